@@ -70,6 +70,9 @@ from shared.file_io import safe_load
 from .formatters import format_alpha_refresh, _get_http_session, _close_http_session
 
 
+from .ml_client import get_ml_client, summarize_predictions
+
+
 
 
 
@@ -2681,521 +2684,166 @@ def _format_prediction_result(mint: str, data: dict) -> str:
 
 
 async def predict_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, user_manager: UserManager):
-
-
     """Handle /predict [mint] command."""
-
-
     chat_id = str(update.effective_chat.id)
-
-
     # Allowed for all users
 
-
-    
-
-
-
-
-
     if not context.args or len(context.args) != 1:
-
-
         await update.message.reply_html(
-
-
             "<b>Usage:</b> <code>/predict [mint_address]</code>\n\n"
-
-
             "<b>Example:</b> <code>/predict DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263</code>"
-
-
         )
-
-
         return
 
-
-
-
-
     mint = context.args[0].strip()
-
-
     loading_msg = await update.message.reply_html(f"\U0001F916 Analyzing token <code>{mint}</code>... Please wait.")
 
-
-    
-
-
-    url = f"{FASTAPI_ML_URL}/token/{mint}/predict"
-
-
-    
-
-
     try:
+        # Shared client: repeat queries within the cache TTL are answered locally
+        client = await get_ml_client()
+        data = await client.predict_token(mint, threshold=0.70)
 
+        if data is not None:
+            result_msg = _format_prediction_result(mint, data)
+            await loading_msg.edit_text(result_msg, parse_mode="HTML", disable_web_page_preview=True)
+        else:
+            error_msg = client.last_error(mint) or "Unknown error"
+            logger.warning(f"Prediction failed for {mint}: {error_msg}")
+            await loading_msg.edit_text(
+                f"❌ <b>Analysis Failed for <code>{mint}</code></b>\n\n"
+                f"<b>Error:</b> {html.escape(error_msg)}",
+                parse_mode="HTML"
+            )
 
-        session = await _get_http_session()
-
-
-        async with session.get(url, timeout=300) as resp:
-
-
-            if resp.status == 200:
-
-
-                data = await resp.json()
-
-
-                result_msg = _format_prediction_result(mint, data)
-
-
-                await loading_msg.edit_text(result_msg, parse_mode="HTML", disable_web_page_preview=True)
-
-
-            else:
-
-
-                error_data = await resp.json()
-
-
-                error_msg = error_data.get('detail', 'Unknown error')
-
-
-                logger.warning(f"Prediction failed for {mint}, status {resp.status}: {error_msg}")
-
-
-                await loading_msg.edit_text(
-
-
-                    f"\u274C <b>Analysis Failed for <code>{mint}</code></b>\n\n"
-
-
-                    f"<b>Error:</b> {html.escape(error_msg)}",
-
-
-                    parse_mode="HTML"
-
-
-                )
-
-
-                
-
-
-    except asyncio.TimeoutError:
-
-
-        logger.error(f"Timeout during /predict for {mint}")
-
-
-        await loading_msg.edit_text(f"Œ <b>Request Timed Out</b>\n\nThe prediction service is taking too long to respond.")
-
-
-    except aiohttp.ClientError as e:
+    except Exception as e:
+        logger.exception(f"Error in /predict command: {e}")
+        await loading_msg.edit_text(f"❌ <b>An Unexpected Error Occurred</b>\n\nPlease try again later.", parse_mode="HTML")
 
 
-        logger.error(f"HTTP error during /predict: {e}")
+MAX_PREDICT_BATCH = 50
 
 
-        await loading_msg.edit_text(f"Œ <b>Connection Error</b>\n\nFailed to connect to the prediction service.")
+def _format_batch_prediction_line(item: dict) -> str:
+    mint = item.get('mint') or ''
+    mint_short = mint[:8] + "..." if len(mint) > 12 else mint
 
+    if item.get('success'):
+        pred_data = item.get('prediction') or {}
+        action = pred_data.get('action', 'N/A')
+        win_prob = (pred_data.get('win_probability') or 0) * 100
+        confidence = pred_data.get('confidence', 'N/A')
+        risk = pred_data.get('risk_tier', 'N/A')
 
-    except Exception as e:
+        # Action emoji
+        action_emoji = {
+            "BUY": "\U0001F7E2",
+            "CONSIDER": "\U0001F7E1",
+            "SKIP": "\U0001F7E0",
+            "AVOID": "\U0001F534"
+        }.get(action, "⚪")
 
+        return (
+            f"{action_emoji} <b>{mint_short}</b>\n"
+            f"   Action: <b>{action}</b>\n"
+            f"   Win: {win_prob:.1f}% | {confidence}\n"
+            f"   Risk: {risk}\n"
+        )
 
-        logger.exception(f"Error in /predict command: {e}")
+    error = item.get('error', 'Unknown error')
+    return (
+        f"❌ <b>{mint_short}</b>\n"
+        f"   Error: {html.escape(str(error))}\n"
+    )
 
 
-        await loading_msg.edit_text(f"Œ <b>An Unexpected Error Occurred</b>\n\nPlease try again later.")
+def _render_batch_predictions(items: list, total: int, done: bool) -> str:
+    if done:
+        header = f"<b>Batch Analysis Complete ({len(items)} tokens)</b>\n"
+    else:
+        header = f"\U0001F916 <b>Batch Analysis</b> ({len(items)}/{total} tokens)...\n"
 
+    result_lines = [header] + [_format_batch_prediction_line(item) for item in items]
 
+    if done:
+        summary = summarize_predictions(items)
+        result_lines.append(
+            f"\n<b>Summary:</b>\n"
+            f"✅ Success: {summary['successful_predictions']} | ❌ Failed: {summary['failed_predictions']}\n"
+            f"\U0001F7E2 Buy Signals: {summary['buy_signals']}"
+        )
 
+    final_msg = "\n".join(result_lines)
+    # Check Telegram message length limit
+    if len(final_msg) > 4096:
+        final_msg = final_msg[:4090] + "...\n<i>(truncated)</i>"
+    return final_msg
 
 
 async def predict_batch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, user_manager: UserManager):
-
-
     """Handle /predict_batch [mint1] [mint2] ... command."""
-
-
     chat_id = str(update.effective_chat.id)
-
-
     # Allowed for all users
 
-
-    
-
-
-
-
-
-    mints = [arg.strip() for arg in context.args]
-
-
-    
-
+    mints = list(dict.fromkeys(arg.strip() for arg in context.args if arg.strip()))
 
     if not mints:
-
-
         await update.message.reply_html(
-
-
             "<b>Usage:</b> <code>/predict_batch [mint1] [mint2] ...</code>\n\n"
-
-
             "<b>Example:</b> <code>/predict_batch mint1 mint2 mint3</code>\n\n"
-
-
-            "<b>Note:</b> Maximum 10 tokens per batch"
-
-
+            f"<b>Note:</b> Maximum {MAX_PREDICT_BATCH} tokens per request"
         )
-
-
         return
 
-
-        
-
-
-    if len(mints) > 10:
-
-
-        await update.message.reply_html("Œ <b>Error:</b> Maximum of 10 tokens per batch request.")
-
-
+    if len(mints) > MAX_PREDICT_BATCH:
+        await update.message.reply_html(f"❌ <b>Error:</b> Maximum of {MAX_PREDICT_BATCH} tokens per batch request.")
         return
 
-
-
-
-
     loading_msg = await update.message.reply_html(
-
-
         f"\U0001F916 Analyzing <b>{len(mints)} tokens</b> in a batch... This may take a moment."
-
-
     )
 
-
-    
-
-
-    # FIXED: Send as JSON array in request body, NOT inside a dict
-
-
-    url = f"{FASTAPI_ML_URL}/token/predict/batch"
-
-
-    
-
-
     try:
-
-
-        session = await _get_http_session()
-
-
-        
-
-
-        # CRITICAL FIX: Send mints as a JSON array directly
-
-
-        async with session.post(
-
-
-            url, 
-
-
-            json=mints,  # † This is now a list, not {"mints": mints}
-
-
-            params={"threshold": 0.70},
-
-
-            timeout=300
-
-
-        ) as resp:
-
-
-            if resp.status == 200:
-
-
-                data = await resp.json()
-
-
-                predictions = data.get('predictions', [])
-
-
-                
-
-
-                result_lines = [f"<b>Batch Analysis Complete ({len(predictions)} tokens)</b>\n"]
-
-
-                
-
-
-                for item in predictions:
-
-
-                    mint = item.get('mint')
-
-
-                    mint_short = mint[:8] + "..." if len(mint) > 12 else mint
-
-
-                    
-
-
-                    if item.get('success'):
-
-
-                        # Format successful prediction
-
-
-                        pred_data = item['prediction']
-
-
-                        action = pred_data.get('action', 'N/A')
-
-
-                        win_prob = pred_data.get('win_probability', 0) * 100
-
-
-                        confidence = pred_data.get('confidence', 'N/A')
-
-
-                        risk = pred_data.get('risk_tier', 'N/A')
-
-
-                        
-
-
-                        # Action emoji
-
-
-                        action_emoji = {
-
-
-                            "BUY": "\U0001F7E2",
-
-
-                            "CONSIDER": "\U0001F7E1",
-
-
-                            "SKIP": "\U0001F7E0",
-
-
-                            "AVOID": "\U0001F534"
-
-
-                        }.get(action, "\u26AA")
-
-
-                        
-
-
-                        result_lines.append(
-
-
-                            f"{action_emoji} <b>{mint_short}</b>\n"
-
-
-                            f"   Action: <b>{action}</b>\n"
-
-
-                            f"   Win: {win_prob:.1f}% | {confidence}\n"
-
-
-                            f"   Risk: {risk}\n"
-
-
-                        )
-
-
-                    else:
-
-
-                        # Format error
-
-
-                        error = item.get('error', 'Unknown error')
-
-
-                        result_lines.append(
-
-
-                            f"\u274C <b>{mint_short}</b>\n"
-
-
-                            f"   Error: {html.escape(error)}\n"
-
-
-                        )
-
-
-                
-
-
-                # Summary
-
-
-                successful = data.get('successful_predictions', 0)
-
-
-                failed = data.get('failed_predictions', 0)
-
-
-                buy_signals = data.get('buy_signals', 0)
-
-
-                
-
-
-                result_lines.append(
-
-
-                    f"\n<b>Summary:</b>\n"
-
-
-                    f"\u2705 Success: {successful} | \u274C Failed: {failed}\n"
-
-
-                    f"\U0001F7E2 Buy Signals: {buy_signals}"
-
-
-                )
-
-
-                
-
-
-                final_msg = "\n".join(result_lines)
-
-
-                
-
-
-                # Check Telegram message length limit
-
-
-                if len(final_msg) > 4096:
-
-
-                    final_msg = final_msg[:4090] + "...\n<i>(truncated)</i>"
-
-
-                    
-
-
-                await loading_msg.edit_text(final_msg, parse_mode="HTML", disable_web_page_preview=True)
-
-
-                
-
-
-            else:
-
-
-                error_data = await resp.json()
-
-
-                error_msg = error_data.get('detail', 'Unknown error')
-
-
-                logger.warning(f"Batch prediction failed, status {resp.status}: {error_msg}")
-
-
-                await loading_msg.edit_text(
-
-
-                    f"Œ <b>Batch Analysis Failed</b>\n\n"
-
-
-                    f"<b>Error:</b> {html.escape(error_msg)}",
-
-
-                    parse_mode="HTML"
-
-
-                )
-
-
-                
-
-
-    except asyncio.TimeoutError:
-
-
-        logger.error(f"Timeout during /predict_batch for {len(mints)} mints")
-
+        client = await get_ml_client()
+        order = {m: i for i, m in enumerate(mints)}
+        items: list = []
+
+        # Render progressively as each 10-mint batch comes back
+        async for chunk in client.iter_predictions(mints, threshold=0.70):
+            items.extend(chunk)
+            items.sort(key=lambda item: order.get(item.get('mint'), len(order)))
+            if len(items) < len(mints):
+                try:
+                    await loading_msg.edit_text(
+                        _render_batch_predictions(items, len(mints), done=False),
+                        parse_mode="HTML", disable_web_page_preview=True
+                    )
+                except Exception as e:
+                    logger.debug(f"/predict_batch progress update skipped: {e}")
+
+        if items and not any(item.get('success') for item in items):
+            error_msg = items[0].get('error', 'Unknown error')
+            logger.warning(f"Batch prediction failed: {error_msg}")
+            await loading_msg.edit_text(
+                f"❌ <b>Batch Analysis Failed</b>\n\n"
+                f"<b>Error:</b> {html.escape(str(error_msg))}",
+                parse_mode="HTML"
+            )
+            return
 
         await loading_msg.edit_text(
-
-
-            "Œ <b>Request Timed Out</b>\n\n"
-
-
-            "The prediction service is taking too long to respond.\n"
-
-
-            "Try reducing the number of tokens or try again later."
-
-
+            _render_batch_predictions(items, len(mints), done=True),
+            parse_mode="HTML", disable_web_page_preview=True
         )
 
-
-    except aiohttp.ClientError as e:
-
-
-        logger.error(f"HTTP error during /predict_batch: {e}")
-
-
-        await loading_msg.edit_text(
-
-
-            "Œ <b>Connection Error</b>\n\n"
-
-
-            "Failed to connect to the prediction service.\n"
-
-
-            "Please try again in a moment."
-
-
-        )
-
-
     except Exception as e:
-
-
         logger.exception(f"Error in /predict_batch command: {e}")
-
-
         await loading_msg.edit_text(
-
-
-            "Œ <b>An Unexpected Error Occurred</b>\n\n"
-
-
-            "Please try again later or contact support."
-
-
+            "❌ <b>An Unexpected Error Occurred</b>\n\n"
+            "Please try again later or contact support.",
+            parse_mode="HTML"
         )
 
 
-
-
-
 # --- MODIFIED: button_handler ---
 
 
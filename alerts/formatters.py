@@ -12,7 +12,12 @@ Enhanced ML insights with beautiful UX
 from typing import Optional, Dict, Any, Tuple
 import aiohttp
 import asyncio
+import hashlib
+import json
 import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 import html
 
@@ -198,8 +203,31 @@ def format_smart_money_insight(sm_data: Dict[str, Any]) -> str:
 # ALPHA ALERTS - High-priority overlap alerts with security analysis
 # ============================================================================
 
+# DexScreener pairs are reused for this long; rendered alerts/refreshes live as long as their market data
+DEX_MARKET_DATA_TTL = float(os.getenv("DEX_MARKET_DATA_TTL", "15"))
+ALERT_RENDER_CACHE_SIZE = 256
+
+_market_data_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_market_data_inflight: Dict[str, "asyncio.Future"] = {}
+_render_cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+
+
 async def _get_dexscreener_data(mint: str) -> Dict[str, Any]:
-    """Fetch token data from DexScreener API."""
+    """Fetch token data from DexScreener API (short-TTL cache; concurrent calls share one request)."""
+    cached = _market_data_cache.get(mint)
+    if cached and time.time() - cached[0] < DEX_MARKET_DATA_TTL:
+        return cached[1]
+
+    loop = asyncio.get_running_loop()
+    task = _market_data_inflight.get(mint)
+    if task is None or task.done() or task.get_loop() is not loop:
+        task = loop.create_task(_fetch_dexscreener_data(mint))
+        _market_data_inflight[mint] = task
+        task.add_done_callback(lambda t, m=mint: _market_data_inflight.pop(m, None) if _market_data_inflight.get(m) is t else None)
+    return await asyncio.shield(task)
+
+
+async def _fetch_dexscreener_data(mint: str) -> Dict[str, Any]:
     session = await _get_http_session()
     url = f"https://api.dexscreener.com/latest/dex/tokens/{mint}"
     try:
@@ -207,7 +235,13 @@ async def _get_dexscreener_data(mint: str) -> Dict[str, Any]:
             if resp.status == 200:
                 data = await resp.json()
                 if data and data.get("pairs"):
-                    return data["pairs"][0]
+                    pair = data["pairs"][0]
+                    _market_data_cache[mint] = (time.time(), pair)
+                    if len(_market_data_cache) > 2000:
+                        now = time.time()
+                        for key in [k for k, v in _market_data_cache.items() if now - v[0] >= DEX_MARKET_DATA_TTL]:
+                            del _market_data_cache[key]
+                    return pair
             logger.warning(f"Failed to fetch DexScreener data for {mint}, status: {resp.status}")
             return {}
     except asyncio.TimeoutError:
@@ -218,6 +252,29 @@ async def _get_dexscreener_data(mint: str) -> Dict[str, Any]:
         return {}
 
 
+def _render_cache_get(key: Tuple) -> Any:
+    entry = _render_cache.get(key)
+    if entry and time.time() - entry[0] < DEX_MARKET_DATA_TTL:
+        _render_cache.move_to_end(key)
+        return entry[1]
+    return None
+
+
+def _render_cache_put(key: Tuple, value: Any):
+    _render_cache[key] = (time.time(), value)
+    _render_cache.move_to_end(key)
+    while len(_render_cache) > ALERT_RENDER_CACHE_SIZE:
+        _render_cache.popitem(last=False)
+
+
+def _entry_version(entry: Dict[str, Any]) -> str:
+    """Identifies one historian entry: its timestamp when present, else a hash of its content."""
+    ts = entry.get("ts") if isinstance(entry, dict) else None
+    if isinstance(ts, str) and ts:
+        return ts
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, default=str).encode()).hexdigest()
+
+
 def _format_time_ago(dt: datetime) -> str:
     """
     Format datetime as age.
@@ -311,11 +368,56 @@ def format_alpha_alert(mint: str, entry: Dict[str, Any]) -> Tuple[str, Dict[str,
         return asyncio.run(_format_alpha_alert_async(mint, entry))
 
 
+_ALPHA_ALERT_TEMPLATE = """🔥 <b>{alert_label}: ${symbol}</b> 🔥
+<b>{name}</b>
+<code>{mint_head}...{mint_tail}</code>
+
+{alpha_score_line}
+-------------------------
+{sm_section}
+-------------------------
+{ml_section}
+-------------------------
+<b>📈 Market Data</b>
+<b>💰 Price:</b> ${price:.8f}
+<b>📊 MC:</b> {market_cap}
+<b>💧 Liq:</b> {liquidity} {liq_gap}
+<b>⏰ Age:</b> {age}
+-------------------------
+<b>🛡️ Safety</b>
+<b>Score:</b> {score_text}
+<b>🔒 LP Locked:</b> {lp_locked}
+<b>Mint:</b> {mint_status}
+<b>Freeze:</b> {freeze_status}
+-------------------------
+<b>⚠️ Risks (Show ONLY Warn/Danger)</b>
+{risks}
+-------------------------
+<a href="https://solscan.io/token/{mint}">Solscan</a> | <a href="https://gmgn.ai/sol/token/{mint}">GMGN</a> | <a href="https://dexscreener.com/solana/{mint}">DexScreener</a>"""
+
+
 async def _format_alpha_alert_async(mint: str, entry: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[str]]:
     """
     Format alpha alert with enhanced ML insights.
     Returns (message_html_string, initial_state_dict, image_url)
+
+    Rendered once per (mint, entry version) and reused while its market data is fresh,
+    so every recipient of the same token shares one DexScreener fetch and one render.
     """
+    key = ("alert", mint, _entry_version(entry))
+    cached = _render_cache_get(key)
+    if cached:
+        msg, initial_state, image_url = cached
+        return msg, dict(initial_state), image_url
+
+    msg, initial_state, image_url = await _build_alpha_alert(mint, entry)
+    if msg:
+        _render_cache_put(key, (msg, initial_state, image_url))
+        initial_state = dict(initial_state)
+    return msg, initial_state, image_url
+
+
+async def _build_alpha_alert(mint: str, entry: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[str]]:
     try:
         # Fetch current market data
         dex_data = await _get_dexscreener_data(mint)
@@ -436,6 +538,7 @@ async def _format_alpha_alert_async(mint: str, entry: Dict[str, Any]) -> Tuple[s
         # Get Smart Money data
         sm_data = result.get("smart_money", {})
         sm_section = format_smart_money_insight(sm_data)
+        alert_label = sm_data.get("alert_label", "Alpha Alert") if isinstance(sm_data, dict) else "Alpha Alert"
         
         # Build Alpha Score section
         alpha_score = result.get("alpha_score", 0)
@@ -448,32 +551,27 @@ async def _format_alpha_alert_async(mint: str, entry: Dict[str, Any]) -> Tuple[s
         liq_gap_str = f"({liq_gap:.1f}% vs MC)" if liq_gap > 0 else ""
 
         # Build the message
-        msg = f"""🔥 <b>{html.escape(alert_label)}: ${esc_symbol}</b> 🔥
-<b>{esc_name}</b>
-<code>{esc_mint[:6]}...{esc_mint[-6:]}</code>
-
-{alpha_score_line}
--------------------------
-{sm_section}
--------------------------
-{ml_section}
--------------------------
-<b>📈 Market Data</b>
-<b>💰 Price:</b> ${price_usd:.8f}
-<b>📊 MC:</b> {_format_usd(market_cap)}
-<b>💧 Liq:</b> {_format_usd(liquidity_usd)} {liq_gap_str}
-<b>⏰ Age:</b> {age_str}
--------------------------
-<b>🛡️ Safety</b>
-<b>Score:</b> {score_text}
-<b>🔒 LP Locked:</b> {_format_pct(lp_locked_pct)}
-<b>Mint:</b> {'✅ Renounced' if not mint_authority else '❌ Active'}
-<b>Freeze:</b> {'✅ Renounced' if not freeze_authority else '❌ Active'}
--------------------------
-<b>⚠️ Risks (Show ONLY Warn/Danger)</b>
-{risk_str if risk_str else "✅ No significant risks"}
--------------------------
-<a href="https://solscan.io/token/{mint}">Solscan</a> | <a href="https://gmgn.ai/sol/token/{mint}">GMGN</a> | <a href="https://dexscreener.com/solana/{mint}">DexScreener</a>"""
+        msg = _ALPHA_ALERT_TEMPLATE.format(
+            alert_label=html.escape(alert_label),
+            symbol=esc_symbol,
+            name=esc_name,
+            mint_head=esc_mint[:6],
+            mint_tail=esc_mint[-6:],
+            alpha_score_line=alpha_score_line,
+            sm_section=sm_section,
+            ml_section=ml_section,
+            price=price_usd,
+            market_cap=_format_usd(market_cap),
+            liquidity=_format_usd(liquidity_usd),
+            liq_gap=liq_gap_str,
+            age=age_str,
+            score_text=score_text,
+            lp_locked=_format_pct(lp_locked_pct),
+            mint_status='✅ Renounced' if not mint_authority else '❌ Active',
+            freeze_status='✅ Renounced' if not freeze_authority else '❌ Active',
+            risks=risk_str,
+            mint=mint,
+        )
 
         # Create initial state
         initial_state = {
@@ -495,8 +593,39 @@ async def _format_alpha_alert_async(mint: str, entry: Dict[str, Any]) -> Tuple[s
         return None, None, None
 
 
+_ALPHA_REFRESH_TEMPLATE = """🔄 <b>Refresh: ${symbol}</b>
+<i>Stats vs. first alert {time_elapsed}</i>
+
+<b>💰 Price:</b> ${price:.8f}
+
+--- <b>Market Cap</b> ---
+<b>Now:</b> {current_mc}
+<b>Initial:</b> {initial_mc}
+<b>Change:</b> {mc_change}
+
+--- <b>Liquidity</b> ---
+<b>Now:</b> {current_liq}
+<b>Initial:</b> {initial_liq}
+<b>Change:</b> {liq_change}
+
+<a href="https://dexscreener.com/solana/{mint}">View on DexScreener</a>"""
+
+
 async def format_alpha_refresh(mint: str, initial_state: Dict[str, Any]) -> str:
-    """Format refresh message showing changes since initial alert."""
+    """Format refresh message showing changes since initial alert (shared by every user refreshing it)."""
+    key = ("refresh", mint, initial_state.get("first_alert_at"),
+           initial_state.get("initial_market_cap"), initial_state.get("initial_liquidity"))
+    cached = _render_cache_get(key)
+    if cached:
+        return cached
+
+    msg = await _build_alpha_refresh(mint, initial_state)
+    if not msg.startswith("❌"):
+        _render_cache_put(key, msg)
+    return msg
+
+
+async def _build_alpha_refresh(mint: str, initial_state: Dict[str, Any]) -> str:
     try:
         dex_data = await _get_dexscreener_data(mint)
         if not dex_data:
@@ -534,22 +663,18 @@ async def format_alpha_refresh(mint: str, initial_state: Dict[str, Any]) -> str:
         mc_change_str = format_change(mc_change_pct)
         liq_change_str = format_change(liq_change_pct)
 
-        msg = f"""🔄 <b>Refresh: ${html.escape(str(symbol))}</b>
-<i>Stats vs. first alert {time_elapsed_str}</i>
-
-<b>💰 Price:</b> ${current_price:.8f}
-
---- <b>Market Cap</b> ---
-<b>Now:</b> {_format_usd(current_mc)}
-<b>Initial:</b> {_format_usd(initial_mc)}
-<b>Change:</b> {mc_change_str}
-
---- <b>Liquidity</b> ---
-<b>Now:</b> {_format_usd(current_liq)}
-<b>Initial:</b> {_format_usd(initial_liq)}
-<b>Change:</b> {liq_change_str}
-
-<a href="https://dexscreener.com/solana/{mint}">View on DexScreener</a>"""
+        msg = _ALPHA_REFRESH_TEMPLATE.format(
+            symbol=html.escape(str(symbol)),
+            time_elapsed=time_elapsed_str,
+            price=current_price,
+            current_mc=_format_usd(current_mc),
+            initial_mc=_format_usd(initial_mc),
+            mc_change=mc_change_str,
+            current_liq=_format_usd(current_liq),
+            initial_liq=_format_usd(initial_liq),
+            liq_change=liq_change_str,
+            mint=mint,
+        )
         
         return msg
 
@@ -1,23 +1,49 @@
 #!/usr/bin/env python3
 """
 alerts/ml_client.py - ML API client for token predictions with enhanced UX
+
+Requests are aggregated client-side:
+- Lists of any size are split into 10-mint batches (the API limit) sent concurrently.
+- Identical in-flight requests for the same (mint, threshold) share one call.
+- Successful predictions are cached per (mint, threshold) for a short TTL.
+- `iter_predictions()` yields results batch by batch so the UI can render progressively.
 """
 
+import json
 import logging
+import time
 import aiohttp
 import asyncio
-from typing import Dict, Any, Optional, List
-from config import ML_API_URL, ML_API_TIMEOUT
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+from config import FASTAPI_ML_URL, ML_API_TIMEOUT, ML_PREDICTION_CACHE_TTL, ML_BATCH_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
+# Maximum mints the /token/predict/batch endpoint accepts per call
+API_BATCH_LIMIT = 10
+BATCH_TIMEOUT_SECONDS = 300
+# Single /predict calls can take minutes on a cold model; the session default (ML_API_TIMEOUT) is too short
+PREDICT_TIMEOUT_SECONDS = 300
+
+_CacheKey = Tuple[str, float]
+
+
 class MLAPIClient:
     """Client for interacting with the ML prediction API."""
     
-    def __init__(self, base_url: str = ML_API_URL, timeout: int = ML_API_TIMEOUT):
-        self.base_url = base_url.rstrip('/')
+    def __init__(self, base_url: str = FASTAPI_ML_URL, timeout: int = ML_API_TIMEOUT,
+                 cache_ttl: int = ML_PREDICTION_CACHE_TTL, batch_concurrency: int = ML_BATCH_CONCURRENCY):
+        self.base_url = (base_url or "").rstrip('/')
         self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache_ttl = cache_ttl
         self._session = None
+        self._batch_sema = asyncio.Semaphore(batch_concurrency)
+        # (mint, threshold) -> (expires_at, data)
+        self._cache: Dict[_CacheKey, Tuple[float, Dict[str, Any]]] = {}
+        # (mint, threshold) -> future resolving to a batch item
+        self._inflight: Dict[_CacheKey, asyncio.Future] = {}
+        # mint -> last API error detail (for user-facing messages)
+        self._last_errors: Dict[str, str] = {}
     
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
@@ -29,6 +55,41 @@ class MLAPIClient:
         """Close the aiohttp session."""
         if self._session and not self._session.closed:
             await self._session.close()
+
+    # ------------------------------------------------------------------
+    # Cache / coalescing helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(mint: str, threshold: float) -> _CacheKey:
+        return (mint, round(float(threshold), 4))
+
+    def _cache_get(self, key: _CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        return data
+
+    def _cache_put(self, key: _CacheKey, data: Dict[str, Any]):
+        now = time.monotonic()
+        if len(self._cache) > 2000:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] >= now}
+        self._cache[key] = (now + self.cache_ttl, data)
+
+    @staticmethod
+    def _as_batch_item(mint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a single-endpoint response or batch item to the batch item shape."""
+        if "success" in data:
+            return data
+        return {"mint": mint, "success": True, "prediction": data.get("prediction", data)}
+
+    def last_error(self, mint: str) -> Optional[str]:
+        """Error detail from the most recent failed request for `mint`, if any."""
+        return self._last_errors.get(mint)
     
     async def predict_token(
         self, 
@@ -45,6 +106,33 @@ class MLAPIClient:
         Returns:
             Dictionary with prediction results or None if failed
         """
+        key = self._key(mint, threshold)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.debug(f"ML prediction cache hit for {mint[:8]}")
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            item = await asyncio.shield(pending)
+            return item if item.get("success") else None
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        data = None
+        try:
+            data = await self._get_prediction(mint, threshold)
+            if data is not None:
+                self._cache_put(key, data)
+            return data
+        finally:
+            self._inflight.pop(key, None)
+            fut.set_result(
+                self._as_batch_item(mint, data) if data is not None
+                else {"mint": mint, "success": False, "error": self._last_errors.get(mint, "Prediction failed")}
+            )
+
+    async def _get_prediction(self, mint: str, threshold: float) -> Optional[Dict[str, Any]]:
         try:
             session = await self._get_session()
             url = f"{self.base_url}/token/{mint}/predict"
@@ -52,13 +140,16 @@ class MLAPIClient:
             
             logger.info(f"🤖 Requesting ML prediction for {mint[:8]}...")
             
-            async with session.get(url, params=params) as response:
+            async with session.get(url, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=PREDICT_TIMEOUT_SECONDS)) as response:
                 if response.status == 200:
                     data = await response.json()
                     logger.info(f"✅ Got ML prediction for {mint[:8]}")
+                    self._last_errors.pop(mint, None)
                     return data
                 elif response.status == 503:
                     logger.warning(f"⚠️ ML service unavailable for {mint[:8]}")
+                    self._last_errors[mint] = "ML service unavailable"
                     return None
                 else:
                     error_text = await response.text()
@@ -66,13 +157,16 @@ class MLAPIClient:
                         f"❌ ML API error for {mint[:8]}: "
                         f"status={response.status}, error={error_text}"
                     )
+                    self._last_errors[mint] = _error_detail(error_text)
                     return None
                     
         except asyncio.TimeoutError:
             logger.error(f"⏱️ ML API timeout for {mint[:8]}")
+            self._last_errors[mint] = "Request timed out"
             return None
         except Exception as e:
             logger.exception(f"❌ ML API request failed for {mint[:8]}: {e}")
+            self._last_errors[mint] = "Connection error"
             return None
     
     async def predict_batch(
@@ -81,52 +175,139 @@ class MLAPIClient:
         threshold: float = 0.70
     ) -> Optional[Dict[str, Any]]:
         """
-        Get ML predictions for multiple tokens (max 10).
+        Get ML predictions for any number of tokens.
+
+        Mints are split into concurrent 10-mint API batches; cached and
+        in-flight predictions are reused.
         
         Args:
-            mints: List of token mint addresses (max 10)
+            mints: List of token mint addresses
             threshold: Probability threshold for BUY signal
         
         Returns:
-            Dictionary with batch prediction results or None if failed
+            Dictionary shaped like the batch endpoint response
+            (predictions, successful_predictions, failed_predictions, buy_signals),
+            or None if every prediction failed
         """
-        if len(mints) > 10:
-            logger.warning(f"⚠️ Batch size {len(mints)} exceeds limit, truncating to 10")
-            mints = mints[:10]
-        
-        try:
-            session = await self._get_session()
-            url = f"{self.base_url}/token/predict/batch"
-            params = {"threshold": threshold}
-            payload = mints
-            
-            logger.info(f"🤖 Requesting batch ML prediction for {len(mints)} tokens...")
-            
-            async with session.post(url, json=payload, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(
-                        f"✅ Got batch predictions: "
-                        f"{data.get('successful_predictions', 0)}/{len(mints)} successful"
-                    )
-                    return data
-                elif response.status == 503:
-                    logger.warning("⚠️ ML service unavailable for batch prediction")
-                    return None
-                else:
-                    error_text = await response.text()
-                    logger.error(
-                        f"❌ Batch ML API error: "
-                        f"status={response.status}, error={error_text}"
-                    )
-                    return None
-                    
-        except asyncio.TimeoutError:
-            logger.error("⏱️ ML API batch timeout")
-            return None
-        except Exception as e:
-            logger.exception(f"❌ Batch ML API request failed: {e}")
+        predictions: List[Dict[str, Any]] = []
+        async for chunk in self.iter_predictions(mints, threshold):
+            predictions.extend(chunk)
+
+        # Keep request order
+        order = {m: i for i, m in enumerate(dict.fromkeys(mints))}
+        predictions.sort(key=lambda item: order.get(item.get("mint"), len(order)))
+
+        summary = summarize_predictions(predictions)
+        if predictions and summary["successful_predictions"] == 0:
             return None
+        return summary
+
+    async def iter_predictions(
+        self,
+        mints: List[str],
+        threshold: float = 0.70
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream predictions as they become available.
+
+        Yields lists of batch items ({"mint", "success", "prediction" | "error"}):
+        cached results first, then one list per API batch as it completes.
+        """
+        unique = list(dict.fromkeys(m for m in mints if m))
+        cached_items, to_fetch = [], []
+        for mint in unique:
+            data = self._cache_get(self._key(mint, threshold))
+            if data is not None:
+                cached_items.append(self._as_batch_item(mint, data))
+            else:
+                to_fetch.append(mint)
+
+        if cached_items:
+            yield cached_items
+
+        chunks = [to_fetch[i:i + API_BATCH_LIMIT] for i in range(0, len(to_fetch), API_BATCH_LIMIT)]
+        tasks = [asyncio.ensure_future(self._fetch_chunk(chunk, threshold)) for chunk in chunks]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_chunk(self, chunk: List[str], threshold: float) -> List[Dict[str, Any]]:
+        """Fetch one batch, sharing any (mint, threshold) already in flight elsewhere."""
+        loop = asyncio.get_running_loop()
+        waiting: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+        for mint in chunk:
+            key = self._key(mint, threshold)
+            if key in self._inflight:
+                waiting[mint] = self._inflight[key]
+            else:
+                owned[mint] = self._inflight[key] = loop.create_future()
+
+        items_by_mint: Dict[str, Dict[str, Any]] = {}
+        try:
+            if owned:
+                for item in await self._post_batch(list(owned), threshold):
+                    items_by_mint[item.get("mint")] = item
+        finally:
+            for mint, fut in owned.items():
+                item = items_by_mint.setdefault(
+                    mint, {"mint": mint, "success": False, "error": "Missing from batch response"}
+                )
+                self._inflight.pop(self._key(mint, threshold), None)
+                if not fut.done():
+                    fut.set_result(item)
+
+        for mint, fut in waiting.items():
+            items_by_mint[mint] = await asyncio.shield(fut)
+
+        return [items_by_mint[m] for m in chunk]
+
+    async def _post_batch(self, mints: List[str], threshold: float) -> List[Dict[str, Any]]:
+        """POST one ≤10-mint batch; failures come back as per-mint error items."""
+        async with self._batch_sema:
+            try:
+                session = await self._get_session()
+                url = f"{self.base_url}/token/predict/batch"
+                params = {"threshold": threshold}
+                payload = mints
+                
+                logger.info(f"🤖 Requesting batch ML prediction for {len(mints)} tokens...")
+                
+                async with session.post(url, json=payload, params=params,
+                                        timeout=aiohttp.ClientTimeout(total=BATCH_TIMEOUT_SECONDS)) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        logger.info(
+                            f"✅ Got batch predictions: "
+                            f"{data.get('successful_predictions', 0)}/{len(mints)} successful"
+                        )
+                        items = data.get("predictions", [])
+                        for item in items:
+                            if item.get("success") and item.get("mint"):
+                                self._cache_put(self._key(item["mint"], threshold), item)
+                        return items
+                    elif response.status == 503:
+                        logger.warning("⚠️ ML service unavailable for batch prediction")
+                        error = "ML service unavailable"
+                    else:
+                        error_text = await response.text()
+                        logger.error(
+                            f"❌ Batch ML API error: "
+                            f"status={response.status}, error={error_text}"
+                        )
+                        error = _error_detail(error_text)
+                        
+            except asyncio.TimeoutError:
+                logger.error("⏱️ ML API batch timeout")
+                error = "Request timed out"
+            except Exception as e:
+                logger.exception(f"❌ Batch ML API request failed: {e}")
+                error = "Connection error"
+
+        return [{"mint": mint, "success": False, "error": error} for mint in mints]
     
     async def get_ml_status(self) -> Optional[Dict[str, Any]]:
         """Get ML service status and model information."""
@@ -147,6 +328,26 @@ class MLAPIClient:
             return None
 
 
+def _error_detail(error_text: str) -> str:
+    """Extract FastAPI's `detail` message from an error body."""
+    try:
+        return str(json.loads(error_text).get("detail", error_text))
+    except Exception:
+        return error_text or "Unknown error"
+
+
+def summarize_predictions(predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the batch endpoint's summary fields from a list of batch items."""
+    successful = [p for p in predictions if p.get("success")]
+    return {
+        "predictions": predictions,
+        "total": len(predictions),
+        "successful_predictions": len(successful),
+        "failed_predictions": len(predictions) - len(successful),
+        "buy_signals": sum(1 for p in successful if (p.get("prediction") or {}).get("action") == "BUY"),
+    }
+
+
 def _format_currency(value: float) -> str:
     """Format currency values with K/M suffixes."""
     if value >= 1_000_000:
@@ -23,7 +23,7 @@ from config import (
 )
 from pathlib import Path
 from shared.file_io import safe_load, safe_save
-from shared.utils import fetch_marketcap_and_fdv, truncate_address
+from shared.utils import fetch_marketcap_and_fdv_async, truncate_address
 from shared.tracking_utils import calculate_dedup_expiry, is_dedup_expired
 from alerts.formatters import format_alert_html
 
@@ -501,7 +501,8 @@ async def background_loop(app: Application, user_manager, portfolio_manager=None
 
     while True:
         try:
-            download_latest_overlap()
+            # Supabase download is blocking I/O - keep it off the event loop
+            await asyncio.to_thread(download_latest_overlap)
             
             tokens = load_latest_tokens_from_overlap()
             if not tokens:
@@ -510,7 +511,7 @@ async def background_loop(app: Application, user_manager, portfolio_manager=None
                 continue
 
             # Download active_tracking.json for ML_PASSED initial status crosscheck
-            active_tracking = download_active_tracking()
+            active_tracking = await asyncio.to_thread(download_active_tracking)
 
             alerts_sent_this_cycle = 0
             state_updated_this_cycle = 0
@@ -547,7 +548,7 @@ async def background_loop(app: Application, user_manager, portfolio_manager=None
                     
                     # Fallback to live fetch if pre-fetched data is incomplete
                     if not data_complete:
-                        _mc_live, _fdv_live, _lqd_live = fetch_marketcap_and_fdv(token_id)
+                        _mc_live, _fdv_live, _lqd_live = await fetch_marketcap_and_fdv_async(token_id)
                         final_mc = _mc_live if mc is None else mc
                         final_lqd = _lqd_live if lqd is None else lqd
                         final_fdv = _fdv_live
@@ -556,7 +557,7 @@ async def background_loop(app: Application, user_manager, portfolio_manager=None
                         final_mc = mc
                         final_lqd = lqd
                         # Try to get FDV from live fetch as it's not in pre-fetched data
-                        _, final_fdv, _ = fetch_marketcap_and_fdv(token_id)
+                        _, final_fdv, _ = await fetch_marketcap_and_fdv_async(token_id)
 
                     alerts_state[token_id] = {
                         "last_grade": grade, 
@@ -598,7 +599,7 @@ async def background_loop(app: Application, user_manager, portfolio_manager=None
                             logger.error(f"Error parsing timestamp for backoff: {e}")
                     
                     if should_retry:
-                        new_mc, new_fdv, new_lqd = fetch_marketcap_and_fdv(token_id)
+                        new_mc, new_fdv, new_lqd = await fetch_marketcap_and_fdv_async(token_id)
                         is_now_complete = (new_mc is not None and new_lqd is not None)
                         
                         alerts_state[token_id]["last_market_data_retry_at"] = current_time.isoformat()
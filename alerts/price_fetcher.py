@@ -4,26 +4,56 @@ alerts/price_fetcher.py - Fetch token prices from Jupiter and DexScreener
 
 This module handles fetching token information (price, symbol, name) given a mint address.
 It prioritizes Jupiter API for speed and falls back to DexScreener for coverage.
+Jupiter prices come from the shared JUPITER_PRICES cache (shared/jupiter_prices.py).
 """
 
+import os
+import time
 import aiohttp
 import logging
 import asyncio
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Iterable, List, Tuple
+
+from shared.http_client import get_http_session
+from shared.jupiter_prices import JUPITER_PRICES
 
 logger = logging.getLogger(__name__)
 
+# Token infos are reused for this long; concurrent lookups for one mint share a single request
+PRICE_FETCHER_TTL = float(os.getenv("PRICE_FETCHER_TTL", "5"))
+DEXSCREENER_IDS_PER_CALL = 30
+
+
 class PriceFetcher:
     """Fetcher for token prices using Jupiter and DexScreener APIs."""
     
-    JUPITER_API_URL = "https://api.jup.ag/price/v2?ids={mint}"
     DEXSCREENER_API_URL = "https://api.dexscreener.com/latest/dex/tokens/{mint}"
     RUGCHECK_API_URL = "https://api.rugcheck.xyz/v1/tokens/{mint}/report"
+
+    # mint -> (fetched_at, info)
+    _cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    # mint -> (loop, task) for lookups in progress
+    _inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+
+    @classmethod
+    def _cached(cls, mint: str) -> Optional[Dict[str, Any]]:
+        entry = cls._cache.get(mint)
+        if entry and time.time() - entry[0] < PRICE_FETCHER_TTL:
+            return dict(entry[1])
+        return None
+
+    @classmethod
+    def _remember(cls, mint: str, info: Dict[str, Any]):
+        cls._cache[mint] = (time.time(), info)
+        if len(cls._cache) > 5000:
+            now = time.time()
+            cls._cache = {m: e for m, e in cls._cache.items() if now - e[0] < PRICE_FETCHER_TTL}
     
     @classmethod
     async def get_token_info(cls, mint: str, max_retries: int = 3) -> Optional[Dict[str, Any]]:
         """
         Fetch token info (price, symbol, name) for a given mint address with retry backoff.
+        Served from a short-TTL cache; concurrent calls for the same mint share one lookup.
         
         Returns:
             dict: {
@@ -34,23 +64,49 @@ class PriceFetcher:
             }
             or None if not found after retries.
         """
+        cached = cls._cached(mint)
+        if cached:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight = cls._inflight.get(mint)
+        if inflight and inflight[0] is loop and not inflight[1].done():
+            task = inflight[1]
+        else:
+            task = loop.create_task(cls._fetch_with_retries(mint, max_retries))
+            cls._inflight[mint] = (loop, task)
+            task.add_done_callback(lambda t, m=mint: cls._forget_inflight(m, t))
+
+        info = await asyncio.shield(task)
+        return dict(info) if info else None
+
+    @classmethod
+    def _forget_inflight(cls, mint: str, task: asyncio.Task):
+        entry = cls._inflight.get(mint)
+        if entry and entry[1] is task:
+            del cls._inflight[mint]
+
+    @classmethod
+    async def _fetch_with_retries(cls, mint: str, max_retries: int) -> Optional[Dict[str, Any]]:
+        session = await get_http_session()
         for attempt in range(max_retries):
-            async with aiohttp.ClientSession() as session:
-                # 1. Try Jupiter API first (Fastest)
-                try:
-                    jup_data = await cls._fetch_jupiter(session, mint)
-                    if jup_data:
-                        return jup_data
-                except Exception as e:
-                    logger.warning(f"Jupiter API failed for {mint} (attempt {attempt+1}): {e}")
-                
-                # 2. Fallback to DexScreener (More comprehensive)
-                try:
-                    dex_data = await cls._fetch_dexscreener(session, mint)
-                    if dex_data:
-                        return dex_data
-                except Exception as e:
-                    logger.warning(f"DexScreener API failed for {mint} (attempt {attempt+1}): {e}")
+            # 1. Try Jupiter API first (Fastest)
+            try:
+                jup_data = await cls._fetch_jupiter(mint)
+                if jup_data:
+                    cls._remember(mint, jup_data)
+                    return jup_data
+            except Exception as e:
+                logger.warning(f"Jupiter API failed for {mint} (attempt {attempt+1}): {e}")
+            
+            # 2. Fallback to DexScreener (More comprehensive)
+            try:
+                dex_data = await cls._fetch_dexscreener(session, mint)
+                if dex_data:
+                    cls._remember(mint, dex_data)
+                    return dex_data
+            except Exception as e:
+                logger.warning(f"DexScreener API failed for {mint} (attempt {attempt+1}): {e}")
             
             if attempt < max_retries - 1:
                 backoff = 2 ** (attempt + 1)
@@ -60,24 +116,63 @@ class PriceFetcher:
         return None
 
     @classmethod
-    async def _fetch_jupiter(cls, session: aiohttp.ClientSession, mint: str) -> Optional[Dict[str, Any]]:
-        """Fetch price from Jupiter v2 API."""
-        url = cls.JUPITER_API_URL.format(mint=mint)
-        async with session.get(url, timeout=5) as response:
-            if response.status == 200:
-                data = await response.json()
-                # Jupiter v2 response format:
-                # { "data": { "mint": { "id": "mint", "type": "token", "price": "1.23" } } }
-                token_data = data.get("data", {}).get(mint)
-                
-                if token_data and token_data.get("price"):
-                    return {
-                        "price": float(token_data["price"]),
-                        "symbol": "UNKNOWN", # Jupiter v2 price API often doesn't return symbol/name
-                        "name": "Unknown Token",
-                        "source": "jupiter"
-                    }
-        return None
+    async def get_token_infos(cls, mints: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch get_token_info(): cached mints are served from memory, the rest are looked up with
+        the shared Jupiter price cache, then multi-id DexScreener calls for whatever Jupiter had no price for.
+        Single pass, no retries; mints found nowhere are left out of the result.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for mint in dict.fromkeys(m for m in mints if m):
+            cached = cls._cached(mint)
+            if cached:
+                results[mint] = cached
+            else:
+                missing.append(mint)
+        if not missing:
+            return results
+
+        fetched: Dict[str, Dict[str, Any]] = {}
+        try:
+            prices = await JUPITER_PRICES.get_prices(missing)
+            fetched.update((mint, cls._jupiter_info(price)) for mint, price in prices.items())
+        except Exception as e:
+            logger.warning(f"Batch Jupiter price lookup failed: {e}")
+
+        rest = [m for m in missing if m not in fetched]
+        if rest:
+            session = await get_http_session()
+            batches = await asyncio.gather(
+                *(cls._fetch_dexscreener_many(session, rest[i:i + DEXSCREENER_IDS_PER_CALL])
+                  for i in range(0, len(rest), DEXSCREENER_IDS_PER_CALL)),
+                return_exceptions=True,
+            )
+            for batch in batches:
+                if isinstance(batch, Exception):
+                    logger.warning(f"Batch DexScreener lookup failed: {batch}")
+                    continue
+                fetched.update(batch)
+
+        for mint, info in fetched.items():
+            cls._remember(mint, info)
+            results[mint] = dict(info)
+        return results
+
+    @classmethod
+    async def _fetch_jupiter(cls, mint: str) -> Optional[Dict[str, Any]]:
+        """Fetch price through the shared Jupiter price cache."""
+        price = await JUPITER_PRICES.get_price(mint)
+        return cls._jupiter_info(price) if price > 0 else None
+
+    @staticmethod
+    def _jupiter_info(price: float) -> Dict[str, Any]:
+        return {
+            "price": price,
+            "symbol": "UNKNOWN", # Jupiter price API doesn't return symbol/name
+            "name": "Unknown Token",
+            "source": "jupiter"
+        }
 
     @classmethod
     async def _fetch_dexscreener(cls, session: aiohttp.ClientSession, mint: str) -> Optional[Dict[str, Any]]:
@@ -90,125 +185,143 @@ class PriceFetcher:
                 
                 if pairs:
                     # Get the most liquid pair (usually the first one)
-                    best_pair = pairs[0]
-                    result = {
-                        "price": float(best_pair.get("priceUsd", 0)),
-                        "symbol": best_pair.get("baseToken", {}).get("symbol", "UNKNOWN"),
-                        "name": best_pair.get("baseToken", {}).get("name", "Unknown Token"),
-                        "source": "dexscreener",
-                        # Extra details
-                        "fdv": float(best_pair.get("fdv", 0)),
-                        "volume24h": float(best_pair.get("volume", {}).get("h24", 0)),
-                        "liquidity": float(best_pair.get("liquidity", {}).get("usd", 0)),
-                        "price_change_24h": float(best_pair.get("priceChange", {}).get("h24", 0))
-                    }
-                    
-                    # Try to get creation time if available
-                    if "pairCreatedAt" in best_pair:
-                        try:
-                            from datetime import datetime as dt
-                            created_at = best_pair.get("pairCreatedAt")
-                            if isinstance(created_at, (int, float)):
-                                # Unix timestamp
-                                created_dt = dt.fromtimestamp(created_at / 1000)
-                            else:
-                                # ISO format
-                                created_dt = dt.fromisoformat(created_at.replace("Z", "+00:00"))
-                            
-                            now = dt.now(created_dt.tzinfo)
-                            age = (now - created_dt).total_seconds() / 3600  # Convert to hours
-                            result["token_age_hours"] = age
-                        except:
-                            pass
-                    
-                    return result
+                    return cls._parse_dexscreener_pair(pairs[0])
         return None
 
+    @classmethod
+    async def _fetch_dexscreener_many(cls, session: aiohttp.ClientSession, mints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several mints with one DexScreener call (first pair per base token)."""
+        url = cls.DEXSCREENER_API_URL.format(mint=",".join(mints))
+        wanted = set(mints)
+        found = {}
+        async with session.get(url, timeout=10) as response:
+            if response.status == 200:
+                data = await response.json()
+                for pair in data.get("pairs") or []:
+                    address = (pair.get("baseToken") or {}).get("address")
+                    if address in wanted and address not in found:
+                        found[address] = cls._parse_dexscreener_pair(pair)
+        return found
+
+    @staticmethod
+    def _parse_dexscreener_pair(best_pair: dict) -> Dict[str, Any]:
+        result = {
+            "price": float(best_pair.get("priceUsd", 0)),
+            "symbol": best_pair.get("baseToken", {}).get("symbol", "UNKNOWN"),
+            "name": best_pair.get("baseToken", {}).get("name", "Unknown Token"),
+            "source": "dexscreener",
+            # Extra details
+            "fdv": float(best_pair.get("fdv", 0)),
+            "volume24h": float(best_pair.get("volume", {}).get("h24", 0)),
+            "liquidity": float(best_pair.get("liquidity", {}).get("usd", 0)),
+            "price_change_24h": float(best_pair.get("priceChange", {}).get("h24", 0))
+        }
+        
+        # Try to get creation time if available
+        if "pairCreatedAt" in best_pair:
+            try:
+                from datetime import datetime as dt
+                created_at = best_pair.get("pairCreatedAt")
+                if isinstance(created_at, (int, float)):
+                    # Unix timestamp
+                    created_dt = dt.fromtimestamp(created_at / 1000)
+                else:
+                    # ISO format
+                    created_dt = dt.fromisoformat(created_at.replace("Z", "+00:00"))
+                
+                now = dt.now(created_dt.tzinfo)
+                age = (now - created_dt).total_seconds() / 3600  # Convert to hours
+                result["token_age_hours"] = age
+            except:
+                pass
+        
+        return result
+
     @classmethod
     async def get_rugcheck_analysis(cls, mint: str) -> Optional[Dict[str, Any]]:
         """
         Fetch comprehensive security analysis from RugCheck API.
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                url = cls.RUGCHECK_API_URL.format(mint=mint)
-                async with session.get(url, timeout=10) as response:
-                    if response.status != 200:
-                        return None
-                        
-                    data = await response.json()
-                    
-                    # Parse RugCheck response
-                    analysis = {
-                        "score": data.get("score", 0),
-                        "risks": data.get("risks", []),
-                        "mint_authority": data.get("mintAuthority"),
-                        "freeze_authority": data.get("freezeAuthority"),
-                        "graph_insiders": data.get("graphInsidersDetected", 0),
-                    }
-                    
-                    # Token meta
-                    token_meta = data.get("tokenMeta", {})
-                    analysis["token_name"] = token_meta.get("name", "Unknown")
-                    analysis["token_symbol"] = token_meta.get("symbol", "UNKNOWN")
-                    analysis["is_mutable"] = token_meta.get("mutable", True)
-                    
-                    # Top holders
-                    top_holders = data.get("topHolders", [])
-                    if top_holders:
-                        # Sum top 10 holders percentage
-                        analysis["top_holders_pct"] = sum(h.get("pct", 0) for h in top_holders[:10])
-                        # Get top 1 holder pct
-                        analysis["top_holder_pct"] = top_holders[0].get("pct", 0) if len(top_holders) > 0 else 0
-                    else:
-                        analysis["top_holders_pct"] = 0.0
-                        analysis["top_holder_pct"] = 0.0
+        session = await get_http_session()
+        try:
+            url = cls.RUGCHECK_API_URL.format(mint=mint)
+            async with session.get(url, timeout=10) as response:
+                if response.status != 200:
+                    return None
                     
-                    # Markets/Liquidity
-                    markets = data.get("markets", [])
-                    total_locked_usd = 0
-                    total_liquidity_usd = 0
-                    lp_locked_pct = 0
-                    
-                    # Try to get LP locked % from the first market (usually the main one)
-                    if markets:
-                        first_market = markets[0]
-                        lp = first_market.get("lp", {})
-                        lp_locked_pct = lp.get("lpLockedPct", 0)
-                        total_liquidity_usd = lp.get("liquidityUSD", 0)
-                    
-                    analysis["liquidity_locked_pct"] = lp_locked_pct
-                    
-                    # Insider/Creator information
-                    analysis["insider_wallets_count"] = 0
-                    analysis["insider_supply_pct"] = 0.0
-                    analysis["dev_supply_pct"] = 0.0
-                    analysis["dev_sold"] = False
-                    
-                    # Check for specific risk indicators
-                    for risk in analysis["risks"]:
-                        risk_name = risk.get("name", "").lower()
-                        risk_description = risk.get("description", "").lower()
-                        risk_value = risk.get("value")
-                        
-                        if "insider" in risk_name or "creator" in risk_name:
-                            if isinstance(risk_value, (int, float)):
-                                if "wallet" in risk_description:
-                                    analysis["insider_wallets_count"] = int(risk_value)
-                                elif "supply" in risk_description or "%" in risk_description:
-                                    analysis["insider_supply_pct"] = float(risk_value)
-                        
-                        if "creator" in risk_name or "dev" in risk_name:
-                            if "sold" in risk_description:
-                                analysis["dev_sold"] = True
-                            if isinstance(risk_value, (int, float)) and "%" in str(risk):
-                                analysis["dev_supply_pct"] = float(risk_value)
+                data = await response.json()
+                
+                # Parse RugCheck response
+                analysis = {
+                    "score": data.get("score", 0),
+                    "risks": data.get("risks", []),
+                    "mint_authority": data.get("mintAuthority"),
+                    "freeze_authority": data.get("freezeAuthority"),
+                    "graph_insiders": data.get("graphInsidersDetected", 0),
+                }
+                
+                # Token meta
+                token_meta = data.get("tokenMeta", {})
+                analysis["token_name"] = token_meta.get("name", "Unknown")
+                analysis["token_symbol"] = token_meta.get("symbol", "UNKNOWN")
+                analysis["is_mutable"] = token_meta.get("mutable", True)
+                
+                # Top holders
+                top_holders = data.get("topHolders", [])
+                if top_holders:
+                    # Sum top 10 holders percentage
+                    analysis["top_holders_pct"] = sum(h.get("pct", 0) for h in top_holders[:10])
+                    # Get top 1 holder pct
+                    analysis["top_holder_pct"] = top_holders[0].get("pct", 0) if len(top_holders) > 0 else 0
+                else:
+                    analysis["top_holders_pct"] = 0.0
+                    analysis["top_holder_pct"] = 0.0
+                
+                # Markets/Liquidity
+                markets = data.get("markets", [])
+                total_locked_usd = 0
+                total_liquidity_usd = 0
+                lp_locked_pct = 0
+                
+                # Try to get LP locked % from the first market (usually the main one)
+                if markets:
+                    first_market = markets[0]
+                    lp = first_market.get("lp", {})
+                    lp_locked_pct = lp.get("lpLockedPct", 0)
+                    total_liquidity_usd = lp.get("liquidityUSD", 0)
+                
+                analysis["liquidity_locked_pct"] = lp_locked_pct
+                
+                # Insider/Creator information
+                analysis["insider_wallets_count"] = 0
+                analysis["insider_supply_pct"] = 0.0
+                analysis["dev_supply_pct"] = 0.0
+                analysis["dev_sold"] = False
+                
+                # Check for specific risk indicators
+                for risk in analysis["risks"]:
+                    risk_name = risk.get("name", "").lower()
+                    risk_description = risk.get("description", "").lower()
+                    risk_value = risk.get("value")
                     
-                    return analysis
+                    if "insider" in risk_name or "creator" in risk_name:
+                        if isinstance(risk_value, (int, float)):
+                            if "wallet" in risk_description:
+                                analysis["insider_wallets_count"] = int(risk_value)
+                            elif "supply" in risk_description or "%" in risk_description:
+                                analysis["insider_supply_pct"] = float(risk_value)
                     
-            except Exception as e:
-                logger.error(f"RugCheck API error for {mint}: {e}")
-                return None
+                    if "creator" in risk_name or "dev" in risk_name:
+                        if "sold" in risk_description:
+                            analysis["dev_sold"] = True
+                        if isinstance(risk_value, (int, float)) and "%" in str(risk):
+                            analysis["dev_supply_pct"] = float(risk_value)
+                
+                return analysis
+                
+        except Exception as e:
+            logger.error(f"RugCheck API error for {mint}: {e}")
+            return None
 
 
 # Simple test if run directly
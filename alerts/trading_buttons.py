@@ -5,6 +5,8 @@ alerts/trading_buttons.py - Interactive trading buttons for /pnl and /portfolio
 
 import logging
 import hashlib
+from functools import lru_cache
+from typing import Dict, Optional
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
@@ -13,14 +15,60 @@ logger = logging.getLogger(__name__)
 # Pagination constants
 PAGE_SIZE = 5
 
+@lru_cache(maxsize=16384)
 def get_short_key(full_key: str) -> str:
     """Generate a short stable hash for a position key."""
     return hashlib.sha256(full_key.encode()).hexdigest()[:12]
 
-def find_key_by_hash(portfolio: dict, short_key: str) -> str:
+
+class PositionKeyIndex:
+    """
+    Per-portfolio short key -> position key map, shared by button rendering and callbacks.
+
+    PortfolioManager updates it as positions open and close. Rendering registers
+    the keys it puts on buttons. A lookup is checked against the live positions,
+    and a miss triggers one rebuild, so a button never resolves to a position
+    that isn't there.
+    """
+
+    def __init__(self):
+        self._by_chat: Dict[str, Dict[str, str]] = {}
+
+    def add(self, chat_id: str, position_key: str) -> str:
+        short_key = get_short_key(position_key)
+        self._by_chat.setdefault(str(chat_id), {})[short_key] = position_key
+        return short_key
+
+    def discard(self, chat_id: str, position_key: str):
+        index = self._by_chat.get(str(chat_id))
+        if index is not None:
+            index.pop(get_short_key(position_key), None)
+
+    def forget(self, chat_id: str):
+        self._by_chat.pop(str(chat_id), None)
+
+    def rebuild(self, chat_id: str, positions: dict) -> Dict[str, str]:
+        index = {get_short_key(key): key for key in positions}
+        self._by_chat[str(chat_id)] = index
+        return index
+
+    def resolve(self, chat_id: str, portfolio: dict, short_key: str) -> Optional[str]:
+        positions = (portfolio or {}).get("positions") or {}
+        key = self._by_chat.get(str(chat_id), {}).get(short_key)
+        if key in positions:
+            return key
+        return self.rebuild(chat_id, positions).get(short_key)
+
+
+POSITION_KEY_INDEX = PositionKeyIndex()
+
+
+def find_key_by_hash(portfolio: dict, short_key: str, chat_id: Optional[str] = None) -> str:
     """Find the full key from the portfolio that matches the short hash."""
     if not portfolio or "positions" not in portfolio:
         return None
+    if chat_id is not None:
+        return POSITION_KEY_INDEX.resolve(chat_id, portfolio, short_key)
     
     for key in portfolio["positions"].keys():
         if get_short_key(key) == short_key:
@@ -39,7 +87,7 @@ async def handle_sell_confirm_callback(update: Update, context: ContextTypes.DEF
         return
     
     portfolio = portfolio_manager.get_portfolio(chat_id)
-    full_key = find_key_by_hash(portfolio, short_key)
+    full_key = find_key_by_hash(portfolio, short_key, chat_id)
     
     if not full_key:
         await query.answer("❌ Position not found or closed.")
@@ -80,7 +128,7 @@ async def handle_sell_execute_callback(update: Update, context: ContextTypes.DEF
         return
     
     portfolio = portfolio_manager.get_portfolio(chat_id)
-    full_key = find_key_by_hash(portfolio, short_key)
+    full_key = find_key_by_hash(portfolio, short_key, chat_id)
     
     if not full_key:
         await query.answer("❌ Position not found or closed.")
@@ -205,7 +253,7 @@ async def send_pnl_page(message, chat_id: str, portfolio: dict, pnl_data: dict,
     # Sell buttons for each position
     for pos in page_positions:
         key = f"{pos.get('mint', '')}_{pos.get('signal_type', '')}"
-        short_key = get_short_key(key)
+        short_key = POSITION_KEY_INDEX.add(chat_id, key)
         symbol = pos.get('symbol', 'N/A')
         keyboard.append([InlineKeyboardButton(f"🔴 Sell {symbol}", callback_data=f"sc:{short_key}")])
     
@@ -285,7 +333,7 @@ async def send_portfolio_page(message, chat_id: str, portfolio: dict, page: int
     # Sell buttons per position
     for key in keys_page:
         pos = active_positions[key]
-        short_key = get_short_key(key)
+        short_key = POSITION_KEY_INDEX.add(chat_id, key)
         symbol = pos.get('symbol', 'N/A')
         keyboard.append([InlineKeyboardButton(f"🔴 Sell {symbol}", callback_data=f"sc:{short_key}")])
     
@@ -362,7 +410,7 @@ async def handle_sell_confirm_callback(update: Update, context: ContextTypes.DEF
         return
     
     portfolio = portfolio_manager.get_portfolio(chat_id)
-    full_key = find_key_by_hash(portfolio, short_key)
+    full_key = find_key_by_hash(portfolio, short_key, chat_id)
     
     if not full_key:
         await query.answer("❌ Position not found or closed.")
@@ -404,7 +452,7 @@ async def handle_sell_execute_callback(update: Update, context: ContextTypes.DEF
         return
     
     portfolio = portfolio_manager.get_portfolio(chat_id)
-    full_key = find_key_by_hash(portfolio, short_key)
+    full_key = find_key_by_hash(portfolio, short_key, chat_id)
 
     if not full_key:
         await query.answer("❌ Position not found or closed.")
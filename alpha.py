@@ -8,7 +8,9 @@ Usage:
     Optional: --window (hours), --minbuy (USD), --minprof (num profitable tokens required)
 
 Notes:
- - Up to 3 tokens allowed.
+ - Up to MAX_TOKENS_PER_ANALYSIS tokens allowed (default 10).
+ - Moralis swap history is kept per token under TRADE_STORE_DIR and refreshed
+   incrementally, so repeat analyses only fetch new trades.
  - Supports multiple provider keys via environment variables:
      MORALIS_KEYS (comma-separated) or MORALIS_API_KEY (legacy single; also accepts comma-separated)
      HELIUS_KEYS  (comma-separated) or HELIUS_API_KEY  (legacy single; also accepts comma-separated)
@@ -30,10 +32,16 @@ import json
 import logging
 import math
 from datetime import timedelta, datetime, timezone
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from shared.http_client import get_http_session, close_http_session
+from shared.solana_accounts import (
+    TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID,
+    get_associated_token_address, account_data_bytes, decode_mint_decimals, decode_token_account,
+)
+
 load_dotenv()
 
 # --------------------
@@ -74,6 +82,14 @@ BUCKET_NAME = os.getenv("SUPABASE_BUCKET", "monitor-data")
 DEFAULT_EARLY_WINDOW_HOURS = 6
 DEFAULT_MINIMUM_INITIAL_BUY_USD = 100.0
 DEFAULT_MIN_PROFITABLE_TRADES = 1
+MAX_TOKENS_PER_ANALYSIS = int(os.getenv("MAX_TOKENS_PER_ANALYSIS", "10"))
+
+# Local swap-history store (see TradeStore)
+TRADE_STORE_DIR = os.getenv("TRADE_STORE_DIR", "./data/trade_store")
+# A store refreshed this recently is served from disk without calling Moralis
+TRADE_STORE_FRESH_SECONDS = int(os.getenv("TRADE_STORE_FRESH_SECONDS", "60"))
+MORALIS_CONCURRENCY = int(os.getenv("MORALIS_CONCURRENCY", "4"))
+MORALIS_MIN_INTERVAL = float(os.getenv("MORALIS_MIN_INTERVAL", "0.15"))  # seconds between requests
 
 # Base tokens (used to identify buys)
 BASE_TOKENS = {
@@ -91,6 +107,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("alpha")
 
+# Helius RPC endpoint ({key} is filled with the rotated API key)
+HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL", "https://mainnet.helius-rpc.com/?api-key={key}")
+# getMultipleAccounts accepts at most 100 addresses per call
+RPC_MULTIPLE_ACCOUNTS_LIMIT = 100
+RPC_BATCH_CONCURRENCY = int(os.getenv("RPC_BATCH_CONCURRENCY", "4"))
+
 # threshold (seconds) to warn for long RPC/API calls
 LONG_CALL_THRESHOLD = float(os.environ.get("LONG_CALL_THRESHOLD", 2.0))
 
@@ -302,6 +324,61 @@ def requests_with_failover(url: str, method: str = "GET", params: dict = None, h
 
     raise RuntimeError(f"All attempts failed for {provider}. Last exception: {last_exception}")
 
+async def requests_with_failover_async(url: str, method: str = "GET", params: dict = None, headers: dict = None,
+                                       json_payload: dict = None, max_attempts: int = None, provider: str = "moralis", timeout: int = 20):
+    """
+    Non-blocking equivalent of requests_with_failover() on the shared pooled aiohttp session.
+    Same key rotation / soft-blacklist behavior; waits between attempts with asyncio.sleep.
+    """
+    attempt = 0
+    last_exception = None
+    if max_attempts is None:
+        max_attempts = max(6, (len(MORALIS_KEYS) if MORALIS_KEYS else 1) * 2)
+
+    session = await get_http_session()
+    while attempt < max_attempts:
+        attempt += 1
+        key = None
+        use_headers = dict(headers or {})
+        if provider == "moralis":
+            key = _next_moralis_key_round_robin()
+            use_headers["Accept"] = "application/json"
+            use_headers["X-API-Key"] = key
+        try:
+            start = time.time()
+            async with session.request(method, url, params=params, headers=use_headers, json=json_payload,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                elapsed = time.time() - start
+                if elapsed > LONG_CALL_THRESHOLD:
+                    logger.warning("Long %s call: %s (%.2fs)", method, url, elapsed)
+
+                if resp.status == 401:
+                    if provider == "moralis":
+                        _bad_moralis_keys.add(key)
+                        logger.warning("[moralis] key masked=%s returned 401; blacklisting this key index.", _mask_key(key))
+                    logger.warning("[%s] request returned 401 (attempt %d). Rotating key and retrying...", provider, attempt)
+                    await asyncio.sleep(min(1 + attempt * 0.5, 5.0))
+                    continue
+
+                if resp.status == 429:
+                    logger.warning("[%s] request returned 429 (rate limited) (attempt %d). Rotating key and retrying...", provider, attempt)
+                    await asyncio.sleep(min(0.8 + attempt * 0.5, 5.0))
+                    continue
+
+                resp.raise_for_status()
+                text = await resp.text()
+                try:
+                    return json.loads(text)
+                except Exception:
+                    return {"_raw_text": text}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_exception = e
+            logger.warning("[%s] request exception (attempt %d): %s", provider, attempt, e)
+            await asyncio.sleep(min(0.5 * attempt, 5.0))
+            continue
+
+    raise RuntimeError(f"All attempts failed for {provider}. Last exception: {last_exception}")
+
 async def aiohttp_with_failover_post(payload: dict, max_attempts: int = None, timeout: int = 30) -> dict:
     """
     Async wrapper to POST to Helius RPC, rotating through HELIUS_KEYS on 429/401 & retrying.
@@ -318,7 +395,7 @@ async def aiohttp_with_failover_post(payload: dict, max_attempts: int = None, ti
             key = _next_helius_key_round_robin()
         except RuntimeError:
             raise
-        helius_url = f"https://mainnet.helius-rpc.com/?api-key={key}"
+        helius_url = HELIUS_RPC_URL.format(key=key)
         try:
             start = time.time()
             async with aiohttp.ClientSession() as session:
@@ -357,158 +434,266 @@ def _timed_get(url, **kwargs):
         logger.warning("Long GET call: %s (%.2fs)", url, elapsed)
     return resp
 
-def get_solana_dex_trades(token_addresses: List[str], limit: int = 100) -> pd.DataFrame:
+def _extract_moralis_trades(data: Any, addr: str) -> List[Dict[str, Any]]:
+    """Pull the swap list out of a Moralis swaps response (handles its different formats)."""
+    trades = []
+    if isinstance(data, dict):
+        # Handle different Moralis API response formats
+        result = data.get("result")
+
+        if isinstance(result, list):
+            # Case 1: API returned trades directly as a list
+            trades = result
+        elif isinstance(result, dict):
+            # Case 2: API returned a dict, trades might be in "data" field  
+            trades = result.get("data", [])
+        else:
+            # Case 3: result is None or unexpected type, try fallback
+            trades = []
+            
+            # Try some alternative response structures as fallback
+            if "data" in data and isinstance(data["data"], list):
+                trades = data["data"]
+            elif "trades" in data and isinstance(data["trades"], list):
+                trades = data["trades"]
+
+            if not trades:
+                return []
+            # Validate that trades are actually for the token we requested
+            valid_trades = []
+            for t in trades:
+                bought = t.get("bought") or {}
+                sold = t.get("sold") or {}
+                bought_addr = (bought.get("address") or "").strip()
+                sold_addr = (sold.get("address") or "").strip()
+                
+                # At least one address should match our target token
+                if addr in [bought_addr, sold_addr]:
+                    valid_trades.append(t)
+                else:
+                    logger.warning(f"Skipping invalid trade for {addr}: bought={bought_addr}, sold={sold_addr}")
+
+            trades = valid_trades
+
+        # Ensure trades is always a list
+        if not isinstance(trades, list):
+            trades = []
+    elif isinstance(data, list):
+        trades = data
+    return trades
+
+def _normalize_moralis_swap(t: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Normalize Moralis swaps into rows where:
+    Normalize one Moralis swap into a row where:
       - mint_address = the token mint of interest (the token side, not the base)
       - token_amount = amount of that mint (positive)
       - other_mint_address/other_amount = counterparty token & amount
       - is_buy = True when trader acquired the token (sold base token to get token)
-    Uses explicit base-token rule: if token_sold_mint_address in BASE_TOKENS then it's a buy.
     """
-    if not isinstance(token_addresses, list):
-        raise TypeError("token_addresses must be a list")
-    if len(token_addresses) == 0:
-        return pd.DataFrame()
-    if len(token_addresses) > 3:
-        raise ValueError("A maximum of 3 tokens is allowed per request.")
-    ensure_keys_present()
+    direction = (t.get("transactionType") or "").lower()
+    bought = t.get("bought") or {}
+    sold = t.get("sold") or {}
+
+    # raw addresses
+    bought_addr = (bought.get("address") or "").strip()
+    sold_addr = (sold.get("address") or "").strip()
+
+    # Determine is_buy using explicit base-token rule:
+    # - If sold_addr is a base token, trader sold base => they bought the token (is_buy=True)
+    # - Else if bought_addr is a base token, trader bought base => they sold the token (is_buy=False)
+    # - Else fall back to Moralis transactionType
+    if sold_addr and sold_addr in BASE_TOKENS and (not bought_addr or bought_addr not in BASE_TOKENS):
+        is_buy = True
+    elif bought_addr and bought_addr in BASE_TOKENS and (not sold_addr or sold_addr not in BASE_TOKENS):
+        is_buy = False
+    else:
+        is_buy = (direction == "buy")
+
+    # Normalize so mint_address/token_amount always refer to the token of interest
+    if is_buy:
+        mint_address = bought_addr or None
+        token_amount = _safe_float(bought.get("amount"))
+        other_mint_address = sold_addr or None
+        other_amount = _safe_float(sold.get("amount"))
+    else:
+        mint_address = sold_addr or None
+        token_amount = _safe_float(sold.get("amount"))
+        other_mint_address = bought_addr or None
+        other_amount = _safe_float(bought.get("amount"))
+
+    amount_usd = _safe_float(t.get("totalValueUsd"))
+    price_usd_at_trade = None
+    if amount_usd is not None and token_amount not in (None, 0):
+        price_usd_at_trade = amount_usd / token_amount
+
+    bt = pd.to_datetime(t.get("blockTimestamp"))
+
+    return {
+        "block_time": bt,
+        "block_date": bt.normalize() if not pd.isna(bt) else None,
+        "transaction_hash": t.get("transactionHash"),
+        "transaction_type": direction,
+        "is_buy": is_buy,
+        "trader_id": t.get("walletAddress"),
+        "pair_address": t.get("pairAddress"),
+        "pair_label": t.get("pairLabel"),
+        "exchange_name": t.get("exchangeName"),
+        "mint_address": mint_address,
+        "token_amount": token_amount,
+        "other_mint_address": other_mint_address,
+        "other_amount": other_amount,
+        "amount_usd": amount_usd,
+        "price_usd_at_trade": price_usd_at_trade
+    }
 
-    all_rows = []
+class TradeStore:
+    """
+    Local per-token swap history: one joblib file per mint under `root`.
+
+    Rows are append-only and keyed by transaction signature. `complete` is set
+    once the full history has been paged through; after that only trades newer
+    than what is stored need to be fetched.
+    """
+    def __init__(self, root: str = TRADE_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, mint: str) -> str:
+        return os.path.join(self.root, f"{mint}.pkl")
 
-    for addr in token_addresses:
-        url = f"https://solana-gateway.moralis.io/token/mainnet/{addr}/swaps"
-        cursor = None
-        logger.info("[Moralis] fetching swaps for %s", addr)
-        while True:
-            params = {"limit": limit, "order": "DESC", "transactionTypes": "buy,sell"}
-            if cursor:
-                params["cursor"] = cursor
+    def load(self, mint: str) -> Dict[str, Any]:
+        path = self._path(mint)
+        if os.path.exists(path):
             try:
-                data = requests_with_failover(url, method="GET", params=params, provider="moralis",
-                                              max_attempts=max(6, len(MORALIS_KEYS) * 2 if MORALIS_KEYS else 6))
+                return joblib.load(path)
             except Exception as e:
-                logger.error("[Moralis] request error for %s: %s", addr, e)
-                break
+                logger.warning("[TradeStore] unreadable store for %s, refetching: %s", mint, e)
+        return {"rows": [], "signatures": set(), "complete": False, "refreshed_at": 0.0}
+
+    @staticmethod
+    def append(state: Dict[str, Any], rows: List[Dict[str, Any]]) -> int:
+        """Append rows whose signature isn't stored yet. Returns the number added."""
+        known = state["signatures"]
+        new_sigs = set()
+        added = 0
+        for row in rows:
+            sig = row.get("transaction_hash")
+            if sig and sig in known:
+                continue
+            state["rows"].append(row)
+            added += 1
+            if sig:
+                new_sigs.add(sig)
+        # Added after the loop so multi-swap transactions keep all their rows
+        known |= new_sigs
+        return added
+
+    def save(self, mint: str, state: Dict[str, Any]):
+        path = self._path(mint)
+        tmp_path = path + ".tmp"
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, path)
+
+class _RequestPacer:
+    """Spaces out requests to one provider across concurrent fetches."""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_at > now:
+                await asyncio.sleep(self._next_at - now)
+            self._next_at = max(now, self._next_at) + self.min_interval
+
+async def _fetch_moralis_swaps(addr: str, known_signatures: Optional[set], limit: int,
+                               pacer: _RequestPacer, sema: asyncio.Semaphore):
+    """
+    Page a token's swaps newest-first. With `known_signatures`, stop at the first
+    page that reaches already-stored trades.
+    Returns (rows, finished) where finished=False means paging stopped on an error.
+    """
+    url = f"https://solana-gateway.moralis.io/token/mainnet/{addr}/swaps"
+    cursor = None
+    rows: List[Dict[str, Any]] = []
+    while True:
+        params = {"limit": limit, "order": "DESC", "transactionTypes": "buy,sell"}
+        if cursor:
+            params["cursor"] = cursor
+        try:
+            async with sema:
+                await pacer.wait()
+                data = await requests_with_failover_async(url, method="GET", params=params, provider="moralis",
+                                                          max_attempts=max(6, len(MORALIS_KEYS) * 2 if MORALIS_KEYS else 6))
+        except Exception as e:
+            logger.error("[Moralis] request error for %s: %s", addr, e)
+            return rows, False
 
-            trades = []
-            if isinstance(data, dict):
-                # Handle different Moralis API response formats
-                result = data.get("result")
-
-                if isinstance(result, list):
-                    # Case 1: API returned trades directly as a list
-                    trades = result
-                elif isinstance(result, dict):
-                    # Case 2: API returned a dict, trades might be in "data" field  
-                    trades = result.get("data", [])
-                else:
-                    # Case 3: result is None or unexpected type, try fallback
-                    trades = []
-                    
-                    # Try some alternative response structures as fallback
-                    if "data" in data and isinstance(data["data"], list):
-                        trades = data["data"]
-                    elif "trades" in data and isinstance(data["trades"], list):
-                        trades = data["trades"]
-
-                    if not trades:
-                        break
-                    # Validate that trades are actually for the token we requested
-                    valid_trades = []
-                    for t in trades:
-                        bought = t.get("bought") or {}
-                        sold = t.get("sold") or {}
-                        bought_addr = (bought.get("address") or "").strip()
-                        sold_addr = (sold.get("address") or "").strip()
-                        
-                        # At least one address should match our target token
-                        if addr in [bought_addr, sold_addr]:
-                            valid_trades.append(t)
-                        else:
-                            logger.warning(f"Skipping invalid trade for {addr}: bought={bought_addr}, sold={sold_addr}")
-
-                    trades = valid_trades
-
-                # Ensure trades is always a list
-                if not isinstance(trades, list):
-                    trades = []
-            elif isinstance(data, list):
-                trades = data
-            else:
-                trades = []
+        trades = _extract_moralis_trades(data, addr)
+        if not trades:
+            return rows, True
 
-            if not trades:
-                break
+        reached_known = False
+        for t in trades:
+            if known_signatures and t.get("transactionHash") in known_signatures:
+                reached_known = True
+                continue
+            rows.append(_normalize_moralis_swap(t))
 
-            for t in trades:
-                direction = (t.get("transactionType") or "").lower()
-                bought = t.get("bought") or {}
-                sold = t.get("sold") or {}
+        cursor = (data.get("cursor") or data.get("next")) if isinstance(data, dict) else None
+        if reached_known or not cursor:
+            return rows, True
 
-                # raw addresses
-                bought_addr = (bought.get("address") or "").strip()
-                sold_addr = (sold.get("address") or "").strip()
+async def get_solana_dex_trades_async(token_addresses: List[str], limit: int = 100,
+                                      store: Optional[TradeStore] = None) -> pd.DataFrame:
+    """
+    Swap history for `token_addresses` as normalized rows (see _normalize_moralis_swap).
 
-                # Determine is_buy using explicit base-token rule:
-                # - If sold_addr is a base token, trader sold base => they bought the token (is_buy=True)
-                # - Else if bought_addr is a base token, trader bought base => they sold the token (is_buy=False)
-                # - Else fall back to Moralis transactionType
-                if sold_addr and sold_addr in BASE_TOKENS and (not bought_addr or bought_addr not in BASE_TOKENS):
-                    is_buy = True
-                elif bought_addr and bought_addr in BASE_TOKENS and (not sold_addr or sold_addr not in BASE_TOKENS):
-                    is_buy = False
-                else:
-                    is_buy = (direction == "buy")
-
-                # Normalize so mint_address/token_amount always refer to the token of interest
-                if is_buy:
-                    mint_address = bought_addr or None
-                    token_amount = _safe_float(bought.get("amount"))
-                    other_mint_address = sold_addr or None
-                    other_amount = _safe_float(sold.get("amount"))
-                else:
-                    mint_address = sold_addr or None
-                    token_amount = _safe_float(sold.get("amount"))
-                    other_mint_address = bought_addr or None
-                    other_amount = _safe_float(bought.get("amount"))
-
-                amount_usd = _safe_float(t.get("totalValueUsd"))
-                price_usd_at_trade = None
-                if amount_usd is not None and token_amount not in (None, 0):
-                    price_usd_at_trade = amount_usd / token_amount
-
-                bt = pd.to_datetime(t.get("blockTimestamp"))
-
-                all_rows.append({
-                    "block_time": bt,
-                    "block_date": bt.normalize() if not pd.isna(bt) else None,
-                    "transaction_hash": t.get("transactionHash"),
-                    "transaction_type": direction,
-                    "is_buy": is_buy,
-                    "trader_id": t.get("walletAddress"),
-                    "pair_address": t.get("pairAddress"),
-                    "pair_label": t.get("pairLabel"),
-                    "exchange_name": t.get("exchangeName"),
-                    "mint_address": mint_address,
-                    "token_amount": token_amount,
-                    "other_mint_address": other_mint_address,
-                    "other_amount": other_amount,
-                    "amount_usd": amount_usd,
-                    "price_usd_at_trade": price_usd_at_trade
-                })
-
-            if isinstance(data, dict):
-                cursor = data.get("cursor") or data.get("next")
-            else:
-                cursor = None
+    Served from the local TradeStore; only trades newer than the stored ones are
+    fetched from Moralis. Tokens are fetched concurrently under a shared rate limit.
+    """
+    if not isinstance(token_addresses, list):
+        raise TypeError("token_addresses must be a list")
+    if len(token_addresses) == 0:
+        return pd.DataFrame()
+    if len(token_addresses) > MAX_TOKENS_PER_ANALYSIS:
+        raise ValueError(f"A maximum of {MAX_TOKENS_PER_ANALYSIS} tokens is allowed per request.")
+    ensure_keys_present()
 
-            if not cursor:
-                break
+    store = store or TradeStore()
+    pacer = _RequestPacer(MORALIS_MIN_INTERVAL)
+    sema = asyncio.Semaphore(MORALIS_CONCURRENCY)
 
-            time.sleep(0.15)
+    async def _token_rows(addr: str) -> List[Dict[str, Any]]:
+        state = await asyncio.to_thread(store.load, addr)
+        incremental = state["complete"]
 
-        logger.info("[Moralis] fetched %d total trades (so far).", len(all_rows))
+        if incremental and time.time() - state["refreshed_at"] < TRADE_STORE_FRESH_SECONDS:
+            logger.info("[TradeStore] %s served from disk (%d trades)", addr, len(state["rows"]))
+            return list(state["rows"])
+
+        logger.info("[Moralis] fetching %s swaps for %s", "new" if incremental else "all", addr)
+        new_rows, finished = await _fetch_moralis_swaps(
+            addr, state["signatures"] if incremental else None, limit, pacer, sema
+        )
+
+        if incremental and not finished:
+            # Persisting a partial top-up would leave a gap behind the newest stored trade
+            return list(state["rows"]) + new_rows
+
+        added = TradeStore.append(state, new_rows)
+        if finished:
+            state["complete"] = True
+            state["refreshed_at"] = time.time()
+        await asyncio.to_thread(store.save, addr, state)
+        logger.info("[TradeStore] %s: +%d new trades, %d stored", addr, added, len(state["rows"]))
+        return list(state["rows"])
+
+    per_token = await asyncio.gather(*(_token_rows(a) for a in token_addresses))
+    all_rows = [row for rows in per_token for row in rows]
+    logger.info("[Moralis] %d total trades for %d tokens.", len(all_rows), len(token_addresses))
 
     if not all_rows:
         return pd.DataFrame()
@@ -524,13 +709,28 @@ def get_solana_dex_trades(token_addresses: List[str], limit: int = 100) -> pd.Da
     logger.info("Total trades fetched: %d", len(df))
     return df
 
+def get_solana_dex_trades(token_addresses: List[str], limit: int = 100) -> pd.DataFrame:
+    """Synchronous entry point for get_solana_dex_trades_async (used from the pipeline thread)."""
+    async def _run():
+        try:
+            return await get_solana_dex_trades_async(token_addresses, limit=limit)
+        finally:
+            await close_http_session()
+    return asyncio.run(_run())
+
 # --------------------
 # Price builder (per-minute OHLC + vwap)
 # --------------------
+MINUTE_PRICE_COLUMNS = ["mint_address", "minute", "open", "high", "low", "close", "vwap", "volume_usd"]
+
+
 def build_minute_prices_from_trades(trades_df: pd.DataFrame) -> pd.DataFrame:
     """
     Build OHLCV + VWAP minute-level candlesticks for tokens from trade data.
 
+    Fully vectorized: one groupby over (mint_address, minute) computes every
+    column in a single pass, so cost stays flat as swap counts grow.
+
     Args:
         trades_df: DataFrame with at least:
             - block_time (datetime)
@@ -541,85 +741,69 @@ def build_minute_prices_from_trades(trades_df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with columns:
             mint_address, minute, open, high, low, close, vwap, volume_usd
+        sorted by (mint_address, minute).
     """
     if trades_df.empty:
-        return pd.DataFrame(
-            columns=[
-                "mint_address",
-                "minute",
-                "open",
-                "high",
-                "low",
-                "close",
-                "vwap",
-                "volume_usd",
-            ]
-        )
-
-    df = trades_df.copy()
-
-    # Ensure datetime
-    df["block_time"] = pd.to_datetime(df["block_time"])
+        return pd.DataFrame(columns=MINUTE_PRICE_COLUMNS)
 
     # Prefer price_usd_at_trade, fallback to derived_price
-    if "price_usd_at_trade" in df.columns:
-        df["price_for_price_series"] = df["price_usd_at_trade"].fillna(
-            df.get("derived_price")
-        )
+    price = None
+    if "price_usd_at_trade" in trades_df.columns:
+        price = trades_df["price_usd_at_trade"]
+        if "derived_price" in trades_df.columns:
+            price = price.fillna(trades_df["derived_price"])
+    elif "derived_price" in trades_df.columns:
+        price = trades_df["derived_price"]
+    if price is None:
+        return pd.DataFrame(columns=MINUTE_PRICE_COLUMNS)
+    price = price.astype("float64")
+
+    work = pd.DataFrame({
+        "mint_address": trades_df["mint_address"],
+        # Round down to the nearest minute
+        "minute": pd.to_datetime(trades_df["block_time"]).dt.floor("min"),
+        "price": price,
+    })
+
+    has_amount = "amount_usd" in trades_df.columns
+    if has_amount:
+        amount = trades_df["amount_usd"].astype("float64")
+        work["weight"] = amount.fillna(0.0)
+        work["amount_present"] = amount.notna()
+        # NaN where the trade has no price, so it is skipped in the numerator
+        work["price_x_weight"] = work["price"] * work["weight"]
     else:
-        df["price_for_price_series"] = df.get("derived_price")
-
-    # Round down to the nearest minute
-    df["minute"] = df["block_time"].dt.floor("min")
-
-    # Group by token mint + minute
-    grouped = df.groupby(["mint_address", "minute"], sort=True)
-
-    rows = []
-    for (mint, minute), g in grouped:
-        prices = g["price_for_price_series"].dropna()
-        if prices.empty:
-            continue
-
-        open_p = prices.iloc[0]
-        high_p = prices.max()
-        low_p = prices.min()
-        close_p = prices.iloc[-1]
-
-        # VWAP calculation with division-by-zero guard
-        if "amount_usd" in g.columns and g["amount_usd"].notna().any():
-            weights = g["amount_usd"].fillna(0.0)
-            denom = weights.sum()
-            if denom > 0:
-                vwap = (prices * weights).sum() / denom
-            else:
-                vwap = prices.mean()
-        else:
-            vwap = prices.mean()
-
-        # Total traded volume (in USD terms)
-        volume_usd = g.get("amount_usd", pd.Series(dtype=float)).fillna(0.0).sum()
-
-        rows.append(
-            {
-                "mint_address": mint,
-                "minute": minute,
-                "open": open_p,
-                "high": high_p,
-                "low": low_p,
-                "close": close_p,
-                "vwap": vwap,
-                "volume_usd": volume_usd,
-            }
-        )
+        work["weight"] = 0.0
+        work["amount_present"] = False
+        work["price_x_weight"] = np.nan
+
+    candles = work.groupby(["mint_address", "minute"], sort=True).agg(
+        open=("price", "first"),
+        high=("price", "max"),
+        low=("price", "min"),
+        close=("price", "last"),
+        price_count=("price", "count"),
+        price_sum=("price", "sum"),
+        volume_usd=("weight", "sum"),
+        weighted_sum=("price_x_weight", "sum"),
+        amount_present=("amount_present", "any"),
+    )
 
-    price_df = pd.DataFrame(rows)
-    if not price_df.empty:
-        price_df = price_df.sort_values(["mint_address", "minute"]).reset_index(
-            drop=True
-        )
+    # Minutes with no usable price produce no candle
+    candles = candles[candles["price_count"] > 0]
+    if candles.empty:
+        return pd.DataFrame(columns=MINUTE_PRICE_COLUMNS)
+
+    # VWAP with division-by-zero guard: plain mean when there is no positive volume
+    mean_price = candles["price_sum"] / candles["price_count"]
+    use_vwap = candles["amount_present"] & (candles["volume_usd"] > 0)
+    candles["vwap"] = np.where(
+        use_vwap,
+        candles["weighted_sum"] / candles["volume_usd"].where(use_vwap, 1.0),
+        mean_price,
+    )
 
-    return price_df
+    return candles.reset_index()[MINUTE_PRICE_COLUMNS]
 
 # --------------------
 # Vectorized price lookup helpers
@@ -640,18 +824,24 @@ def attach_minute_price(df_in: pd.DataFrame, minute_price_df: pd.DataFrame, mint
 
     mask_missing = merged[price_col_name].isna()
     if mask_missing.any():
-        left_asof = merged[mask_missing].sort_values([mint_col, "minute"]).copy()
-        right_asof = mp.sort_values([mint_col, "minute"]).copy()
+        # Carry the row position through merge_asof (it returns a fresh index) and
+        # drop the empty price column so the right side's values aren't suffixed away
+        left_asof = (
+            merged.loc[mask_missing, [mint_col, "minute"]]
+            .reset_index(names="_row")
+            .sort_values("minute")
+        )
+        right_asof = mp.sort_values("minute")
         try:
             left_asof = pd.merge_asof(
-                left_asof.sort_values("minute"),
-                right_asof.sort_values("minute"),
+                left_asof,
+                right_asof,
                 on="minute",
                 by=mint_col,
                 direction="nearest",
                 tolerance=pd.Timedelta(minutes=tolerance_minutes)
             )
-            merged.loc[left_asof.index, price_col_name] = left_asof[price_col_name].values
+            merged.loc[left_asof["_row"].values, price_col_name] = left_asof[price_col_name].values
         except Exception as e:
             logger.debug("merge_asof fallback failed: %s", e)
 
@@ -718,72 +908,124 @@ async def get_current_prices_for_mints_async(mints: List[str]) -> dict:
 async def fetch_solana_rpc(payload: dict) -> dict:
     return await aiohttp_with_failover_post(payload, max_attempts=max(6, len(HELIUS_KEYS) * 2 if HELIUS_KEYS else 6))
 
+async def get_multiple_accounts(addresses: List[str]) -> Dict[str, Optional[dict]]:
+    """
+    Fetch accounts (base64 data) with getMultipleAccounts, 100 addresses per call,
+    chunks running concurrently. Missing accounts and failed chunks map to None.
+    """
+    unique = list(dict.fromkeys(addresses))
+    chunks = [unique[i:i + RPC_MULTIPLE_ACCOUNTS_LIMIT] for i in range(0, len(unique), RPC_MULTIPLE_ACCOUNTS_LIMIT)]
+    sema = asyncio.Semaphore(RPC_BATCH_CONCURRENCY)
+
+    async def _fetch_chunk(chunk: List[str]) -> Dict[str, Optional[dict]]:
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "getMultipleAccounts",
+                   "params": [chunk, {"encoding": "base64"}]}
+        async with sema:
+            try:
+                res = await fetch_solana_rpc(payload)
+                values = (res.get("result") or {}).get("value") or []
+            except Exception as e:
+                logger.warning("getMultipleAccounts failed for %d accounts: %s", len(chunk), e)
+                values = []
+        return {addr: (values[i] if i < len(values) else None) for i, addr in enumerate(chunk)}
+
+    accounts: Dict[str, Optional[dict]] = {}
+    for part in await asyncio.gather(*(_fetch_chunk(c) for c in chunks)):
+        accounts.update(part)
+    return accounts
+
 async def get_current_balances_and_prices(traders: List[str], token_mints: List[str]) -> pd.DataFrame:
+    """
+    Current SOL and token balances for every (trader, mint), valued at current prices.
+
+    Associated token accounts are derived locally and fetched together with the
+    wallets via chunked getMultipleAccounts, so N traders cost ~N*(mints+1)/100
+    RPC calls instead of 2N. Token amounts are decoded from the raw account data.
+    """
     token_mints = list({m.strip() for m in token_mints})
     prices_map = await get_current_prices_for_mints_async(token_mints)
-    all_rows = []
+    unique_traders = list(dict.fromkeys(traders))
+
+    # Mint accounts give the owning token program (classic vs Token-2022) and decimals
+    mint_accounts = await get_multiple_accounts(token_mints)
+    mint_info: Dict[str, tuple] = {}
+    for mint in token_mints:
+        acc = mint_accounts.get(mint)
+        program_id = (acc or {}).get("owner")
+        if program_id not in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID):
+            program_id = TOKEN_PROGRAM_ID
+        decimals = decode_mint_decimals(account_data_bytes(acc))
+        if decimals is None:
+            logger.warning("Could not read decimals for mint %s; its balances will be 0", mint)
+        mint_info[mint] = (program_id, decimals)
+
+    ata_index: Dict[tuple, str] = {}
+    for trader in unique_traders:
+        for mint in token_mints:
+            try:
+                ata_index[(trader, mint)] = get_associated_token_address(trader, mint, mint_info[mint][0])
+            except (KeyError, ValueError) as e:
+                logger.debug("ATA derivation failed for %s / %s: %s", trader, mint, e)
+
+    accounts = await get_multiple_accounts(unique_traders + list(ata_index.values()))
+
+    sol_balances: Dict[str, float] = {}
+    token_balances: Dict[tuple, float] = {}
+    for trader in unique_traders:
+        wallet = accounts.get(trader)
+        lamports = (wallet or {}).get("lamports") or 0
+        sol_balances[trader] = lamports / 1e9
+
+        for mint in token_mints:
+            decoded = decode_token_account(account_data_bytes(accounts.get(ata_index.get((trader, mint)))))
+            decimals = mint_info[mint][1]
+            bal = 0.0
+            if decoded and decimals is not None and decoded[0] == mint and decoded[1] == trader:
+                bal = decoded[2] / (10 ** decimals)
+            token_balances[(trader, mint)] = bal
 
+    all_rows = []
     for trader in traders:
-        sol_payload = {"jsonrpc":"2.0","id":1,"method":"getBalance","params":[trader]}
-        try:
-            sol_res = await fetch_solana_rpc(sol_payload)
-            lamports = sol_res.get("result",{}).get("value",0)
-            sol_balance = lamports / 1e9 if lamports is not None else 0.0
-        except Exception as e:
-            logger.debug("SOL balance fetch failed for %s: %s", trader, e)
-            sol_balance = 0.0
-
-        tokens_payload = {
-            "jsonrpc":"2.0","id":"1","method":"getTokenAccountsByOwner",
-            "params":[trader, {"programId":"TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"}, {"encoding":"jsonParsed"}]
-        }
-        try:
-            tok_res = await fetch_solana_rpc(tokens_payload)
-            accounts = tok_res.get("result",{}).get("value",[]) or []
-        except Exception as e:
-            logger.debug("Token accounts fetch failed for %s: %s", trader, e)
-            accounts = []
-
-        balances_map = {m: 0.0 for m in token_mints}
-        for acc in accounts:
-            info = acc.get("account", {}).get("data", {}).get("parsed", {}).get("info", {}) or {}
-            mint = (info.get("mint") or "").strip()
-            if not mint:
-                continue
-            if mint in balances_map:
-                ta = info.get("tokenAmount", {}) or {}
-                balances_map[mint] = float(ta.get("uiAmount") or 0.0)
-
-        for mint, bal in balances_map.items():
+        for mint in token_mints:
+            bal = token_balances.get((trader, mint), 0.0)
             price = prices_map.get(mint, 0.0) or 0.0
             all_rows.append({
                 "trader_id": trader,
-                "sol_balance": sol_balance,
+                "sol_balance": sol_balances.get(trader, 0.0),
                 "mint_address": mint,
                 "token_balance": bal,
                 "current_price": price,
                 "current_value_usd": bal * price
             })
 
-        await asyncio.sleep(0.05)
-
     return pd.DataFrame(all_rows)
 
 # --------------------
 # Main pipeline (vectorized)
 # --------------------
+def _report_progress(progress: Optional[Callable[..., None]], stage: str, **counts):
+    if progress is None:
+        return
+    try:
+        progress(stage, **counts)
+    except Exception as e:
+        logger.debug("Progress callback failed for stage %s: %s", stage, e)
+
+
 def run_pipeline(tokens: List[str],
                  early_trading_window_hours: Optional[int] = None,
                  minimum_initial_buy_usd: Optional[float] = None,
                  min_profitable_trades: int = DEFAULT_MIN_PROFITABLE_TRADES, 
-                 job_id: str = "unknown") -> Optional[pd.DataFrame]:
+                 job_id: str = "unknown",
+                 progress: Optional[Callable[..., None]] = None) -> Optional[pd.DataFrame]:
+    """`progress(stage, **counts)` is called as each pipeline stage completes (see main.py's job events)."""
     ensure_keys_present()
     tokens = [t.strip() for t in tokens]
     if len(tokens) == 0:
         logger.error("No tokens provided.")
         return
-    if len(tokens) > 3:
-        raise ValueError("A maximum of 3 token addresses is allowed.")
+    if len(tokens) > MAX_TOKENS_PER_ANALYSIS:
+        raise ValueError(f"A maximum of {MAX_TOKENS_PER_ANALYSIS} token addresses is allowed.")
     logger.info("[Run] tokens=%s window=%s minbuy=%s minprof=%s", tokens, early_trading_window_hours, minimum_initial_buy_usd, min_profitable_trades)
 
     # Fetch trades and build minute prices
@@ -806,7 +1048,10 @@ def run_pipeline(tokens: List[str],
         logger.info(f"[Pipeline] After filtering: {len(trades_df)} trades remaining")
 
 
+    _report_progress(progress, "trades_fetched", trades=len(trades_df))
+
     minute_price_df = build_minute_prices_from_trades(trades_df)
+    _report_progress(progress, "candles_built", candles=len(minute_price_df))
 
     # token launch times per normalized mint_address
     token_first_trade_times = trades_df.groupby("mint_address", as_index=False).agg(token_launch_time=("block_time", "min"))
@@ -948,6 +1193,7 @@ def run_pipeline(tokens: List[str],
             for m in token_mints_to_fetch:
                 rows.append({"trader_id": t, "mint_address": m, "token_balance": 0.0, "current_price": 0.0, "current_value_usd": 0.0, "sol_balance": 0.0})
         balances_df = pd.DataFrame(rows)
+    _report_progress(progress, "balances_resolved", balances=len(balances_df))
 
     trader_token_metrics = pd.merge(
         trader_token_metrics,
@@ -1006,6 +1252,8 @@ def run_pipeline(tokens: List[str],
         if c not in final_summary.columns:
             final_summary[c] = 0.0
 
+    _report_progress(progress, "summary_built", traders=len(final_summary))
+
     logger.info("--- 🏆 Final Early Trader Profitability Report (top 50) ---")
     if final_summary.empty:
         logger.info("Final summary empty after filtering.")
@@ -1028,15 +1276,15 @@ def run_pipeline(tokens: List[str],
 # CLI
 # --------------------
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Solana Early Trader PNL Analysis (up to 3 tokens)")
-    parser.add_argument("tokens", nargs="+", help="List of 1-3 token mint addresses (positional)")
+    parser = argparse.ArgumentParser(description=f"Solana Early Trader PNL Analysis (up to {MAX_TOKENS_PER_ANALYSIS} tokens)")
+    parser.add_argument("tokens", nargs="+", help=f"List of 1-{MAX_TOKENS_PER_ANALYSIS} token mint addresses (positional)")
     parser.add_argument("--window", type=int, default=None, help="Early trading window (hours) - optional")
     parser.add_argument("--minbuy", type=float, default=DEFAULT_MINIMUM_INITIAL_BUY_USD, help="Minimum initial buy in USD - optional")
     parser.add_argument("--minprof", type=int, default=DEFAULT_MIN_PROFITABLE_TRADES, help="Minimum number of profitable tokens")
     args = parser.parse_args()
 
-    if len(args.tokens) > 3:
-        parser.error("A maximum of 3 token addresses is allowed.")
+    if len(args.tokens) > MAX_TOKENS_PER_ANALYSIS:
+        parser.error(f"A maximum of {MAX_TOKENS_PER_ANALYSIS} token addresses is allowed.")
 
     try:
         ensure_keys_present(require_supabase=False)
@@ -8,12 +8,17 @@ It performs the following:
 2. Scans ALL daily files (discovery & alpha), removes the tokens, and recalculates daily stats.
 3. Regenerates the 'summary_stats.json' files for both signals.
 4. Regenerates the 'overall/summary_stats.json'.
+
+Daily files are planned from one listing per signal folder and rewritten
+concurrently through shared/maintenance.py (rate-limited). Use --dry-run to
+preview and --local-dir to run against a local copy of the bucket (a
+rehearsal only touches that directory, not the live data/active_tracking.json).
 """
 
 import os
 import json
+import argparse
 import asyncio
-import aiohttp
 import logging
 from datetime import datetime, timedelta, timezone
 try:
@@ -30,7 +35,10 @@ try:
     load_dotenv()
 except ImportError:
     pass  # dotenv not required
-import requests
+
+from shared.maintenance import (
+    MAINTENANCE_CONCURRENCY, MAINTENANCE_RATE_LIMIT, LocalBucket, MaintenanceEngine, SupabaseBucket,
+)
 
 # --- Configuration ---
 
@@ -40,7 +48,8 @@ TOKENS_TO_DELETE = [
 ]
 
 BUCKET_NAME = "monitor-data"
-TEMP_DIR = "/tmp/analytics_cleanup"
+ACTIVE_TRACKING_PATH = "analytics/active_tracking.json"
+LOCAL_ACTIVE_TRACKING_PATH = "data/active_tracking.json"
 
 # --- Logging ---
 logging.basicConfig(
@@ -63,54 +72,6 @@ def get_supabase_client() -> Client:
         supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
     return supabase
 
-def list_files_in_supabase_folder(folder_path: str) -> list[str]:
-    try:
-        client = get_supabase_client()
-        result = client.storage.from_(BUCKET_NAME).list(folder_path)
-        if not result:
-            return []
-        return [item['name'] for item in result if item.get('name')]
-    except Exception as e:
-        logger.error(f"Error listing files in {folder_path}: {e}")
-        return []
-
-async def download_file_from_supabase(remote_path: str, local_path: str) -> bool:
-    client = get_supabase_client()
-    try:
-        # Simple download without caching logic for cleanup script
-        data = await asyncio.to_thread(client.storage.from_(BUCKET_NAME).download, remote_path)
-        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
-        with open(local_path, "wb") as f:
-            f.write(data)
-        return True
-    except Exception as e:
-        # Only log if it's not a "file not found" which is common for new days
-        logger.warning(f"Could not download {remote_path} (might not exist): {e}")
-        return False
-
-async def upload_file_to_supabase(local_path: str, remote_path: str) -> bool:
-    if not os.path.exists(local_path):
-        return False
-    try:
-        client = get_supabase_client()
-        # Always overwrite in cleanup
-        try:
-            await asyncio.to_thread(client.storage.from_(BUCKET_NAME).remove, [remote_path])
-        except Exception:
-            pass
-
-        with open(local_path, "rb") as f:
-            data = f.read()
-        
-        await asyncio.to_thread(
-            client.storage.from_(BUCKET_NAME).upload,
-            remote_path, data, {"content-type": "application/json", "cache-control": "3600"}
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Upload failed for {remote_path}: {e}")
-        return False
-
 def load_json(file_path: str) -> dict | list | None:
     if not os.path.exists(file_path):
         return None
@@ -145,63 +106,54 @@ def parse_ts(ts_str: str) -> datetime:
 
 # --- Cleanup Logic ---
 
-async def clean_active_tracking():
-    """Removes tokens from active_tracking.json (both Supabase and local)."""
+def _drop_tokens_from_active(data: dict, tokens: set) -> list:
+    keys_to_remove = [key for key, token_data in data.items() if token_data.get("mint") in tokens]
+    for k in keys_to_remove:
+        del data[k]
+    return keys_to_remove
+
+async def clean_active_tracking(engine: MaintenanceEngine | None, tokens: set,
+                                local_data_path: str | None = LOCAL_ACTIVE_TRACKING_PATH):
+    """Removes tokens from active_tracking.json (the bucket and, unless local_data_path is None, the local copy)."""
     logger.info("Cleaning active_tracking.json...")
     removed_from_supabase = 0
     removed_from_local = 0
     
-    # 1. Clean Supabase version (if available)
-    if SUPABASE_AVAILABLE:
-        remote_path = "analytics/active_tracking.json"
-        local_path = os.path.join(TEMP_DIR, remote_path)
-        
-        if await download_file_from_supabase(remote_path, local_path):
-            data = load_json(local_path)
-            if data:
-                initial_count = len(data)
-                
-                # Filter dictionary keys
-                keys_to_remove = []
-                for key, token_data in data.items():
-                    if token_data.get("mint") in TOKENS_TO_DELETE:
-                        keys_to_remove.append(key)
-                
-                for k in keys_to_remove:
-                    del data[k]
-                
-                if len(keys_to_remove) > 0:
-                    removed_from_supabase = len(keys_to_remove)
-                    logger.info(f"✅ Removed {removed_from_supabase} tokens from Supabase active_tracking.json")
-                    save_json(data, local_path)
-                    await upload_file_to_supabase(local_path, remote_path)
-                else:
-                    logger.info("No target tokens found in Supabase active_tracking.json")
+    # 1. Clean bucket version (if available)
+    if engine is not None:
+        def clean(path, data):
+            nonlocal removed_from_supabase
+            if not data:
+                return None
+            removed_from_supabase = len(_drop_tokens_from_active(data, tokens))
+            return data if removed_from_supabase else None
+
+        report = await engine.rewrite([ACTIVE_TRACKING_PATH], clean)
+        if report.failed:
+            logger.warning("Could not clean active_tracking.json in the bucket")
+        elif removed_from_supabase:
+            logger.info(f"✅ Removed {removed_from_supabase} tokens from bucket active_tracking.json")
         else:
-            logger.warning("Could not download active_tracking.json from Supabase")
+            logger.info("No target tokens found in bucket active_tracking.json")
     else:
         logger.info("Skipping Supabase active_tracking (module not available)")
     
     # 2. Clean local version (if exists)
-    local_data_path = "data/active_tracking.json"
-    if os.path.exists(local_data_path):
+    if local_data_path is None:
+        logger.info("Skipping local active_tracking.json (rehearsing against --local-dir)")
+    elif os.path.exists(local_data_path):
         logger.info(f"Found local file at {local_data_path}")
         data = load_json(local_data_path)
         if data:
-            initial_count = len(data)
-            
-            keys_to_remove = []
-            for key, token_data in data.items():
-                if token_data.get("mint") in TOKENS_TO_DELETE:
-                    keys_to_remove.append(key)
-            
-            for k in keys_to_remove:
-                del data[k]
+            keys_to_remove = _drop_tokens_from_active(data, tokens)
             
             if len(keys_to_remove) > 0:
                 removed_from_local = len(keys_to_remove)
-                logger.info(f"✅ Removed {removed_from_local} tokens from LOCAL active_tracking.json")
-                save_json(data, local_data_path)
+                if engine is not None and engine.dry_run:
+                    logger.info(f"[DRY RUN] Would remove {removed_from_local} tokens from LOCAL active_tracking.json")
+                else:
+                    logger.info(f"✅ Removed {removed_from_local} tokens from LOCAL active_tracking.json")
+                    save_json(data, local_data_path)
             else:
                 logger.info("No target tokens found in local active_tracking.json")
     else:
@@ -234,41 +186,34 @@ def recalculate_daily_summary(daily_data: dict):
     }
     return daily_data
 
-async def clean_daily_files_for_signal(signal_type: str):
+async def clean_daily_files_for_signal(engine: MaintenanceEngine, signal_type: str, tokens: set):
     """Scans all daily files for a signal type, deletes tokens, updates summaries."""
     logger.info(f"Scanning daily files for {signal_type}...")
     folder = f"analytics/{signal_type}/daily"
-    files = await asyncio.to_thread(list_files_in_supabase_folder, folder)
-    
-    updated_files_count = 0
-    
-    for filename in files:
-        if not filename.endswith(".json"): continue
+    files = await engine.list_names(folder)
+
+    def remove_tokens(remote_path, data):
+        if not data or "tokens" not in data:
+            return None
+        original_len = len(data["tokens"])
         
-        remote_path = f"{folder}/{filename}"
-        local_path = os.path.join(TEMP_DIR, remote_path)
+        # Filter tokens
+        data["tokens"] = [t for t in data["tokens"] if t.get("mint") not in tokens]
         
-        if await download_file_from_supabase(remote_path, local_path):
-            data = load_json(local_path)
-            if not data or "tokens" not in data: continue
-            
-            original_len = len(data["tokens"])
-            
-            # Filter tokens
-            data["tokens"] = [t for t in data["tokens"] if t.get("mint") not in TOKENS_TO_DELETE]
+        if len(data["tokens"]) < original_len:
+            removed_count = original_len - len(data["tokens"])
+            logger.info(f"Removing {removed_count} tokens from {remote_path.rsplit('/', 1)[-1]}")
             
-            if len(data["tokens"]) < original_len:
-                removed_count = original_len - len(data["tokens"])
-                logger.info(f"Removing {removed_count} tokens from {filename}")
-                
-                # Recalculate stats for this day
-                # data = recalculate_daily_summary(data)
-                
-                save_json(data, local_path)
-                await upload_file_to_supabase(local_path, remote_path)
-                updated_files_count += 1
+            # Recalculate stats for this day
+            # data = recalculate_daily_summary(data)
+            return data
+        return None
+
+    report = await engine.rewrite([f"{folder}/{filename}" for filename in files], remove_tokens)
+    for remote_path in report.failed:
+        logger.error(f"Failed to clean {remote_path}")
                 
-    logger.info(f"Finished {signal_type}. Updated {updated_files_count} daily files.")
+    logger.info(f"Finished {signal_type}. Updated {report.changed} daily files. {report.summary()}")
 
 # --- Summary Regeneration Logic (Duplicate from Tracker) ---
 
@@ -297,26 +242,17 @@ def calculate_timeframe_stats(tokens: list[dict]) -> dict:
         "top_tokens": top_tokens[:10]
     }
 
-async def regenerate_summary_stats(signal_type: str):
+async def regenerate_summary_stats(engine: MaintenanceEngine, signal_type: str):
     """Regenerates the main summary_stats.json based on the NOW CLEANED daily files."""
     logger.info(f"Regenerating summary stats for {signal_type}...")
     
     folder = f"analytics/{signal_type}/daily"
-    files = await asyncio.to_thread(list_files_in_supabase_folder, folder)
+    files = await engine.list_names(folder)
     all_tokens = []
     
     # Load all tokens from cleaned daily files
-    for filename in files:
-        if not filename.endswith(".json"): continue
-        remote_path = f"{folder}/{filename}"
-        local_path = os.path.join(TEMP_DIR, remote_path)
-        
-        # Files should already be local from the previous step, but safe to check/redownload
-        data = load_json(local_path)
-        if not data:
-            if await download_file_from_supabase(remote_path, local_path):
-                data = load_json(local_path)
-        
+    daily_files = await asyncio.gather(*(engine.read_json(f"{folder}/{filename}") for filename in files))
+    for data in daily_files:
         if data and "tokens" in data:
             all_tokens.extend(data["tokens"])
             
@@ -343,26 +279,18 @@ async def regenerate_summary_stats(signal_type: str):
         filtered = [t for t in all_tokens if parse_ts(t.get("tracking_completed_at", to_iso(now))) >= start_date]
         summary_data["timeframes"][period] = calculate_timeframe_stats(filtered)
 
-    remote_path = f"analytics/{signal_type}/summary_stats.json"
-    local_path = os.path.join(TEMP_DIR, remote_path)
-    save_json(summary_data, local_path)
-    await upload_file_to_supabase(local_path, remote_path)
+    await engine.write_json(f"analytics/{signal_type}/summary_stats.json", summary_data)
     logger.info(f"Regenerated summary stats for {signal_type}.")
 
-async def regenerate_overall_stats():
+async def regenerate_overall_stats(engine: MaintenanceEngine):
     """Regenerates the overall combined stats."""
     logger.info("Regenerating overall stats...")
     
     # Download the just-regenerated summaries
-    d_path = "analytics/discovery/summary_stats.json"
-    a_path = "analytics/alpha/summary_stats.json"
-    
-    # Ensure we have the latest
-    await download_file_from_supabase(d_path, os.path.join(TEMP_DIR, d_path))
-    await download_file_from_supabase(a_path, os.path.join(TEMP_DIR, a_path))
-    
-    disc = load_json(os.path.join(TEMP_DIR, d_path))
-    alph = load_json(os.path.join(TEMP_DIR, a_path))
+    disc, alph = await asyncio.gather(
+        engine.read_json("analytics/discovery/summary_stats.json"),
+        engine.read_json("analytics/alpha/summary_stats.json"),
+    )
     
     if not disc or not alph:
         logger.error("Missing summary stats, cannot generate overall.")
@@ -392,42 +320,62 @@ async def regenerate_overall_stats():
             "top_tokens": sorted(d["top_tokens"] + a["top_tokens"], key=lambda x: x["ath_roi"], reverse=True)[:10]
         }
 
-    remote_path = "analytics/overall/summary_stats.json"
-    local_path = os.path.join(TEMP_DIR, remote_path)
-    save_json(overall, local_path)
-    await upload_file_to_supabase(local_path, remote_path)
+    await engine.write_json("analytics/overall/summary_stats.json", overall)
     logger.info("Overall stats regenerated.")
 
 # --- Main ---
 
-async def main():
+async def main(tokens: list[str], dry_run: bool = False, local_dir: str | None = None,
+               concurrency: int = MAINTENANCE_CONCURRENCY, rate_limit: float = MAINTENANCE_RATE_LIMIT):
+    if local_dir:
+        bucket = LocalBucket(local_dir)
+    elif SUPABASE_AVAILABLE:
+        bucket = SupabaseBucket(get_supabase_client(), BUCKET_NAME)
+    else:
+        bucket = None
+    engine = MaintenanceEngine(bucket, dry_run=dry_run, concurrency=concurrency, rate_limit=rate_limit) if bucket else None
+    tokens = set(tokens)
+
     logger.info("="*60)
     logger.info("Starting cleanup process...")
-    logger.info(f"Tokens to delete: {TOKENS_TO_DELETE}")
-    logger.info(f"Supabase available: {SUPABASE_AVAILABLE}")
+    logger.info(f"Tokens to delete: {sorted(tokens)}")
+    logger.info(f"Bucket: {bucket.location if bucket else 'unavailable (supabase module not installed)'}")
+    logger.info(f"Dry run: {dry_run}")
     logger.info("="*60)
     
-    # 1. Active Tracking (both Supabase and local)
-    await clean_active_tracking()
+    # 1. Active Tracking (bucket, plus the live local file unless this is a --local-dir rehearsal)
+    await clean_active_tracking(engine, tokens, None if local_dir else LOCAL_ACTIVE_TRACKING_PATH)
     
-    if SUPABASE_AVAILABLE:
+    if engine is not None:
         # 2. Discovery
-        await clean_daily_files_for_signal("discovery")
-        # await regenerate_summary_stats("discovery")
+        await clean_daily_files_for_signal(engine, "discovery", tokens)
+        # await regenerate_summary_stats(engine, "discovery")
         
         # 3. Alpha
-        await clean_daily_files_for_signal("alpha")
-        # await regenerate_summary_stats("alpha")
+        await clean_daily_files_for_signal(engine, "alpha", tokens)
+        # await regenerate_summary_stats(engine, "alpha")
         
         # 4. Overall
-        # await regenerate_overall_stats()
+        # await regenerate_overall_stats(engine)
     else:
         logger.warning("⚠️ Skipping Supabase daily files and stats (module not available)")
         logger.info("💡 To clean Supabase files, install: pip install supabase")
     
     logger.info("="*60)
-    logger.info("✅ Cleanup complete!")
+    logger.info("✅ Cleanup complete!" if not dry_run else "✅ Dry run complete (nothing was changed)")
     logger.info("="*60)
 
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="Remove tokens from the analytics system.")
+    arg_parser.add_argument("--tokens", nargs="+", default=TOKENS_TO_DELETE, metavar="MINT",
+                            help="Mints to remove (default: TOKENS_TO_DELETE).")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing anything.")
+    arg_parser.add_argument("--local-dir", metavar="DIR", help="Run against a local directory laid out like the bucket.")
+    arg_parser.add_argument("--concurrency", type=int, default=MAINTENANCE_CONCURRENCY, help="Storage calls in flight at once.")
+    arg_parser.add_argument("--rate-limit", type=float, default=MAINTENANCE_RATE_LIMIT, help="Maximum storage calls per second (0 = no limit).")
+    return arg_parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    asyncio.run(main(args.tokens, dry_run=args.dry_run, local_dir=args.local_dir,
+                     concurrency=args.concurrency, rate_limit=args.rate_limit))
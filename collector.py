@@ -15,10 +15,13 @@ Key fixes:
 
 import os
 import json
+import gzip
+import uuid
 import asyncio
 import aiohttp
 import logging
 import argparse
+import signal
 import time
 from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, List, Optional, Set, Tuple, Callable
@@ -66,6 +69,9 @@ class Config:
     CLEANUP_LOCAL_FILES: bool = field(default_factory=lambda: os.getenv("CLEANUP_LOCAL_FILES", "true").lower() == "true")
     
     PROCESSOR_CONCURRENCY: int = field(default_factory=lambda: int(os.getenv("PROCESSOR_CONCURRENCY", "1")))
+    DATASET_SEGMENT_MAX_BYTES: int = field(default_factory=lambda: int(os.getenv("DATASET_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024))))
+    DATASET_SEGMENT_MAX_AGE_SECONDS: int = field(default_factory=lambda: int(os.getenv("DATASET_SEGMENT_MAX_AGE_SECONDS", "600")))
+    SNAPSHOT_MANIFEST_RECONCILE_SECONDS: int = field(default_factory=lambda: int(os.getenv("SNAPSHOT_MANIFEST_RECONCILE_SECONDS", "900")))
     
     CHECK_INTERVAL_MINUTES: int = field(default_factory=lambda: int(os.getenv("CHECK_INTERVAL_MINUTES", "30")))
     TOKEN_AGE_THRESHOLD_HOURS: float = field(default_factory=lambda: float(os.getenv("TOKEN_AGE_THRESHOLD_HOURS", "12.0")))
@@ -73,6 +79,8 @@ class Config:
     LONG_FINALIZE_HOURS: int = field(default_factory=lambda: int(os.getenv("LONG_FINALIZE_HOURS", "168")))
     ANALYTICS_INDEX_TTL: int = field(default_factory=lambda: int(os.getenv("ANALYTICS_INDEX_TTL", "600")))
     AGGREGATOR_BATCH_SIZE: int = field(default_factory=lambda: int(os.getenv("AGGREGATOR_BATCH_SIZE", "10")))
+    AGGREGATOR_CONCURRENCY: int = field(default_factory=lambda: int(os.getenv("AGGREGATOR_CONCURRENCY", "4")))
+    LABEL_INDEX_FILE: str = field(default_factory=lambda: os.getenv("LABEL_INDEX_FILE", "./data/label_index.json"))
     
     SNAPSHOT_RETENTION_DAYS: int = field(default_factory=lambda: int(os.getenv("SNAPSHOT_RETENTION_DAYS", "14")))
     DATASET_RETENTION_DAYS: int = field(default_factory=lambda: int(os.getenv("DATASET_RETENTION_DAYS", "14")))
@@ -285,6 +293,11 @@ class SupabaseManager:
         self._last_operation_time = 0.0
         self._min_delay_between_ops = 0.5
     
+    async def _pace(self):
+        """Space out operation starts by the minimum gap; the operations themselves may overlap."""
+        async with self._download_lock:
+            await self._enforce_rate_limit()
+
     async def _enforce_rate_limit(self):
         now = time.monotonic()
         elapsed = now - self._last_operation_time
@@ -301,9 +314,8 @@ class SupabaseManager:
             else:
                 del self._failed_paths[remote_path]
         
-        async with self._download_lock:
-            await self._enforce_rate_limit()
-            return await self._download_json_file_impl(remote_path)
+        await self._pace()
+        return await self._download_json_file_impl(remote_path)
     
     async def _load_from_local_cache(self, remote_path: str) -> Optional[Dict]:
         local_save_path = os.path.join(
@@ -419,72 +431,71 @@ class SupabaseManager:
         return await self._load_from_local_cache(remote_path)
 
     async def check_file_exists(self, remote_path: str) -> bool:
-        async with self._download_lock:
-            await self._enforce_rate_limit()
-            try:
-                folder = os.path.dirname(remote_path)
-                filename = os.path.basename(remote_path)
+        await self._pace()
+        try:
+            folder = os.path.dirname(remote_path)
+            filename = os.path.basename(remote_path)
                 
-                file_list = await asyncio.to_thread(
-                    self.client.storage.from_(self.config.SUPABASE_BUCKET).list,
-                    folder,
-                    {"search": filename}
-                )
+            file_list = await asyncio.to_thread(
+                self.client.storage.from_(self.config.SUPABASE_BUCKET).list,
+                folder,
+                {"search": filename}
+            )
                 
-                return any(f['name'] == filename for f in file_list)
-            except Exception as e:
-                log.error(f"Failed to check existence of {remote_path}: {e}")
-                raise
-    
-    async def upload_file(self, local_path: str, remote_path: str):
-        async with self._download_lock:
-            await self._enforce_rate_limit()
-            try:
-                try:
-                    await asyncio.to_thread(
-                        self.client.storage.from_(self.config.SUPABASE_BUCKET).remove,
-                        [remote_path]
-                    )
-                except Exception:
-                    pass
-
-                await asyncio.to_thread(
-                    self.client.storage.from_(self.config.SUPABASE_BUCKET).upload,
-                    remote_path,
-                    local_path,
-                    {"content-type": "application/json"}
-                )
-                log.debug(f"Uploaded {local_path} to {remote_path}")
-            except Exception as e:
-                log.error(f"Failed to upload {local_path}: {e}")
-                raise
+            return any(f['name'] == filename for f in file_list)
+        except Exception as e:
+            log.error(f"Failed to check existence of {remote_path}: {e}")
+            raise
     
-    async def delete_file(self, remote_path: str):
-        async with self._download_lock:
-            await self._enforce_rate_limit()
+    async def upload_file(self, local_path: str, remote_path: str, content_type: str = "application/json"):
+        await self._pace()
+        try:
             try:
                 await asyncio.to_thread(
                     self.client.storage.from_(self.config.SUPABASE_BUCKET).remove,
                     [remote_path]
                 )
-                log.debug(f"Deleted {remote_path}")
-            except Exception as e:
-                log.error(f"Failed to delete {remote_path}: {e}")
-                raise
+            except Exception:
+                pass
+
+            await asyncio.to_thread(
+                self.client.storage.from_(self.config.SUPABASE_BUCKET).upload,
+                remote_path,
+                local_path,
+                {"content-type": content_type}
+            )
+            log.debug(f"Uploaded {local_path} to {remote_path}")
+        except Exception as e:
+            log.error(f"Failed to upload {local_path}: {e}")
+            raise
     
-    async def list_files(self, folder: str, limit: int = 1000) -> List[Dict]:
-        async with self._download_lock:
-            await self._enforce_rate_limit()
-            try:
-                files = await asyncio.to_thread(
-                    self.client.storage.from_(self.config.SUPABASE_BUCKET).list,
-                    folder,
-                    {"limit": limit, "sortBy": {"column": "created_at", "order": "desc"}}
-                )
-                return files if files else []
-            except Exception as e:
-                log.error(f"Failed to list files in {folder}: {e}")
-                return []
+    async def delete_file(self, remote_path: str):
+        await self._pace()
+        try:
+            await asyncio.to_thread(
+                self.client.storage.from_(self.config.SUPABASE_BUCKET).remove,
+                [remote_path]
+            )
+            log.debug(f"Deleted {remote_path}")
+        except Exception as e:
+            log.error(f"Failed to delete {remote_path}: {e}")
+            raise
+    
+    async def list_files(self, folder: str, limit: int = 1000, offset: int = 0,
+                         raise_errors: bool = False) -> List[Dict]:
+        await self._pace()
+        try:
+            files = await asyncio.to_thread(
+                self.client.storage.from_(self.config.SUPABASE_BUCKET).list,
+                folder,
+                {"limit": limit, "offset": offset, "sortBy": {"column": "created_at", "order": "desc"}}
+            )
+            return files if files else []
+        except Exception as e:
+            log.error(f"Failed to list files in {folder}: {e}")
+            if raise_errors:
+                raise
+            return []
     
     async def cleanup_old_files(self, folder: str, retention_days: int) -> int:
         """Delete files older than retention_days. Returns count of deleted files."""
@@ -588,11 +599,189 @@ class SupabaseManager:
 
 # --- Persistence Manager ---
 
+class DatasetSegmentWriter:
+    """
+    Batches dataset records per (pipeline, folder) into gzip-compressed NDJSON
+    segments instead of one JSON object per record.
+
+    Records are appended to a local spool file first, so an acknowledged
+    record survives a restart. A spool file is sealed once it reaches
+    DATASET_SEGMENT_MAX_BYTES or DATASET_SEGMENT_MAX_AGE_SECONDS and
+    uploaded as:
+
+        {pipeline}/{folder}/segment_{stamp}_{id}.ndjson.gz   one record per line
+        {pipeline}/{folder}/segment_{stamp}_{id}.idx.json    {"records": {record_key: line_no}}
+
+    so an individual record can still be located by the name it used to have.
+    Sealed spools that fail to upload are retried on the next flush.
+
+    A spooled record is only as durable as the local disk, so callers that
+    delete the record's source pass `on_published`; it runs once the segment
+    holding the record has been uploaded.
+    """
+
+    SEGMENT_SUFFIX = ".ndjson.gz"
+    INDEX_SUFFIX = ".idx.json"
+
+    def __init__(self, config: Config, supabase_manager: SupabaseManager):
+        self.config = config
+        self.supabase = supabase_manager
+        self.spool_dir = os.path.join(config.DATASET_DIR_LOCAL, "_spool")
+        self._open: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (pipeline, folder) -> open spool
+        self._sealed: List[Tuple[str, str, str, List[Callable]]] = []  # (pipeline, folder, spool path, on_published)
+        self._lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self.records_written = 0
+        self.segments_uploaded = 0
+        self._recover()
+
+    def _recover(self):
+        """Seal spool files left behind by a previous process."""
+        if not os.path.isdir(self.spool_dir):
+            return
+        for pipeline in os.listdir(self.spool_dir):
+            for folder in os.listdir(os.path.join(self.spool_dir, pipeline)):
+                folder_dir = os.path.join(self.spool_dir, pipeline, folder)
+                for name in sorted(os.listdir(folder_dir)):
+                    if name.endswith(".ndjson"):
+                        self._sealed.append((pipeline, folder, os.path.join(folder_dir, name), []))
+        if self._sealed:
+            log.info(f"Recovered {len(self._sealed)} unflushed dataset spool files.")
+
+    async def append(self, pipeline: str, folder: str, record_key: str, record: Dict,
+                     on_published: Optional[Callable] = None) -> bool:
+        line = json.dumps({"key": record_key, "record": record}, default=str, separators=(',', ':')) + "\n"
+        data = line.encode('utf-8')
+
+        async with self._lock:
+            key = (pipeline, folder)
+            spool = self._open.get(key)
+            if spool is None:
+                folder_dir = os.path.join(self.spool_dir, pipeline, folder)
+                spool = {
+                    "path": os.path.join(
+                        folder_dir,
+                        f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:12]}.ndjson"
+                    ),
+                    "bytes": 0,
+                    "opened_at": time.monotonic(),
+                    "on_published": [],
+                }
+                await asyncio.to_thread(os.makedirs, folder_dir, exist_ok=True)
+                self._open[key] = spool
+
+            def _append():
+                with open(spool["path"], 'ab') as f:
+                    f.write(data)
+
+            await asyncio.to_thread(_append)
+            spool["bytes"] += len(data)
+            if on_published is not None:
+                spool["on_published"].append(on_published)
+            self.records_written += 1
+
+            rotate = spool["bytes"] >= self.config.DATASET_SEGMENT_MAX_BYTES
+            if rotate:
+                self._seal(key)
+
+        if rotate:
+            await self.flush()
+        return True
+
+    def _seal(self, key: Tuple[str, str]):
+        spool = self._open.pop(key)
+        self._sealed.append((key[0], key[1], spool["path"], spool["on_published"]))
+
+    async def flush(self, force: bool = False):
+        """Seal spools past the age threshold (or all, if forced) and upload sealed segments."""
+        async with self._lock:
+            now = time.monotonic()
+            for key, spool in list(self._open.items()):
+                if force or now - spool["opened_at"] >= self.config.DATASET_SEGMENT_MAX_AGE_SECONDS:
+                    self._seal(key)
+            pending, self._sealed = self._sealed, []
+
+        if not pending:
+            return
+        async with self._flush_lock:
+            failed = []
+            for pipeline, folder, spool_path, callbacks in pending:
+                try:
+                    await self._publish(pipeline, folder, spool_path)
+                except Exception as e:
+                    log.error(f"Failed to publish dataset segment {spool_path}: {e}")
+                    failed.append((pipeline, folder, spool_path, callbacks))
+                    continue
+                for callback in callbacks:
+                    try:
+                        await callback()
+                    except Exception as e:
+                        log.warning(f"Post-publish callback failed for {spool_path}: {e}")
+            if failed:
+                async with self._lock:
+                    self._sealed.extend(failed)
+
+    async def _publish(self, pipeline: str, folder: str, spool_path: str):
+        # Named after the spool so a retried publish overwrites rather than duplicates
+        segment_base = f"segment_{os.path.basename(spool_path)[:-len('.ndjson')]}"
+
+        def _build():
+            records: Dict[str, int] = {}
+            lines = []
+            with open(spool_path, 'rb') as f:
+                for raw in f:
+                    try:
+                        entry = json.loads(raw)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash mid-append
+                    records[entry["key"]] = len(lines)
+                    lines.append(json.dumps(entry["record"], separators=(',', ':')))
+            payload = gzip.compress(("\n".join(lines) + "\n").encode('utf-8')) if lines else b""
+            index = {"segment": f"{segment_base}{self.SEGMENT_SUFFIX}", "count": len(lines), "records": records}
+            return payload, index
+
+        payload, index = await asyncio.to_thread(_build)
+        if not index["count"]:
+            os.remove(spool_path)
+            return
+
+        out_dir = os.path.join(self.config.DATASET_DIR_LOCAL, pipeline, folder)
+        segment_path = os.path.join(out_dir, f"{segment_base}{self.SEGMENT_SUFFIX}")
+        index_path = os.path.join(out_dir, f"{segment_base}{self.INDEX_SUFFIX}")
+
+        def _write_local():
+            os.makedirs(out_dir, exist_ok=True)
+            with open(segment_path, 'wb') as f:
+                f.write(payload)
+            with open(index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, separators=(',', ':'))
+
+        await asyncio.to_thread(_write_local)
+
+        if self.config.UPLOAD_TO_SUPABASE:
+            remote_dir = f"{self.config.DATASET_DIR_REMOTE}/{pipeline}/{folder}"
+            await self.supabase.upload_file(segment_path, f"{remote_dir}/{segment_base}{self.SEGMENT_SUFFIX}",
+                                            content_type="application/gzip")
+            await self.supabase.upload_file(index_path, f"{remote_dir}/{segment_base}{self.INDEX_SUFFIX}")
+            log.info(f"Uploaded dataset segment {pipeline}/{folder}/{segment_base} "
+                     f"({index['count']} records, {len(payload)} bytes)")
+            if self.config.CLEANUP_LOCAL_FILES:
+                for path in (segment_path, index_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+        os.remove(spool_path)
+        self.segments_uploaded += 1
+
+
 class PersistenceManager:
     """Handles saving snapshots and datasets."""
     def __init__(self, config: Config, supabase_manager: SupabaseManager):
         self.config = config
         self.supabase = supabase_manager
+        self.dataset_writer = DatasetSegmentWriter(config, supabase_manager)
 
     async def save_snapshot(self, snapshot_data: Dict, filename_base: str):
         json_path = os.path.join(self.config.SNAPSHOT_DIR_LOCAL, f"{filename_base}.json")
@@ -600,15 +789,16 @@ class PersistenceManager:
         try:
             def _save_files():
                 with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(snapshot_data, f, indent=2, default=str)
+                    json.dump(snapshot_data, f, separators=(',', ':'), default=str)
             
             await asyncio.to_thread(_save_files)
             log.debug(f"Saved snapshot locally: {filename_base}.json")
 
         except Exception as e:
             log.error(f"Failed to save local snapshot {filename_base}: {e}")
-            return
+            return False
 
+        uploaded = True
         if self.config.UPLOAD_TO_SUPABASE:
             remote_json_path = f"{self.config.SNAPSHOT_DIR_REMOTE}/{filename_base}.json"
             
@@ -617,6 +807,7 @@ class PersistenceManager:
                 log.info(f"Uploaded snapshot to Supabase: {filename_base}.json")
             except Exception as e:
                 log.error(f"Failed to upload snapshot {filename_base}: {e}")
+                uploaded = False
 
         if self.config.CLEANUP_LOCAL_FILES:
             try:
@@ -624,47 +815,33 @@ class PersistenceManager:
                 log.debug(f"Cleaned up local snapshot: {filename_base}.json")
             except Exception as e:
                 log.warning(f"Failed to clean up local file {filename_base}: {e}")
+
+        return uploaded
     
-    async def save_dataset(self, dataset_data: Dict, pipeline: str, date_str: str, mint: str, is_expired: bool = False):
+    async def save_dataset(self, dataset_data: Dict, pipeline: str, date_str: str, mint: str, is_expired: bool = False,
+                           on_published: Optional[Callable] = None):
+        """
+        Queue a dataset record into its (pipeline, date) segment; True once it is spooled locally.
+        The record is durable only after `on_published` runs (its segment was uploaded).
+        """
         subfolder_name = "expired_no_label" if is_expired else date_str
-        dataset_dir_local = os.path.join(self.config.DATASET_DIR_LOCAL, pipeline, subfolder_name)
-        os.makedirs(dataset_dir_local, exist_ok=True)
         
         safe_timestamp = dataset_data['features']['checked_at_utc'].replace(':', '-').replace('+', '_')
         filename_base = f"{mint}_{safe_timestamp}"
         
-        json_path = os.path.join(dataset_dir_local, f"{filename_base}.json")
-        
         try:
-            def _save_files():
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(dataset_data, f, indent=2, default=str)
-            
-            await asyncio.to_thread(_save_files)
-            log.debug(f"Saved dataset locally: {filename_base}.json")
+            await self.dataset_writer.append(pipeline, subfolder_name, filename_base, dataset_data,
+                                             on_published=on_published)
+            log.debug(f"Spooled dataset record: {pipeline}/{subfolder_name}/{filename_base}")
         except Exception as e:
-            log.error(f"Failed to save local dataset {filename_base}: {e}")
+            log.error(f"Failed to spool dataset {filename_base}: {e}")
             return False
         
-        if self.config.UPLOAD_TO_SUPABASE:
-            remote_json_path = f"{self.config.DATASET_DIR_REMOTE}/{pipeline}/{subfolder_name}/{filename_base}.json"
-            
-            try:
-                await self.supabase.upload_file(json_path, remote_json_path)
-                log.info(f"Uploaded dataset to Supabase: {pipeline}/{subfolder_name}/{filename_base}.json")
-            except Exception as e:
-                log.error(f"Failed to upload dataset {filename_base}: {e}")
-                return False
-        
-        if self.config.CLEANUP_LOCAL_FILES:
-            try:
-                os.remove(json_path)
-                log.debug(f"Cleaned up local dataset: {filename_base}.json")
-            except Exception as e:
-                log.warning(f"Failed to clean up local dataset {filename_base}: {e}")
-        
         return True
 
+    async def flush_datasets(self, force: bool = False):
+        await self.dataset_writer.flush(force=force)
+
 # --- CORRECTED Feature Computer ---
 
 class FeatureComputer:
@@ -1276,19 +1453,93 @@ class FeatureComputer:
 
 # --- Snapshot Aggregator (keeping your existing implementation) ---
 
+class LabelStatusIndex:
+    """
+    Persistent snapshot -> label state, so each aggregation pass only touches
+    what could have changed since the last one.
+
+    - daily_files: remote daily file path -> version (eTag / updated_at) last parsed
+    - labels: composite key -> {"source": daily file path, "label": token}
+    - snapshots: snapshot filename -> "aggregated" | "finalized" (dataset written
+      or already final; only the remote delete may still be outstanding)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.daily_files: Dict[str, Optional[str]] = {}
+        self.labels: Dict[str, Dict] = {}
+        self.snapshots: Dict[str, str] = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.daily_files = data.get("daily_files", {})
+            self.labels = data.get("labels", {})
+            self.snapshots = data.get("snapshots", {})
+            log.info(f"Loaded label index: {len(self.labels)} labels, {len(self.daily_files)} daily files, "
+                     f"{len(self.snapshots)} resolved snapshots")
+        except Exception as e:
+            log.warning(f"Could not load label index {self.path}, rebuilding: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"daily_files": self.daily_files, "labels": self.labels, "snapshots": self.snapshots},
+                      f, default=str)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def file_version(file_info: Dict) -> Optional[str]:
+        metadata = file_info.get('metadata') or {}
+        return metadata.get('eTag') or file_info.get('updated_at') or None
+
+    def needs_refresh(self, path: str, version: Optional[str]) -> bool:
+        return version is None or self.daily_files.get(path) != version
+
+    def replace_daily_file(self, path: str, version: Optional[str], tokens: List[Dict]):
+        """Swap in the finalized labels parsed from one daily file."""
+        for key in [k for k, v in self.labels.items() if v.get("source") == path]:
+            del self.labels[key]
+        for token in tokens:
+            self.labels[get_composite_key(token["mint"], token["signal_type"])] = {"source": path, "label": token}
+        self.daily_files[path] = version
+
+    def forget_daily_files(self, live_paths: Set[str]):
+        """Drop daily files (and their labels) that retention cleanup removed."""
+        gone = set(self.daily_files) - live_paths
+        for path in gone:
+            del self.daily_files[path]
+        if gone:
+            for key in [k for k, v in self.labels.items() if v.get("source") in gone]:
+                del self.labels[key]
+
+    def forget_snapshots(self, live_filenames: Set[str]):
+        for filename in set(self.snapshots) - live_filenames:
+            del self.snapshots[filename]
+
+
 class SnapshotAggregator:
     """Handles efficient aggregation of snapshots with labels."""
     
-    def __init__(self, config: Config, supabase: SupabaseManager, persistence: 'PersistenceManager', active_snapshot_cache: Set[str]):
+    def __init__(self, config: Config, supabase: SupabaseManager, persistence: 'PersistenceManager', active_snapshot_cache: 'SnapshotManifest'):
         self.config = config
         self.supabase = supabase
         self.persistence = persistence
         self.claimed_snapshots: Set[str] = set()
+        # Aggregated into a spooled segment that hasn't been uploaded yet; deleted once it is
+        self.awaiting_publish: Set[str] = set()
         self.active_snapshot_cache = active_snapshot_cache
         self._file_cache: Dict[str, Tuple[Optional[Dict], float]] = {}
         self._cache_lock = asyncio.Lock()
         self._label_index: Dict[str, Dict] = {}
         self._existing_daily_folders: Dict[str, Set[str]] = {}
+        self.index = LabelStatusIndex(config.LABEL_INDEX_FILE)
+        self.index.load()
+        self._semaphore = asyncio.Semaphore(max(1, config.AGGREGATOR_CONCURRENCY))
 
     def _clear_caches(self):
         log.debug("Clearing aggregator pass caches.")
@@ -1312,12 +1563,31 @@ class SnapshotAggregator:
             self._file_cache[remote_path] = (data, now + ttl)
         return data
 
+    async def _bounded(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    async def _refresh_daily_file(self, file_path: str, version: Optional[str]) -> int:
+        """Re-parse one changed daily file into the index. Returns the number of finalized labels."""
+        content = await self.supabase.download_json_file(file_path)
+        if content is None:
+            return 0  # download failed; retried next pass
+        tokens = content.get("tokens") if isinstance(content, dict) else None
+
+        finalized = [
+            token for token in (tokens if isinstance(tokens, list) else [])
+            if isinstance(token, dict) and token.get("mint") and token.get("signal_type")
+            and token.get("status") in ("win", "loss")
+        ]
+        self.index.replace_daily_file(file_path, version, finalized)
+        return len(finalized)
+
     async def scan_and_aggregate(self):
-        """Sequential snapshot aggregation scan."""
-        log.info("Starting sequential snapshot aggregation scan...")
+        """Incremental snapshot aggregation scan (bounded concurrency, persistent label index)."""
+        log.info("Starting snapshot aggregation scan...")
         
         self._clear_caches()
-        now = datetime.now(timezone.utc)
+        started = time.monotonic()
         
         # Stage 1: Build label index
         log.info("Loading 'active_tracking.json'...")
@@ -1330,8 +1600,6 @@ class SnapshotAggregator:
                     self._label_index[composite_key] = token_data
                     active_wins_found += 1
             log.info(f"Found {active_wins_found} active 'win' labels.")
-        
-        await asyncio.sleep(1.0)
             
         # Discover pipelines
         try:
@@ -1344,11 +1612,10 @@ class SnapshotAggregator:
         except Exception as e:
             log.error(f"Failed to discover pipelines: {e}")
             pipelines_to_scan = set()
-        
-        await asyncio.sleep(1.0)
 
-        # Collect daily file paths
-        daily_file_paths = []
+        # Collect daily file versions
+        daily_versions: Dict[str, Optional[str]] = {}
+        listing_complete = bool(pipelines_to_scan)
         for pipeline in pipelines_to_scan:
             daily_folder_path = f"analytics/{pipeline}/daily"
             try:
@@ -1356,51 +1623,30 @@ class SnapshotAggregator:
                 for file_info in files:
                     filename = file_info.get('name', '')
                     if filename.endswith('.json'):
-                        daily_file_paths.append(f"{daily_folder_path}/{filename}")
-                await asyncio.sleep(0.5)
+                        daily_versions[f"{daily_folder_path}/{filename}"] = LabelStatusIndex.file_version(file_info)
             except Exception as e:
+                listing_complete = False
                 log.error(f"Failed to list daily files for {pipeline}: {e}")
 
-        log.info(f"Found {len(daily_file_paths)} daily files. Processing sequentially...")
+        if listing_complete:
+            self.index.forget_daily_files(set(daily_versions))
 
-        # Download daily files sequentially
-        finalized_labels_found = 0
-        
-        for i, file_path in enumerate(daily_file_paths):
-            if i > 0 and i % 10 == 0:
-                log.info(f"Progress: {i}/{len(daily_file_paths)} daily files processed")
-            
-            try:
-                content = await self.supabase.download_json_file(file_path)
-                
-                if not content or not isinstance(content.get("tokens"), list):
-                    continue
-                
-                for token in content["tokens"]:
-                    if not isinstance(token, dict):
-                        continue
-                        
-                    mint = token.get("mint")
-                    signal_type = token.get("signal_type")
-                    
-                    if not mint or not signal_type or token.get("status") not in ("win", "loss"):
-                        continue
-                    
-                    composite_key = get_composite_key(mint, signal_type)
-                    self._label_index[composite_key] = token
-                    finalized_labels_found += 1
-            
-            except Exception as e:
-                log.warning(f"Failed to process daily file {file_path}: {e}")
+        changed = [(path, version) for path, version in daily_versions.items()
+                   if self.index.needs_refresh(path, version)]
+        log.info(f"Found {len(daily_versions)} daily files, {len(changed)} new or changed since last pass.")
 
-        log.info(f"Found {finalized_labels_found} finalized labels from daily files.")
-        log.info(f"Total labels indexed: {len(self._label_index)}")
-
-        if not self._label_index:
-            log.info("No labels found. Nothing to aggregate.")
-            return
+        results = await asyncio.gather(
+            *(self._bounded(self._refresh_daily_file(path, version)) for path, version in changed),
+            return_exceptions=True
+        )
+        for (path, _), result in zip(changed, results):
+            if isinstance(result, Exception):
+                log.warning(f"Failed to process daily file {path}: {result}")
 
-        await asyncio.sleep(1.0)
+        # Finalized labels from daily files take precedence over active wins
+        for composite_key, entry in self.index.labels.items():
+            self._label_index[composite_key] = entry["label"]
+        log.info(f"Total labels indexed: {len(self._label_index)}")
 
         # Stage 2: Match snapshots
         log.info("Listing snapshot files...")
@@ -1408,16 +1654,27 @@ class SnapshotAggregator:
         
         if not snapshot_files:
             log.info("No snapshot files found.")
+            await asyncio.to_thread(self.index.save)
             return
 
-        log.info(f"Found {len(snapshot_files)} snapshot files. Matching against labels...")
-
-        snapshots_to_process = []
+        live_snapshots: Set[str] = set()
+        to_delete: List[Tuple[str, str]] = []
+        snapshots_to_process: List[Tuple[str, str, str]] = []
 
         for file_info in snapshot_files:
             filename = file_info.get('name', '')
             if not filename.endswith('.json'):
                 continue
+            live_snapshots.add(filename)
+            remote_path = f"{self.config.SNAPSHOT_DIR_REMOTE}/{filename}"
+
+            if filename in self.awaiting_publish:
+                continue
+
+            # Already resolved in an earlier pass; only the delete is outstanding
+            if filename in self.index.snapshots:
+                to_delete.append((filename, remote_path))
+                continue
             
             try:
                 parts = filename.replace('.json', '').split('_')
@@ -1429,56 +1686,53 @@ class SnapshotAggregator:
                 composite_key = get_composite_key(mint, signal_type)
                 
                 if composite_key in self._label_index:
-                    remote_path = f"{self.config.SNAPSHOT_DIR_REMOTE}/{filename}"
                     snapshots_to_process.append((filename, remote_path, composite_key))
                     
             except Exception as e:
                 log.warning(f"Error parsing filename {filename}: {e}")
-        
-        if not snapshots_to_process:
-            log.info("No snapshots match the label index.")
-            return
-            
-        log.info(f"Found {len(snapshots_to_process)} snapshots with labels.")
-        
-        await asyncio.sleep(1.0)
 
-        # Stage 3: Process snapshots sequentially
-        processed_count = 0
-        failed_count = 0
-        
-        for i, (filename, remote_path, composite_key) in enumerate(snapshots_to_process):
-            try:
-                if i > 0 and i % 10 == 0:
-                    log.info(f"Progress: {i}/{len(snapshots_to_process)} snapshots processed "
-                            f"({processed_count} successful, {failed_count} failed)")
-                
-                snapshot_data = await self.supabase.download_json_file(remote_path)
-                
-                if not snapshot_data:
-                    failed_count += 1
-                    continue
-                
-                label_data = self._label_index.get(composite_key)
-                if not label_data:
-                    failed_count += 1
-                    continue
-                
-                finalization_status = snapshot_data.get('finalization', {}).get("finalization_status", "pending")
-                if finalization_status in ("labeled", "expired_no_label"):
-                    log.warning(f"Snapshot {filename} already finalized. Deleting.")
-                    await self._delete_snapshot(filename, remote_path)
-                    continue
+        self.index.forget_snapshots(live_snapshots)
+        log.info(f"Found {len(snapshot_files)} snapshot files: {len(snapshots_to_process)} newly resolvable, "
+                 f"{len(to_delete)} resolved awaiting delete.")
 
-                log.info(f"[{i+1}/{len(snapshots_to_process)}] Aggregating {filename} with label '{label_data.get('status')}'")
-                await self._aggregate_with_label(snapshot_data, label_data, filename, remote_path)
-                processed_count += 1
-                
-            except Exception as e:
-                log.error(f"Failed to aggregate {filename}: {e}", exc_info=True)
-                failed_count += 1
-        
-        log.info(f"Aggregation complete: {processed_count} successful, {failed_count} failed")
+        # Stage 3: Process resolvable snapshots concurrently
+        outcomes = await asyncio.gather(
+            *(self._bounded(self._delete_snapshot(filename, remote_path)) for filename, remote_path in to_delete),
+            *(self._bounded(self._process_snapshot(*item)) for item in snapshots_to_process),
+            return_exceptions=True
+        )
+        outcomes = outcomes[len(to_delete):]
+        processed_count = sum(1 for o in outcomes if o is True)
+        failed_count = len(outcomes) - processed_count
+
+        await asyncio.to_thread(self.index.save)
+        log.info(f"Aggregation complete in {time.monotonic() - started:.1f}s: "
+                 f"{processed_count} successful, {failed_count} failed/skipped")
+
+    async def _process_snapshot(self, filename: str, remote_path: str, composite_key: str) -> bool:
+        try:
+            snapshot_data = await self.supabase.download_json_file(remote_path)
+            if not snapshot_data:
+                return False
+            
+            label_data = self._label_index.get(composite_key)
+            if not label_data:
+                return False
+            
+            finalization_status = snapshot_data.get('finalization', {}).get("finalization_status", "pending")
+            if finalization_status in ("labeled", "expired_no_label"):
+                log.warning(f"Snapshot {filename} already finalized. Deleting.")
+                self.index.snapshots[filename] = "finalized"
+                await self._delete_snapshot(filename, remote_path)
+                return False
+
+            log.info(f"Aggregating {filename} with label '{label_data.get('status')}'")
+            if await self._aggregate_with_label(snapshot_data, label_data, filename, remote_path):
+                return True
+            return False
+        except Exception as e:
+            log.error(f"Failed to aggregate {filename}: {e}", exc_info=True)
+            return False
     
     async def _aggregate_with_label(self, snapshot: Dict, label_data: Dict, 
                                 filename: str, remote_path: str):
@@ -1503,13 +1757,22 @@ class SnapshotAggregator:
             checked_at = parser.isoparse(checked_at_str)
             date_str = checked_at.strftime('%Y-%m-%d')
         
-        success = await self.persistence.save_dataset(snapshot, pipeline, date_str, mint, is_expired=False)
+        async def _on_published():
+            # Only now is the record safe to lose the source snapshot
+            self.awaiting_publish.discard(filename)
+            self.index.snapshots[filename] = "aggregated"
+            await self._delete_snapshot(filename, remote_path)
+
+        self.awaiting_publish.add(filename)
+        success = await self.persistence.save_dataset(snapshot, pipeline, date_str, mint, is_expired=False,
+                                                      on_published=_on_published)
         
         if success:
-            await self._delete_snapshot(filename, remote_path)
             log.info(f"Successfully aggregated {mint} ({pipeline}) to dataset {pipeline}/{date_str}")
         else:
+            self.awaiting_publish.discard(filename)
             log.error(f"Failed to save dataset for {mint} ({pipeline})")
+        return success
     
     async def _delete_snapshot(self, filename: str, remote_path: str):
         try:
@@ -1527,11 +1790,82 @@ class SnapshotAggregator:
 
         self.claimed_snapshots.discard(filename)
         
-        try:
-            if filename in self.active_snapshot_cache:
-                self.active_snapshot_cache.remove(filename)
-        except Exception:
-            pass
+        self.active_snapshot_cache.discard(filename)
+
+# --- Snapshot Manifest ---
+
+class SnapshotManifest:
+    """
+    Local view of the snapshots that exist in the bucket, indexed by
+    (mint, signal source) for O(1) "already have one?" checks.
+
+    Kept current by the collector (add on upload) and aggregator (discard on
+    delete), and reconciled against a bucket listing every
+    SNAPSHOT_MANIFEST_RECONCILE_SECONDS instead of checking the bucket per signal.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[Tuple[str, str], Set[str]] = {}
+        self._count = 0
+        self.reconciled_at: Optional[float] = None
+
+    @staticmethod
+    def parse(filename: str) -> Optional[Tuple[str, str]]:
+        """'{mint}_{timestamp}_{signal_type}.json' -> (mint, signal_type)."""
+        if not filename.endswith('.json'):
+            return None
+        stem = filename[:-len('.json')]
+        mint, _, rest = stem.partition('_')
+        _, _, signal_type = rest.rpartition('_')
+        if not mint or not rest or not signal_type:
+            return None
+        return mint, signal_type
+
+    def add(self, filename: str):
+        key = self.parse(filename)
+        if key is None:
+            return
+        names = self._by_key.setdefault(key, set())
+        if filename not in names:
+            names.add(filename)
+            self._count += 1
+
+    def discard(self, filename: str):
+        key = self.parse(filename)
+        names = self._by_key.get(key) if key else None
+        if names and filename in names:
+            names.remove(filename)
+            self._count -= 1
+            if not names:
+                del self._by_key[key]
+
+    def has(self, mint: str, signal_type: str) -> bool:
+        return (mint, signal_type) in self._by_key
+
+    def first(self, mint: str, signal_type: str) -> Optional[str]:
+        names = self._by_key.get((mint, signal_type))
+        return next(iter(names)) if names else None
+
+    def reconcile(self, filenames: List[str]):
+        """Replace the manifest with an authoritative bucket listing."""
+        self._by_key.clear()
+        self._count = 0
+        for filename in filenames:
+            self.add(filename)
+        self.reconciled_at = time.monotonic()
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return self.reconciled_at is None or time.monotonic() - self.reconciled_at >= max_age_seconds
+
+    def invalidate(self):
+        self.reconciled_at = None
+
+    def __contains__(self, filename: str) -> bool:
+        key = self.parse(filename)
+        return bool(key) and filename in self._by_key.get(key, ())
+
+    def __len__(self) -> int:
+        return self._count
 
 # --- Main Collector Service ---
 
@@ -1547,7 +1881,7 @@ class CollectorService:
         self.holiday_client = HolidayClient(session, config)
         self.computer = FeatureComputer()
         
-        self.active_snapshot_files: Set[str] = set()
+        self.active_snapshot_files = SnapshotManifest()
         self.processing_keys: Set[str] = set()  # Track signals currently being processed
         self.aggregator = SnapshotAggregator(config, self.supabase, self.persistence, self.active_snapshot_files)
         
@@ -1687,28 +2021,12 @@ class CollectorService:
             safe_timestamp = features['checked_at_utc'].replace(':', '-').replace('+', '_')
             filename_base = f"{mint}_{safe_timestamp}_{signal_type}"
             filename_json = f"{filename_base}.json"
-            remote_json_path = f"{self.config.SNAPSHOT_DIR_REMOTE}/{filename_json}"
 
-            # 3. Robust Idempotency Check (Active Monitoring Check)
-            # Check if ANY active snapshot exists for this (mint, signal_type)
-            search_prefix = f"{mint}_"
-            search_suffix = f"_{signal_type}.json"
-            
-            existing_active = [f for f in self.active_snapshot_files 
-                               if f.startswith(search_prefix) and f.endswith(search_suffix)]
-            
+            # 3. Idempotency Check against the snapshot manifest
+            # Skip if ANY active snapshot exists for this (mint, signal_type)
+            existing_active = self.active_snapshot_files.first(mint, signal_type)
             if existing_active:
-                log.info(f"Skipping: active snapshot already exists for {processing_key} -> {existing_active[0]}")
-                return
-
-            # Extra safety: Check Supabase directly if not in local cache
-            try:
-                if await self.supabase.check_file_exists(remote_json_path):
-                    log.debug(f"Skipping: file already exists on Supabase: {filename_json}")
-                    self.active_snapshot_files.add(filename_json)
-                    return
-            except Exception as e:
-                log.error(f"Failed remote idempotency check for {filename_base}: {e}")
+                log.info(f"Skipping: active snapshot already exists for {processing_key} -> {existing_active}")
                 return
 
             log.info(f"Processing new signal: {filename_base}")
@@ -1758,6 +2076,27 @@ class CollectorService:
         finally:
             self.processing_keys.discard(processing_key)
 
+    async def reconcile_snapshot_manifest(self):
+        log.info("Reconciling snapshot manifest with bucket listing...")
+        page_size = 1000
+        filenames: List[str] = []
+        try:
+            offset = 0
+            while True:
+                page = await self.supabase.list_files(
+                    self.config.SNAPSHOT_DIR_REMOTE, limit=page_size, offset=offset, raise_errors=True
+                )
+                filenames.extend(f['name'] for f in page if f.get('name') and f['name'].endswith('.json'))
+                if len(page) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            # Keep the previous manifest rather than trusting a partial listing
+            log.error(f"Failed to list snapshots for manifest: {e}")
+            return
+        self.active_snapshot_files.reconcile(filenames)
+        log.info(f"Snapshot manifest holds {len(self.active_snapshot_files)} active snapshots.")
+
     async def run_process_with_semaphore(self, signal: Dict):
         """Wrapper for process_signal with semaphore."""
         mint = signal.get('mint', 'unknown_mint')
@@ -1802,6 +2141,10 @@ class CollectorService:
                     self.config.DATASET_RETENTION_DAYS
                 )
                 
+                # Retention deletes bypass the manifest
+                if deleted_snapshots:
+                    self.active_snapshot_files.invalidate()
+
                 log.info(f"Storage cleanup complete: "
                          f"Deleted {deleted_snapshots} snapshots, "
                          f"{deleted_daily_discovery + deleted_daily_alpha} daily analytics files, "
@@ -1817,59 +2160,66 @@ class CollectorService:
         
         last_aggregation = time.monotonic() - self.config.AGGREGATOR_INTERVAL - 1
         
-        while True:
-            try:
-                start_time = time.monotonic()
-                log.info("Starting new polling cycle...")
-
-                # Update active snapshot cache
-                log.info("Updating active snapshot file cache...")
+        try:
+            while True:
                 try:
-                    snapshot_files_list = await self.supabase.list_files(self.config.SNAPSHOT_DIR_REMOTE, limit=5000)
-                    self.active_snapshot_files = {f['name'] for f in snapshot_files_list if f.get('name') and f['name'].endswith('.json')}
-                    log.info(f"Cached {len(self.active_snapshot_files)} active snapshot filenames.")
-                except Exception as e:
-                    log.error(f"Failed to update active snapshot cache: {e}")
-                
-                # Process new signals
-                signals = await self._fetch_all_signals()
-                log.info(f"Found {len(signals)} total signals to check.")
+                    start_time = time.monotonic()
+                    log.info("Starting new polling cycle...")
+
+                    # Reconcile the snapshot manifest with the bucket (occasionally, not per signal)
+                    if self.active_snapshot_files.is_stale(self.config.SNAPSHOT_MANIFEST_RECONCILE_SECONDS):
+                        await self.reconcile_snapshot_manifest()
+
+                    # Process new signals (only once the manifest reflects the bucket)
+                    if self.active_snapshot_files.reconciled_at is None:
+                        log.warning("Snapshot manifest has never been reconciled; skipping signals this cycle.")
+                        signals = []
+                    else:
+                        signals = await self._fetch_all_signals()
+                    log.info(f"Found {len(signals)} total signals to check.")
                 
-                if signals:
-                    tasks = [self.run_process_with_semaphore(sig) for sig in signals]
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
+                    if signals:
+                        tasks = [self.run_process_with_semaphore(sig) for sig in signals]
+                        results = await asyncio.gather(*tasks, return_exceptions=True)
                     
-                    exceptions = [r for r in results if isinstance(r, Exception)]
-                    if exceptions:
-                        log.error(f"{len(exceptions)} signals failed during processing")
+                        exceptions = [r for r in results if isinstance(r, Exception)]
+                        if exceptions:
+                            log.error(f"{len(exceptions)} signals failed during processing")
 
-                # Run aggregator if interval elapsed
-                elapsed_since_last_agg = start_time - last_aggregation
+                    # Run aggregator if interval elapsed
+                    elapsed_since_last_agg = start_time - last_aggregation
                 
-                if elapsed_since_last_agg >= self.config.AGGREGATOR_INTERVAL:
-                    log.info("Running snapshot aggregation...")
-                    try:
-                        await self.aggregator.scan_and_aggregate()
-                        last_aggregation = time.monotonic()
-                        log.info("Aggregation completed successfully.")
-                    except Exception as e:
-                        log.error(f"Aggregator failed: {e}", exc_info=True)
-                        last_aggregation = time.monotonic()
+                    if elapsed_since_last_agg >= self.config.AGGREGATOR_INTERVAL:
+                        log.info("Running snapshot aggregation...")
+                        try:
+                            await self.aggregator.scan_and_aggregate()
+                            last_aggregation = time.monotonic()
+                            log.info("Aggregation completed successfully.")
+                        except Exception as e:
+                            log.error(f"Aggregator failed: {e}", exc_info=True)
+                            last_aggregation = time.monotonic()
                 
-                # Run storage cleanup if interval elapsed
-                await self.run_cleanup()
+                    # Publish dataset segments that reached their age threshold
+                    await self.persistence.flush_datasets()
 
-                cycle_duration = time.monotonic() - start_time
-                log.info(f"Polling cycle finished in {cycle_duration:.2f}s.")
+                    # Run storage cleanup if interval elapsed
+                    await self.run_cleanup()
+
+                    cycle_duration = time.monotonic() - start_time
+                    log.info(f"Polling cycle finished in {cycle_duration:.2f}s.")
                 
-                sleep_time = max(0, self.config.POLL_INTERVAL - cycle_duration)
-                log.info(f"Sleeping for {sleep_time:.2f}s...")
-                await asyncio.sleep(sleep_time)
+                    sleep_time = max(0, self.config.POLL_INTERVAL - cycle_duration)
+                    log.info(f"Sleeping for {sleep_time:.2f}s...")
+                    await asyncio.sleep(sleep_time)
                 
-            except Exception as e:
-                log.critical(f"CRITICAL ERROR in main loop: {e}", exc_info=True)
-                log.info("Restarting loop after 60s...")
-                await asyncio.sleep(60)
+                except Exception as e:
+                    log.critical(f"CRITICAL ERROR in main loop: {e}", exc_info=True)
+                    log.info("Restarting loop after 60s...")
+                    await asyncio.sleep(60)
+        finally:
+            # Spooled records live only on local disk; publish them before the host goes away
+            log.info("Publishing pending dataset segments before shutdown...")
+            await self.persistence.flush_datasets(force=True)
 
 # --- CLI and Test Functions ---
 
@@ -1964,12 +2314,17 @@ async def main():
             await run_tests(config, session)
         elif args.command == "run":
             service = CollectorService(config, session)
+            # Deploys send SIGTERM: cancel the service so its shutdown flush runs
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            except (NotImplementedError, RuntimeError):
+                pass  # not supported on Windows event loops
             await service.run()
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\nService stopped manually.")
         if 'log' in globals():
             log.info("Service stopped manually.")
\ No newline at end of file
@@ -66,6 +66,14 @@ if not BOT_TOKEN:
 # ----------------------
 FASTAPI_ML_URL = os.getenv("ML_API_URL")
 ML_API_TIMEOUT = int(os.getenv("ML_API_TIMEOUT", "30"))  # seconds
+ML_PREDICTION_CACHE_TTL = int(os.getenv("ML_PREDICTION_CACHE_TTL", "60"))  # seconds per (mint, threshold)
+ML_BATCH_CONCURRENCY = int(os.getenv("ML_BATCH_CONCURRENCY", "4"))  # concurrent 10-mint batch calls
+
+# ----------------------
+# Event Loop Monitoring
+# ----------------------
+# Callbacks blocking the shared event loop longer than this are logged with their stack
+LOOP_LAG_THRESHOLD_SECS = float(os.getenv("LOOP_LAG_THRESHOLD_SECS", "0.5"))
 
 # ----------------------
 # Alert Grades
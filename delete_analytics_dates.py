@@ -25,15 +25,22 @@ USAGE EXAMPLES:
 
   # Delete a range of dates:
   python delete_analytics_dates.py --date-range 2026-02-20 2026-02-25
+
+  # Rehearse against a local copy of the bucket instead of Supabase:
+  python delete_analytics_dates.py --date-range 2026-02-20 2026-02-25 --local-dir ./bucket_copy
 """
 
 import os
 import sys
 import argparse
+import asyncio
 import logging
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from shared.maintenance import (
+    MAINTENANCE_CONCURRENCY, MAINTENANCE_RATE_LIMIT, MaintenanceEngine, open_bucket,
+)
 
 load_dotenv()
 
@@ -60,41 +67,6 @@ logging.basicConfig(
 log = logging.getLogger("AnalyticsDeleter")
 
 
-# ---------------------------------------------------------------------------
-# Supabase helpers
-# ---------------------------------------------------------------------------
-
-def get_client() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    if not url or not key:
-        log.critical("SUPABASE_URL and SUPABASE_KEY must be set in .env")
-        sys.exit(1)
-    return create_client(url, key)
-
-
-def file_exists(client: Client, remote_path: str) -> bool:
-    """Check whether a specific file exists in the bucket."""
-    try:
-        folder = os.path.dirname(remote_path).replace("\\", "/")
-        filename = os.path.basename(remote_path)
-        result = client.storage.from_(BUCKET_NAME).list(folder, {"search": filename})
-        return any(f.get("name") == filename for f in (result or []))
-    except Exception as e:
-        log.warning(f"  Could not check existence of {remote_path}: {e}")
-        return False
-
-
-def delete_file(client: Client, remote_path: str) -> bool:
-    """Delete a single file from the bucket. Returns True on success."""
-    try:
-        client.storage.from_(BUCKET_NAME).remove([remote_path])
-        return True
-    except Exception as e:
-        log.error(f"  Failed to delete {remote_path}: {e}")
-        return False
-
-
 # ---------------------------------------------------------------------------
 # Core logic
 # ---------------------------------------------------------------------------
@@ -113,30 +85,41 @@ def build_target_paths(dates: list[str], signal_types: list[str]) -> list[dict]:
     return targets
 
 
-def run(dates: list[str], signal_types: list[str], dry_run: bool) -> None:
+async def plan_deletions(engine: MaintenanceEngine, targets: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split targets into (found, not_found) using one listing per daily folder."""
+    folders = sorted({f"{ANALYTICS_BASE_PATH}/{t['signal_type']}/daily" for t in targets})
+    listings = await asyncio.gather(*(engine.list_names(folder) for folder in folders))
+    existing = {f"{folder}/{name}" for folder, names in zip(folders, listings) for name in names}
+
+    found = [t for t in targets if t["path"] in existing]
+    not_found = [t for t in targets if t["path"] not in existing]
+    return found, not_found
+
+
+def run(dates: list[str], signal_types: list[str], dry_run: bool, local_dir: str | None = None,
+        concurrency: int = MAINTENANCE_CONCURRENCY, rate_limit: float = MAINTENANCE_RATE_LIMIT) -> None:
+    try:
+        bucket = open_bucket(BUCKET_NAME, local_dir)
+    except ValueError as e:
+        log.critical(f"{e} (set them in .env or pass --local-dir)")
+        sys.exit(1)
+
     log.info("=" * 60)
     log.info("  Analytics Date Deletion Utility")
     log.info("=" * 60)
-    log.info(f"  Bucket       : {BUCKET_NAME}")
+    log.info(f"  Bucket       : {bucket.location}")
     log.info(f"  Signal types : {', '.join(signal_types)}")
     log.info(f"  Dates        : {', '.join(dates)}")
     log.info(f"  Dry run      : {'YES — no files will be deleted' if dry_run else 'NO  — files WILL be deleted'}")
     log.info("=" * 60)
 
-    client = get_client()
+    engine = MaintenanceEngine(bucket, dry_run=dry_run, concurrency=concurrency, rate_limit=rate_limit)
     targets = build_target_paths(dates, signal_types)
 
-    found      = []
-    not_found  = []
-
     log.info("\nScanning for files...")
+    found, not_found = asyncio.run(plan_deletions(engine, targets))
     for t in targets:
-        if file_exists(client, t["path"]):
-            log.info(f"  [FOUND]     {t['path']}")
-            found.append(t)
-        else:
-            log.info(f"  [NOT FOUND] {t['path']}")
-            not_found.append(t)
+        log.info(f"  {'[FOUND]    ' if t in found else '[NOT FOUND]'} {t['path']}")
 
     log.info(f"\nScan complete: {len(found)} file(s) found, {len(not_found)} file(s) missing.")
 
@@ -152,32 +135,21 @@ def run(dates: list[str], signal_types: list[str], dry_run: bool) -> None:
             log.info("Deletion cancelled by user.")
             return
 
-    deleted  = 0
-    failed   = 0
-
     log.info("\nProcessing deletions...")
-    for t in found:
-        if dry_run:
-            log.info(f"  [DRY RUN] Would delete: {t['path']}")
-            deleted += 1
-        else:
-            success = delete_file(client, t["path"])
-            if success:
-                log.info(f"  [DELETED]  {t['path']}")
-                deleted += 1
-            else:
-                log.error(f"  [FAILED]   {t['path']}")
-                failed += 1
+    report = asyncio.run(engine.delete(t["path"] for t in found))
+    for path in report.failed:
+        log.error(f"  [FAILED]   {path}")
 
     log.info("\n" + "=" * 60)
     action = "Would have deleted" if dry_run else "Deleted"
-    log.info(f"  {action} : {deleted} file(s)")
+    log.info(f"  {action} : {report.deleted} file(s)")
     if not dry_run:
-        log.info(f"  Failed     : {failed} file(s)")
-        if failed == 0:
+        log.info(f"  Failed     : {len(report.failed)} file(s)")
+        if not report.failed:
             log.info("  All deletions successful ✓")
         else:
             log.warning("  Some deletions failed — check the log above.")
+    log.info(f"  Throughput : {report.summary()}")
     log.info("=" * 60)
 
 
@@ -258,6 +230,23 @@ def parse_args():
         action="store_true",
         help="Preview what would be deleted without actually deleting anything.",
     )
+    parser.add_argument(
+        "--local-dir",
+        metavar="DIR",
+        help="Run against a local directory laid out like the bucket instead of Supabase.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAINTENANCE_CONCURRENCY,
+        help=f"Storage calls in flight at once (default: {MAINTENANCE_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=MAINTENANCE_RATE_LIMIT,
+        help=f"Maximum storage calls per second, 0 for no limit (default: {MAINTENANCE_RATE_LIMIT:g}).",
+    )
 
     return parser.parse_args()
 
@@ -271,7 +260,8 @@ def main():
     else:
         dates = expand_date_range(args.date_range[0], args.date_range[1])
 
-    run(dates=dates, signal_types=args.signal_types, dry_run=args.dry_run)
+    run(dates=dates, signal_types=args.signal_types, dry_run=args.dry_run, local_dir=args.local_dir,
+        concurrency=args.concurrency, rate_limit=args.rate_limit)
 
 
 if __name__ == "__main__":
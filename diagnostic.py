@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 Diagnostic script to check dataset folders and compare with active_tracking.json
+
+Dataset folders hold collector.py's NDJSON segments; each segment's .idx.json
+lists its records (keyed "{mint}_{timestamp}"), so records are counted and
+looked up from the indexes. Legacy per-record JSON files are still counted.
 """
 import os
 import json
@@ -8,9 +12,40 @@ import asyncio
 from supabase import create_client
 from dotenv import load_dotenv
 from collections import defaultdict
+from typing import Set, Tuple
+
+from extract_datasets import SEGMENT_INDEX_SUFFIX, SEGMENT_SUFFIX, is_dataset_object, parse_segment
 
 load_dotenv()
 
+
+async def scan_dataset_folder(storage, folder_path: str) -> Tuple[int, Set[str]]:
+    """(record count, mints) for one dataset folder, read from segment indexes and legacy JSON files."""
+    files = await asyncio.to_thread(storage.list, folder_path, {"limit": 1000})
+    names = [f['name'] for f in files if f.get('name')]
+    indexed = {n[:-len(SEGMENT_INDEX_SUFFIX)] for n in names if n.endswith(SEGMENT_INDEX_SUFFIX)}
+
+    count = 0
+    mints: Set[str] = set()
+    for name in names:
+        path = f"{folder_path}/{name}"
+        if name.endswith(SEGMENT_INDEX_SUFFIX):
+            index = json.loads(await asyncio.to_thread(storage.download, path))
+            count += index.get("count", 0)
+            mints.update(key.split("_", 1)[0] for key in index.get("records", {}))
+        elif name.endswith(SEGMENT_SUFFIX):
+            if name[:-len(SEGMENT_SUFFIX)] in indexed:
+                continue
+            # Segment whose index is missing: read the records themselves
+            records = parse_segment(await asyncio.to_thread(storage.download, path))
+            count += len(records)
+            mints.update(r.get('features', {}).get('mint') for r in records if r.get('features', {}).get('mint'))
+        elif is_dataset_object(name):
+            # Legacy per-record file: "{mint}_{timestamp}.json"
+            count += 1
+            mints.add(name.split("_", 1)[0])
+    return count, mints
+
 async def analyze_datasets():
     """Analyze dataset folders and compare with active tracking."""
     
@@ -19,6 +54,7 @@ async def analyze_datasets():
     SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "monitor-data")
     
     client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    storage = client.storage.from_(SUPABASE_BUCKET)
     
     # 1. Load active_tracking.json
     print("Loading active_tracking.json...")
@@ -50,6 +86,8 @@ async def analyze_datasets():
     
     pipelines = ['discovery', 'alpha']
     dataset_counts = defaultdict(int)
+    # pipeline -> date folder -> mints with a labeled record there
+    dataset_mints = defaultdict(dict)
     
     for pipeline in pipelines:
         print(f"\nPipeline: {pipeline}")
@@ -75,13 +113,8 @@ async def analyze_datasets():
             total_labeled = 0
             for date_folder in date_folders:
                 try:
-                    files = await asyncio.to_thread(
-                        client.storage.from_(SUPABASE_BUCKET).list,
-                        f"{daily_path}/{date_folder}",
-                        {"limit": 1000}
-                    )
-                    json_files = [f for f in files if f.get('name', '').endswith('.json')]
-                    count = len(json_files)
+                    count, mints = await scan_dataset_folder(storage, f"{daily_path}/{date_folder}")
+                    dataset_mints[pipeline][date_folder] = mints
                     total_labeled += count
                     print(f"    {date_folder}: {count} datasets")
                 except Exception as e:
@@ -95,13 +128,7 @@ async def analyze_datasets():
         # Check expired folder
         expired_path = f"datasets/{pipeline}/expired_no_label"
         try:
-            files = await asyncio.to_thread(
-                client.storage.from_(SUPABASE_BUCKET).list,
-                expired_path,
-                {"limit": 1000}
-            )
-            json_files = [f for f in files if f.get('name', '').endswith('.json')]
-            count = len(json_files)
+            count, _ = await scan_dataset_folder(storage, expired_path)
             dataset_counts[f"{pipeline}_expired"] = count
             print(f"  Expired (no label): {count} datasets")
         except Exception as e:
@@ -130,44 +157,16 @@ async def analyze_datasets():
             mint = data.get('mint', 'unknown')
             signal_type = data.get('signal_type', 'unknown')
             
-            # Try to find this token in datasets
+            # Look the mint up in the records found while scanning the date folders
             found = False
             for pipeline in pipelines:
-                daily_path = f"datasets/{pipeline}"
-                try:
-                    folders = await asyncio.to_thread(
-                        client.storage.from_(SUPABASE_BUCKET).list,
-                        daily_path,
-                        {"limit": 100}
-                    )
-                    
-                    for folder in folders:
-                        folder_name = folder.get('name', '')
-                        if folder_name == 'expired_no_label':
-                            continue
-                        
-                        # List files in this folder
-                        files = await asyncio.to_thread(
-                            client.storage.from_(SUPABASE_BUCKET).list,
-                            f"{daily_path}/{folder_name}",
-                            {"limit": 1000}
-                        )
-                        
-                        # Check if any file starts with the mint
-                        for file in files:
-                            if file.get('name', '').startswith(mint):
-                                print(f"  ✅ {key} -> Found in {pipeline}/{folder_name}")
-                                found = True
-                                break
-                        
-                        if found:
-                            break
-                    
-                    if found:
+                for folder_name, mints in sorted(dataset_mints[pipeline].items()):
+                    if mint in mints:
+                        print(f"  ✅ {key} -> Found in {pipeline}/{folder_name}")
+                        found = True
                         break
-                        
-                except Exception as e:
-                    pass
+                if found:
+                    break
             
             if not found:
                 print(f"  ❌ {key} -> NOT FOUND in any dataset folder")
@@ -18,16 +18,14 @@ import aiohttp
 import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 import uvicorn
 
 # --- Additional imports from api.py ---
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-import uuid
 import os
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
 import json
 import joblib
 from supabase import create_client, Client
@@ -47,6 +45,10 @@ from alerts.alpha_monitoring import alpha_monitoring_loop
 from alerts.analytics_monitoring import active_tracking_signal_loop
 from alerts.trade_monitor import trade_monitoring_loop
 
+from shared.http_client import close_http_session
+from shared.loop_monitor import LoopLagMonitor
+from shared.job_engine import JobEngine
+
 # Import the bot module
 import bot
 
@@ -79,13 +81,12 @@ BUCKET_NAME = "monitor-data"
 JOBS_FOLDER = "jobs"
 
 MAX_WORKERS = int(os.environ.get("API_MAX_WORKERS", "2"))
-EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+RESULT_CACHE_TTL = int(os.environ.get("API_RESULT_CACHE_TTL", "600"))
+JOB_SNAPSHOT_SECS = int(os.environ.get("API_JOB_SNAPSHOT_SECS", "5"))
+JOB_RETENTION_SECS = int(os.environ.get("API_JOB_RETENTION_SECS", "86400"))
 JOB_STATUS_DIR = Path("job_status")
 JOB_STATUS_DIR.mkdir(exist_ok=True)
 
-# In-memory map of job futures
-JOB_FUTURES: Dict[str, Any] = {}
-
 # Global variables for Managers
 user_manager = None
 portfolio_manager = None
@@ -102,6 +103,8 @@ tp_metrics_task = None
 sync_task = None
 expiry_task = None
 
+loop_monitor: Optional[LoopLagMonitor] = None
+
 collector_session = None # For collector's aiohttp session
 collector_log = None # To store the collector's logger instance
 
@@ -170,6 +173,15 @@ async def lifespan(app: FastAPI):
     global bot_task, analytics_task, collector_task, alert_process, trade_process
     global user_manager, portfolio_manager
     global alert_task, trade_task, trade_monitor_task, alpha_task, tp_metrics_task, sync_task, expiry_task
+    global loop_monitor
+
+    # 0. Watch the shared event loop for blocking callbacks
+    from config import LOOP_LAG_THRESHOLD_SECS
+    loop_monitor = LoopLagMonitor(threshold_secs=LOOP_LAG_THRESHOLD_SECS)
+    loop_monitor.start()
+
+    # Restore /analyze job state from the last snapshot
+    JOB_ENGINE.start()
 
     # 1. Critical Startup: Prepare Data
     logger.info("🔧 Preparing data directory and downloading from Supabase...")
@@ -250,6 +262,14 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error(f"Error cancelling {name} task: {e}")
     
+    if loop_monitor:
+        await loop_monitor.stop()
+
+    JOB_ENGINE.stop()
+
+    # Shared pooled HTTP session
+    await close_http_session()
+
     # Session cleanup for analytics tracker
     if analytics_tracker.http_session and not analytics_tracker.http_session.closed:
         await analytics_tracker.http_session.close()
@@ -320,6 +340,7 @@ async def health_check():
         "service": "Solana Bot Unified Orchestrator",
         "tasks": task_statuses,
         "active_tracking_tokens": active_tokens,
+        "event_loop": loop_monitor.stats() if loop_monitor else None,
         "details": "All managed tasks are running" if all_healthy else "One or more tasks are stopped or failed"
     }
 
@@ -356,6 +377,18 @@ async def analytics_status():
         return {"status": "error", "message": str(e)}
 
 
+@app.get("/health/event-loop")
+async def event_loop_health():
+    """Event-loop lag stats plus the stacks of recent blocking callbacks."""
+    if not loop_monitor:
+        return {"status": "not_started"}
+    return {
+        "status": "ok",
+        **loop_monitor.stats(),
+        "recent_stalls": loop_monitor.recent_stalls(),
+    }
+
+
 # ----------------------
 # Supabase upload helper (from api.py)
 # ----------------------
@@ -388,6 +421,23 @@ def upload_to_supabase(job_id: str, data: Any, suffix: str = "pkl"):
         logger.error(f"Failed to upload to Supabase: {e}")
         raise
 
+
+def _upload_job_result(job_id: str, result: Any) -> Dict[str, Any]:
+    """JobEngine on_result hook: upload the DataFrame and report where it went."""
+    upload_to_supabase(job_id, result)
+    return {"supabasePath": f"{BUCKET_NAME}/{JOBS_FOLDER}/{job_id}.pkl"}
+
+
+JOB_ENGINE = JobEngine(
+    run_pipeline,
+    max_workers=MAX_WORKERS,
+    result_ttl=RESULT_CACHE_TTL,
+    snapshot_file=JOB_STATUS_DIR / "jobs.json",
+    snapshot_interval=JOB_SNAPSHOT_SECS,
+    retention_secs=JOB_RETENTION_SECS,
+    on_result=_upload_job_result,
+)
+
 # ----------------------
 # Request model (from api.py)
 # ----------------------
@@ -403,76 +453,26 @@ class AnalysisRequest(BaseModel):
 # ----------------------
 @app.post("/analyze", tags=["Trader Analysis"])
 def analyze(req: AnalysisRequest):
-    """Starts run_pipeline in a background thread and returns a jobId immediately."""
+    """Starts run_pipeline in the process pool and returns a jobId immediately.
+
+    Identical requests share the in-flight job, and a finished job is reused for
+    RESULT_CACHE_TTL seconds (the response flags which case applied).
+    """
     try:
-        job_id = uuid.uuid4().hex
-
-        # Save initial job status to disk
-        status_file = JOB_STATUS_DIR / f"{job_id}.json"
-        status_data = {
-            "jobId": job_id,
-            "status": "running",
-            "startedAt": datetime.now().isoformat(),
-            "tokens": req.tokens
+        params = {
+            "tokens": req.tokens,
+            "early_trading_window_hours": req.window if (req.trader_type == "early" and req.window) else None,
+            "minimum_initial_buy_usd": req.min_buy,
+            "min_profitable_trades": req.min_num_tokens_in_profit,
         }
-        with open(status_file, "w") as f:
-            json.dump(status_data, f)
-
-        # Submit the long-running pipeline to background thread
-        future = EXECUTOR.submit(
-            run_pipeline,
-            tokens=req.tokens,
-            early_trading_window_hours=req.window if (req.trader_type == "early" and req.window) else None,
-            minimum_initial_buy_usd=req.min_buy,
-            min_profitable_trades=req.min_num_tokens_in_profit,
-            job_id=job_id
-        )
-
-        # Store future in memory
-        JOB_FUTURES[job_id] = future
-
-        # Callback to update status when complete
-        def _on_complete(fut):
-            status_file = JOB_STATUS_DIR / f"{job_id}.json"
-            try:
-                result = fut.result()
-                status = "done"
-                error = None
-                supabase_path = None
-
-                # Upload result to Supabase if successful
-                if result is not None:
-                    try:
-                        upload_to_supabase(job_id, result)
-                        supabase_path = f"{BUCKET_NAME}/{JOBS_FOLDER}/{job_id}.pkl"
-                    except Exception as e:
-                        logger.exception(f"Failed to upload job {job_id} result to Supabase: {e}")
-                        # keep supabase_path = None
-
-            except Exception as e:
-                logger.exception(f"Job {job_id} failed")
-                status = "failed"
-                error = str(e)
-                supabase_path = None
-
-            # Update status file
-            status_data = {
-                "jobId": job_id,
-                "status": status,
-                "error": error,
-                "completedAt": datetime.now().isoformat(),
-                "supabasePath": supabase_path
-            }
-            try:
-                with open(status_file, "w") as f:
-                    json.dump(status_data, f)
-            except Exception:
-                logger.exception(f"Failed to write status file for job {job_id}")
+        submitted = JOB_ENGINE.submit(params, meta={"tokens": req.tokens, "supabasePath": None})
 
-        future.add_done_callback(_on_complete)
-
-        logger.info(f"Submitted job {job_id} for tokens={req.tokens}")
-        return {"jobId": job_id}
+        if submitted["deduplicated"] or submitted["cached"]:
+            logger.info(f"Reusing job {submitted['jobId']} for tokens={req.tokens} "
+                        f"({'in flight' if submitted['deduplicated'] else 'cached'})")
+        else:
+            logger.info(f"Submitted job {submitted['jobId']} for tokens={req.tokens}")
+        return submitted
 
     except Exception as e:
         logger.exception("Failed to submit job")
@@ -484,33 +484,19 @@ def job_status(job_id: str):
     """Check job status and include Supabase storage path if complete"""
     logger.info(f"Checking status for job {job_id}")
 
-    # Check status file first (most reliable source)
+    status_data = JOB_ENGINE.status(job_id)
+    if status_data is not None:
+        return status_data
+
+    # Jobs from before the in-memory engine were tracked as one file per job
     status_file = JOB_STATUS_DIR / f"{job_id}.json"
     if status_file.exists():
         try:
             with open(status_file) as f:
-                status_data = json.load(f)
-            return status_data
+                return json.load(f)
         except Exception as e:
             logger.error(f"Error reading status file: {e}")
 
-    # Check in-memory future
-    fut = JOB_FUTURES.get(job_id)
-    if fut is not None:
-        if fut.running():
-            return {"jobId": job_id, "status": "running"}
-        elif fut.done():
-            try:
-                result = fut.result()
-                return {
-                    "jobId": job_id,
-                    "status": "done",
-                    "supabasePath": f"{BUCKET_NAME}/{JOBS_FOLDER}/{job_id}.pkl"
-                }
-            except Exception as e:
-                logger.exception(f"Error getting result for job {job_id}")
-                return {"jobId": job_id, "status": "failed", "error": str(e)}
-
     # Job ID not found
     return {
         "jobId": job_id,
@@ -518,6 +504,33 @@ def job_status(job_id: str):
         "message": "Job not found. It may have been completed in a previous server session."
     }
 
+
+@app.get("/job/{job_id}/events", tags=["Trader Analysis"])
+async def job_events(job_id: str):
+    """Server-sent events with the job's stage progress (trades_fetched, candles_built,
+    balances_resolved, summary_built, upload_done) followed by a final done/failed event."""
+    if JOB_ENGINE.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in JOB_ENGINE.events(job_id):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/jobs/stats", tags=["Trader Analysis"])
+def job_engine_stats():
+    """Process-pool job engine gauges (running, dedup and cache hits)."""
+    return JOB_ENGINE.stats()
+
 # ----------------------
 # NEW: Collector API Endpoints
 # ----------------------
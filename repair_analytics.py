@@ -1,75 +1,17 @@
-import os
-import json
+import argparse
 import asyncio
-import aiohttp
-from datetime import datetime
-from supabase import create_client, Client
 from dateutil import parser
 from dotenv import load_dotenv
 import copy
 
+from shared.maintenance import (
+    MAINTENANCE_CONCURRENCY, MAINTENANCE_RATE_LIMIT, MaintenanceEngine, open_bucket,
+)
+
 # --- Configuration ---
 load_dotenv()
 BUCKET_NAME = "monitor-data"
-TEMP_DIR = "repair_temp"
-
-# --- Supabase Setup ---
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
-if not url or not key:
-    raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in .env")
-supabase = create_client(url, key)
-
-async def download_json(remote_path):
-    """Downloads a JSON file from Supabase."""
-    local_path = os.path.join(TEMP_DIR, remote_path)
-    os.makedirs(os.path.dirname(local_path), exist_ok=True)
-    
-    try:
-        # Create signed URL
-        res = supabase.storage.from_(BUCKET_NAME).create_signed_url(remote_path, 60)
-        signed_url = res.get('signedURL')
-        if not signed_url: return None
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(signed_url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data
-                elif resp.status == 404:
-                    return None # File doesn't exist yet, which is fine
-                else:
-                    print(f"Error downloading {remote_path}: {resp.status}")
-                    return None
-    except Exception as e:
-        print(f"Exception downloading {remote_path}: {e}")
-        return None
-
-async def upload_json(data, remote_path):
-    """Uploads a JSON file to Supabase."""
-    try:
-        # Convert to JSON string
-        json_str = json.dumps(data, indent=2, default=str)
-        
-        # Try update first
-        try:
-            supabase.storage.from_(BUCKET_NAME).update(
-                remote_path, 
-                json_str.encode(), 
-                {"content-type": "application/json"}
-            )
-        except Exception:
-            # Fallback to upload if update fails (file new)
-            supabase.storage.from_(BUCKET_NAME).upload(
-                remote_path, 
-                json_str.encode(), 
-                {"content-type": "application/json"}
-            )
-        print(f"SUCCESS: Updated {remote_path}")
-        return True
-    except Exception as e:
-        print(f"FAILED to upload {remote_path}: {e}")
-        return False
+ACTIVE_TRACKING_PATH = "analytics/active_tracking.json"
 
 def calculate_daily_summary(tokens):
     """Recalculates summary stats for a daily file."""
@@ -91,19 +33,18 @@ def calculate_daily_summary(tokens):
         "max_roi": max(ath_rois, default=0),
     }
 
-async def repair_zombie_wins():
+async def repair_zombie_wins(engine: MaintenanceEngine):
     print("--- Starting Repair Process ---")
     
     # 1. Download Active Tracking
-    active_path = "analytics/active_tracking.json"
-    active_data = await download_json(active_path)
+    active_data = await engine.read_json(ACTIVE_TRACKING_PATH)
     
     if not active_data:
         print("CRITICAL: Could not download active_tracking.json")
         return
 
     # 2. Iterate through active tokens
-    fixes_needed = {} # Map: date_str -> {signal_type -> [tokens]}
+    fixes_needed = {} # Map: file path -> [tokens]
 
     for key, token in active_data.items():
         # Check if it is a winner
@@ -132,13 +73,16 @@ async def repair_zombie_wins():
             
             fixes_needed[file_key].append(token)
 
-    # 3. Process each Daily File
-    for file_path, active_winners in fixes_needed.items():
+    # 3. One listing per daily folder tells us which files exist
+    folders = sorted({path.rsplit("/", 1)[0] for path in fixes_needed})
+    listings = await asyncio.gather(*(engine.list_names(folder) for folder in folders))
+    existing = {f"{folder}/{name}" for folder, names in zip(folders, listings) for name in names}
+
+    # 4. Repair every daily file concurrently
+    def repair_file(file_path, daily_data):
+        active_winners = fixes_needed[file_path]
         print(f"\nChecking file: {file_path}")
-        
-        # Download the daily file
-        daily_data = await download_json(file_path)
-        
+
         # If file doesn't exist, create structure
         if not daily_data:
             print(f"  -> File missing. Creating new.")
@@ -165,6 +109,7 @@ async def repair_zombie_wins():
                 # Ensure is_final is set correctly (False because it's still active)
                 entry_to_add["is_final"] = False 
                 daily_tokens.append(entry_to_add)
+                existing_mints.add(winner["mint"])
                 modified = True
             else:
                 # OPTIONAL: Update the existing entry if the active one has better stats (higher ATH)
@@ -179,18 +124,36 @@ async def repair_zombie_wins():
                              daily_tokens[i]["is_final"] = False
                              modified = True
 
-        if modified:
-            # Recalculate Summary
-            daily_data["tokens"] = daily_tokens
-            daily_data["daily_summary"] = calculate_daily_summary(daily_tokens)
-            
-            # Upload Fixed File
-            await upload_json(daily_data, file_path)
-        else:
+        if not modified:
             print("  -> No missing tokens found in this file.")
+            return None
+
+        # Recalculate Summary; the engine uploads the fixed file (unless dry run)
+        daily_data["tokens"] = daily_tokens
+        daily_data["daily_summary"] = calculate_daily_summary(daily_tokens)
+        return daily_data
+
+    report = await engine.rewrite(fixes_needed, repair_file, existing=existing)
+    for path in report.failed:
+        print(f"FAILED to repair {path}")
 
     print("\n--- Repair Complete ---")
-    print("Please verify the dashboard/stats in a few minutes.")
+    print(report.summary())
+    if not engine.dry_run:
+        print("Please verify the dashboard/stats in a few minutes.")
+
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description="Add active winners missing from their analytics daily files.")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Report the repairs without uploading anything.")
+    arg_parser.add_argument("--local-dir", metavar="DIR", help="Run against a local directory laid out like the bucket.")
+    arg_parser.add_argument("--concurrency", type=int, default=MAINTENANCE_CONCURRENCY, help="Storage calls in flight at once.")
+    arg_parser.add_argument("--rate-limit", type=float, default=MAINTENANCE_RATE_LIMIT, help="Maximum storage calls per second (0 = no limit).")
+    return arg_parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(repair_zombie_wins())
\ No newline at end of file
+    args = parse_args()
+    engine = MaintenanceEngine(
+        open_bucket(BUCKET_NAME, args.local_dir),
+        dry_run=args.dry_run, concurrency=args.concurrency, rate_limit=args.rate_limit,
+    )
+    asyncio.run(repair_zombie_wins(engine))
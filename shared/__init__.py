@@ -5,7 +5,10 @@ Shared utilities package for the Solana bot.
 """
 
 from .file_io import safe_load, safe_save
-from .utils import truncate_address, format_marketcap_display, fetch_marketcap_and_fdv
+from .utils import (
+    truncate_address, format_marketcap_display,
+    fetch_marketcap_and_fdv, fetch_marketcap_and_fdv_async,
+)
 
 __all__ = [
     'safe_load',
@@ -13,4 +16,5 @@ __all__ = [
     'truncate_address',
     'format_marketcap_display',
     'fetch_marketcap_and_fdv',
-]
\ No newline at end of file
+    'fetch_marketcap_and_fdv_async',
+]
@@ -0,0 +1,81 @@
+"""
+shared/http_client.py
+
+Shared, pooled aiohttp session for async code paths.
+
+All coroutines running on the same event loop reuse one ClientSession (and
+therefore one connection pool), so hot paths don't pay a TLS handshake per
+request. Sessions are tracked per event loop because aiohttp sessions can't
+be shared across loops (alpha.py still drives some work via asyncio.run()).
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "15"))
+
+# One session per running event loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the shared ClientSession for the running event loop,
+    creating it on first use (or after it was closed).
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_DEFAULT_TIMEOUT),
+        )
+        _sessions[loop] = session
+        logger.debug("Created shared HTTP session (limit=%d, per_host=%d)", HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST)
+    return session
+
+
+async def close_http_session() -> None:
+    """Close the shared session belonging to the running event loop (if any)."""
+    loop = asyncio.get_running_loop()
+    session: Optional[aiohttp.ClientSession] = _sessions.pop(loop, None)
+    if session and not session.closed:
+        await session.close()
+        logger.debug("Closed shared HTTP session")
+
+
+async def fetch_json(url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                     timeout: Optional[float] = None) -> Optional[dict]:
+    """
+    GET `url` on the shared session and return the decoded JSON body.
+    Returns None on non-200 responses, timeouts or decode errors.
+    """
+    session = await get_http_session()
+    request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    try:
+        async with session.get(url, params=params, headers=headers, timeout=request_timeout) as resp:
+            if resp.status != 200:
+                logger.debug("GET %s returned status %s", url, resp.status)
+                return None
+            return await resp.json(content_type=None)
+    except asyncio.TimeoutError:
+        logger.warning(f"Timeout fetching {url}")
+        return None
+    except Exception as e:
+        logger.warning(f"Error fetching {url}: {e}")
+        return None
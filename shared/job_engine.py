@@ -0,0 +1,395 @@
+"""
+shared/job_engine.py
+
+Job engine for the /analyze API.
+
+- Pipelines run in a bounded process pool, so CPU-heavy pandas work never
+  contends for the GIL with the bot's event loop.
+- Submissions with identical parameters while a job is in flight are folded
+  into that job (same jobId).
+- Finished jobs are reused for identical parameters for `result_ttl` seconds.
+- Job state lives in memory; a background thread snapshots it to one JSON file
+  every `snapshot_interval` seconds (only when something changed) so state
+  survives a restart without a file write per update.
+- Pipelines report stage progress (`progress(stage, **counts)`) back through a
+  multiprocessing queue; `events(job_id)` streams those stages to async
+  consumers (the SSE endpoint in main.py) as they happen.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_JobKey = Tuple[Any, ...]
+
+TERMINAL_STAGES = ("done", "failed")
+_END_OF_PROGRESS = "_end"
+
+# Set in each worker process by the pool initializer
+_progress_queue = None
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+class ProgressReporter:
+    """Picklable progress callback handed to the pipeline inside the worker process."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def __call__(self, stage: str, **counts):
+        if _progress_queue is not None:
+            _progress_queue.put((self.job_id, stage, counts, time.time()))
+
+
+def _run_job(fn: Callable[..., Any], job_id: str, params: Dict[str, Any]):
+    """Worker-side entrypoint."""
+    reporter = ProgressReporter(job_id)
+    reporter("started")
+    try:
+        return fn(**params, job_id=job_id, progress=reporter)
+    finally:
+        # Lets the parent apply every stage event before it publishes done/failed
+        reporter(_END_OF_PROGRESS)
+
+
+def job_key(params: Dict[str, Any]) -> _JobKey:
+    """Canonical key for a set of pipeline kwargs (token order doesn't matter)."""
+    items = []
+    for name, value in sorted(params.items()):
+        if name == "tokens":
+            value = tuple(sorted({t.strip() for t in value}))
+        items.append((name, value))
+    return tuple(items)
+
+
+class JobEngine:
+    """Runs pipeline jobs in a process pool with in-flight dedup and a TTL result cache."""
+
+    def __init__(self, fn: Callable[..., Any], *, max_workers: int = 2, result_ttl: float = 600.0,
+                 snapshot_file: Path = Path("job_status/jobs.json"), snapshot_interval: float = 5.0,
+                 retention_secs: float = 86400.0, on_result: Optional[Callable[[str, Any], Dict[str, Any]]] = None,
+                 result_stage: str = "upload_done", start_method: str = "spawn"):
+        self.fn = fn
+        self.result_ttl = result_ttl
+        self.snapshot_file = Path(snapshot_file)
+        self.snapshot_interval = snapshot_interval
+        self.retention_secs = retention_secs
+        self.on_result = on_result
+        self.result_stage = result_stage
+
+        ctx = multiprocessing.get_context(start_method)
+        self._progress_q = ctx.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(self._progress_q,),
+        )
+        # on_result (e.g. an upload) is blocking I/O; keep it off the pool's result thread
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-finish")
+
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[_JobKey, str] = {}
+        self._results: Dict[_JobKey, Tuple[str, float]] = {}  # key -> (job_id, expires_at)
+        self._subscribers: Dict[str, set] = {}  # job_id -> {(loop, asyncio.Queue)}
+        self._progress_drained: Dict[str, threading.Event] = {}
+        self._dirty = False
+
+        self._stop = threading.Event()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._progress_thread = threading.Thread(target=self._progress_loop, name="job-progress", daemon=True)
+        self._progress_thread.start()
+
+        # Gauges
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cache_hits = 0
+
+    # ------------------------------------------------------------------
+    # Submission / status
+    # ------------------------------------------------------------------
+    def submit(self, params: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Start (or reuse) a job for `params`. Returns {"jobId", "status", "deduplicated", "cached"}."""
+        key = job_key(params)
+        now = time.time()
+        with self._lock:
+            self.submitted += 1
+
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                self.deduplicated += 1
+                return {"jobId": job_id, "status": "running", "deduplicated": True, "cached": False}
+
+            cached = self._results.get(key)
+            if cached is not None:
+                cached_id, expires_at = cached
+                if expires_at > now and cached_id in self._jobs:
+                    self.cache_hits += 1
+                    return {"jobId": cached_id, "status": "done", "deduplicated": False, "cached": True}
+                del self._results[key]
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "jobId": job_id,
+                "status": "running",
+                "startedAt": datetime.now().isoformat(),
+                "stage": "queued",
+                "stages": [],
+                "_started_ts": now,
+                **(meta or {}),
+            }
+            self._inflight[key] = job_id
+            self._progress_drained[job_id] = threading.Event()
+            self._dirty = True
+
+        try:
+            future = self._pool.submit(_run_job, self.fn, job_id, params)
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._jobs.pop(job_id, None)
+                self._progress_drained.pop(job_id, None)
+            raise
+        future.add_done_callback(lambda fut: self._finisher.submit(self._finish, job_id, key, fut))
+        return {"jobId": job_id, "status": "running", "deduplicated": False, "cached": False}
+
+    def _finish(self, job_id: str, key: _JobKey, fut):
+        with self._lock:
+            drained = self._progress_drained.get(job_id)
+        if drained is not None:
+            drained.wait(timeout=2.0)  # never set if the worker died
+            with self._lock:
+                self._progress_drained.pop(job_id, None)
+
+        update: Dict[str, Any] = {"error": None}
+        cacheable = False
+        try:
+            result = fut.result()
+            update["status"] = "done"
+            cacheable = True
+            if self.on_result is not None and result is not None:
+                try:
+                    update.update(self.on_result(job_id, result) or {})
+                    self._record_stage(job_id, self.result_stage, {}, time.time())
+                except Exception as e:
+                    # Same as before: the job still counts as done, but don't serve it again
+                    logger.exception(f"Post-processing for job {job_id} failed: {e}")
+                    cacheable = False
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            update["status"] = "failed"
+            update["error"] = str(e)
+        update["completedAt"] = datetime.now().isoformat()
+
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"jobId": job_id})
+            job.update(update)
+            job["_completed_ts"] = time.time()
+            if self._inflight.get(key) == job_id:
+                del self._inflight[key]
+            if cacheable and self.result_ttl > 0:
+                self._results[key] = (job_id, time.time() + self.result_ttl)
+            self._dirty = True
+        self._record_stage(job_id, update["status"], {"error": update["error"]}, time.time())
+
+    # ------------------------------------------------------------------
+    # Progress events
+    # ------------------------------------------------------------------
+    def _progress_loop(self):
+        while True:
+            item = self._progress_q.get()
+            if item is None:
+                return
+            try:
+                self._record_stage(*item)
+            except Exception as e:
+                logger.error(f"Failed to record job progress {item!r}: {e}")
+
+    def _record_stage(self, job_id: str, stage: str, counts: Dict[str, Any], ts: float):
+        if stage == _END_OF_PROGRESS:
+            with self._lock:
+                drained = self._progress_drained.get(job_id)
+            if drained is not None:
+                drained.set()
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            event = {
+                "jobId": job_id,
+                "stage": stage,
+                "at": datetime.fromtimestamp(ts).isoformat(),
+                "elapsedSecs": round(ts - job.get("_started_ts", ts), 3),
+                **counts,
+            }
+            if stage not in TERMINAL_STAGES:
+                job["stage"] = stage
+                job.setdefault("stages", []).append({k: v for k, v in event.items() if k != "jobId"})
+                self._dirty = True
+            subscribers = list(self._subscribers.get(job_id, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    async def events(self, job_id: str, keepalive_secs: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Stage events for a job: history first, then live until done/failed.
+
+        Yields None every `keepalive_secs` without news so the caller can ping.
+        Unknown jobs yield nothing.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            history = [{"jobId": job_id, **e} for e in job.get("stages", [])]
+            final = None
+            if job.get("status") != "running":
+                final = {"jobId": job_id, "stage": job.get("status"), "at": job.get("completedAt"),
+                         "error": job.get("error")}
+            else:
+                self._subscribers.setdefault(job_id, set()).add(subscriber)
+
+        try:
+            for event in history:
+                yield event
+            if final is not None:
+                yield final
+                return
+
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=keepalive_secs)
+                if not done:
+                    getter.cancel()
+                    yield None
+                    continue
+                event = getter.result()
+                yield event
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(job_id)
+                if subs is not None:
+                    subs.discard(subscriber)
+                    if not subs:
+                        del self._subscribers[job_id]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if not k.startswith("_")} if job else None
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+    def start(self):
+        """Load the last snapshot and start the snapshot thread."""
+        self.load_snapshot()
+        self._stop.clear()
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, name="job-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def stop(self, wait: bool = False):
+        """Stop the snapshot thread, write a final snapshot and shut the pools down."""
+        self._stop.set()
+        if self._snapshot_thread:
+            self._snapshot_thread.join(timeout=2)
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._finisher.shutdown(wait=wait)
+        self._progress_q.put(None)
+        self._progress_thread.join(timeout=2)
+        self.snapshot(force=True)
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self._prune()
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Job snapshot failed: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_secs
+        with self._lock:
+            stale = [jid for jid, job in self._jobs.items() if job.get("_completed_ts", float("inf")) < cutoff]
+            for jid in stale:
+                del self._jobs[jid]
+            now = time.time()
+            for key in [k for k, (jid, exp) in self._results.items() if exp <= now or jid not in self._jobs]:
+                del self._results[key]
+            if stale:
+                self._dirty = True
+
+    def snapshot(self, force: bool = False):
+        with self._lock:
+            if not (self._dirty or force):
+                return
+            jobs = {jid: dict(job) for jid, job in self._jobs.items()}
+            self._dirty = False
+
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(jobs, f)
+        os.replace(tmp, self.snapshot_file)
+
+    def load_snapshot(self):
+        """Restore job state; jobs still running at the last snapshot are marked failed."""
+        if not self.snapshot_file.exists():
+            return
+        try:
+            with open(self.snapshot_file) as f:
+                jobs = json.load(f)
+        except Exception as e:
+            logger.error(f"Could not read job snapshot {self.snapshot_file}: {e}")
+            return
+
+        interrupted = 0
+        with self._lock:
+            for jid, job in jobs.items():
+                if job.get("status") == "running":
+                    job.update({
+                        "status": "failed",
+                        "error": "Server restarted before the job finished",
+                        "completedAt": datetime.now().isoformat(),
+                        "_completed_ts": time.time(),
+                    })
+                    interrupted += 1
+                self._jobs.setdefault(jid, job)
+            self._dirty = True
+        logger.info(f"Restored {len(jobs)} jobs from snapshot ({interrupted} interrupted)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = len(self._inflight)
+            tracked = len(self._jobs)
+            cached = len(self._results)
+        return {
+            "running": running,
+            "tracked_jobs": tracked,
+            "cached_results": cached,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "cache_hits": self.cache_hits,
+        }
@@ -0,0 +1,93 @@
+"""
+shared/jupiter_prices.py
+
+Batched Jupiter USD price lookups with a short-TTL cache shared by all callers.
+
+`await JUPITER_PRICES.get_prices(mints)` serves fresh entries from memory and
+fetches the rest with multi-id calls (chunked to JUPITER_IDS_PER_CALL) on the
+shared HTTP session, a few chunks at a time. Mints Jupiter has no price for
+are cached too, so repeated /pnl calls don't re-ask for them until the TTL runs out.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from shared.http_client import fetch_json
+
+logger = logging.getLogger(__name__)
+
+JUPITER_PRICE_URL = "https://lite-api.jup.ag/price/v3"
+JUPITER_IDS_PER_CALL = int(os.getenv("JUPITER_IDS_PER_CALL", "50"))
+JUPITER_PRICE_TTL = float(os.getenv("JUPITER_PRICE_TTL", "10"))
+JUPITER_PRICE_CONCURRENCY = int(os.getenv("JUPITER_PRICE_CONCURRENCY", "4"))
+JUPITER_PRICE_TIMEOUT = 5
+
+
+class JupiterPriceCache:
+    """mint -> USD price, refreshed in batches; a price of 0.0 means Jupiter had none."""
+
+    def __init__(self, ttl: float = JUPITER_PRICE_TTL, ids_per_call: int = JUPITER_IDS_PER_CALL,
+                 concurrency: int = JUPITER_PRICE_CONCURRENCY):
+        self.ttl = ttl
+        self.ids_per_call = ids_per_call
+        self.concurrency = concurrency
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self.hits = 0
+        self.fetched = 0
+        self.calls = 0
+
+    async def _fetch_chunk(self, chunk: List[str], semaphore: asyncio.Semaphore) -> Dict[str, float]:
+        async with semaphore:
+            self.calls += 1
+            data = await fetch_json(JUPITER_PRICE_URL, params={"ids": ",".join(chunk)}, timeout=JUPITER_PRICE_TIMEOUT)
+        if not isinstance(data, dict):
+            return {}
+        prices = {}
+        for mint in chunk:
+            info = data.get(mint) or {}
+            try:
+                prices[mint] = float(info.get("usdPrice") or 0)
+            except (TypeError, ValueError):
+                prices[mint] = 0.0
+        return prices
+
+    async def get_prices(self, mints: Iterable[str]) -> Dict[str, float]:
+        """Prices for the mints Jupiter knows (> 0); unknown or failed mints are left out."""
+        now = time.time()
+        result: Dict[str, float] = {}
+        missing: List[str] = []
+        for mint in dict.fromkeys(m for m in mints if m):
+            cached = self._prices.get(mint)
+            if cached and now - cached[0] < self.ttl:
+                self.hits += 1
+                if cached[1] > 0:
+                    result[mint] = cached[1]
+            else:
+                missing.append(mint)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            chunks = [missing[i:i + self.ids_per_call] for i in range(0, len(missing), self.ids_per_call)]
+            fetched = await asyncio.gather(*(self._fetch_chunk(c, semaphore) for c in chunks))
+            fetched_at = time.time()
+            for prices in fetched:
+                # Failed chunks return {} and stay uncached so the next call retries them
+                for mint, price in prices.items():
+                    self._prices[mint] = (fetched_at, price)
+                    self.fetched += 1
+                    if price > 0:
+                        result[mint] = price
+            logger.debug(f"Jupiter prices: {len(missing)} fetched in {len(chunks)} calls, {len(result)} priced")
+
+        if len(self._prices) > 10_000:
+            self._prices = {m: v for m, v in self._prices.items() if now - v[0] < self.ttl}
+        return result
+
+    async def get_price(self, mint: str) -> float:
+        return (await self.get_prices([mint])).get(mint, 0.0)
+
+
+JUPITER_PRICES = JupiterPriceCache()
@@ -0,0 +1,128 @@
+"""
+shared/loop_monitor.py
+
+Event-loop lag monitor.
+
+A heartbeat coroutine wakes up every `interval_secs` and records how late it
+was scheduled. A watchdog thread watches the heartbeat: if the loop hasn't
+ticked for longer than `threshold_secs`, something is blocking it, so the
+watchdog grabs the loop thread's current stack and logs it. That points
+straight at the offending synchronous call (e.g. a requests.get on an async
+path).
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Detects and reports callbacks that block the event loop."""
+
+    def __init__(self, threshold_secs: float = 0.5, interval_secs: float = 0.25, max_events: int = 50):
+        self.threshold_secs = threshold_secs
+        self.interval_secs = interval_secs
+
+        self._events: deque = deque(maxlen=max_events)
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+        self._last_beat = time.monotonic()
+        self._reported_beat: Optional[float] = None
+
+        self.last_lag_secs = 0.0
+        self.max_lag_secs = 0.0
+        self.stall_count = 0
+
+    def start(self) -> asyncio.Task:
+        """Start the heartbeat on the running loop and the watchdog thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+        logger.info(f"🩺 Event loop lag monitor started (threshold={self.threshold_secs}s)")
+        return self._task
+
+    async def stop(self):
+        """Stop the heartbeat and watchdog."""
+        self._stop.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    async def _heartbeat(self):
+        while True:
+            beat = time.monotonic()
+            self._last_beat = beat
+            await asyncio.sleep(self.interval_secs)
+
+            lag = max(0.0, time.monotonic() - beat - self.interval_secs)
+            self.last_lag_secs = lag
+            self.max_lag_secs = max(self.max_lag_secs, lag)
+
+            # Stall already reported by the watchdog: record how long it lasted in total
+            if beat == self._reported_beat and self._events:
+                last = self._events[-1]
+                if last.get("beat") == beat:
+                    last["blocked_secs"] = round(lag, 3)
+                    logger.warning(f"⚠️ Event loop was blocked for {lag:.2f}s in total")
+
+    def _watchdog(self):
+        poll = min(self.interval_secs, self.threshold_secs / 2)
+        while not self._stop.wait(poll):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat - self.interval_secs
+            if stalled <= self.threshold_secs or beat == self._reported_beat:
+                continue
+
+            self._reported_beat = beat
+            self.stall_count += 1
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<loop thread stack unavailable>"
+            del frame
+
+            self._events.append({
+                "beat": beat,
+                "detected_at": datetime.now(timezone.utc).isoformat(),
+                "blocked_secs": round(stalled, 3),
+                "stack": stack,
+            })
+            logger.warning(
+                f"⚠️ Event loop blocked for more than {self.threshold_secs}s "
+                f"({stalled:.2f}s so far). Loop thread stack:\n{stack}"
+            )
+
+    def recent_stalls(self) -> List[Dict[str, Any]]:
+        """Return recent stall events (most recent last)."""
+        return [{k: v for k, v in e.items() if k != "beat"} for e in self._events]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a summary suitable for health endpoints."""
+        last = self._events[-1] if self._events else None
+        return {
+            "threshold_ms": round(self.threshold_secs * 1000, 1),
+            "last_lag_ms": round(self.last_lag_secs * 1000, 1),
+            "max_lag_ms": round(self.max_lag_secs * 1000, 1),
+            "stalls": self.stall_count,
+            "last_stall_at": last["detected_at"] if last else None,
+        }
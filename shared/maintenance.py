@@ -0,0 +1,289 @@
+"""
+shared/maintenance.py
+
+Bulk engine for the analytics maintenance scripts (clean_tokens.py,
+repair_analytics.py, delete_analytics_dates.py).
+
+- A script plans its work from one listing per folder (`list_names`) instead
+  of probing objects one at a time.
+- `rewrite()` downloads, transforms and re-uploads objects concurrently;
+  `delete()` removes objects in batched calls. Every storage call goes through
+  one semaphore plus a requests-per-second limiter, so a large cleanup can't
+  hammer the bucket.
+- With `dry_run=True` nothing is uploaded or deleted; the report shows what
+  would have changed.
+- `SupabaseBucket` talks to Supabase storage (blocking client calls run in
+  the engine's thread pool); `LocalBucket` maps the same paths onto a local directory, for
+  rehearsing a cleanup on a copy of the bucket.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_CONCURRENCY = int(os.getenv("MAINTENANCE_CONCURRENCY", "8"))
+MAINTENANCE_RATE_LIMIT = float(os.getenv("MAINTENANCE_RATE_LIMIT", "20"))  # storage calls per second
+LIST_PAGE_SIZE = 1000
+REMOVE_BATCH_SIZE = 100
+
+# transform(path, data) -> new data to upload, or None to leave the object untouched.
+# data is None when the object doesn't exist (only for paths absent from `existing`).
+Transform = Callable[[str, Any], Union[Any, Awaitable[Any]]]
+
+
+class SupabaseBucket:
+    """Supabase storage bucket behind the engine's list/download/upload/remove interface."""
+
+    def __init__(self, client, bucket_name: str):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.location = f"supabase://{bucket_name}"
+
+    def _storage(self):
+        return self.client.storage.from_(self.bucket_name)
+
+    def list(self, folder: str) -> List[str]:
+        names = []
+        offset = 0
+        while True:
+            page = self._storage().list(folder, {"limit": LIST_PAGE_SIZE, "offset": offset})
+            if not isinstance(page, list):
+                raise RuntimeError(f"unexpected listing response: {page!r}")
+            names.extend(item["name"] for item in page if item.get("name"))
+            if len(page) < LIST_PAGE_SIZE:
+                return names
+            offset += LIST_PAGE_SIZE
+
+    def download(self, path: str) -> bytes:
+        return self._storage().download(path)
+
+    def upload(self, path: str, data: bytes):
+        self._storage().upload(path, data, {"content-type": "application/json", "upsert": "true"})
+
+    def remove(self, paths: List[str]):
+        self._storage().remove(paths)
+
+
+class LocalBucket:
+    """A local directory laid out like the bucket (root/analytics/alpha/daily/...)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.location = os.path.abspath(root)
+
+    def _local(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/"))
+
+    def list(self, folder: str) -> List[str]:
+        local = self._local(folder)
+        if not os.path.isdir(local):
+            return []
+        return sorted(os.listdir(local))
+
+    def download(self, path: str) -> bytes:
+        with open(self._local(path), "rb") as f:
+            return f.read()
+
+    def upload(self, path: str, data: bytes):
+        local = self._local(path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        tmp = f"{local}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, local)
+
+    def remove(self, paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(self._local(path))
+            except FileNotFoundError:
+                pass
+
+
+def open_bucket(bucket_name: str, local_dir: Optional[str] = None):
+    """LocalBucket for `local_dir`, otherwise the Supabase bucket from SUPABASE_URL/SUPABASE_KEY."""
+    if local_dir:
+        return LocalBucket(local_dir)
+    from supabase import create_client
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY")
+    return SupabaseBucket(create_client(url, key), bucket_name)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all tasks (rate <= 0 disables it)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class MaintenanceReport:
+    dry_run: bool = False
+    planned: int = 0
+    downloaded: int = 0
+    changed: int = 0
+    uploaded: int = 0
+    deleted: int = 0
+    failed: List[str] = field(default_factory=list)
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+
+    def merge(self, other: "MaintenanceReport") -> "MaintenanceReport":
+        for name in ("planned", "downloaded", "changed", "uploaded", "deleted", "bytes_in", "bytes_out", "seconds"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.failed.extend(other.failed)
+        return self
+
+    def summary(self) -> str:
+        rate = self.planned / self.seconds if self.seconds > 0 else 0.0
+        mb_per_sec = (self.bytes_in + self.bytes_out) / 1e6 / self.seconds if self.seconds > 0 else 0.0
+        if self.dry_run:
+            actions = f"would upload {self.changed}, would delete {self.deleted}"
+        else:
+            actions = f"uploaded {self.uploaded}, deleted {self.deleted}"
+        return (
+            f"{self.planned} objects in {self.seconds:.2f}s ({rate:.1f}/s, {mb_per_sec:.2f} MB/s) | "
+            f"downloaded {self.downloaded}, changed {self.changed}, {actions}, failed {len(self.failed)}"
+        )
+
+
+def encode_json(data: Any) -> bytes:
+    return json.dumps(data, indent=2, default=str).encode()
+
+
+class MaintenanceEngine:
+    def __init__(self, bucket, dry_run: bool = False, concurrency: int = MAINTENANCE_CONCURRENCY,
+                 rate_limit: float = MAINTENANCE_RATE_LIMIT):
+        self.bucket = bucket
+        self.dry_run = dry_run
+        self.concurrency = max(1, concurrency)
+        self.rate_limit = rate_limit
+        self._loop = None
+        self._semaphore = None
+        self._limiter = None
+        # Own pool: the default executor can be smaller than `concurrency` on small machines
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="maintenance")
+
+    async def _call(self, fn, *args):
+        # Scripts may drive one engine from several asyncio.run() calls; the limits are per event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._limiter = RateLimiter(self.rate_limit)
+        async with self._semaphore:
+            await self._limiter.wait()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def list_names(self, folder: str, suffix: str = ".json") -> List[str]:
+        """Object names directly under `folder` (one paginated listing)."""
+        names = await self._call(self.bucket.list, folder)
+        return [n for n in names if n.endswith(suffix)]
+
+    async def read_json(self, path: str) -> Any:
+        """Download and parse one object; None if it is missing or unreadable."""
+        try:
+            return json.loads(await self._call(self.bucket.download, path))
+        except Exception as e:
+            logger.warning(f"Could not read {path}: {e}")
+            return None
+
+    async def write_json(self, path: str, data: Any) -> bool:
+        """Upload one JSON object (logged only in dry run)."""
+        payload = encode_json(data)
+        if self.dry_run:
+            logger.info(f"[DRY RUN] Would upload {path} ({len(payload):,} bytes)")
+            return True
+        try:
+            await self._call(self.bucket.upload, path, payload)
+            return True
+        except Exception as e:
+            logger.error(f"Upload failed for {path}: {e}")
+            return False
+
+    async def rewrite(self, paths: Iterable[str], transform: Transform,
+                      existing: Optional[Set[str]] = None) -> MaintenanceReport:
+        """
+        Download each JSON object, run `transform`, and upload what it returns.
+        Paths not in `existing` (when given) skip the download and get data=None.
+        """
+        paths = list(dict.fromkeys(paths))
+        report = MaintenanceReport(dry_run=self.dry_run, planned=len(paths))
+        started = time.perf_counter()
+
+        async def process(path: str):
+            try:
+                data = None
+                if existing is None or path in existing:
+                    raw = await self._call(self.bucket.download, path)
+                    report.downloaded += 1
+                    report.bytes_in += len(raw)
+                    data = json.loads(raw)
+                new_data = transform(path, data)
+                if asyncio.iscoroutine(new_data):
+                    new_data = await new_data
+                if new_data is None:
+                    return
+                report.changed += 1
+                payload = encode_json(new_data)
+                if self.dry_run:
+                    logger.info(f"[DRY RUN] Would upload {path} ({len(payload):,} bytes)")
+                    return
+                await self._call(self.bucket.upload, path, payload)
+                report.uploaded += 1
+                report.bytes_out += len(payload)
+            except Exception as e:
+                logger.error(f"Rewrite failed for {path}: {e}")
+                report.failed.append(path)
+
+        await asyncio.gather(*(process(p) for p in paths))
+        report.seconds = time.perf_counter() - started
+        return report
+
+    async def delete(self, paths: Iterable[str]) -> MaintenanceReport:
+        """Remove objects in batches of REMOVE_BATCH_SIZE per call."""
+        paths = list(dict.fromkeys(paths))
+        report = MaintenanceReport(dry_run=self.dry_run, planned=len(paths))
+        started = time.perf_counter()
+
+        async def remove(batch: List[str]):
+            if self.dry_run:
+                for path in batch:
+                    logger.info(f"[DRY RUN] Would delete {path}")
+                report.deleted += len(batch)
+                return
+            try:
+                await self._call(self.bucket.remove, batch)
+                report.deleted += len(batch)
+            except Exception as e:
+                logger.error(f"Delete failed for {len(batch)} objects ({batch[0]}...): {e}")
+                report.failed.extend(batch)
+
+        batches = [paths[i:i + REMOVE_BATCH_SIZE] for i in range(0, len(paths), REMOVE_BATCH_SIZE)]
+        await asyncio.gather(*(remove(b) for b in batches))
+        report.seconds = time.perf_counter() - started
+        return report
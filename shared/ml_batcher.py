@@ -0,0 +1,146 @@
+"""
+shared/ml_batcher.py
+
+Micro-batching ML scoring stage.
+
+Coroutines that reach the ML gate call `await scorer.score(mint, ...)`.
+Requests arriving within `window_secs` of each other (and sharing the same
+predict parameters) are collected into one batch and scored by a single call
+in a worker thread, so model inference never runs on the event loop. Results
+are fanned back out to the waiting coroutines.
+
+If the predictor exposes `predict_batch(mints, **params)` it is used for the
+whole batch (one stacked feature matrix, one vectorized predict). Otherwise
+the batch falls back to per-mint `predict()` calls, still off the loop.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_ParamsKey = Tuple[Tuple[str, Any], ...]
+
+
+class MLBatchScorer:
+    """Collects ML gate requests into micro-batches and scores them in a thread pool."""
+
+    def __init__(self, predictor, *, window_secs: float = 0.05, max_batch: int = 64,
+                 max_workers: int = 2, log_every_batches: int = 100):
+        self.predictor = predictor
+        self.window_secs = window_secs
+        self.max_batch = max_batch
+        self.log_every_batches = log_every_batches
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ml-score")
+        self._pending: Dict[_ParamsKey, List[Tuple[str, asyncio.Future, float]]] = {}
+        self._timers: Dict[_ParamsKey, asyncio.TimerHandle] = {}
+        self._batch_tasks: set = set()
+
+        # Gauges
+        self.rows_scored = 0
+        self.batches = 0
+        self.inference_secs = 0.0
+        self._gate_latencies: deque = deque(maxlen=2000)
+
+    async def score(self, mint: str, **params) -> Dict[str, Any]:
+        """Score one mint; resolves when its batch has been predicted."""
+        loop = asyncio.get_running_loop()
+        key: _ParamsKey = tuple(sorted(params.items()))
+        fut = loop.create_future()
+
+        bucket = self._pending.setdefault(key, [])
+        bucket.append((mint, fut, time.perf_counter()))
+
+        if len(bucket) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window_secs, self._flush, key)
+
+        return await fut
+
+    def _flush(self, key: _ParamsKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_batch(key, batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, key: _ParamsKey, batch: List[Tuple[str, asyncio.Future, float]]):
+        params = dict(key)
+        mints = [mint for mint, _, _ in batch]
+
+        started = time.perf_counter()
+        try:
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._predict_rows, mints, params
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ ML batch of {len(mints)} failed: {e}")
+                results = [{"action": "ERROR", "error": str(e)} for _ in mints]
+            if not isinstance(results, list) or len(results) != len(mints):
+                # Rows can't be matched back to mints, so none of them can be trusted
+                got = len(results) if isinstance(results, list) else type(results).__name__
+                logger.warning(f"⚠️ ML batch returned {got} rows for {len(mints)} mints")
+                results = [{"action": "ERROR", "error": "batch result count mismatch"} for _ in mints]
+            finished = time.perf_counter()
+
+            self.rows_scored += len(mints)
+            self.batches += 1
+            self.inference_secs += finished - started
+
+            for (_, fut, enqueued_at), result in zip(batch, results):
+                self._gate_latencies.append(finished - enqueued_at)
+                if not fut.done():
+                    fut.set_result(result)
+        finally:
+            # Cancellation (or anything else escaping above) must not leave a gate waiting forever
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_result({"action": "ERROR", "error": "ML batch did not complete"})
+
+        if self.log_every_batches and self.batches % self.log_every_batches == 0:
+            logger.info(f"🔮 ML scoring: {self.stats()}")
+
+    def _predict_rows(self, mints: List[str], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Runs in the worker thread."""
+        predict_batch = getattr(self.predictor, "predict_batch", None)
+        if callable(predict_batch):
+            results = predict_batch(mints, **params)
+            if isinstance(results, dict):
+                results = [results.get(mint) for mint in mints]
+            return [
+                r if r is not None else {"action": "ERROR", "error": "missing batch result"}
+                for r in results
+            ]
+
+        rows = []
+        for mint in mints:
+            try:
+                rows.append(self.predictor.predict(mint, **params))
+            except Exception as e:
+                rows.append({"action": "ERROR", "error": str(e)})
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._gate_latencies)
+        p95: Optional[float] = latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+        return {
+            "rows": self.rows_scored,
+            "batches": self.batches,
+            "avg_batch_size": round(self.rows_scored / self.batches, 1) if self.batches else 0.0,
+            "rows_per_sec": round(self.rows_scored / self.inference_secs, 1) if self.inference_secs else 0.0,
+            "gate_latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,119 @@
+"""
+shared/solana_accounts.py
+
+Local Solana account helpers (no RPC needed):
+- base58 encode/decode
+- program-derived address search (ed25519 off-curve check)
+- associated token account (ATA) derivation
+- SPL mint / token account decoding from raw account data
+"""
+
+import base64
+import hashlib
+import struct
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+ASSOCIATED_TOKEN_PROGRAM_ID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {c: i for i, c in enumerate(_B58_ALPHABET)}
+
+# ed25519 field parameters
+_P = 2 ** 255 - 19
+_D = (-121665 * pow(121666, _P - 2, _P)) % _P
+
+
+@lru_cache(maxsize=4096)
+def b58decode(value: str) -> bytes:
+    num = 0
+    for char in value:
+        num = num * 58 + _B58_INDEX[char]
+    raw = num.to_bytes((num.bit_length() + 7) // 8, "big") if num else b""
+    leading_zeros = len(value) - len(value.lstrip("1"))
+    return b"\x00" * leading_zeros + raw
+
+
+def b58encode(data: bytes) -> str:
+    num = int.from_bytes(data, "big")
+    out = []
+    while num:
+        num, rem = divmod(num, 58)
+        out.append(_B58_ALPHABET[rem])
+    leading_zeros = len(data) - len(data.lstrip(b"\x00"))
+    return "1" * leading_zeros + "".join(reversed(out))
+
+
+def is_on_curve(point: bytes) -> bool:
+    """True if the 32 bytes decompress to an ed25519 point (i.e. could be a wallet key)."""
+    y = (int.from_bytes(point, "little") & ((1 << 255) - 1)) % _P
+    y2 = y * y % _P
+    u = (y2 - 1) % _P
+    v = (_D * y2 + 1) % _P
+    # x^2 = u / v must be a square in the field; v != 0, so that holds iff u * v is a square
+    return _jacobi(u * v, _P) >= 0
+
+
+def _jacobi(a: int, n: int) -> int:
+    """Jacobi symbol (a/n) for odd n; ~4x faster than Euler's criterion via pow()."""
+    a %= n
+    result = 1
+    while a:
+        twos = (a & -a).bit_length() - 1
+        if twos:
+            a >>= twos
+            if twos & 1 and n & 7 in (3, 5):
+                result = -result
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a, n = n % a, a
+    return result if n == 1 else 0
+
+
+def find_program_address(seeds: List[bytes], program_id: str) -> Tuple[str, int]:
+    """Solana's findProgramAddress: first bump (255 down) whose hash is off the curve."""
+    program_bytes = b58decode(program_id)
+    for bump in range(255, -1, -1):
+        digest = hashlib.sha256(
+            b"".join(seeds) + bytes([bump]) + program_bytes + b"ProgramDerivedAddress"
+        ).digest()
+        if not is_on_curve(digest):
+            return b58encode(digest), bump
+    raise ValueError("Unable to find a viable program address bump seed")
+
+
+def get_associated_token_address(owner: str, mint: str, token_program_id: str = TOKEN_PROGRAM_ID) -> str:
+    address, _ = find_program_address(
+        [b58decode(owner), b58decode(token_program_id), b58decode(mint)],
+        ASSOCIATED_TOKEN_PROGRAM_ID,
+    )
+    return address
+
+
+def account_data_bytes(account: Optional[dict]) -> Optional[bytes]:
+    """Raw bytes of a getMultipleAccounts entry fetched with encoding=base64."""
+    if not account:
+        return None
+    data = account.get("data")
+    if isinstance(data, list) and data:
+        return base64.b64decode(data[0])
+    return None
+
+
+def decode_mint_decimals(data: bytes) -> Optional[int]:
+    """SPL mint layout: decimals is the u8 at offset 44 (same for Token-2022)."""
+    if data is None or len(data) < 45:
+        return None
+    return data[44]
+
+
+def decode_token_account(data: bytes) -> Optional[Tuple[str, str, int]]:
+    """SPL token account layout: mint (32) | owner (32) | amount (u64 LE) ..."""
+    if data is None or len(data) < 72:
+        return None
+    mint = b58encode(data[0:32])
+    owner = b58encode(data[32:64])
+    (amount,) = struct.unpack_from("<Q", data, 64)
+    return mint, owner, amount
@@ -8,6 +8,8 @@ import logging
 import requests
 from typing import Optional, Tuple
 
+from .http_client import fetch_json
+
 
 def truncate_address(addr: str, length: int = 6) -> str:
     """
@@ -57,9 +59,30 @@ def format_marketcap_display(value: Optional[float]) -> str:
         return f"${value:.2f}"
 
 
+def _parse_marketcap_and_fdv(data: dict) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    """Extract (market_cap, fdv, liquidity_usd) from a DexScreener tokens response."""
+    pairs = (data or {}).get("pairs") or []
+    if not pairs:
+        return None, None, None
+
+    # Use first pair (usually most liquid)
+    pair = pairs[0]
+    mc = pair.get("marketCap")
+    fdv = pair.get("fdv")
+
+    # Safely extract liquidity
+    liquidity = pair.get("liquidity") or {}
+    lqd = liquidity.get("usd")
+    lqd_float = float(lqd) if lqd is not None else None
+
+    return mc, fdv, lqd_float
+
+
 def fetch_marketcap_and_fdv(mint: str) -> Tuple[Optional[float], Optional[float], Optional[float]]:
     """
     Fetch current market cap, FDV, and liquidity from DexScreener API.
+
+    Blocking - async code should use fetch_marketcap_and_fdv_async() instead.
     
     Args:
         mint: Token mint address
@@ -81,23 +104,33 @@ def fetch_marketcap_and_fdv(mint: str) -> Tuple[Optional[float], Optional[float]
         if resp.status_code != 200:
             return None, None, None
 
-        data = resp.json()
-        pairs = data.get("pairs", [])
-        if not pairs:
-            return None, None, None
+        return _parse_marketcap_and_fdv(resp.json())
+
+    except Exception as e:
+        logging.error(f"Error fetching marketcap for {mint}: {e}")
+        return None, None, None
+
 
-        # Use first pair (usually most liquid)
-        pair = pairs[0]
-        mc = pair.get("marketCap")
-        fdv = pair.get("fdv")
+async def fetch_marketcap_and_fdv_async(mint: str) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    """
+    Non-blocking version of fetch_marketcap_and_fdv() using the shared HTTP session.
+    
+    Args:
+        mint: Token mint address
+        
+    Returns:
+        Tuple of (market_cap, fdv, liquidity_usd) or (None, None, None) on error
+    """
+    try:
+        if not mint:
+            return None, None, None
 
-        # Safely extract liquidity
-        liquidity = pair.get("liquidity", {})
-        lqd = liquidity.get("usd")
-        lqd_float = float(lqd) if lqd is not None else None
+        data = await fetch_json(f"https://api.dexscreener.com/latest/dex/tokens/{mint}", timeout=10)
+        if not data:
+            return None, None, None
 
-        return mc, fdv, lqd_float
+        return _parse_marketcap_and_fdv(data)
 
     except Exception as e:
         logging.error(f"Error fetching marketcap for {mint}: {e}")
-        return None, None, None
\ No newline at end of file
+        return None, None, None
@@ -13,16 +13,22 @@ NEW: Added support for 'alpha' overlap results with
 REVISION:
 - Download functions now use signed URLs and 'If-Modified-Since' / 'If-None-Match' (ETag)
   headers to work with private buckets and avoid re-downloading unchanged files.
-- An in-memory cache stores 'Last-Modified' and 'ETag' times for conditional GETs.
+- 'Last-Modified' and 'ETag' validators are persisted next to each local copy, and
+  signed URLs are reused until shortly before they expire.
 """
 
+import io
 import os
 import json
+import time
 import pickle
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
-import tempfile
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, List, Iterable, Tuple, BinaryIO
+
+from shared.http_client import fetch_json
 
 BUCKET_NAME = "monitor-data"
 
@@ -36,9 +42,30 @@ OVERLAP_ALPHA_JSON_NAME = "overlap_results_alpha.json"
 
 MAX_SIZE_MB = 1.7
 
-# --- In-Memory Cache for Conditional Fetching ---
-# This dictionary will store 'Last-Modified' and 'ETag' headers for each file path.
+# Dexscreener enrichment: the tokens endpoint takes up to 30 comma-separated addresses
+DEXSCREENER_TOKENS_URL = "https://api.dexscreener.com/latest/dex/tokens/{}"
+DEXSCREENER_BATCH_SIZE = 30
+DEXSCREENER_CONCURRENCY = int(os.getenv("DEXSCREENER_CONCURRENCY", "4"))
+# Stored current prices younger than this are not refreshed; lookups (hits and misses) are cached as long
+DEXSCREENER_PRICE_TTL = int(os.getenv("DEXSCREENER_PRICE_TTL", "600"))
+
+_METADATA_PLACEHOLDERS = (None, "N/A", "Unknown", "")
+
+# token_id -> (fetched_at, info)
+_dexscreener_info_cache: Dict[str, Tuple[float, dict]] = {}
+_dexscreener_cache_lock = threading.Lock()
+
+# --- Cache for Conditional Fetching ---
+# 'Last-Modified' / 'ETag' validators per local copy (save_path). Persisted next to the copy as
+# '<save_path>.meta.json' so a restarted process can still send conditional GETs.
 _file_cache_headers: Dict[str, Dict[str, str]] = {}
+VALIDATORS_SUFFIX = ".meta.json"
+
+# Signed URLs are reused until SIGNED_URL_REFRESH_MARGIN seconds before they expire
+SIGNED_URL_TTL = int(os.getenv("SUPABASE_SIGNED_URL_TTL", "3600"))
+SIGNED_URL_REFRESH_MARGIN = 60
+_signed_url_cache: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_download_cache_lock = threading.Lock()
 
 
 # -------------------
@@ -58,27 +85,106 @@ def get_supabase_client() -> Client:
 # -------------------
 # Dexscreener Helper
 # -------------------
+def _parse_dexscreener_token_info(data: dict) -> dict:
+    """Extract price/symbol/name from a Dexscreener tokens response."""
+    pair = (data.get("pairs") or [{}])[0]
+    price = pair.get("priceUsd")
+    base_token = pair.get("baseToken", {})
+
+    return {
+        "price_usd": float(price) if price else None,
+        "symbol": base_token.get("symbol"),
+        "name": base_token.get("name")
+    }
+
+
 def fetch_dexscreener_token_info(token_id: str, debug: bool = True) -> dict:
     """Fetch current USD price, symbol, and name for a token from Dexscreener."""
     try:
         url = f"https://api.dexscreener.com/latest/dex/tokens/{token_id}"
         resp = requests.get(url, timeout=10)
-        data = resp.json()
-        pair = data.get("pairs", [{}])[0]
-        price = pair.get("priceUsd")
-        base_token = pair.get("baseToken", {})
-        
-        return {
-            "price_usd": float(price) if price else None,
-            "symbol": base_token.get("symbol"),
-            "name": base_token.get("name")
-        }
+        return _parse_dexscreener_token_info(resp.json())
     except Exception as e:
         if debug:
             print(f"⚠️ Dexscreener fetch failed for {token_id}: {e}")
         return {}
 
 
+async def fetch_dexscreener_token_info_async(token_id: str, debug: bool = True) -> dict:
+    """Non-blocking fetch_dexscreener_token_info() on the shared HTTP session."""
+    try:
+        url = f"https://api.dexscreener.com/latest/dex/tokens/{token_id}"
+        data = await fetch_json(url, timeout=10)
+        if data is None:
+            return {}
+        return _parse_dexscreener_token_info(data)
+    except Exception as e:
+        if debug:
+            print(f"⚠️ Dexscreener fetch failed for {token_id}: {e}")
+        return {}
+
+
+def _fetch_dexscreener_batch(token_ids: List[str], debug: bool = True) -> Optional[Dict[str, dict]]:
+    """One Dexscreener call for up to 30 tokens; first pair per base token, like the single lookup."""
+    try:
+        resp = requests.get(DEXSCREENER_TOKENS_URL.format(",".join(token_ids)), timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        if debug:
+            print(f"⚠️ Dexscreener batch fetch failed for {len(token_ids)} tokens: {e}")
+        return None
+
+    wanted = set(token_ids)
+    infos: Dict[str, dict] = {}
+    for pair in data.get("pairs") or []:
+        address = (pair.get("baseToken") or {}).get("address")
+        if address in wanted and address not in infos:
+            infos[address] = _parse_dexscreener_token_info({"pairs": [pair]})
+    return infos
+
+
+def fetch_dexscreener_token_infos(token_ids: Iterable[str], debug: bool = True) -> Dict[str, dict]:
+    """
+    Batched, concurrent fetch_dexscreener_token_info() for many tokens.
+
+    Results (including tokens Dexscreener doesn't know) are cached for
+    DEXSCREENER_PRICE_TTL; failed batches are not cached and come back as {}.
+    """
+    now = time.time()
+    results: Dict[str, dict] = {}
+    missing: List[str] = []
+    with _dexscreener_cache_lock:
+        for token_id in dict.fromkeys(token_ids):
+            cached = _dexscreener_info_cache.get(token_id)
+            if cached and now - cached[0] < DEXSCREENER_PRICE_TTL:
+                results[token_id] = cached[1]
+            else:
+                missing.append(token_id)
+
+    batches = [missing[i:i + DEXSCREENER_BATCH_SIZE] for i in range(0, len(missing), DEXSCREENER_BATCH_SIZE)]
+    if not batches:
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(DEXSCREENER_CONCURRENCY, len(batches))) as pool:
+        fetched = list(pool.map(lambda batch: _fetch_dexscreener_batch(batch, debug=debug), batches))
+
+    fetched_at = time.time()
+    with _dexscreener_cache_lock:
+        for batch, infos in zip(batches, fetched):
+            for token_id in batch:
+                if infos is None:
+                    results[token_id] = {}
+                    continue
+                info = infos.get(token_id, {})
+                _dexscreener_info_cache[token_id] = (fetched_at, info)
+                results[token_id] = info
+
+    if debug:
+        print(f"🔎 Dexscreener: {len(results) - len(missing)} cached, {len(missing)} fetched in {len(batches)} batches")
+    return results
+
+
 def fetch_dexscreener_price(token_id: str, debug: bool = True) -> float | None:
     """Old helper kept for backward compatibility if needed, though now redirects to info."""
     info = fetch_dexscreener_token_info(token_id, debug=debug)
@@ -142,6 +248,90 @@ def safe_get_timestamp(history_entry):
 # -------------------
 # JSON Preparation
 # -------------------
+def _needs_dexscreener_enrichment(target_dict: dict, now: float) -> bool:
+    meta = target_dict["token_metadata"]
+    if meta.get("symbol") in _METADATA_PLACEHOLDERS or meta.get("name") in _METADATA_PLACEHOLDERS:
+        return True
+    dex = target_dict["dexscreener"]
+    if dex.get("current_price_usd") is None:
+        return True
+    return now - (dex.get("current_price_fetched_at") or 0) >= DEXSCREENER_PRICE_TTL
+
+
+def _apply_dexscreener_info(token_id: str, target_dict: dict, info: dict, now: float, debug: bool) -> bool:
+    """Returns True if anything in target_dict changed."""
+    changed = False
+    # Refresh current price (keep the last known one if Dexscreener has none)
+    if info.get("price_usd") is not None:
+        target_dict["dexscreener"]["current_price_usd"] = info["price_usd"]
+        target_dict["dexscreener"]["current_price_fetched_at"] = now
+        changed = True
+    elif "current_price_usd" not in target_dict["dexscreener"]:
+        target_dict["dexscreener"]["current_price_usd"] = None
+        changed = True
+
+    # Enrich symbol and name in token_metadata
+    meta = target_dict["token_metadata"]
+    if meta.get("symbol") in _METADATA_PLACEHOLDERS:
+        if info.get("symbol"):
+            meta["symbol"] = info["symbol"]
+            changed = True
+            if debug: print(f"💎 Enriched {token_id} with symbol: {info['symbol']}")
+
+    if meta.get("name") in _METADATA_PLACEHOLDERS:
+        if info.get("name"):
+            meta["name"] = info["name"]
+            changed = True
+    return changed
+
+
+def _json_entry(token_id: str, history: Any, indent: bool) -> bytes:
+    """One '"token": history' member exactly as json.dumps renders it inside the top-level object."""
+    if indent:
+        return json.dumps({token_id: history}, indent=2, default=str)[2:-2].encode()
+    return json.dumps({token_id: history}, default=str)[1:-1].encode()
+
+
+def write_size_bounded_json(items: List[Tuple[str, Any]], out: BinaryIO, max_bytes: int) -> int:
+    """
+    Stream {token: history, ...} for the longest prefix of items that fits in max_bytes.
+
+    Pretty-printed when every token fits that way, compact otherwise (the same
+    bytes json.dumps would give). Each token is serialized at most once per
+    format, and only until the budget runs out. Returns the number of tokens written.
+    """
+    for indent in (True, False):
+        opener, sep, closer = (b"{\n", b",\n", b"\n}") if indent else (b"{", b", ", b"}")
+        chunks: List[bytes] = []
+        size = len(opener) + len(closer)
+        try:
+            for token_id, history in items:
+                chunk = _json_entry(token_id, history, indent)
+                added = len(chunk) + (len(sep) if chunks else 0)
+                if size + added > max_bytes:
+                    break
+                chunks.append(chunk)
+                size += added
+        except (TypeError, ValueError):
+            if indent:
+                continue
+            raise
+        if indent and len(chunks) < len(items):
+            continue
+
+        if not chunks:
+            out.write(b"{}")
+            return 0
+        out.write(opener)
+        for i, chunk in enumerate(chunks):
+            if i:
+                out.write(sep)
+            out.write(chunk)
+        out.write(closer)
+        return len(chunks)
+    return 0
+
+
 def prepare_json_from_pkl(pkl_path: str, debug: bool = True) -> bytes:
     """Load pickle, enrich with Dexscreener prices, filter NONE grades, sort, size limit."""
     if not os.path.exists(pkl_path):
@@ -161,7 +351,10 @@ def prepare_json_from_pkl(pkl_path: str, debug: bool = True) -> bytes:
             print("⚠️ Pickle contained no valid dict data")
         return b"{}"
 
+    now = time.time()
+    changed = False
     filtered = {}
+    to_enrich: Dict[str, dict] = {}
     for token_id, history in overlap_results.items():
         if not isinstance(history, list) or not history:
             continue
@@ -186,29 +379,22 @@ def prepare_json_from_pkl(pkl_path: str, debug: bool = True) -> bytes:
             # Ensure dexscreener and token_metadata sections exist
             if "dexscreener" not in target_dict or not isinstance(target_dict.get("dexscreener"), dict):
                 target_dict["dexscreener"] = {}
+                changed = True
             if "token_metadata" not in target_dict or not isinstance(target_dict.get("token_metadata"), dict):
                 target_dict["token_metadata"] = {}
-                
-            # Fetch current info from Dexscreener
-            info = fetch_dexscreener_token_info(token_id, debug=debug)
-            
-            # Add current price if missing
-            if target_dict["dexscreener"].get("current_price_usd") is None:
-                target_dict["dexscreener"]["current_price_usd"] = info.get("price_usd")
-            
-            # Enrich symbol and name in token_metadata
-            meta = target_dict["token_metadata"]
-            if meta.get("symbol") in [None, "N/A", "Unknown", ""]:
-                if info.get("symbol"):
-                    meta["symbol"] = info["symbol"]
-                    if debug: print(f"💎 Enriched {token_id} with symbol: {info['symbol']}")
-                    
-            if meta.get("name") in [None, "N/A", "Unknown", ""]:
-                if info.get("name"):
-                    meta["name"] = info["name"]
-            
+                changed = True
+
+            if _needs_dexscreener_enrichment(target_dict, now):
+                to_enrich[token_id] = target_dict
+
             filtered[token_id] = history
 
+    # Fetch current info from Dexscreener, only for tokens missing metadata or with a stale price
+    if to_enrich:
+        infos = fetch_dexscreener_token_infos(to_enrich.keys(), debug=debug)
+        for token_id, target_dict in to_enrich.items():
+            changed |= _apply_dexscreener_info(token_id, target_dict, infos.get(token_id) or {}, now, debug)
+
     if not filtered:
         if debug:
             print("🚫 All entries NONE, JSON empty")
@@ -220,26 +406,22 @@ def prepare_json_from_pkl(pkl_path: str, debug: bool = True) -> bytes:
         key=lambda kv: safe_get_timestamp(kv[1][-1]),
         reverse=True,
     )
-    pruned = dict(sorted_tokens)
-
-    try:
-        json_bytes = json.dumps(pruned, indent=2, default=str).encode()
-    except Exception:
-        json_bytes = json.dumps(pruned, default=str).encode()
-
-    # Trim size if too big
-    while len(json_bytes) / (1024 * 1024) > MAX_SIZE_MB and pruned:
-        sorted_tokens = sorted_tokens[:-1]
-        pruned = dict(sorted_tokens)
-        json_bytes = json.dumps(pruned, default=str).encode()
+    buffer = io.BytesIO()
+    kept = write_size_bounded_json(sorted_tokens, buffer, int(MAX_SIZE_MB * 1024 * 1024))
+    json_bytes = buffer.getvalue()
+    pruned = dict(sorted_tokens[:kept])
 
     if debug:
         print(f"✅ JSON ready: {len(pruned)} tokens, {len(json_bytes)/1024:.2f} KB")
 
-    # Save enriched data back to PKL
+    # Save enriched/pruned data back to PKL, only if that changes its contents
+    if not changed and list(pruned) == list(overlap_results):
+        return json_bytes
     try:
-        with open(pkl_path, "wb") as f:
+        tmp_path = f"{pkl_path}.tmp"
+        with open(tmp_path, "wb") as f:
             pickle.dump(pruned, f)
+        os.replace(tmp_path, pkl_path)
         if debug:
             print(f"💾 Updated PKL with Dexscreener prices: {pkl_path}")
     except Exception as e:
@@ -353,6 +535,66 @@ def upload_alpha_overlap_results(file_path: str, bucket: str = BUCKET_NAME, debu
 # -------------------
 # MODIFIED: Download Functions (Private + Conditional)
 # -------------------
+def _validators_path(save_path: str) -> str:
+    return save_path + VALIDATORS_SUFFIX
+
+
+def _load_validators(save_path: str, file_name: str, bucket: str) -> Dict[str, str]:
+    """Validators for the local copy at save_path, if that copy exists and came from bucket/file_name."""
+    if not os.path.exists(save_path):
+        return {}
+    with _download_cache_lock:
+        cached = _file_cache_headers.get(save_path)
+    if cached is None:
+        try:
+            with open(_validators_path(save_path), "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        with _download_cache_lock:
+            _file_cache_headers[save_path] = cached
+    if cached.get("file_name") != file_name or cached.get("bucket") != bucket:
+        return {}
+    return cached
+
+
+def _save_validators(save_path: str, file_name: str, bucket: str, response: requests.Response):
+    validators = {"file_name": file_name, "bucket": bucket}
+    if response.headers.get("Last-Modified"):
+        validators["Last-Modified"] = response.headers["Last-Modified"]
+    if response.headers.get("ETag"):
+        validators["ETag"] = response.headers["ETag"]
+    with _download_cache_lock:
+        _file_cache_headers[save_path] = validators
+    try:
+        tmp_path = _validators_path(save_path) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(validators, f)
+        os.replace(tmp_path, _validators_path(save_path))
+    except OSError as e:
+        print(f"File '{file_name}': Could not persist cache headers: {e}")
+
+
+def _get_signed_url(file_name: str, bucket: str, refresh: bool = False) -> Optional[str]:
+    """Signed URL for bucket/file_name, reused until shortly before it expires."""
+    key = (bucket, file_name)
+    now = time.time()
+    with _download_cache_lock:
+        cached = _signed_url_cache.get(key)
+    if cached and not refresh and cached[1] - SIGNED_URL_REFRESH_MARGIN > now:
+        return cached[0]
+
+    supabase = get_supabase_client()
+    signed_url_response = supabase.storage.from_(bucket).create_signed_url(file_name, SIGNED_URL_TTL)
+    signed_url = signed_url_response.get('signedURL')
+    if not signed_url:
+        print(f"Error: Could not generate signed URL for '{file_name}'. Response: {signed_url_response}")
+        return None
+    with _download_cache_lock:
+        _signed_url_cache[key] = (signed_url, now + SIGNED_URL_TTL)
+    return signed_url
+
+
 def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) -> Optional[bytes]:
     """
     Download file from private Supabase Storage using signed URL and
@@ -360,21 +602,20 @@ def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) ->
     If not modified (304), loads from local `save_path`.
     If modified (200), downloads, saves to `save_path`, and returns content.
     Returns file content as bytes if successful, None otherwise.
-    """
-    global _file_cache_headers
-    supabase = get_supabase_client()
 
+    Validators are persisted next to `save_path` and signed URLs are cached,
+    so a steady-state poll is a single 304 request, even after a restart.
+    """
     try:
-        # 1. Generate a 60-second signed URL for the private file
-        signed_url_response = supabase.storage.from_(bucket).create_signed_url(file_name, 60)
-        signed_url = signed_url_response.get('signedURL')
+        # 1. Signed URL for the private file (cached)
+        signed_url = _get_signed_url(file_name, bucket)
         if not signed_url:
-            print(f"Error: Could not generate signed URL for '{file_name}'. Response: {signed_url_response}")
             return None
 
         # 2. Prepare headers for conditional GET using ETag and Last-Modified
+        #    (only when the local copy they describe is still there)
         headers = {}
-        cached_headers = _file_cache_headers.get(file_name, {})
+        cached_headers = _load_validators(save_path, file_name, bucket)
         if cached_headers.get('Last-Modified'):
             headers['If-Modified-Since'] = cached_headers['Last-Modified']
         if cached_headers.get('ETag'):
@@ -382,6 +623,12 @@ def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) ->
 
         # 3. Perform the HTTP request
         response = requests.get(signed_url, headers=headers, timeout=15)
+        if response.status_code in (400, 401, 403):
+            # Cached URL rejected (expired or revoked token): sign a fresh one and retry once
+            signed_url = _get_signed_url(file_name, bucket, refresh=True)
+            if not signed_url:
+                return None
+            response = requests.get(signed_url, headers=headers, timeout=15)
 
         # 4. Handle the response
         if response.status_code == 304:
@@ -392,12 +639,11 @@ def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) ->
                 with open(save_path, "rb") as f:
                     return f.read()
             else:
-                # File not modified, but local copy is missing. Force re-download.
+                # File not modified, but local copy vanished since the validators were read. Force re-download.
                 print(f"File '{file_name}' not modified, but local file '{save_path}' missing. Forcing re-download.")
-                headers.pop('If-Modified-Since', None)
-                headers.pop('If-None-Match', None)
-                _file_cache_headers.pop(file_name, None)
-                response = requests.get(signed_url, headers=headers, timeout=15)
+                with _download_cache_lock:
+                    _file_cache_headers.pop(save_path, None)
+                response = requests.get(signed_url, timeout=15)
                 # Allow to fall through to 200 logic
 
         if response.status_code == 200:
@@ -405,25 +651,12 @@ def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) ->
             print(f"File '{file_name}': File updated — new data loaded.")
             data = response.content
 
-            # Update our cache with the new 'Last-Modified' and 'ETag' headers
-            new_last_modified = response.headers.get('Last-Modified')
-            new_etag = response.headers.get('ETag')
-            
-            new_headers_to_cache = {}
-            if new_last_modified:
-                new_headers_to_cache['Last-Modified'] = new_last_modified
-            if new_etag:
-                new_headers_to_cache['ETag'] = new_etag
-                
-            if new_headers_to_cache:
-                _file_cache_headers[file_name] = new_headers_to_cache
-                print(f"File '{file_name}': Updated cache headers (ETag: {new_etag}, Last-Modified: {new_last_modified}).")
-
-            # Save the new file content locally
+            # Save the new file content locally, then the validators describing it
             os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
             with open(save_path, "wb") as f:
                 f.write(data)
             print(f"Downloaded and saved '{file_name}' -> '{save_path}'")
+            _save_validators(save_path, file_name, bucket, response)
             return data
 
         else:
@@ -453,6 +686,17 @@ def download_file(save_path: str, file_name: str, bucket: str = BUCKET_NAME) ->
     return None
 
 
+def remove_local_copy(save_path: str):
+    """Delete a download_file() local copy together with its persisted validators."""
+    with _download_cache_lock:
+        _file_cache_headers.pop(save_path, None)
+    for path in (save_path, _validators_path(save_path)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 def download_overlap_results(save_path: str, bucket: str = BUCKET_NAME) -> Optional[bytes]:
     """Download overlap_results.pkl specifically."""
     return download_file(save_path, OVERLAP_FILE_NAME, bucket)
@@ -486,29 +730,236 @@ def download_dune_cache_file(save_path: str, filename: str, bucket: str = BUCKET
 # Wallet PnL Helpers
 # -------------------
 WALLET_FOLDER = "wallet_pnl"
+WALLET_LIST_PAGE_SIZE = 1000
+WALLET_MANIFEST_TTL = int(os.getenv("WALLET_MANIFEST_TTL", "300"))
+WALLET_UPLOAD_CONCURRENCY = int(os.getenv("WALLET_UPLOAD_CONCURRENCY", "8"))
 
 def wallet_file_name(wallet: str) -> str:
     """Return remote file path for a wallet JSON file."""
     return f"{WALLET_FOLDER}/{wallet}.json"
 
 
+def _wallet_json_bytes(data: dict) -> bytes:
+    return json.dumps(data, indent=2, default=str).encode()
+
+
+class WalletManifest:
+    """
+    Set of wallets that have a file under WALLET_FOLDER, rebuilt from a
+    paginated listing at most every `ttl` seconds. Uploads made through this
+    module are added immediately, so lookups never wait for the next refresh.
+    """
+
+    def __init__(self, bucket: str = BUCKET_NAME, ttl: float = WALLET_MANIFEST_TTL):
+        self.bucket = bucket
+        self.ttl = ttl
+        self._wallets: set = set()
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Re-list WALLET_FOLDER; on failure the previous set is kept and retried after another ttl."""
+        wallets = set()
+        try:
+            storage = get_supabase_client().storage.from_(self.bucket)
+            offset = 0
+            while True:
+                page = storage.list(WALLET_FOLDER, {"limit": WALLET_LIST_PAGE_SIZE, "offset": offset})
+                if not isinstance(page, list):
+                    raise RuntimeError(f"unexpected listing response: {page!r}")
+                for obj in page:
+                    name = obj.get("name") or ""
+                    if name.endswith(".json"):
+                        wallets.add(name[:-len(".json")])
+                if len(page) < WALLET_LIST_PAGE_SIZE:
+                    break
+                offset += WALLET_LIST_PAGE_SIZE
+        except Exception as e:
+            print(f"⚠️ Wallet manifest refresh failed: {e}")
+            with self._lock:
+                self._refreshed_at = time.time()
+            return False
+
+        with self._lock:
+            self._wallets = wallets
+            self._refreshed_at = time.time()
+        return True
+
+    def _ensure_fresh(self):
+        with self._lock:
+            stale = self._refreshed_at is None or time.time() - self._refreshed_at >= self.ttl
+        if stale:
+            self.refresh()
+
+    def __contains__(self, wallet: str) -> bool:
+        self._ensure_fresh()
+        with self._lock:
+            return wallet in self._wallets
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        with self._lock:
+            return len(self._wallets)
+
+    def add(self, wallet: str):
+        with self._lock:
+            self._wallets.add(wallet)
+
+
+_wallet_manifests: Dict[str, WalletManifest] = {}
+_wallet_manifests_lock = threading.Lock()
+
+
+def get_wallet_manifest(bucket: str = BUCKET_NAME) -> WalletManifest:
+    """Process-wide WalletManifest for a bucket."""
+    with _wallet_manifests_lock:
+        if bucket not in _wallet_manifests:
+            _wallet_manifests[bucket] = WalletManifest(bucket)
+        return _wallet_manifests[bucket]
+
+
 def upload_wallet_data(wallet: str, data: dict, bucket: str = BUCKET_NAME, debug: bool = True) -> bool:
     """Upload wallet balances + trades JSON to Supabase."""
+    file_name = wallet_file_name(wallet)
     try:
-        # Save JSON locally first
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as tmp:
-            tmp.write(json.dumps(data, indent=2, default=str).encode())
-            tmp_path = tmp.name
-
-        success = upload_file(tmp_path, bucket, wallet_file_name(wallet), debug=debug)
-        os.remove(tmp_path)
-        return success
+        storage = get_supabase_client().storage.from_(bucket)
+        try:
+            storage.remove([file_name])
+        except Exception:
+            pass # Fails if file doesn't exist, which is fine
+        payload = _wallet_json_bytes(data)
+        storage.upload(file_name, payload, {"content-type": "application/json"})
+        get_wallet_manifest(bucket).add(wallet)
+        if debug:
+            print(f"✅ Uploaded {file_name} ({len(payload)/1024:.2f} KB)")
+        return True
     except Exception as e:
         if debug:
             print(f"❌ Failed to upload wallet {wallet}: {e}")
         return False
 
 
+class WalletUploadBatcher:
+    """
+    Coalesces wallet writes. add() keeps only the latest data per wallet;
+    flush() removes the previous files with one call and uploads the batch
+    concurrently. Flushes happen automatically once `max_pending` wallets
+    are queued, and a background timer flushes once the oldest one has waited
+    `max_age` seconds. Call close() on shutdown so the last wallets are written.
+    """
+
+    def __init__(self, bucket: str = BUCKET_NAME, max_pending: int = 200, max_age: float = 30.0,
+                 concurrency: int = WALLET_UPLOAD_CONCURRENCY, debug: bool = False):
+        self.bucket = bucket
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.concurrency = concurrency
+        self.debug = debug
+        self._pending: Dict[str, dict] = {}
+        self._oldest: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.uploaded = 0
+        self.failed = 0
+
+    def add(self, wallet: str, data: dict) -> int:
+        """Queue a wallet write; returns the number uploaded if this triggered a flush."""
+        with self._lock:
+            self._pending[wallet] = data
+            if self._oldest is None:
+                self._oldest = time.time()
+                self._arm_timer()
+            due = len(self._pending) >= self.max_pending or time.time() - self._oldest >= self.max_age
+        return self.flush() if due else 0
+
+    def _arm_timer(self):
+        # Caller holds self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_age, self._flush_due)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_due(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Upload everything queued; failed wallets are re-queued unless newer data arrived meanwhile."""
+        with self._lock:
+            batch, self._pending, self._oldest = self._pending, {}, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+
+        try:
+            storage = get_supabase_client().storage.from_(self.bucket)
+        except Exception as e:
+            if self.debug:
+                print(f"❌ Wallet batch of {len(batch)} not uploaded: {e}")
+            self._requeue(batch)
+            return 0
+
+        try:
+            storage.remove([wallet_file_name(w) for w in batch])
+        except Exception:
+            pass # Missing files are fine
+
+        def _upload(item):
+            wallet, data = item
+            try:
+                storage.upload(wallet_file_name(wallet), _wallet_json_bytes(data), {"content-type": "application/json"})
+                return True
+            except Exception as e:
+                if self.debug:
+                    print(f"❌ Failed to upload wallet {wallet}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(batch)))) as pool:
+            results = list(pool.map(_upload, batch.items()))
+
+        manifest = get_wallet_manifest(self.bucket)
+        failed = {}
+        for (wallet, data), ok in zip(batch.items(), results):
+            if ok:
+                manifest.add(wallet)
+            else:
+                failed[wallet] = data
+        self._requeue(failed)
+
+        uploaded = len(batch) - len(failed)
+        self.uploaded += uploaded
+        self.failed += len(failed)
+        if self.debug:
+            print(f"✅ Uploaded {uploaded}/{len(batch)} wallet files")
+        return uploaded
+
+    def _requeue(self, batch: Dict[str, dict]):
+        if not batch:
+            return
+        with self._lock:
+            for wallet, data in batch.items():
+                self._pending.setdefault(wallet, data)
+            if self._oldest is None:
+                self._oldest = time.time()
+            self._arm_timer()
+
+    def close(self) -> int:
+        """Flush what is queued and stop the timer; wallets that still fail stay queued."""
+        uploaded = self.flush()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return uploaded
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
 def download_wallet_data(wallet: str, bucket: str = BUCKET_NAME, debug: bool = True) -> dict | None:
     """Download wallet JSON from Supabase and return as dict."""
     save_path = f"/tmp/{wallet}.json" # Use temp dir for local save
@@ -534,15 +985,8 @@ def download_wallet_data(wallet: str, bucket: str = BUCKET_NAME, debug: bool = T
 
 
 def wallet_data_exists(wallet: str, bucket: str = BUCKET_NAME) -> bool:
-    """Check if wallet data exists in Supabase Storage."""
-    try:
-        supabase = get_supabase_client()
-        res = supabase.storage.from_(bucket).list(WALLET_FOLDER)
-        if not isinstance(res, list):
-            return False
-        return any(obj.get("name") == f"{wallet}.json" for obj in res)
-    except Exception:
-        return False
+    """Check if wallet data exists in Supabase Storage (via the cached wallet manifest)."""
+    return wallet in get_wallet_manifest(bucket)
 
 # -------------------
 # Script Runner
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import time
+from unittest import mock
+
+os.environ.setdefault("BOT_TOKEN", "test-token")
+
+from alerts import formatters
+
+
+class _Response:
+    def __init__(self, payload):
+        self.status = 200
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    closed = False
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        mint = url.rsplit("/", 1)[-1]
+        return _DelayedResponse(self.delay, {"pairs": [_pair(mint)]})
+
+
+class _DelayedResponse(_Response):
+    def __init__(self, delay, payload):
+        super().__init__(payload)
+        self.delay = delay
+
+    async def __aenter__(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self
+
+
+def _pair(mint: str) -> dict:
+    return {
+        "baseToken": {"name": f"Token {mint}", "symbol": mint[:4].upper()},
+        "priceUsd": "0.00012",
+        "fdv": 120_000,
+        "liquidity": {"usd": 30_000},
+        "pairCreatedAt": int((time.time() - 7200) * 1000),
+        "txns": {"h24": {"buys": 60, "sells": 40}},
+        "info": {"imageUrl": f"https://img/{mint}.png"},
+    }
+
+
+def _entry(mint: str, ts: str = "2026-10-18T10:00:00Z") -> dict:
+    return {
+        "ts": ts,
+        "result": {
+            "grade": "HIGH",
+            "smart_money": {"alert_label": "Smart Money Alert"},
+            "security": {
+                "rugcheck": {"holder_count": 900, "lp_locked_pct": 100},
+                "rugcheck_raw": {"raw": {"score_normalised": 12, "risks": [
+                    {"name": "Low holders", "level": "warn", "score": 10, "description": "few"},
+                ]}},
+            },
+        },
+    }
+
+
+def _reset(session):
+    formatters._market_data_cache.clear()
+    formatters._market_data_inflight.clear()
+    formatters._render_cache.clear()
+    return mock.patch.object(formatters, "_http_session", session)
+
+
+def test_alert_rendered_once_per_entry_version():
+    session = _FakeSession()
+    with _reset(session):
+        async def run():
+            first = await formatters._format_alpha_alert_async("mintA", _entry("mintA"))
+            again = await formatters._format_alpha_alert_async("mintA", _entry("mintA"))
+            return first, again
+
+        (msg, state, image), (msg2, state2, image2) = asyncio.run(run())
+
+    assert msg and msg == msg2 and image == image2 == "https://img/mintA.png"
+    assert "Smart Money Alert" in msg
+    assert len(session.calls) == 1
+    # Callers get their own copy of the state dict
+    state2["initial_market_cap"] = 0
+    assert state["initial_market_cap"] == 120_000
+
+
+def test_new_entry_version_rerenders_but_reuses_market_data():
+    session = _FakeSession()
+    with _reset(session):
+        async def run():
+            await formatters._format_alpha_alert_async("mintB", _entry("mintB", "2026-10-18T10:00:00Z"))
+            await formatters._format_alpha_alert_async("mintB", _entry("mintB", "2026-10-18T11:00:00Z"))
+
+        asyncio.run(run())
+        assert len(formatters._render_cache) == 2
+    assert len(session.calls) == 1
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    session = _FakeSession(delay=0.01)
+    initial_state = {
+        "symbol": "MINT", "name": "Token", "initial_market_cap": 60_000,
+        "initial_liquidity": 30_000, "first_alert_at": "2026-10-18T10:00:00+00:00",
+    }
+    with _reset(session):
+        async def run():
+            return await asyncio.gather(*(formatters.format_alpha_refresh("mintC", initial_state) for _ in range(20)))
+
+        messages = asyncio.run(run())
+
+    assert len(set(messages)) == 1
+    assert "+100.00% 📈" in messages[0]
+    assert len(session.calls) == 1
+
+
+def test_failures_are_not_cached():
+    with _reset(_FakeSession()):
+        with mock.patch.object(formatters, "_fetch_dexscreener_data", mock.AsyncMock(return_value={})) as fetch:
+            async def run():
+                for _ in range(3):
+                    msg, _, _ = await formatters._format_alpha_alert_async("mintD", _entry("mintD"))
+                    assert msg is None
+
+            asyncio.run(run())
+    assert fetch.await_count == 3
+    assert not formatters._render_cache
+
+
+def benchmark_alpha_render(n_tokens: int = 200, recipients: int = 25):
+    """Per-alert render time when every recipient triggers a render of the same token."""
+    entries = {f"mint{i:04d}": _entry(f"mint{i:04d}") for i in range(n_tokens)}
+
+    async def render_all():
+        for mint, entry in entries.items():
+            for _ in range(recipients):
+                await formatters._format_alpha_alert_async(mint, entry)
+
+    session = _FakeSession()
+    with _reset(session):
+        with mock.patch.object(formatters, "DEX_MARKET_DATA_TTL", 0):
+            t0 = time.perf_counter()
+            asyncio.run(render_all())
+            uncached = time.perf_counter() - t0
+        uncached_calls = len(session.calls)
+
+    session = _FakeSession()
+    with _reset(session):
+        t0 = time.perf_counter()
+        asyncio.run(render_all())
+        cached = time.perf_counter() - t0
+        cached_calls = len(session.calls)
+
+    total = n_tokens * recipients
+    print(
+        f"📊 {total:,} alert renders ({n_tokens} tokens x {recipients} recipients) | "
+        f"uncached {uncached / total * 1e6:.0f}µs/alert, {uncached_calls} fetches | "
+        f"cached {cached / total * 1e6:.0f}µs/alert, {cached_calls} fetches"
+    )
+    return uncached / cached
+
+
+if __name__ == "__main__":
+    test_alert_rendered_once_per_entry_version()
+    test_new_entry_version_rerenders_but_reuses_market_data()
+    test_concurrent_refreshes_share_one_fetch()
+    test_failures_are_not_cached()
+    assert benchmark_alpha_render() >= 5
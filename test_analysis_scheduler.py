@@ -0,0 +1,123 @@
+import asyncio
+import os
+import pickle
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+from unittest.mock import MagicMock
+
+os.environ.setdefault("DUNE_QUERY_ID", "0")
+os.environ.setdefault("HELIUS_API_KEY", "test-key")
+try:
+    import ml_predictor  # noqa: F401
+except ImportError:
+    sys.modules['ml_predictor'] = MagicMock()
+
+import token_monitor
+from token_monitor import AnalysisScheduler, TradingStart
+
+
+def _pickle_dump(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def _pickle_load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# Other tests replace joblib in sys.modules with a MagicMock; persist through plain pickle instead
+_joblib = SimpleNamespace(dump=_pickle_dump, load=_pickle_load)
+
+
+async def _run_until(scheduler, done, timeout=5.0):
+    await scheduler.start()
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    finally:
+        await scheduler.stop()
+
+
+def test_due_jobs_run_by_priority_then_deadline():
+    with tempfile.TemporaryDirectory() as tmp:
+        order = []
+
+        async def scenario():
+            done = asyncio.Event()
+
+            async def handler(job):
+                order.append(job.mint)
+                if len(order) == 4:
+                    done.set()
+                return None
+
+            scheduler = AnalysisScheduler(handler, workers=1, queue_file=os.path.join(tmp, "q.pkl"))
+            now = time.time()
+            scheduler.schedule("late_low", "overlap", TradingStart(mint="late_low"), now - 10, 3, jitter=False)
+            scheduler.schedule("early_low", "overlap", TradingStart(mint="early_low"), now - 20, 3, jitter=False)
+            scheduler.schedule("high", "overlap", TradingStart(mint="high"), now - 5, 0, jitter=False)
+            scheduler.schedule("mid", "overlap", TradingStart(mint="mid"), now - 1, 1, jitter=False)
+            # Replaced entries don't run twice
+            scheduler.schedule("mid", "overlap", TradingStart(mint="mid"), now - 1, 1, jitter=False)
+            await _run_until(scheduler, done)
+            assert len(scheduler) == 0
+
+        asyncio.run(scenario())
+        assert order == ["high", "mid", "early_low", "late_low"]
+
+
+def test_reschedule_recomputes_priority_without_new_jitter():
+    with tempfile.TemporaryDirectory() as tmp:
+        ranks = {"tok": 0}
+        next_run_at = time.time() + 3600
+
+        async def scenario():
+            done = asyncio.Event()
+
+            async def handler(job):
+                ranks["tok"] = 2  # the token aged out of "fresh"
+                done.set()
+                return next_run_at
+
+            scheduler = AnalysisScheduler(handler, workers=1, queue_file=os.path.join(tmp, "q.pkl"),
+                                          jitter_seconds=60, priority_fn=lambda start: ranks[start.mint])
+            due_at = time.time() - 120
+            first = scheduler.schedule("tok", "overlap", TradingStart(mint="tok"), due_at, 0)
+            assert due_at <= first.run_at <= due_at + 60  # initial schedule is jittered
+            await _run_until(scheduler, done)
+            return scheduler._jobs[("tok", "overlap")]
+
+        job = asyncio.run(scenario())
+        assert job.priority == 2
+        assert job.run_at == next_run_at
+        assert job.check_count == 1
+
+
+def test_persisted_queue_is_restored_with_current_priority():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(token_monitor, "joblib", _joblib):
+        queue_file = os.path.join(tmp, "q.pkl")
+        run_at = time.time() + 600
+
+        scheduler = AnalysisScheduler(None, queue_file=queue_file)
+        scheduler.schedule("tok", "probation", TradingStart(mint="tok", block_time=123, fdv_usd=5.0),
+                           run_at, 0, check_count=4, jitter=False)
+        scheduler.schedule("gone", "overlap", TradingStart(mint="gone"), run_at, 0, jitter=False)
+        scheduler.cancel("gone", "overlap")
+        scheduler.persist(force=True)
+
+        restored = AnalysisScheduler(None, queue_file=queue_file, priority_fn=lambda start: 3)
+        jobs = restored.load_persisted()
+        assert [(j.mint, j.kind, j.run_at, j.priority, j.check_count) for j in jobs] == \
+            [("tok", "probation", run_at, 3, 4)]
+        assert jobs[0].start.fdv_usd == 5.0 and jobs[0].start.block_time == 123
+        assert restored.has_job("tok", "probation") and not restored.has_job("gone", "overlap")
+
+
+if __name__ == "__main__":
+    test_due_jobs_run_by_priority_then_deadline()
+    test_reschedule_recomputes_priority_without_new_jitter()
+    test_persisted_queue_is_restored_with_current_priority()
+    print("✅ Analysis scheduler tests passed")
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from shared.maintenance import LocalBucket, MaintenanceEngine, RateLimiter
+
+
+def _write(root, path, data):
+    local = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    with open(local, "w") as f:
+        json.dump(data, f)
+
+
+def _read(root, path):
+    with open(os.path.join(root, *path.split("/"))) as f:
+        return json.load(f)
+
+
+def _daily(date, mints):
+    return {"date": date, "tokens": [{"mint": m, "status": "win", "ath_roi": 60} for m in mints]}
+
+
+def _seed(root, n_days=5):
+    for signal in ("discovery", "alpha"):
+        for day in range(1, n_days + 1):
+            _write(root, f"analytics/{signal}/daily/2026-03-{day:02d}.json", _daily(f"2026-03-{day:02d}", ["bad", f"ok{day}"]))
+    _write(root, "analytics/active_tracking.json", {"bad_alpha": {"mint": "bad"}, "ok_alpha": {"mint": "ok"}})
+
+
+def test_rewrite_and_dry_run():
+    root = tempfile.mkdtemp()
+    try:
+        _seed(root)
+        folder = "analytics/alpha/daily"
+
+        def drop_bad(path, data):
+            kept = [t for t in data["tokens"] if t["mint"] != "bad"]
+            if len(kept) == len(data["tokens"]):
+                return None
+            data["tokens"] = kept
+            return data
+
+        async def run(dry_run):
+            engine = MaintenanceEngine(LocalBucket(root), dry_run=dry_run, concurrency=4, rate_limit=0)
+            names = await engine.list_names(folder)
+            return await engine.rewrite([f"{folder}/{n}" for n in names], drop_bad)
+
+        preview = asyncio.run(run(dry_run=True))
+        assert preview.planned == preview.downloaded == preview.changed == 5
+        assert preview.uploaded == 0
+        assert len(_read(root, f"{folder}/2026-03-01.json")["tokens"]) == 2
+
+        report = asyncio.run(run(dry_run=False))
+        assert report.uploaded == 5 and not report.failed
+        assert [t["mint"] for t in _read(root, f"{folder}/2026-03-01.json")["tokens"]] == ["ok1"]
+        # Second pass finds nothing left to change
+        assert asyncio.run(run(dry_run=False)).changed == 0
+    finally:
+        shutil.rmtree(root)
+
+
+def test_rewrite_creates_missing_and_reports_failures():
+    root = tempfile.mkdtemp()
+    try:
+        _write(root, "analytics/alpha/daily/broken.json", {})
+        with open(os.path.join(root, "analytics/alpha/daily/broken.json"), "w") as f:
+            f.write("{not json")
+
+        seen = {}
+
+        def create(path, data):
+            seen[path] = data
+            return {"created": path}
+
+        async def run():
+            engine = MaintenanceEngine(LocalBucket(root), concurrency=2, rate_limit=0)
+            return await engine.rewrite(
+                ["analytics/alpha/daily/new.json", "analytics/alpha/daily/broken.json"],
+                create, existing={"analytics/alpha/daily/broken.json"},
+            )
+
+        report = asyncio.run(run())
+        assert seen == {"analytics/alpha/daily/new.json": None}
+        assert report.failed == ["analytics/alpha/daily/broken.json"]
+        assert _read(root, "analytics/alpha/daily/new.json") == {"created": "analytics/alpha/daily/new.json"}
+    finally:
+        shutil.rmtree(root)
+
+
+def test_delete_batches_and_dry_run():
+    root = tempfile.mkdtemp()
+    try:
+        _seed(root, n_days=3)
+        paths = [f"analytics/discovery/daily/2026-03-0{d}.json" for d in (1, 2)]
+
+        preview = asyncio.run(MaintenanceEngine(LocalBucket(root), dry_run=True).delete(paths))
+        assert preview.deleted == 2
+        assert len(os.listdir(os.path.join(root, "analytics/discovery/daily"))) == 3
+
+        report = asyncio.run(MaintenanceEngine(LocalBucket(root)).delete(paths))
+        assert report.deleted == 2 and not report.failed
+        assert os.listdir(os.path.join(root, "analytics/discovery/daily")) == ["2026-03-03.json"]
+    finally:
+        shutil.rmtree(root)
+
+
+def test_rate_limiter_spaces_calls():
+    async def run():
+        limiter = RateLimiter(100)
+        t0 = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(11)))
+        return time.monotonic() - t0
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_clean_tokens_and_repair_against_local_dir():
+    import clean_tokens
+    import repair_analytics
+
+    root = tempfile.mkdtemp()
+    try:
+        _seed(root, n_days=2)
+        asyncio.run(clean_tokens.main(["bad"], local_dir=root, rate_limit=0))
+        assert _read(root, "analytics/active_tracking.json") == {"ok_alpha": {"mint": "ok"}}
+        for signal in ("discovery", "alpha"):
+            assert [t["mint"] for t in _read(root, f"analytics/{signal}/daily/2026-03-01.json")["tokens"]] == ["ok1"]
+
+        _write(root, "analytics/active_tracking.json", {
+            "w_alpha": {"mint": "w", "symbol": "W", "status": "win", "ath_roi": 80,
+                        "hit_50_percent_time": "2026-03-02T05:00:00Z", "signal_type": "alpha"},
+            "n_alpha": {"mint": "n", "symbol": "N", "status": "win", "ath_roi": 70,
+                        "hit_50_percent_time": "2026-03-09T05:00:00Z", "signal_type": "alpha"},
+        })
+        dry = MaintenanceEngine(LocalBucket(root), dry_run=True, rate_limit=0)
+        asyncio.run(repair_analytics.repair_zombie_wins(dry))
+        assert not os.path.exists(os.path.join(root, "analytics/alpha/daily/2026-03-09.json"))
+
+        asyncio.run(repair_analytics.repair_zombie_wins(MaintenanceEngine(LocalBucket(root), rate_limit=0)))
+        repaired = _read(root, "analytics/alpha/daily/2026-03-02.json")
+        assert [t["mint"] for t in repaired["tokens"]] == ["ok2", "w"]
+        assert repaired["daily_summary"]["wins"] == 2
+        assert _read(root, "analytics/alpha/daily/2026-03-09.json")["tokens"][0]["mint"] == "n"
+    finally:
+        shutil.rmtree(root)
+
+
+def test_local_dir_rehearsal_leaves_live_active_tracking_alone():
+    import clean_tokens
+
+    root = tempfile.mkdtemp()
+    cwd = tempfile.mkdtemp()
+    previous_cwd = os.getcwd()
+    try:
+        _seed(root, n_days=1)
+        live = {"bad_alpha": {"mint": "bad"}, "ok_alpha": {"mint": "ok"}}
+        _write(cwd, clean_tokens.LOCAL_ACTIVE_TRACKING_PATH, live)
+        os.chdir(cwd)
+
+        asyncio.run(clean_tokens.main(["bad"], local_dir=root, rate_limit=0))
+
+        assert _read(cwd, clean_tokens.LOCAL_ACTIVE_TRACKING_PATH) == live
+        assert _read(root, "analytics/active_tracking.json") == {"ok_alpha": {"mint": "ok"}}
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(root)
+        shutil.rmtree(cwd)
+
+
+class _SlowBucket(LocalBucket):
+    """LocalBucket with a fixed per-call latency, standing in for remote storage."""
+
+    def __init__(self, root, latency):
+        super().__init__(root)
+        self.latency = latency
+
+    def download(self, path):
+        time.sleep(self.latency)
+        return super().download(path)
+
+    def upload(self, path, data):
+        time.sleep(self.latency)
+        super().upload(path, data)
+
+
+def benchmark_maintenance(n_days: int = 200, latency: float = 0.02, concurrency: int = 16):
+    root = tempfile.mkdtemp()
+    try:
+        def drop_bad(path, data):
+            data["tokens"] = [t for t in data["tokens"] if t["mint"] != "bad"]
+            return data
+
+        async def run(workers):
+            for day in range(n_days):
+                _write(root, f"analytics/alpha/daily/{day:04d}.json", _daily(str(day), ["bad", "ok"]))
+            engine = MaintenanceEngine(_SlowBucket(root, latency), concurrency=workers, rate_limit=0)
+            names = await engine.list_names("analytics/alpha/daily")
+            return await engine.rewrite([f"analytics/alpha/daily/{n}" for n in names], drop_bad)
+
+        sequential = asyncio.run(run(1))
+        parallel = asyncio.run(run(concurrency))
+        print(f"📊 sequential: {sequential.summary()}")
+        print(f"📊 {concurrency} workers: {parallel.summary()}")
+        return sequential.seconds / parallel.seconds
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    test_rewrite_and_dry_run()
+    test_rewrite_creates_missing_and_reports_failures()
+    test_delete_batches_and_dry_run()
+    test_rate_limiter_spaces_calls()
+    test_clean_tokens_and_repair_against_local_dir()
+    test_local_dir_rehearsal_leaves_live_active_tracking_alone()
+    assert benchmark_maintenance() >= 5
@@ -0,0 +1,107 @@
+import asyncio
+import base64
+import os
+import struct
+from unittest.mock import patch
+
+from aiohttp import web
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+import alpha
+from shared.solana_accounts import (
+    TOKEN_PROGRAM_ID, b58decode, b58encode, get_associated_token_address,
+)
+
+
+def _key(i: int, tag: int) -> str:
+    return b58encode(bytes([tag]) + i.to_bytes(4, "big") + b"\x07" * 27)
+
+
+def _b64(data: bytes) -> list:
+    return [base64.b64encode(data).decode(), "base64"]
+
+
+class _MockRpc:
+    """In-memory ledger behind a real HTTP JSON-RPC endpoint."""
+
+    def __init__(self):
+        self.accounts = {}
+        self.calls = []
+
+    def add_mint(self, mint: str, decimals: int):
+        data = b"\x00" * 44 + bytes([decimals]) + b"\x01" + b"\x00" * 36
+        self.accounts[mint] = {"lamports": 1, "owner": TOKEN_PROGRAM_ID, "data": _b64(data)}
+
+    def add_wallet(self, owner: str, lamports: int):
+        self.accounts[owner] = {"lamports": lamports, "owner": "11111111111111111111111111111111", "data": _b64(b"")}
+
+    def add_token_account(self, owner: str, mint: str, amount: int):
+        data = b58decode(mint) + b58decode(owner) + struct.pack("<Q", amount) + b"\x00" * 93
+        ata = get_associated_token_address(owner, mint)
+        self.accounts[ata] = {"lamports": 2039280, "owner": TOKEN_PROGRAM_ID, "data": _b64(data)}
+
+    async def handle(self, request):
+        body = await request.json()
+        method = body["method"]
+        self.calls.append((method, len(body["params"][0])))
+        assert method == "getMultipleAccounts"
+        assert len(body["params"][0]) <= 100
+        value = [self.accounts.get(addr) for addr in body["params"][0]]
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": {"value": value}})
+
+
+async def _with_server(rpc: _MockRpc, coro_factory):
+    app = web.Application()
+    app.router.add_post("/", rpc.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await coro_factory(f"http://127.0.0.1:{port}/?api-key={{key}}")
+    finally:
+        await runner.cleanup()
+
+
+def test_balances_resolved_in_chunked_calls():
+    n_traders = 250
+    mints = [_key(1, 200), _key(2, 200)]
+    traders = [_key(i, 100) for i in range(n_traders)]
+
+    rpc = _MockRpc()
+    for mint in mints:
+        rpc.add_mint(mint, decimals=6)
+    for i, trader in enumerate(traders):
+        if i % 3:
+            rpc.add_wallet(trader, lamports=(i + 1) * 10 ** 8)
+        if i % 2 == 0:
+            rpc.add_token_account(trader, mints[0], amount=(i + 1) * 1_500_000)
+
+    async def fake_prices(ms):
+        return {m: 2.0 for m in ms}
+
+    async def run(url):
+        with patch.multiple(alpha, HELIUS_RPC_URL=url, HELIUS_KEYS=["k"],
+                            get_current_prices_for_mints_async=fake_prices):
+            return await alpha.get_current_balances_and_prices(traders, mints)
+
+    df = asyncio.run(_with_server(rpc, run))
+
+    # 1 mint lookup + ceil((250 wallets + 500 ATAs) / 100) = 9 calls, instead of 2 * 250
+    assert len(rpc.calls) == 9
+    assert len(df) == n_traders * len(mints)
+
+    rows = df.set_index(["trader_id", "mint_address"])
+    assert rows.loc[(traders[4], mints[0]), "token_balance"] == 7.5
+    assert rows.loc[(traders[4], mints[0]), "current_value_usd"] == 15.0
+    assert rows.loc[(traders[4], mints[0]), "sol_balance"] == 0.5
+    assert rows.loc[(traders[3], mints[0]), "token_balance"] == 0.0
+    assert rows.loc[(traders[3], mints[0]), "sol_balance"] == 0.0
+    assert (rows.xs(mints[1], level="mint_address")["token_balance"] == 0.0).all()
+    print(f"✅ {n_traders} traders resolved with {len(rpc.calls)} RPC calls")
+
+
+if __name__ == "__main__":
+    test_balances_resolved_in_chunked_calls()
@@ -0,0 +1,120 @@
+import asyncio
+import importlib.util
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+import trade_manager
+from trade_manager import PortfolioManager
+
+# Other test modules swap supabase_utils for a MagicMock in sys.modules; load the real file directly
+_spec = importlib.util.spec_from_file_location("supabase_utils_real", Path(__file__).with_name("supabase_utils.py"))
+supabase_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_utils)
+
+
+def _manager():
+    # Only the daily-file cache state is needed
+    manager = object.__new__(PortfolioManager)
+    manager._daily_files = OrderedDict()
+    manager._daily_file_locks = {}
+    return manager
+
+
+class _FakeDownload:
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+
+    def __call__(self, save_path, remote_path, bucket=None):
+        self.calls.append(remote_path)
+        data = json.dumps(self.files[remote_path]).encode()
+        with open(save_path, "wb") as f:
+            f.write(data)
+        return data
+
+
+def _daily(n, roi=10):
+    return {"tokens": [{"mint": f"M{i}", "final_price": 1.0, "final_roi": roi + i, "ath_roi": 50} for i in range(n)]}
+
+
+def test_positions_on_same_day_share_one_download():
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = _FakeDownload({"analytics/discovery/daily/2026-01-05.json": _daily(300)})
+        with mock.patch.object(trade_manager, "download_file", fake), \
+                mock.patch.object(trade_manager, "DATA_DIR", Path(tmp)):
+            manager = _manager()
+
+            async def resolve_all():
+                return await asyncio.gather(*(
+                    manager.get_final_data_from_daily_file(f"M{i}", "discovery", "2026-01-05") for i in range(0, 300, 3)
+                ))
+
+            results = asyncio.run(resolve_all())
+            assert len(fake.calls) == 1
+            assert results[1] == {"final_price": 1.0, "final_roi": 13, "ath_roi": 50}
+            assert asyncio.run(manager.get_final_data_from_daily_file("missing", "discovery", "2026-01-05")) is None
+            assert len(fake.calls) == 1
+
+
+def test_revalidates_after_interval_and_evicts_oldest():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {f"analytics/alpha/daily/2026-01-{d:02d}.json": _daily(3) for d in range(1, 4)}
+        fake = _FakeDownload(files)
+        with mock.patch.object(trade_manager, "download_file", fake), \
+                mock.patch.object(trade_manager, "DATA_DIR", Path(tmp)), \
+                mock.patch.object(trade_manager, "DAILY_FILE_CACHE_SIZE", 2), \
+                mock.patch.object(trade_manager, "remove_local_copy", supabase_utils.remove_local_copy):
+            manager = _manager()
+            get = manager.get_final_data_from_daily_file
+            validators = os.path.join(tmp, "daily_2026-01-01_alpha.json" + supabase_utils.VALIDATORS_SUFFIX)
+            with open(validators, "w") as f:
+                json.dump({"file_name": "analytics/alpha/daily/2026-01-01.json"}, f)
+            assert asyncio.run(get("M0", "alpha", "2026-01-01"))["final_roi"] == 10
+
+            # The file changed upstream; after the revalidate interval the new content is picked up
+            files["analytics/alpha/daily/2026-01-01.json"] = _daily(3, roi=90)
+            assert asyncio.run(get("M0", "alpha", "2026-01-01"))["final_roi"] == 10
+            with mock.patch.object(trade_manager, "DAILY_FILE_REVALIDATE_SECS", 0):
+                assert asyncio.run(get("M0", "alpha", "2026-01-01"))["final_roi"] == 90
+
+            asyncio.run(get("M0", "alpha", "2026-01-02"))
+            asyncio.run(get("M0", "alpha", "2026-01-03"))
+            assert list(manager._daily_files) == [("alpha", "2026-01-02"), ("alpha", "2026-01-03")]
+            assert not os.path.exists(os.path.join(tmp, "daily_2026-01-01_alpha.json"))
+            assert not os.path.exists(validators)
+
+
+def test_eviction_keeps_locks_that_are_still_held():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {f"analytics/alpha/daily/2026-01-{d:02d}.json": _daily(3) for d in range(1, 4)}
+        fake = _FakeDownload(files)
+        with mock.patch.object(trade_manager, "download_file", fake), \
+                mock.patch.object(trade_manager, "DATA_DIR", Path(tmp)), \
+                mock.patch.object(trade_manager, "DAILY_FILE_CACHE_SIZE", 1), \
+                mock.patch.object(trade_manager, "remove_local_copy", supabase_utils.remove_local_copy):
+            manager = _manager()
+
+            async def scenario():
+                await manager._get_daily_file_index("alpha", "2026-01-01")
+                held = manager._daily_file_locks[("alpha", "2026-01-01")]
+                async with held:
+                    # Loading another day evicts 2026-01-01 while its lock is held
+                    await manager._get_daily_file_index("alpha", "2026-01-02")
+                    assert manager._daily_file_locks[("alpha", "2026-01-01")] is held
+                # Idle locks are dropped with their entry
+                await manager._get_daily_file_index("alpha", "2026-01-03")
+                assert ("alpha", "2026-01-02") not in manager._daily_file_locks
+
+            asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_positions_on_same_day_share_one_download()
+    test_revalidates_after_interval_and_evicts_oldest()
+    test_eviction_keeps_locks_that_are_still_held()
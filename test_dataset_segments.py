@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import collector
+from collector import PersistenceManager
+from extract_datasets import is_dataset_object, parse_segment
+
+collector.log = logging.getLogger("CollectorService")
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.objects = {}
+        self.fail = False
+
+    async def upload_file(self, local_path, remote_path, content_type="application/json"):
+        if self.fail:
+            raise RuntimeError("upload failed")
+        with open(local_path, "rb") as f:
+            self.objects[remote_path] = f.read()
+
+
+def _config(tmp, max_bytes=8 * 1024 * 1024):
+    return SimpleNamespace(
+        DATASET_DIR_LOCAL=tmp, DATASET_DIR_REMOTE="datasets", UPLOAD_TO_SUPABASE=True, CLEANUP_LOCAL_FILES=True,
+        DATASET_SEGMENT_MAX_BYTES=max_bytes, DATASET_SEGMENT_MAX_AGE_SECONDS=600,
+    )
+
+
+def _record(mint, i):
+    return {
+        "features": {"mint": mint, "checked_at_utc": f"2026-01-01T00:{i % 60:02d}:00+00:00", "price_usd": 0.001 * i},
+        "inputs": {"dexscreener_raw": {"pairs": [{"priceUsd": str(0.001 * i), "liquidity": {"usd": 1000 + i}}]}},
+        "label": {"status": "win" if i % 2 else "loss"},
+    }
+
+
+def _segments(supabase, folder):
+    return {k: v for k, v in supabase.objects.items() if k.startswith(folder) and k.endswith(".ndjson.gz")}
+
+
+def test_records_are_batched_into_indexed_segments():
+    tmp = tempfile.mkdtemp()
+    try:
+        supabase = FakeSupabase()
+        pm = PersistenceManager(_config(tmp), supabase)
+
+        async def scenario():
+            for i in range(200):
+                assert await pm.save_dataset(_record(f"Mint{i}", i), "discovery", "2026-01-01", f"Mint{i}")
+            assert await pm.save_dataset(_record("Late", 1), "alpha", "2026-01-02", "Late")
+            await pm.flush_datasets()  # nothing is old enough yet
+            assert supabase.objects == {}
+            await pm.flush_datasets(force=True)
+
+        asyncio.run(scenario())
+
+        # 201 records -> 2 segments + 2 indexes instead of 201 objects
+        assert len(supabase.objects) == 4
+        (seg_path, payload), = _segments(supabase, "datasets/discovery/2026-01-01/").items()
+        records = parse_segment(payload)
+        assert len(records) == 200 and records[5]["features"]["mint"] == "Mint5"
+
+        index = json.loads(supabase.objects[seg_path.replace(".ndjson.gz", ".idx.json")])
+        line = index["records"]["Mint7_2026-01-01T00-07-00_00-00"]
+        assert records[line]["features"]["mint"] == "Mint7"
+
+        legacy_bytes = sum(len(json.dumps(r, indent=2)) for r in records)
+        assert len(payload) * 5 < legacy_bytes
+
+        assert is_dataset_object(os.path.basename(seg_path))
+        assert not is_dataset_object(os.path.basename(seg_path).replace(".ndjson.gz", ".idx.json"))
+        assert os.listdir(os.path.join(tmp, "_spool", "discovery", "2026-01-01")) == []
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_size_rotation_recovery_and_retry():
+    tmp = tempfile.mkdtemp()
+    try:
+        supabase = FakeSupabase()
+        pm = PersistenceManager(_config(tmp, max_bytes=1000), supabase)
+
+        async def fill(pm, start, n):
+            for i in range(start, start + n):
+                await pm.save_dataset(_record(f"Mint{i}", i), "alpha", "2026-01-03", f"Mint{i}")
+
+        # Size threshold seals and publishes without an explicit flush
+        asyncio.run(fill(pm, 0, 10))
+        assert len(_segments(supabase, "datasets/alpha/2026-01-03/")) >= 2
+
+        # Uploads fail: the sealed spool stays on disk...
+        supabase.fail = True
+        pm.dataset_writer.config.DATASET_SEGMENT_MAX_BYTES = 10 ** 9
+        asyncio.run(fill(pm, 100, 3))
+        asyncio.run(pm.flush_datasets(force=True))
+
+        # ...and a restarted writer recovers and publishes it
+        supabase.fail = False
+        before = len(_segments(supabase, "datasets/alpha/2026-01-03/"))
+        restarted = PersistenceManager(_config(tmp), supabase)
+        asyncio.run(restarted.flush_datasets())
+        segments = _segments(supabase, "datasets/alpha/2026-01-03/")
+        assert len(segments) == before + 1
+        mints = sorted(r["features"]["mint"] for p in segments.values() for r in parse_segment(p))
+        assert mints == sorted([f"Mint{i}" for i in range(10)] + ["Mint100", "Mint101", "Mint102"])
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_on_published_runs_only_after_upload():
+    tmp = tempfile.mkdtemp()
+    try:
+        supabase = FakeSupabase()
+        supabase.fail = True
+        pm = PersistenceManager(_config(tmp), supabase)
+        published = []
+
+        async def scenario():
+            async def on_published():
+                published.append("Mint1")
+
+            assert await pm.save_dataset(_record("Mint1", 1), "alpha", "2026-01-04", "Mint1", on_published=on_published)
+            await pm.flush_datasets(force=True)
+            assert published == []  # upload failed: the source must not be deleted yet
+            supabase.fail = False
+            await pm.flush_datasets()
+            assert published == ["Mint1"]
+
+        asyncio.run(scenario())
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_service_flushes_datasets_on_shutdown():
+    flushes = []
+
+    async def flush_datasets(force=False):
+        flushes.append(force)
+
+    def stopped(_):
+        raise asyncio.CancelledError
+
+    service = SimpleNamespace(
+        config=SimpleNamespace(POLL_INTERVAL=1, AGGREGATOR_INTERVAL=1, SNAPSHOT_MANIFEST_RECONCILE_SECONDS=1),
+        active_snapshot_files=SimpleNamespace(is_stale=stopped),
+        persistence=SimpleNamespace(flush_datasets=flush_datasets),
+    )
+    try:
+        asyncio.run(collector.CollectorService.run(service))
+    except asyncio.CancelledError:
+        pass
+    assert flushes == [True]
+
+
+if __name__ == "__main__":
+    test_records_are_batched_into_indexed_segments()
+    test_size_rotation_recovery_and_retry()
+    test_on_published_runs_only_after_upload()
+    test_service_flushes_datasets_on_shutdown()
+    print("✅ Dataset segment tests passed")
@@ -0,0 +1,46 @@
+import asyncio
+import gzip
+import json
+
+from diagnostic import scan_dataset_folder
+
+
+class FakeStorage:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def list(self, folder, options=None):
+        return [{"name": p[len(folder) + 1:]} for p in self.objects if p.startswith(folder + "/")]
+
+    def download(self, path):
+        return self.objects[path]
+
+
+def _segment(mints):
+    lines = "\n".join(json.dumps({"features": {"mint": m}}) for m in mints) + "\n"
+    return gzip.compress(lines.encode())
+
+
+def test_counts_records_from_indexes_and_legacy_files():
+    folder = "datasets/discovery/2026-01-01"
+    objects = {
+        f"{folder}/segment_a.ndjson.gz": _segment(["MintA", "MintB", "MintA"]),
+        f"{folder}/segment_a.idx.json": json.dumps({
+            "segment": "segment_a.ndjson.gz", "count": 3,
+            "records": {"MintA_2026-01-01T00-00-00_00-00": 0, "MintB_2026-01-01T01-00-00_00-00": 1,
+                        "MintA_2026-01-01T02-00-00_00-00": 2},
+        }).encode(),
+        # Index not uploaded yet: records are read from the segment itself
+        f"{folder}/segment_b.ndjson.gz": _segment(["MintC", "MintD"]),
+        f"{folder}/MintE_2025-12-31T00-00-00_00-00.json": b"{}",
+    }
+
+    count, mints = asyncio.run(scan_dataset_folder(FakeStorage(objects), folder))
+
+    assert count == 6
+    assert mints == {"MintA", "MintB", "MintC", "MintD", "MintE"}
+
+
+if __name__ == "__main__":
+    test_counts_records_from_indexes_and_legacy_files()
+    print("✅ Diagnostic tests passed")
@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Other test modules swap supabase_utils for a MagicMock in sys.modules; load the real file directly
+_spec = importlib.util.spec_from_file_location("supabase_utils_real", Path(__file__).with_name("supabase_utils.py"))
+supabase_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_utils)
+
+
+class _FakeStorage:
+    """Signs URLs and serves one object with an ETag, honouring If-None-Match."""
+
+    def __init__(self, body=b"payload", etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.signed = 0
+        self.gets = []
+        self.rejected_tokens = set()
+
+    def create_signed_url(self, file_name, expires_in):
+        self.signed += 1
+        return {"signedURL": f"https://storage/{file_name}?token={self.signed}"}
+
+    def get(self, url, headers=None, timeout=None):
+        self.gets.append((url, dict(headers or {})))
+        if url.rsplit("=", 1)[1] in self.rejected_tokens:
+            return SimpleNamespace(status_code=400, headers={}, content=b"", text="jwt expired")
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return SimpleNamespace(status_code=304, headers={}, content=b"", text="")
+        return SimpleNamespace(status_code=200, headers={"ETag": self.etag}, content=self.body, text="")
+
+
+def _restart():
+    supabase_utils._file_cache_headers.clear()
+    supabase_utils._signed_url_cache.clear()
+
+
+def _patched(storage):
+    client = SimpleNamespace(storage=SimpleNamespace(from_=lambda bucket: storage))
+    return (mock.patch.object(supabase_utils, "get_supabase_client", return_value=client),
+            mock.patch.object(supabase_utils.requests, "get", storage.get))
+
+
+def test_steady_state_and_restart_are_single_304():
+    _restart()
+    storage = _FakeStorage()
+    patch_client, patch_get = _patched(storage)
+    with tempfile.TemporaryDirectory() as tmp, patch_client, patch_get:
+        save_path = os.path.join(tmp, "overlap.pkl")
+        assert supabase_utils.download_file(save_path, "overlap.pkl") == b"payload"
+        assert os.path.exists(save_path + supabase_utils.VALIDATORS_SUFFIX)
+
+        # Steady-state poll: cached URL, one conditional request
+        assert supabase_utils.download_file(save_path, "overlap.pkl") == b"payload"
+        assert storage.signed == 1
+        assert len(storage.gets) == 2 and storage.gets[-1][1] == {"If-None-Match": '"v1"'}
+
+        # Restart: validators come back from disk, so the first poll is still a 304
+        _restart()
+        assert supabase_utils.download_file(save_path, "overlap.pkl") == b"payload"
+        assert storage.gets[-1][1] == {"If-None-Match": '"v1"'}
+        assert len(storage.gets) == 3
+
+        # Validators are ignored when the local copy is gone
+        os.remove(save_path)
+        assert supabase_utils.download_file(save_path, "overlap.pkl") == b"payload"
+        assert storage.gets[-1][1] == {}
+
+
+def test_expired_or_rejected_urls_are_re_signed():
+    _restart()
+    storage = _FakeStorage()
+    patch_client, patch_get = _patched(storage)
+    with tempfile.TemporaryDirectory() as tmp, patch_client, patch_get:
+        save_path = os.path.join(tmp, "overlap.pkl")
+        supabase_utils.download_file(save_path, "overlap.pkl")
+
+        url, _ = supabase_utils._signed_url_cache[(supabase_utils.BUCKET_NAME, "overlap.pkl")]
+        supabase_utils._signed_url_cache[(supabase_utils.BUCKET_NAME, "overlap.pkl")] = (url, 0)
+        supabase_utils.download_file(save_path, "overlap.pkl")
+        assert storage.signed == 2
+
+        storage.rejected_tokens.add("2")
+        assert supabase_utils.download_file(save_path, "overlap.pkl") == b"payload"
+        assert storage.signed == 3
+        assert storage.gets[-1][0].endswith("token=3")
+
+
+if __name__ == "__main__":
+    test_steady_state_and_restart_are_single_304()
+    test_expired_or_rejected_urls_are_re_signed()
@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from extract_datasets import FeatureExtractor
+
+
+def _snapshot(mint, status="win"):
+    return {
+        "features": {"mint": mint, "signal_source": "discovery", "checked_at_utc": "2026-01-01T00:00:00+00:00",
+                     "checked_at_timestamp": 1767225600, "price_usd": 0.5, "liquidity_usd": 1000.0},
+        "inputs": {"rugcheck_raw": {"raw": {"creator": "Creator1", "token": {"supply": 1000, "decimals": 6}}}},
+        "finalization": {"token_age_hours_at_signal": 3.0},
+        "label": {"status": status, "ath_roi": 120, "final_roi": 40, "hit_50_percent": True},
+    }
+
+
+class FakeBucket:
+    """storage.from_(bucket) stand-in: `objects` maps path -> bytes; eTag is a content hash."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def from_(self, bucket):
+        return self
+
+    def list(self, folder):
+        names = {}
+        for path, payload in self.objects.items():
+            if path.startswith(folder + "/"):
+                name = path[len(folder) + 1:].split("/")[0]
+                is_file = "/" not in path[len(folder) + 1:]
+                meta = {"eTag": str(hash(payload)), "size": len(payload)} if is_file else None
+                names[name] = {"name": name, "metadata": meta}
+        return list(names.values())
+
+    def download(self, path):
+        with self._lock:
+            self.downloads.append(path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        return self.objects[path]
+
+
+def _bucket():
+    objects = {}
+    for day in ("2026-01-01", "2026-01-02"):
+        for i in range(6):
+            objects[f"datasets/discovery/{day}/M{day[-1]}{i}_ts.json"] = json.dumps(_snapshot(f"M{day[-1]}{i}")).encode()
+    segment = "\n".join(json.dumps(_snapshot(f"S{i}", "loss")) for i in range(4)) + "\n"
+    objects["datasets/discovery/2026-01-02/segment_a.ndjson.gz"] = gzip.compress(segment.encode())
+    objects["datasets/discovery/2026-01-02/segment_a.idx.json"] = b'{"records": {}}'
+    return objects
+
+
+def test_parallel_extraction_hits_cache_on_rebuild():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        storage = FakeBucket(_bucket())
+        extractor = FeatureExtractor(cache_dir=cache_dir, concurrency=4, client=type("C", (), {"storage": storage})())
+        rows = asyncio.run(extractor.extract_all_data("discovery"))
+
+        assert len(rows) == 16
+        assert sorted(r["mint"] for r in rows if r["label_status"] == "loss") == ["S0", "S1", "S2", "S3"]
+        assert len(storage.downloads) == 13  # 12 JSON + 1 segment, never the index
+        assert 1 < storage.max_active <= 4
+
+        # Full rebuild with a fresh extractor: everything comes from the local feature cache
+        storage.downloads.clear()
+        again = FeatureExtractor(cache_dir=cache_dir, concurrency=4, client=type("C", (), {"storage": storage})())
+        rebuilt = asyncio.run(again.extract_all_data("discovery"))
+        assert storage.downloads == []
+        assert again.cache_stats["feature_hits"] == 13
+        assert sorted(rebuilt, key=lambda r: r["mint"]) == sorted(rows, key=lambda r: r["mint"])
+
+        # A new and a changed object are the only downloads on the next run
+        storage.objects["datasets/discovery/2026-01-02/Mnew_ts.json"] = json.dumps(_snapshot("Mnew")).encode()
+        storage.objects["datasets/discovery/2026-01-01/M10_ts.json"] = json.dumps(_snapshot("M10", "loss")).encode()
+        rows3 = asyncio.run(again.extract_date_range("discovery", "2026-01-01", "2026-01-02"))
+        assert sorted(storage.downloads) == [
+            "datasets/discovery/2026-01-01/M10_ts.json",
+            "datasets/discovery/2026-01-02/Mnew_ts.json",
+        ]
+        assert len(rows3) == 17
+        assert next(r for r in rows3 if r["mint"] == "M10")["label_status"] == "loss"
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_objects_in_flight_stay_bounded_across_folders():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        objects = {}
+        for day in range(1, 7):
+            for i in range(10):
+                objects[f"datasets/discovery/2026-01-{day:02d}/M{day}_{i}_ts.json"] = json.dumps(_snapshot(f"M{day}_{i}")).encode()
+        storage = FakeBucket(objects)
+        extractor = FeatureExtractor(cache_dir=cache_dir, concurrency=3, client=type("C", (), {"storage": storage})())
+        stats = {"active": 0, "max_active": 0}
+        extract = extractor._extract_object
+
+        async def tracked(remote_path, version):
+            stats["active"] += 1
+            stats["max_active"] = max(stats["max_active"], stats["active"])
+            try:
+                return await extract(remote_path, version)
+            finally:
+                stats["active"] -= 1
+
+        extractor._extract_object = tracked
+        rows = asyncio.run(extractor.extract_all_data("discovery"))
+
+        assert len(rows) == 60
+        assert 1 < stats["max_active"] <= 3
+        assert storage.max_active <= 3
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    test_parallel_extraction_hits_cache_on_rebuild()
+    test_objects_in_flight_stay_bounded_across_folders()
+    print("✅ Extraction cache tests passed")
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from shared.job_engine import JobEngine, job_key
+
+
+def _fake_pipeline(tokens, window=None, job_id="unknown", progress=None):
+    # Module-level so the spawned worker can import it
+    time.sleep(0.3)
+    progress("trades_fetched", trades=len(tokens) * 10)
+    time.sleep(0.2)
+    progress("candles_built", candles=5)
+    return {"tokens": sorted(tokens), "window": window, "pid": os.getpid()}
+
+
+def _wait_done(engine, job_id, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = engine.status(job_id)
+        if status and status["status"] != "running":
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_key_ignores_token_order():
+    assert job_key({"tokens": ["b", "a "], "window": 1}) == job_key({"window": 1, "tokens": ["a", "b"]})
+    assert job_key({"tokens": ["a"], "window": 1}) != job_key({"tokens": ["a"], "window": 2})
+
+
+def test_dedup_cache_and_snapshot():
+    uploads = []
+
+    def on_result(job_id, result):
+        uploads.append((job_id, result))
+        return {"supabasePath": f"bucket/{job_id}.pkl"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / "jobs.json"
+        engine = JobEngine(_fake_pipeline, max_workers=2, result_ttl=60, snapshot_file=snapshot,
+                           snapshot_interval=0.1, on_result=on_result)
+        engine.start()
+        try:
+            first = engine.submit({"tokens": ["a", "b"], "window": None})
+            again = engine.submit({"tokens": ["b", "a"], "window": None})
+            other = engine.submit({"tokens": ["a", "b"], "window": 2})
+
+            assert again["jobId"] == first["jobId"] and again["deduplicated"]
+            assert other["jobId"] != first["jobId"]
+
+            status = _wait_done(engine, first["jobId"])
+            _wait_done(engine, other["jobId"])
+            assert status["status"] == "done"
+            assert status["supabasePath"] == f"bucket/{first['jobId']}.pkl"
+            # Three submissions, two distinct parameter sets -> two runs, both in worker processes
+            assert len(uploads) == 2
+            assert all(result["pid"] != os.getpid() for _, result in uploads)
+
+            cached = engine.submit({"tokens": ["a", "b"], "window": None})
+            assert cached == {"jobId": first["jobId"], "status": "done", "deduplicated": False, "cached": True}
+            assert engine.stats()["cache_hits"] == 1 and engine.stats()["deduplicated"] == 1
+
+            running = engine.submit({"tokens": ["c"], "window": None})["jobId"]
+            time.sleep(0.3)  # let a snapshot catch the running job
+        finally:
+            engine.stop()
+
+        restored = JobEngine(_fake_pipeline, max_workers=1, snapshot_file=snapshot)
+        restored.load_snapshot()
+        assert restored.status(first["jobId"])["status"] == "done"
+        assert restored.status(running)["status"] in ("done", "failed")
+        restored.stop()
+
+
+def test_events_stream_stages_then_done():
+    async def collect(engine, job_id):
+        return [e async for e in engine.events(job_id, keepalive_secs=0.1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = JobEngine(_fake_pipeline, max_workers=1, snapshot_file=Path(tmp) / "jobs.json",
+                           on_result=lambda job_id, result: {"supabasePath": "x"})
+        try:
+            job_id = engine.submit({"tokens": ["a", "b"]})["jobId"]
+            events = asyncio.run(collect(engine, job_id))
+            stages = [e["stage"] for e in events if e is not None]
+            assert stages == ["started", "trades_fetched", "candles_built", "upload_done", "done"], stages
+            assert None in events  # keepalives while the worker sleeps
+            fetched = next(e for e in events if e and e["stage"] == "trades_fetched")
+            assert fetched["trades"] == 20 and fetched["elapsedSecs"] >= 0
+
+            # A late subscriber gets the recorded history and the final state
+            replay = [e["stage"] for e in asyncio.run(collect(engine, job_id))]
+            assert replay == ["started", "trades_fetched", "candles_built", "upload_done", "done"]
+            assert engine.status(job_id)["stage"] == "upload_done"
+            assert asyncio.run(collect(engine, "missing")) == []
+        finally:
+            engine.stop()
+
+
+def test_expired_cache_reruns():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = JobEngine(_fake_pipeline, max_workers=1, result_ttl=0.2,
+                           snapshot_file=Path(tmp) / "jobs.json")
+        try:
+            first = engine.submit({"tokens": ["a"]})["jobId"]
+            _wait_done(engine, first)
+            time.sleep(0.3)
+            second = engine.submit({"tokens": ["a"]})
+            assert second["jobId"] != first and not second["cached"]
+            _wait_done(engine, second["jobId"])
+        finally:
+            engine.stop()
+
+
+if __name__ == "__main__":
+    test_job_key_ignores_token_order()
+    test_dedup_cache_and_snapshot()
+    test_events_stream_stages_then_done()
+    test_expired_cache_reruns()
+    print("✅ Job engine tests passed")
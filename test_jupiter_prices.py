@@ -0,0 +1,72 @@
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+from shared import jupiter_prices
+from shared.jupiter_prices import JupiterPriceCache
+
+
+class _FakeJupiter:
+    def __init__(self, unpriced=(), fail=False):
+        self.calls = []
+        self.unpriced = set(unpriced)
+        self.fail = fail
+
+    async def __call__(self, url, params=None, timeout=None):
+        ids = params["ids"].split(",")
+        self.calls.append(ids)
+        if self.fail:
+            return None
+        return {m: {"usdPrice": 1.5} for m in ids if m not in self.unpriced}
+
+
+def test_batches_and_caches_across_callers():
+    fake = _FakeJupiter(unpriced={"m7"})
+    cache = JupiterPriceCache(ttl=60, ids_per_call=50)
+    with mock.patch.object(jupiter_prices, "fetch_json", fake):
+        prices = asyncio.run(cache.get_prices([f"m{i}" for i in range(120)] + ["m1"]))
+        assert sorted(len(c) for c in fake.calls) == [20, 50, 50]
+        assert len(prices) == 119 and "m7" not in prices
+
+        # A second user's lookup (including the unpriced mint) is served from memory
+        again = asyncio.run(cache.get_prices(["m1", "m7", "m99"]))
+        assert again == {"m1": 1.5, "m99": 1.5}
+        assert len(fake.calls) == 3
+
+
+def test_failed_lookups_are_not_cached():
+    fake = _FakeJupiter(fail=True)
+    cache = JupiterPriceCache(ttl=60)
+    with mock.patch.object(jupiter_prices, "fetch_json", fake):
+        assert asyncio.run(cache.get_price("m1")) == 0.0
+        fake.fail = False
+        assert asyncio.run(cache.get_price("m1")) == 1.5
+
+
+def test_update_positions_uses_one_batched_lookup():
+    from trade_manager import PortfolioManager
+
+    positions = {f"m{i}_discovery": {"mint": f"m{i}", "signal_type": "discovery", "status": "active",
+                                     "entry_price": 1.0, "current_price": 0.9} for i in range(30)}
+    portfolio = {"positions": positions}
+
+    async def download_active_tracking():
+        return {"m0_discovery": {"current_price": 2.0}}
+
+    manager = SimpleNamespace(get_portfolio=lambda chat_id: portfolio, download_active_tracking=download_active_tracking)
+    fake = _FakeJupiter(unpriced={"m5"})
+    with mock.patch.object(jupiter_prices, "fetch_json", fake), \
+            mock.patch("trade_manager.JUPITER_PRICES", JupiterPriceCache()):
+        live = asyncio.run(PortfolioManager.update_positions_with_live_prices(manager, "1"))
+
+    assert len(fake.calls) == 1 and len(fake.calls[0]) == 29
+    assert live["m0"] == 2.0 and live["m1"] == 1.5 and live["m5"] == 0.9
+
+
+if __name__ == "__main__":
+    test_batches_and_caches_across_callers()
+    test_failed_lookups_are_not_cached()
+    test_update_positions_uses_one_batched_lookup()
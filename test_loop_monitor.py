@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from shared.loop_monitor import LoopLagMonitor
+
+
+def _blocking_helper():
+    # Stand-in for a sync requests.get() on an async path
+    time.sleep(0.6)
+
+
+def test_blocking_callback_is_reported_with_stack():
+    async def scenario():
+        monitor = LoopLagMonitor(threshold_secs=0.2, interval_secs=0.05)
+        monitor.start()
+        await asyncio.sleep(0.1)
+
+        _blocking_helper()
+        await asyncio.sleep(0.1)
+
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    stalls = monitor.recent_stalls()
+
+    assert monitor.stall_count == 1
+    assert "_blocking_helper" in stalls[0]["stack"]
+    assert stalls[0]["blocked_secs"] >= 0.5
+    assert monitor.stats()["max_lag_ms"] >= 500
+    print("✅ Blocking callback detected:", monitor.stats())
+
+
+def test_idle_loop_has_no_stalls():
+    async def scenario():
+        monitor = LoopLagMonitor(threshold_secs=0.2, interval_secs=0.05)
+        monitor.start()
+        await asyncio.sleep(0.3)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.stall_count == 0
+    assert monitor.recent_stalls() == []
+
+
+if __name__ == "__main__":
+    test_blocking_callback_is_reported_with_stack()
+    test_idle_loop_has_no_stalls()
@@ -0,0 +1,105 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+from alpha import build_minute_prices_from_trades
+
+
+def _reference_minute_prices(trades_df: pd.DataFrame) -> pd.DataFrame:
+    """Previous per-group implementation, kept as the correctness reference."""
+    df = trades_df.copy()
+    df["block_time"] = pd.to_datetime(df["block_time"])
+    df["price_for_price_series"] = df["price_usd_at_trade"].fillna(df.get("derived_price"))
+    df["minute"] = df["block_time"].dt.floor("min")
+
+    rows = []
+    for (mint, minute), g in df.groupby(["mint_address", "minute"], sort=True):
+        prices = g["price_for_price_series"].dropna()
+        if prices.empty:
+            continue
+        if g["amount_usd"].notna().any():
+            weights = g["amount_usd"].fillna(0.0)
+            denom = weights.sum()
+            vwap = (prices * weights).sum() / denom if denom > 0 else prices.mean()
+        else:
+            vwap = prices.mean()
+        rows.append({
+            "mint_address": mint,
+            "minute": minute,
+            "open": prices.iloc[0],
+            "high": prices.max(),
+            "low": prices.min(),
+            "close": prices.iloc[-1],
+            "vwap": vwap,
+            "volume_usd": g["amount_usd"].fillna(0.0).sum(),
+        })
+    return pd.DataFrame(rows).sort_values(["mint_address", "minute"]).reset_index(drop=True)
+
+
+def _synthetic_trades(n_trades: int, n_tokens: int = 20, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01")
+    seconds = rng.integers(0, 12 * 3600, n_trades)
+    price = rng.lognormal(-8, 1, n_trades)
+    amount = rng.lognormal(3, 1.5, n_trades)
+
+    # Sprinkle the gaps real swap data has
+    price[rng.random(n_trades) < 0.05] = np.nan
+    amount[rng.random(n_trades) < 0.05] = np.nan
+    derived = np.where(rng.random(n_trades) < 0.5, price * 1.01, np.nan)
+
+    return pd.DataFrame({
+        "block_time": start + pd.to_timedelta(np.sort(seconds), unit="s"),
+        "mint_address": rng.choice([f"mint{i}" for i in range(n_tokens)], n_trades),
+        "price_usd_at_trade": price,
+        "derived_price": derived,
+        "amount_usd": amount,
+    })
+
+
+def test_matches_reference_output():
+    trades = _synthetic_trades(5_000, n_tokens=5)
+    # A minute with no usable prices and one with zero volume
+    trades.loc[0:2, ["price_usd_at_trade", "derived_price"]] = np.nan
+    trades.loc[10:12, "amount_usd"] = 0.0
+
+    expected = _reference_minute_prices(trades)
+    actual = build_minute_prices_from_trades(trades)
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-12)
+
+
+def test_empty_input():
+    out = build_minute_prices_from_trades(pd.DataFrame())
+    assert out.empty
+    assert list(out.columns) == ["mint_address", "minute", "open", "high", "low", "close", "vwap", "volume_usd"]
+
+
+def benchmark_minute_prices(n_trades: int = 100_000):
+    trades = _synthetic_trades(n_trades)
+
+    t0 = time.perf_counter()
+    expected = _reference_minute_prices(trades)
+    loop_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual = build_minute_prices_from_trades(trades)
+    vector_secs = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-12)
+    speedup = loop_secs / vector_secs
+    print(
+        f"📊 {n_trades:,} trades -> {len(actual):,} candles | "
+        f"loop {loop_secs:.2f}s, vectorized {vector_secs:.3f}s ({speedup:.0f}x)"
+    )
+    return speedup
+
+
+if __name__ == "__main__":
+    test_matches_reference_output()
+    test_empty_input()
+    assert benchmark_minute_prices(100_000) >= 10
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from shared.ml_batcher import MLBatchScorer
+
+
+class _VectorPredictor:
+    """Scores a stacked feature matrix in one call."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.threads = set()
+
+    def predict_batch(self, mints, threshold=0.5, **_):
+        self.batch_sizes.append(len(mints))
+        self.threads.add(threading.get_ident())
+        features = np.array([[len(m), sum(map(ord, m)) % 97] for m in mints], dtype=float)
+        probs = 1.0 / (1.0 + np.exp(-(features[:, 1] / 97.0 - 0.5)))
+        time.sleep(0.02)  # model cost
+        return [
+            {"win_probability": float(p), "action": "BUY" if p >= threshold else "SKIP"}
+            for p in probs
+        ]
+
+
+class _RowPredictor:
+    def predict(self, mint, **_):
+        if mint == "bad":
+            raise ValueError("no features")
+        return {"win_probability": 0.9, "action": "BUY"}
+
+
+def test_concurrent_gate_requests_share_one_batch():
+    predictor = _VectorPredictor()
+
+    async def scenario():
+        scorer = MLBatchScorer(predictor, window_secs=0.05)
+        mints = [f"mint{i}" for i in range(40)]
+        results = await asyncio.gather(*(scorer.score(m, threshold=0.5) for m in mints))
+        scorer.close()
+        return scorer, results
+
+    scorer, results = asyncio.run(scenario())
+    assert predictor.batch_sizes == [40]
+    assert threading.get_ident() not in predictor.threads
+    assert len(results) == 40 and all("win_probability" in r for r in results)
+
+    stats = scorer.stats()
+    assert stats["rows"] == 40 and stats["batches"] == 1
+    assert stats["rows_per_sec"] > 0 and stats["gate_latency_p95_ms"] is not None
+    print("✅ ML batch stats:", stats)
+
+
+def test_different_params_and_row_fallback():
+    async def scenario():
+        scorer = MLBatchScorer(_RowPredictor(), window_secs=0.01)
+        a, b, bad = await asyncio.gather(
+            scorer.score("a", signal_type="alpha"),
+            scorer.score("b", signal_type="discovery"),
+            scorer.score("bad", signal_type="alpha"),
+        )
+        scorer.close()
+        return scorer, a, b, bad
+
+    scorer, a, b, bad = asyncio.run(scenario())
+    assert scorer.batches == 2
+    assert a["action"] == "BUY" and b["action"] == "BUY"
+    assert bad["action"] == "ERROR" and "no features" in bad["error"]
+
+
+class _ShortPredictor:
+    def predict_batch(self, mints, **_):
+        return [{"action": "BUY"}] * (len(mints) - 1)
+
+
+class _StuckPredictor:
+    def predict_batch(self, mints, **_):
+        time.sleep(0.2)
+        return [{"action": "BUY"} for _ in mints]
+
+
+def test_short_batch_resolves_every_request():
+    async def scenario():
+        scorer = MLBatchScorer(_ShortPredictor(), window_secs=0.01)
+        results = await asyncio.wait_for(asyncio.gather(*(scorer.score(m) for m in "abc")), 2)
+        scorer.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [r["action"] for r in results] == ["ERROR"] * 3
+    assert all("mismatch" in r["error"] for r in results)
+
+
+def test_cancelled_batch_resolves_waiters():
+    async def scenario():
+        scorer = MLBatchScorer(_StuckPredictor(), window_secs=0.01)
+        waiters = [asyncio.ensure_future(scorer.score(m)) for m in "ab"]
+        await asyncio.sleep(0.05)
+        for task in list(scorer._batch_tasks):
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        scorer.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [r["action"] for r in results] == ["ERROR", "ERROR"]
+
+
+if __name__ == "__main__":
+    test_concurrent_gate_requests_share_one_batch()
+    test_different_params_and_row_fallback()
+    test_short_batch_resolves_every_request()
+    test_cancelled_batch_resolves_waiters()
@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+from alerts.ml_client import MLAPIClient
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.status = 200
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    """Records calls and answers like the ML API."""
+
+    closed = False
+
+    def __init__(self):
+        self.batch_calls = []
+        self.get_calls = []
+        self.get_timeouts = []
+
+    def post(self, url, json=None, params=None, timeout=None):
+        self.batch_calls.append(list(json))
+        assert len(json) <= 10
+        return _FakeResponse({
+            "predictions": [
+                {"mint": m, "success": True, "prediction": {"action": "BUY", "win_probability": 0.8}}
+                for m in json
+            ],
+            "successful_predictions": len(json),
+        })
+
+    def get(self, url, params=None, timeout=None):
+        self.get_calls.append(url)
+        self.get_timeouts.append(timeout)
+        return _FakeResponse({"prediction": {"action": "SKIP", "win_probability": 0.2}})
+
+
+def _client():
+    client = MLAPIClient(base_url="http://ml", timeout=30, cache_ttl=60, batch_concurrency=4)
+    client._session = _FakeSession()
+    return client
+
+
+def test_large_list_is_split_and_streamed():
+    async def scenario():
+        client = _client()
+        mints = [f"mint{i}" for i in range(25)]
+        chunks = [chunk async for chunk in client.iter_predictions(mints)]
+        return client, chunks
+
+    client, chunks = asyncio.run(scenario())
+    assert sorted(len(c) for c in client._session.batch_calls) == [5, 10, 10]
+    assert len(chunks) == 3
+    assert sum(len(c) for c in chunks) == 25
+
+
+def test_cache_and_coalescing():
+    async def scenario():
+        client = _client()
+        # Same mint requested concurrently -> one HTTP call
+        a, b = await asyncio.gather(client.predict_token("m1"), client.predict_token("m1"))
+        # Cached: no further calls, also served to batch requests
+        again = await client.predict_token("m1")
+        batch = await client.predict_batch(["m1", "m2", "m2"])
+        # Different threshold is a different cache key
+        await client.predict_token("m1", threshold=0.5)
+        return client, a, b, again, batch
+
+    client, a, b, again, batch = asyncio.run(scenario())
+    session = client._session
+    assert len(session.get_calls) == 2
+    # /predict keeps its long timeout regardless of the session default
+    assert all(t.total == 300 for t in session.get_timeouts)
+    assert session.batch_calls == [["m2"]]
+    assert a == again and b["prediction"]["action"] == "SKIP"
+    assert [p["mint"] for p in batch["predictions"]] == ["m1", "m2"]
+    assert batch["successful_predictions"] == 2 and batch["buy_signals"] == 1
+
+
+if __name__ == "__main__":
+    test_large_list_is_split_and_streamed()
+    test_cache_and_coalescing()
@@ -0,0 +1,107 @@
+import asyncio
+import importlib.util
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+# Other test modules swap supabase_utils for a MagicMock in sys.modules; load the real file directly
+_spec = importlib.util.spec_from_file_location("supabase_utils_real", Path(__file__).with_name("supabase_utils.py"))
+supabase_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_utils)
+
+
+class _FakeDexscreener:
+    """requests.get stand-in for the batched tokens endpoint."""
+
+    def __init__(self, unknown=()):
+        self.calls = []
+        self.unknown = set(unknown)
+        self._lock = threading.Lock()
+
+    def __call__(self, url, timeout=None):
+        tokens = url.rsplit("/", 1)[1].split(",")
+        with self._lock:
+            self.calls.append(tokens)
+        pairs = [
+            {"priceUsd": "0.5", "baseToken": {"address": t, "symbol": f"S{t}", "name": f"Name {t}"}}
+            for t in tokens if t not in self.unknown
+        ]
+        return mock.Mock(json=lambda: {"pairs": pairs}, raise_for_status=lambda: None)
+
+
+def _write_overlap(path, n_tokens):
+    data = {
+        f"tok{i}": [{"grade": "HIGH", "checked_at": f"2026-01-01T00:{i % 60:02d}:00",
+                     "token_metadata": {"symbol": "N/A"}}]
+        for i in range(n_tokens)
+    }
+    data["skipped"] = [{"grade": "NONE", "checked_at": "2026-01-01T00:00:00"}]
+    with open(path, "wb") as f:
+        pickle.dump(data, f)
+
+
+def test_batches_and_skips_enriched_tokens():
+    supabase_utils._dexscreener_info_cache.clear()
+    fake = _FakeDexscreener(unknown={"tok3"})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "overlap.pkl")
+        _write_overlap(path, 75)
+
+        with mock.patch.object(supabase_utils.requests, "get", fake):
+            supabase_utils.prepare_json_from_pkl(path, debug=False)
+            assert sorted(len(c) for c in fake.calls) == [15, 30, 30]
+            assert "skipped" not in {t for c in fake.calls for t in c}
+
+            with open(path, "rb") as f:
+                enriched = pickle.load(f)
+            assert enriched["tok1"][-1]["token_metadata"] == {"symbol": "Stok1", "name": "Name tok1"}
+            assert enriched["tok1"][-1]["dexscreener"]["current_price_usd"] == 0.5
+
+            # Second upload: enriched tokens are skipped, the unknown one is a cached miss
+            fake.calls.clear()
+            supabase_utils.prepare_json_from_pkl(path, debug=False)
+            assert fake.calls == []
+
+
+def test_stale_prices_are_refreshed():
+    supabase_utils._dexscreener_info_cache.clear()
+    fake = _FakeDexscreener()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "overlap.pkl")
+        _write_overlap(path, 2)
+
+        with mock.patch.object(supabase_utils.requests, "get", fake):
+            supabase_utils.prepare_json_from_pkl(path, debug=False)
+            supabase_utils._dexscreener_info_cache.clear()
+            with mock.patch.object(supabase_utils.time, "time",
+                                   return_value=supabase_utils.time.time() + supabase_utils.DEXSCREENER_PRICE_TTL + 1):
+                supabase_utils.prepare_json_from_pkl(path, debug=False)
+        assert len(fake.calls) == 2
+
+
+def test_async_lookup_uses_shared_session_fetch():
+    calls = []
+
+    async def fake_fetch_json(url, params=None, headers=None, timeout=None):
+        calls.append((url, timeout))
+        if url.endswith("/missing"):
+            return None
+        return {"pairs": [{"priceUsd": "0.25", "baseToken": {"symbol": "ABC", "name": "Abc"}}]}
+
+    with mock.patch.object(supabase_utils, "fetch_json", fake_fetch_json), \
+            mock.patch.object(supabase_utils.requests, "get", side_effect=AssertionError("blocking call")):
+        info = asyncio.run(supabase_utils.fetch_dexscreener_token_info_async("mintA", debug=False))
+        missing = asyncio.run(supabase_utils.fetch_dexscreener_token_info_async("missing", debug=False))
+
+    assert info == {"price_usd": 0.25, "symbol": "ABC", "name": "Abc"}
+    assert missing == {}
+    assert calls[0] == ("https://api.dexscreener.com/latest/dex/tokens/mintA", 10)
+
+
+if __name__ == "__main__":
+    test_batches_and_skips_enriched_tokens()
+    test_stale_prices_are_refreshed()
+    test_async_lookup_uses_shared_session_fetch()
@@ -0,0 +1,110 @@
+import importlib.util
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+# Other test modules swap supabase_utils for a MagicMock in sys.modules; load the real file directly
+_spec = importlib.util.spec_from_file_location("supabase_utils_real", Path(__file__).with_name("supabase_utils.py"))
+supabase_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_utils)
+
+
+def _reference_export(sorted_tokens, max_size_mb):
+    """Previous drop-one-and-reserialize loop, kept as the correctness reference."""
+    pruned = dict(sorted_tokens)
+    json_bytes = json.dumps(pruned, indent=2, default=str).encode()
+    while len(json_bytes) / (1024 * 1024) > max_size_mb and pruned:
+        sorted_tokens = sorted_tokens[:-1]
+        pruned = dict(sorted_tokens)
+        json_bytes = json.dumps(pruned, default=str).encode()
+    return json_bytes
+
+
+def _synthetic_overlap(n_tokens, entries_per_token=4, seed=3):
+    now = time.time()
+    data = {}
+    for i in range(n_tokens):
+        history = [
+            {"grade": "HIGH", "checked_at": f"2026-01-{1 + (i + j) % 28:02d}T00:00:{j:02d}",
+             "overlap_count": (i * 7 + j) % 50, "wallets": [f"W{i}_{k}" for k in range(20)],
+             "token_metadata": {"symbol": f"T{i}", "name": f"Token {i}"},
+             "dexscreener": {"current_price_usd": 0.001 * (i + 1), "current_price_fetched_at": now}}
+            for j in range(entries_per_token)
+        ]
+        data[f"mint{seed}_{i}"] = history
+    return data
+
+
+def _sorted_items(data):
+    return sorted(data.items(), key=lambda kv: supabase_utils.safe_get_timestamp(kv[1][-1]), reverse=True)
+
+
+def test_matches_reference_output():
+    data = _synthetic_overlap(300)
+    items = _sorted_items(data)
+    for max_mb in (10.0, 0.5, 0.05, 0.0001):
+        buffer = io.BytesIO()
+        kept = supabase_utils.write_size_bounded_json(items, buffer, int(max_mb * 1024 * 1024))
+        assert buffer.getvalue() == _reference_export(items, max_mb), max_mb
+        assert json.loads(buffer.getvalue()).keys() == dict(items[:kept]).keys()
+
+
+def test_unchanged_pickle_is_not_rewritten():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "overlap.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(dict(_sorted_items(_synthetic_overlap(50))), f)
+        mtime = os.stat(path).st_mtime_ns
+
+        with mock.patch.object(supabase_utils.requests, "get", side_effect=AssertionError("no HTTP expected")):
+            first = supabase_utils.prepare_json_from_pkl(path, debug=False)
+            second = supabase_utils.prepare_json_from_pkl(path, debug=False)
+
+        assert first == second
+        assert os.stat(path).st_mtime_ns == mtime
+
+
+def benchmark_overlap_export(target_mb: int = 50):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "overlap.pkl")
+        probe = _synthetic_overlap(1000)
+        data = _synthetic_overlap(int(target_mb * 1024 * 1024 / len(pickle.dumps(probe)) * 1000))
+        with open(path, "wb") as f:
+            pickle.dump(data, f)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        t0 = time.perf_counter()
+        json_bytes = supabase_utils.prepare_json_from_pkl(path, debug=False)
+        new_secs = time.perf_counter() - t0
+
+        items = _sorted_items(data)
+        t0 = time.perf_counter()
+        supabase_utils.write_size_bounded_json(items, io.BytesIO(), int(supabase_utils.MAX_SIZE_MB * 1024 * 1024))
+        export_secs = time.perf_counter() - t0
+
+        # The old loop re-serializes the whole dict per dropped token; time it on a slice it can finish
+        sample = items[:int(2.5 * 1024 * 1024 / len(json.dumps(probe, default=str)) * 1000)]
+        t0 = time.perf_counter()
+        expected = _reference_export(sample, supabase_utils.MAX_SIZE_MB)
+        old_secs = time.perf_counter() - t0
+        buffer = io.BytesIO()
+        supabase_utils.write_size_bounded_json(sample, buffer, int(supabase_utils.MAX_SIZE_MB * 1024 * 1024))
+        assert buffer.getvalue() == expected
+
+    print(
+        f"📊 {len(data):,} tokens ({size_mb:.0f} MB pickle) -> {len(json_bytes)/1024:.0f} KB JSON in {new_secs:.2f}s "
+        f"(bounded export {export_secs:.2f}s) | "
+        f"old trim loop on a 2.5 MB slice: {old_secs:.2f}s"
+    )
+    return new_secs, export_secs, old_secs
+
+
+if __name__ == "__main__":
+    test_matches_reference_output()
+    test_unchanged_pickle_is_not_rewritten()
+    benchmark_overlap_export(50)
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from alerts.trading_buttons import PositionKeyIndex, find_key_by_hash, get_short_key
+
+
+def _portfolio(n):
+    return {"positions": {f"Mint{i}_discovery": {"status": "active"} for i in range(n)}}
+
+
+def test_resolves_without_rescanning_positions():
+    index = PositionKeyIndex()
+    portfolio = _portfolio(500)
+    index.rebuild("1", portfolio["positions"])
+
+    with mock.patch.object(index, "rebuild", side_effect=AssertionError("unexpected rebuild")):
+        for i in (0, 250, 499):
+            key = f"Mint{i}_discovery"
+            assert index.resolve("1", portfolio, get_short_key(key)) == key
+
+        # Opened positions are registered as they open
+        portfolio["positions"]["New_manual"] = {"status": "active"}
+        index.add("1", "New_manual")
+        assert index.resolve("1", portfolio, get_short_key("New_manual")) == "New_manual"
+
+
+def test_closed_and_unknown_positions_do_not_resolve():
+    index = PositionKeyIndex()
+    portfolio = _portfolio(3)
+    short = index.add("1", "Mint1_discovery")
+
+    del portfolio["positions"]["Mint1_discovery"]
+    index.discard("1", "Mint1_discovery")
+    assert index.resolve("1", portfolio, short) is None
+
+    # Positions the index never heard about are still found (one rebuild on the miss)
+    portfolio["positions"]["Loaded_alpha"] = {}
+    assert index.resolve("1", portfolio, get_short_key("Loaded_alpha")) == "Loaded_alpha"
+
+    # Indexes are per portfolio
+    assert index.resolve("2", _portfolio(1), get_short_key("Loaded_alpha")) is None
+
+
+def test_find_key_by_hash_matches_scan():
+    portfolio = _portfolio(20)
+    short = get_short_key("Mint7_discovery")
+    assert find_key_by_hash(portfolio, short) == find_key_by_hash(portfolio, short, "42") == "Mint7_discovery"
+    assert find_key_by_hash({}, short, "42") is None
+
+
+if __name__ == "__main__":
+    test_resolves_without_rescanning_positions()
+    test_closed_and_unknown_positions_do_not_resolve()
+    test_find_key_by_hash_matches_scan()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+from contextlib import ExitStack
+from unittest import mock
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+from alerts import price_fetcher
+from alerts.price_fetcher import PriceFetcher
+from shared import jupiter_prices
+from shared.jupiter_prices import JupiterPriceCache
+
+
+class _Response:
+    def __init__(self, payload):
+        self.status = 200
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    """Jupiter prices mints starting with 'j'; DexScreener knows every mint."""
+
+    def __init__(self):
+        self.jupiter_calls = []
+        self.dex_calls = []
+
+    async def fetch_json(self, url, params=None, timeout=None):
+        ids = params["ids"].split(",")
+        self.jupiter_calls.append(ids)
+        return {m: {"usdPrice": 2.0} for m in ids if m.startswith("j")}
+
+    def get(self, url, timeout=None):
+        ids = url.rsplit("/", 1)[1].split(",")
+        self.dex_calls.append(ids)
+        return _Response({"pairs": [{"priceUsd": "3.0", "baseToken": {"address": m, "symbol": m.upper(), "name": m}}
+                                    for m in ids]})
+
+
+def _patched(session):
+    PriceFetcher._cache.clear()
+    PriceFetcher._inflight.clear()
+
+    async def get_session():
+        await asyncio.sleep(0)
+        return session
+
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(price_fetcher, "get_http_session", get_session))
+    stack.enter_context(mock.patch.object(price_fetcher, "JUPITER_PRICES", JupiterPriceCache()))
+    stack.enter_context(mock.patch.object(jupiter_prices, "fetch_json", session.fetch_json))
+    return stack
+
+
+def test_concurrent_lookups_share_one_request_and_cache():
+    session = _FakeSession()
+
+    async def scenario():
+        infos = await asyncio.gather(*(PriceFetcher.get_token_info("jA") for _ in range(5)))
+        again = await PriceFetcher.get_token_info("jA")
+        return infos, again
+
+    with _patched(session):
+        infos, again = asyncio.run(scenario())
+
+    assert len(session.jupiter_calls) == 1
+    assert all(info["price"] == 2.0 and info["source"] == "jupiter" for info in infos)
+    assert again == infos[0] and again is not infos[0]
+
+
+def test_batch_lookup_uses_multi_id_calls():
+    session = _FakeSession()
+    mints = [f"j{i}" for i in range(40)] + [f"d{i}" for i in range(20)]
+
+    with _patched(session):
+        infos = asyncio.run(PriceFetcher.get_token_infos(mints))
+        cached = asyncio.run(PriceFetcher.get_token_info("d3"))
+
+    assert sorted(len(c) for c in session.jupiter_calls) == [10, 50]
+    assert [len(c) for c in session.dex_calls] == [20]
+    assert len(infos) == 60
+    assert infos["d0"]["symbol"] == "D0" and infos["j0"]["source"] == "jupiter"
+    assert cached["price"] == 3.0 and len(session.dex_calls) == 1
+
+
+if __name__ == "__main__":
+    test_concurrent_lookups_share_one_request_and_cache()
+    test_batch_lookup_uses_multi_id_calls()
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+
+import collector
+
+collector.log = logging.getLogger("CollectorService")
+
+
+class FakeSupabase:
+    """Bucket stand-in: `files` maps remote path -> (json content, eTag)."""
+
+    def __init__(self, files):
+        self.files = files
+        self.downloads = []
+        self.deletes = []
+        self.fail_deletes = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def download_json_file(self, remote_path):
+        self.downloads.append(remote_path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        entry = self.files.get(remote_path)
+        return entry[0] if entry else None
+
+    async def list_files(self, folder, limit=1000):
+        folder = folder.rstrip("/")
+        names = {}
+        for path, (_, etag) in self.files.items():
+            if path.startswith(folder + "/"):
+                name = path[len(folder) + 1:].split("/")[0]
+                names[name] = {"name": name, "metadata": {"eTag": etag}}
+        return list(names.values())
+
+    async def delete_file(self, remote_path):
+        self.deletes.append(remote_path)
+        if remote_path in self.fail_deletes:
+            raise RuntimeError("delete failed")
+        self.files.pop(remote_path, None)
+
+
+class FakePersistence:
+    """Publishes each record immediately unless `defer` is set (then publish() does it)."""
+
+    def __init__(self, defer=False):
+        self.saved = []
+        self.defer = defer
+        self.pending = []
+
+    async def save_dataset(self, snapshot, pipeline, date_str, mint, is_expired=False, on_published=None):
+        self.saved.append((mint, snapshot["label"]["status"]))
+        if self.defer:
+            self.pending.append(on_published)
+        else:
+            await on_published()
+        return True
+
+    async def publish(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            await callback()
+
+
+def _snapshot(mint):
+    return {
+        "features": {"mint": mint, "signal_source": "discovery", "checked_at_utc": "2026-01-01T00:00:00+00:00"},
+        "finalization": {"finalization_status": "pending"},
+        "label": None,
+    }
+
+
+def _label(mint, status):
+    return {"mint": mint, "signal_type": "discovery", "status": status,
+            "tracking_completed_at": "2026-01-02T00:00:00+00:00"}
+
+
+def _aggregator(supabase, persistence, index_file):
+    config = SimpleNamespace(
+        SNAPSHOT_DIR_REMOTE="analytics/snapshots", SNAPSHOT_DIR_LOCAL=os.path.dirname(index_file),
+        LABEL_INDEX_FILE=index_file, AGGREGATOR_CONCURRENCY=4, ANALYTICS_INDEX_TTL=600,
+    )
+    return collector.SnapshotAggregator(config, supabase, persistence, set())
+
+
+def test_incremental_aggregation():
+    daily = "analytics/discovery/daily"
+    snaps = "analytics/snapshots"
+    files = {
+        "analytics/active_tracking.json": ({}, "a1"),
+        f"{daily}/2026-01-01.json": ({"tokens": [_label(f"M{i}", "win") for i in range(8)]}, "d1"),
+        f"{daily}/2026-01-02.json": ({"tokens": [_label("L1", "loss"), _label("P1", "active")]}, "d2"),
+        f"{daily}/2026-01-03.json": ({"tokens": []}, "d3"),
+        **{f"{snaps}/M{i}_2026-01-01T00-00-00_discovery.json": (_snapshot(f"M{i}"), f"s{i}") for i in range(8)},
+        f"{snaps}/L1_2026-01-01T00-00-00_discovery.json": (_snapshot("L1"), "sl"),
+        f"{snaps}/P1_2026-01-01T00-00-00_discovery.json": (_snapshot("P1"), "sp"),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_file = os.path.join(tmp, "label_index.json")
+        supabase = FakeSupabase(files)
+        persistence = FakePersistence()
+        supabase.fail_deletes.add(f"{snaps}/L1_2026-01-01T00-00-00_discovery.json")
+
+        # Pass 1: full build
+        asyncio.run(_aggregator(supabase, persistence, index_file).scan_and_aggregate())
+        assert len(persistence.saved) == 9
+        assert ("L1", "loss") in persistence.saved
+        assert supabase.max_in_flight > 1
+        assert len(supabase.downloads) == 1 + 3 + 9  # active tracking, daily files, labeled snapshots
+
+        # Pass 2 (fresh process, index from disk): nothing changed, only the failed delete is retried
+        supabase.downloads.clear()
+        supabase.deletes.clear()
+        supabase.fail_deletes.clear()
+        asyncio.run(_aggregator(supabase, persistence, index_file).scan_and_aggregate())
+        assert supabase.downloads == ["analytics/active_tracking.json"]
+        assert supabase.deletes == [f"{snaps}/L1_2026-01-01T00-00-00_discovery.json"]
+        assert len(persistence.saved) == 9
+
+        # Pass 3: P1 resolves in a changed daily file; only that file and that snapshot are fetched
+        supabase.downloads.clear()
+        files[f"{daily}/2026-01-02.json"] = ({"tokens": [_label("L1", "loss"), _label("P1", "win")]}, "d2b")
+        asyncio.run(_aggregator(supabase, persistence, index_file).scan_and_aggregate())
+        assert sorted(supabase.downloads) == sorted([
+            "analytics/active_tracking.json",
+            f"{daily}/2026-01-02.json",
+            f"{snaps}/P1_2026-01-01T00-00-00_discovery.json",
+        ])
+        assert persistence.saved[-1] == ("P1", "win")
+
+
+def test_snapshot_deleted_only_after_segment_upload():
+    snap = "analytics/snapshots/M0_2026-01-01T00-00-00_discovery.json"
+    files = {
+        "analytics/active_tracking.json": ({}, "a1"),
+        "analytics/discovery/daily/2026-01-01.json": ({"tokens": [_label("M0", "win")]}, "d1"),
+        snap: (_snapshot("M0"), "s0"),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        supabase = FakeSupabase(files)
+        persistence = FakePersistence(defer=True)
+        aggregator = _aggregator(supabase, persistence, os.path.join(tmp, "label_index.json"))
+
+        async def scenario():
+            await aggregator.scan_and_aggregate()
+            assert supabase.deletes == []
+            # A second pass before the upload neither deletes nor re-aggregates the snapshot
+            await aggregator.scan_and_aggregate()
+            assert supabase.deletes == [] and len(persistence.saved) == 1
+            await persistence.publish()
+            assert supabase.deletes == [snap]
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_incremental_aggregation()
+    test_snapshot_deleted_only_after_segment_upload()
+    print("✅ Snapshot aggregator tests passed")
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import collector
+from collector import CollectorService, SnapshotManifest
+
+collector.log = logging.getLogger("CollectorService")
+
+
+def test_manifest_lookup_and_reconcile():
+    manifest = SnapshotManifest()
+    assert manifest.is_stale(900)
+
+    manifest.reconcile([
+        "MintA_2026-01-01T00-00-00_00-00_discovery.json",
+        "MintA_2026-01-02T00-00-00_00-00_discovery.json",
+        "MintB_2026-01-01T00-00-00_00-00_alpha.json",
+        "not-a-snapshot.txt",
+    ])
+    assert len(manifest) == 3 and not manifest.is_stale(900)
+    assert manifest.has("MintA", "discovery") and not manifest.has("MintA", "alpha")
+
+    manifest.discard("MintA_2026-01-01T00-00-00_00-00_discovery.json")
+    assert manifest.has("MintA", "discovery")
+    manifest.discard("MintA_2026-01-02T00-00-00_00-00_discovery.json")
+    assert not manifest.has("MintA", "discovery") and len(manifest) == 1
+
+    manifest.add("MintB_2026-01-01T00-00-00_00-00_alpha.json")
+    assert len(manifest) == 1
+    assert "MintB_2026-01-01T00-00-00_00-00_alpha.json" in manifest
+
+    manifest.invalidate()
+    assert manifest.is_stale(900)
+
+
+class _Computer:
+    def compute_features(self, signal_type, history_entry, dex, rug, is_holiday):
+        return {"checked_at_utc": "2026-01-01T00:00:00+00:00"}, datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def _safe_get_dex_data(self, entry):
+        return {"pairs": []}
+
+    def _safe_get_rug_data(self, entry):
+        return {"score": 1}
+
+
+def test_process_signal_uses_manifest_not_bucket():
+    saved = []
+
+    async def save_snapshot(snapshot, filename_base):
+        saved.append(filename_base)
+        return True
+
+    async def is_holiday(dt, codes):
+        return False
+
+    svc = CollectorService.__new__(CollectorService)
+    svc.config = SimpleNamespace(HOLIDAY_COUNTRY_CODES=["US"])
+    svc.processing_keys = set()
+    svc.active_snapshot_files = SnapshotManifest()
+    svc.active_snapshot_files.reconcile(["MintA_2025-12-31T00-00-00_00-00_discovery.json"])
+    svc.computer = _Computer()
+    svc.supabase = MagicMock(side_effect=AssertionError("no bucket calls on the signal path"))
+    svc.persistence = SimpleNamespace(save_snapshot=save_snapshot)
+    svc.holiday_client = SimpleNamespace(is_holiday=is_holiday)
+    svc._build_canonical_snapshot = lambda *args: {"snapshot": True}
+
+    async def scenario():
+        await svc.process_signal({"mint": "MintA", "signal_type": "discovery", "data": {}})
+        await svc.process_signal({"mint": "MintA", "signal_type": "alpha", "data": {}})
+        await svc.process_signal({"mint": "MintA", "signal_type": "alpha", "data": {}})
+
+    asyncio.run(scenario())
+    assert saved == ["MintA_2026-01-01T00-00-00_00-00_alpha"]
+    assert svc.active_snapshot_files.has("MintA", "alpha")
+    assert svc.supabase.mock_calls == []
+
+
+if __name__ == "__main__":
+    test_manifest_lookup_and_reconcile()
+    test_process_signal_uses_manifest_not_bucket()
+    print("✅ Snapshot manifest tests passed")
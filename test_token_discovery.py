@@ -0,0 +1,173 @@
+import asyncio
+import os
+import pickle
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+from unittest.mock import MagicMock
+
+os.environ.setdefault("DUNE_QUERY_ID", "0")
+os.environ.setdefault("HELIUS_API_KEY", "test-key")
+try:
+    import ml_predictor  # noqa: F401
+except ImportError:
+    sys.modules['ml_predictor'] = MagicMock()
+
+import token_monitor
+from token_monitor import SeenMintsCache, TokenDiscovery
+
+
+def _pickle_dump(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def _pickle_load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# Other tests replace joblib in sys.modules with a MagicMock; persist through plain pickle instead
+_joblib = SimpleNamespace(dump=_pickle_dump, load=_pickle_load)
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Response:
+    def __init__(self, payload):
+        self.status = 200
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Session:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def get(self, url, **_):
+        return _Response(self._payload)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _discovery(tmp, **kwargs):
+    return TokenDiscovery(
+        timestamp_cache_file=os.path.join(tmp, "ts.pkl"),
+        cursor_cache_file=os.path.join(tmp, "cursors.pkl"),
+        seen_mints=SeenMintsCache(os.path.join(tmp, "seen.pkl")),
+        **kwargs,
+    )
+
+
+def test_seen_mints_lru_eviction_and_horizon():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(token_monitor, "joblib", _joblib):
+        cache = SeenMintsCache(os.path.join(tmp, "seen.pkl"), horizon_seconds=3600, max_size=3)
+        now = int(time.time())
+        for mint in ("a", "b", "c"):
+            cache.add(mint, seen_at=now)
+        cache.add("a", seen_at=now)  # refreshed: "b" is now the oldest
+        cache.add("d", seen_at=now)
+        assert "b" not in cache and all(m in cache for m in ("a", "c", "d"))
+
+        # Adding past max_size evicts the least recently added ("c"); expired entries read as unseen
+        cache.add("old", seen_at=now - 7200)
+        assert "c" not in cache and "old" not in cache
+        assert "a" in cache and "d" in cache and len(cache) == 2
+
+
+def test_seen_mints_persistence_round_trip():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(token_monitor, "joblib", _joblib):
+        path = os.path.join(tmp, "seen.pkl")
+        now = int(time.time())
+        cache = SeenMintsCache(path, horizon_seconds=3600)
+        cache.add("fresh", seen_at=now)
+        cache.add("expired", seen_at=now - 7200)
+        cache.save()
+
+        reloaded = SeenMintsCache(path, horizon_seconds=3600)
+        assert "fresh" in reloaded and "expired" not in reloaded
+        assert len(reloaded) == 1
+
+
+def test_birdeye_cursor_keeps_same_second_listings():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(token_monitor, "joblib", _joblib):
+        discovery = _discovery(tmp)
+        discovery.birdeye_keys = ["key"]
+        cursor = int(time.time()) - 600
+        discovery.source_cursors["birdeye"] = cursor
+        discovery.seen_mints.add("known")
+        items = [
+            {"address": "same_second", "liquidityAddedAt": _iso(cursor)},
+            {"address": "older", "liquidityAddedAt": _iso(cursor - 1)},
+            {"address": "newer", "liquidityAddedAt": _iso(cursor + 30)},
+            {"address": "known", "liquidityAddedAt": _iso(cursor + 60)},
+        ]
+        session = _Session({"data": {"items": items}})
+        with mock.patch.object(token_monitor.aiohttp, "ClientSession", lambda *a, **k: session):
+            starts = asyncio.run(discovery._fetch_birdeye_new_tokens())
+
+        assert [s.mint for s in starts] == ["same_second", "newer"]
+        assert discovery.source_cursors["birdeye"] == cursor + 30
+
+
+def test_failing_source_backs_off_and_recovers():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(token_monitor, "joblib", _joblib):
+        discovery = _discovery(tmp, source_merge_timeout=1.0)
+        calls = {"flaky": 0, "steady": 0}
+        state = {"fail": True}
+
+        async def flaky():
+            calls["flaky"] += 1
+            if state["fail"]:
+                raise RuntimeError("boom")
+            return ["ok"]
+
+        async def steady():
+            calls["steady"] += 1
+            return ["s"]
+
+        discovery._source_fetchers = lambda limit: {"flaky": flaky, "steady": steady}
+
+        async def scenario():
+            first = await discovery._collect_source_results(10)
+            assert first == {"steady": ["s"]}
+            assert discovery._source_failures["flaky"] == 1
+            assert discovery._source_retry_at["flaky"] - time.time() > 25
+
+            # Still backing off: the failed source isn't retried
+            second = await discovery._collect_source_results(10)
+            assert second == {"steady": ["s"]} and calls["flaky"] == 1
+
+            # Backoff elapsed and the source recovers: failure state is cleared
+            discovery._source_retry_at["flaky"] = 0
+            state["fail"] = False
+            third = await discovery._collect_source_results(10)
+            assert third == {"flaky": ["ok"], "steady": ["s"]}
+            assert "flaky" not in discovery._source_failures
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_seen_mints_lru_eviction_and_horizon()
+    test_seen_mints_persistence_round_trip()
+    test_birdeye_cursor_keeps_same_second_listings()
+    test_failing_source_backs_off_and_recovers()
+    print("✅ Token discovery tests passed")
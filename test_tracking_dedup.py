@@ -0,0 +1,139 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from extract_datasets import FeatureExtractor, PartitionedDatasetStore, dedup_by_tracking_period
+
+
+def _reference_dedup(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous row-by-row implementation, kept as the correctness reference."""
+    df = df.copy()
+    df['checked_at_utc'] = pd.to_datetime(df['checked_at_utc'], errors='coerce')
+    df = df.sort_values(by=['mint', 'signal_source', 'checked_at_utc'])
+
+    kept = []
+    for _, group in df.groupby(['mint', 'signal_source']):
+        tracking_end_time = pd.NaT
+        for index, row in group.iterrows():
+            current_time = row['checked_at_utc']
+            if pd.isna(current_time):
+                continue
+            if pd.isna(tracking_end_time) or current_time >= tracking_end_time:
+                kept.append(group.loc[[index]])
+                raw_age = row.get('token_age_hours_at_signal')
+                try:
+                    token_age = float(raw_age) if pd.notna(raw_age) else None
+                except (ValueError, TypeError):
+                    token_age = None
+                hours = 24 if (token_age is not None and token_age < 12) else 168
+                tracking_end_time = current_time + pd.Timedelta(hours=hours)
+    if not kept:
+        return df.iloc[0:0].reset_index(drop=True)
+    return pd.concat(kept).reset_index(drop=True)
+
+
+def _synthetic_signals(n_rows: int, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    # Minute resolution over 60 days so exact window-end ties happen
+    minutes = rng.integers(0, 60 * 24 * 60, n_rows)
+    ages = rng.choice([1.0, 5.0, 11.99, 12.0, 48.0, np.nan], n_rows).astype(object)
+    return pd.DataFrame({
+        "mint": rng.choice([f"mint{i}" for i in range(max(n_rows // 20, 1))], n_rows),
+        "signal_source": rng.choice(["discovery", "alpha"], n_rows),
+        "checked_at_utc": start + pd.to_timedelta(minutes, unit="min"),
+        "token_age_hours_at_signal": ages,
+        "label_status": rng.choice(["win", "loss"], n_rows),
+    })
+
+
+def test_matches_reference_output():
+    df = _synthetic_signals(4_000)
+    # Exact tie with a 24h window end, missing keys/times and non-numeric ages
+    df.loc[0, ["mint", "signal_source", "checked_at_utc", "token_age_hours_at_signal"]] = \
+        ["tie", "alpha", pd.Timestamp("2026-01-01", tz="UTC"), 2.0]
+    df.loc[1, ["mint", "signal_source", "checked_at_utc"]] = \
+        ["tie", "alpha", pd.Timestamp("2026-01-02", tz="UTC")]
+    df.loc[2:4, "checked_at_utc"] = pd.NaT
+    df.loc[5, "mint"] = None
+    df.loc[6:8, "token_age_hours_at_signal"] = ["3", "n/a", True]
+
+    expected = _reference_dedup(df)
+    actual = dedup_by_tracking_period(df)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert ((actual["mint"] == "tie") & (actual["checked_at_utc"] == pd.Timestamp("2026-01-02", tz="UTC"))).any()
+
+
+def test_empty_and_all_missing_times():
+    df = pd.DataFrame({"mint": ["a", "a"], "signal_source": ["alpha", "alpha"], "checked_at_utc": [None, None]})
+    assert dedup_by_tracking_period(df).empty
+    assert dedup_by_tracking_period(df.iloc[0:0]).empty
+
+
+def test_incremental_run_rewrites_only_affected_partitions():
+    tmp = tempfile.mkdtemp()
+    try:
+        store = PartitionedDatasetStore(tmp, columnar=False)
+        now = datetime.now()
+        old_day = now - timedelta(days=30)
+        old = pd.DataFrame({
+            "mint": ["old", "recent"],
+            "signal_source": ["alpha", "alpha"],
+            "checked_at_utc": pd.to_datetime([old_day, now - timedelta(days=2)], utc=True),
+            "label_status": ["win", "loss"],
+        })
+        store.write(old, {old_day.strftime('%Y-%m-%d'), (now - timedelta(days=2)).strftime('%Y-%m-%d')})
+        old_part = os.path.join(tmp, f"date={old_day.strftime('%Y-%m-%d')}", "part.csv")
+        old_mtime = os.stat(old_part).st_mtime_ns
+
+        new_rows = [{"mint": "fresh", "signal_source": "discovery", "label_status": "win",
+                     "checked_at_utc": (now - timedelta(days=1)).isoformat() + "+00:00"}]
+
+        extractor = FeatureExtractor(cache_dir=os.path.join(tmp, "cache"), client=object())
+
+        async def fake_range(pipeline, start_date, end_date):
+            return new_rows if pipeline == "discovery" else []
+
+        extractor.extract_date_range = fake_range
+        written = asyncio.run(extractor.create_training_dataset(None, None, tmp))
+
+        assert list(written["mint"]) == ["fresh"]
+        assert os.stat(old_part).st_mtime_ns == old_mtime
+        # The re-extracted window replaced the stale "recent" row
+        assert sorted(store.read()["mint"]) == ["fresh", "old"]
+    finally:
+        shutil.rmtree(tmp)
+
+
+def benchmark_tracking_dedup(n_rows: int = 500_000):
+    df = _synthetic_signals(n_rows)
+
+    t0 = time.perf_counter()
+    expected = _reference_dedup(df)
+    loop_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual = dedup_by_tracking_period(df)
+    vector_secs = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(actual, expected)
+    speedup = loop_secs / vector_secs
+    print(
+        f"📊 {n_rows:,} signals -> {len(actual):,} kept | "
+        f"loop {loop_secs:.2f}s, vectorized {vector_secs:.3f}s ({speedup:.0f}x)"
+    )
+    return speedup
+
+
+if __name__ == "__main__":
+    test_matches_reference_output()
+    test_empty_and_all_missing_times()
+    test_incremental_run_rewrites_only_affected_partitions()
+    assert benchmark_tracking_dedup(500_000) >= 10
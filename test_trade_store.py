@@ -0,0 +1,105 @@
+import asyncio
+import os
+import pickle
+import tempfile
+from unittest.mock import patch
+
+os.environ.setdefault('BOT_TOKEN', 'mock_token')
+
+import alpha
+
+SOL = "So11111111111111111111111111111111111111112"
+
+
+def _swap(i: int, mint: str) -> dict:
+    return {
+        "transactionHash": f"sig{i}",
+        "transactionType": "buy",
+        "blockTimestamp": f"2025-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+        "walletAddress": f"wallet{i % 7}",
+        "bought": {"address": mint, "amount": "1000"},
+        "sold": {"address": SOL, "amount": "1"},
+        "totalValueUsd": 150.0 + i,
+    }
+
+
+class _FakeMoralis:
+    """Serves `history` newest-first in pages of `limit`, recording each call."""
+
+    def __init__(self, mint: str, n: int):
+        self.mint = mint
+        self.history = [_swap(i, mint) for i in range(n)]
+        self.calls = 0
+
+    async def __call__(self, url, method="GET", params=None, **_):
+        self.calls += 1
+        newest_first = list(reversed(self.history))
+        start = int(params.get("cursor") or 0)
+        page = newest_first[start:start + params["limit"]]
+        nxt = start + params["limit"]
+        return {"result": page, "cursor": str(nxt) if nxt < len(newest_first) else None}
+
+
+class _PickleJoblib:
+    """joblib stand-in (other test modules replace joblib with a MagicMock)."""
+
+    @staticmethod
+    def dump(obj, path):
+        with open(path, "wb") as f:
+            pickle.dump(obj, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_incremental_refresh_and_disk_serving():
+    mint = "TokenMint1111"
+    fake = _FakeMoralis(mint, 250)
+    patched = patch.multiple(
+        alpha,
+        requests_with_failover_async=fake,
+        MORALIS_KEYS=["k"],
+        HELIUS_KEYS=["k"],
+        MORALIS_MIN_INTERVAL=0.0,
+        joblib=_PickleJoblib,
+    )
+
+    with patched, tempfile.TemporaryDirectory() as root:
+        store = alpha.TradeStore(root)
+
+        # First run pages the full history (3 pages of 100)
+        df = _run(alpha.get_solana_dex_trades_async([mint], store=store))
+        assert len(df) == 250 and fake.calls == 3
+        assert df["block_time"].is_monotonic_increasing
+
+        # Fresh store: served from disk, no API calls
+        df = _run(alpha.get_solana_dex_trades_async([mint], store=store))
+        assert len(df) == 250 and fake.calls == 3
+
+        # Stale store with 5 new swaps: a single page is enough
+        fake.history += [_swap(i, mint) for i in range(250, 255)]
+        with patch.object(alpha, "TRADE_STORE_FRESH_SECONDS", 0):
+            df = _run(alpha.get_solana_dex_trades_async([mint], store=store))
+        assert fake.calls == 4
+        assert len(df) == 255 and df["transaction_hash"].is_unique
+
+        state = store.load(mint)
+        assert state["complete"] and len(state["signatures"]) == 255
+
+
+def test_append_keeps_multi_swap_transactions():
+    state = {"rows": [], "signatures": set(), "complete": False, "refreshed_at": 0.0}
+    rows = [{"transaction_hash": "a"}, {"transaction_hash": "a"}, {"transaction_hash": "b"}]
+    assert alpha.TradeStore.append(state, rows) == 3
+    assert alpha.TradeStore.append(state, rows) == 0
+
+
+if __name__ == "__main__":
+    test_incremental_refresh_and_disk_serving()
+    test_append_keeps_multi_swap_transactions()
@@ -0,0 +1,99 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Other test modules swap supabase_utils for a MagicMock in sys.modules; load the real file directly
+_spec = importlib.util.spec_from_file_location("supabase_utils_real", Path(__file__).with_name("supabase_utils.py"))
+supabase_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_utils)
+
+
+class _FakeBucket:
+    def __init__(self, wallets=(), fail_uploads=()):
+        self.files = {f"{supabase_utils.WALLET_FOLDER}/{w}.json": b"{}" for w in wallets}
+        self.fail_uploads = set(fail_uploads)
+        self.list_calls = 0
+        self.remove_calls = 0
+        self.upload_calls = 0
+        self._lock = threading.Lock()
+
+    def list(self, folder, options=None):
+        self.list_calls += 1
+        names = sorted(p.split("/", 1)[1] for p in self.files if p.startswith(folder + "/"))
+        offset, limit = options["offset"], options["limit"]
+        return [{"name": n} for n in names[offset:offset + limit]]
+
+    def remove(self, paths):
+        self.remove_calls += 1
+        for p in paths:
+            self.files.pop(p, None)
+
+    def upload(self, path, data, options=None):
+        with self._lock:
+            self.upload_calls += 1
+        if path in {supabase_utils.wallet_file_name(w) for w in self.fail_uploads}:
+            raise RuntimeError("upload failed")
+        self.files[path] = data
+
+
+def _patched(bucket):
+    supabase_utils._wallet_manifests.clear()
+    client = SimpleNamespace(storage=SimpleNamespace(from_=lambda name: bucket))
+    return mock.patch.object(supabase_utils, "get_supabase_client", return_value=client)
+
+
+def test_manifest_pages_and_caches_listing():
+    bucket = _FakeBucket(wallets=[f"W{i}" for i in range(2500)])
+    with _patched(bucket):
+        assert all(supabase_utils.wallet_data_exists(f"W{i}") for i in range(0, 2500, 7))
+        assert not supabase_utils.wallet_data_exists("missing")
+        # 3 pages, listed once for all lookups
+        assert bucket.list_calls == 3
+
+        supabase_utils.upload_wallet_data("new", {"pnl": 1}, debug=False)
+        assert supabase_utils.wallet_data_exists("new")
+        assert bucket.list_calls == 3
+
+
+def test_batcher_coalesces_and_requeues_failures():
+    bucket = _FakeBucket(fail_uploads={"bad"})
+    with _patched(bucket):
+        batcher = supabase_utils.WalletUploadBatcher(max_pending=50, max_age=3600)
+        for i in range(120):
+            batcher.add(f"W{i % 40}", {"version": i})
+        batcher.add("bad", {"version": 0})
+
+        assert bucket.upload_calls == 0 and len(batcher) == 41
+        assert batcher.flush() == 40
+        assert bucket.remove_calls == 1 and bucket.upload_calls == 41
+        assert b'"version": 119' in bucket.files[supabase_utils.wallet_file_name("W39")]
+        assert len(batcher) == 1
+
+        manifest = supabase_utils.get_wallet_manifest()
+        assert "W0" in manifest and "bad" not in manifest
+        batcher.close()
+
+
+def test_batcher_flushes_after_max_age_without_further_adds():
+    bucket = _FakeBucket()
+    with _patched(bucket):
+        batcher = supabase_utils.WalletUploadBatcher(max_pending=50, max_age=0.05)
+        batcher.add("A", {"pnl": 1})
+        batcher.add("B", {"pnl": 2})
+        deadline = time.time() + 2
+        names = {supabase_utils.wallet_file_name(w) for w in ("A", "B")}
+        while not names <= bucket.files.keys() and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert names <= bucket.files.keys()
+        assert len(batcher) == 0 and bucket.upload_calls == 2
+        batcher.close()
+
+
+if __name__ == "__main__":
+    test_manifest_pages_and_caches_listing()
+    test_batcher_coalesces_and_requeues_failures()
+    test_batcher_flushes_after_max_age_without_further_adds()
@@ -24,8 +24,8 @@ import time
 import json
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Set, Tuple
-from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from collections import defaultdict, OrderedDict, deque
 import pandas as pd
 import traceback
 import math
@@ -35,6 +35,7 @@ import threading
 from dotenv import load_dotenv
 
 import random
+import heapq
 
 from typing import List, Set
 
@@ -42,6 +43,7 @@ import sqlite3
 import threading
 
 from ml_predictor import SolanaTokenPredictor
+from shared.ml_batcher import MLBatchScorer
 
 load_dotenv()
 
@@ -50,6 +52,12 @@ PROBATION_THRESHOLD_PCT = float(os.getenv("PROBATION_THRESHOLD_PCT", "40"))
 ML_PREDICTION_THRESHOLD = float(os.getenv("ML_PREDICTION_THRESHOLD", "0.50"))
 ML_ACTION_THRESHOLD = float(os.getenv("ML_ACTION_THRESHOLD", "0.70"))
 MAX_CREATOR_PCT = 20
+# Analysis scheduler
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "8"))
+ANALYSIS_JITTER_SECONDS = float(os.getenv("ANALYSIS_JITTER_SECONDS", "60"))
+PRIORITY_FRESH_SECONDS = int(os.getenv("PRIORITY_FRESH_SECONDS", "3600"))
+PRIORITY_HIGH_FDV_USD = float(os.getenv("PRIORITY_HIGH_FDV_USD", "100000"))
+PROBATION_RECHECK_SECONDS = 5 * 60
 
 COINGECKO_PRO_API_KEY = os.environ.get("GECKO_API")
 DUNE_API_KEY = os.environ.get("DUNE_API_KEY")
@@ -242,6 +250,84 @@ class TradingStart:
     source_dex: Optional[str] = None
     price_change_percentage: Optional[float] = None
 
+# -----------------------
+# Seen-mints cache (discovery dedupe)
+# -----------------------
+class SeenMintsCache:
+    """
+    Bounded LRU of mints already handed to the scheduler, with a time horizon.
+    Lets discovery drop known mints before parsing / scheduling / store lookups.
+    """
+    def __init__(self, filepath: str = "./data/seen_mints.pkl", horizon_seconds: int = 24 * 3600,
+                 max_size: int = 50000, debug: bool = False):
+        self.filepath = filepath
+        self.horizon_seconds = horizon_seconds
+        self.max_size = max_size
+        self.debug = debug
+        self._dirty = False
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        self._mints: "OrderedDict[str, int]" = self._load()
+
+    def _load(self) -> "OrderedDict[str, int]":
+        if os.path.exists(self.filepath):
+            try:
+                data = joblib.load(self.filepath)
+                if isinstance(data, dict):
+                    cutoff = int(time.time()) - self.horizon_seconds
+                    return OrderedDict(
+                        (m, ts) for m, ts in sorted(data.items(), key=lambda kv: kv[1]) if ts >= cutoff
+                    )
+            except Exception as e:
+                if self.debug:
+                    print("SeenMintsCache: load failed", e)
+        return OrderedDict()
+
+    def __contains__(self, mint: str) -> bool:
+        ts = self._mints.get(mint)
+        if ts is None:
+            return False
+        if ts < int(time.time()) - self.horizon_seconds:
+            del self._mints[mint]
+            self._dirty = True
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._mints)
+
+    def add(self, mint: str, seen_at: Optional[int] = None):
+        if not mint:
+            return
+        self._mints[mint] = int(seen_at or time.time())
+        self._mints.move_to_end(mint)
+        while len(self._mints) > self.max_size:
+            self._mints.popitem(last=False)
+        self._dirty = True
+
+    def prune(self) -> int:
+        """Drop entries older than the horizon (oldest are at the front)."""
+        cutoff = int(time.time()) - self.horizon_seconds
+        removed = 0
+        while self._mints:
+            mint, ts = next(iter(self._mints.items()))
+            if ts >= cutoff:
+                break
+            self._mints.popitem(last=False)
+            removed += 1
+        if removed:
+            self._dirty = True
+        return removed
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            joblib.dump(dict(self._mints), self.filepath)
+            self._dirty = False
+        except Exception as e:
+            if self.debug:
+                print("SeenMintsCache: save failed", e)
+
 # -----------------------
 # Token discovery (CoinGecko + Rugcheck + FULLY ASYNC Dune)
 # -----------------------
@@ -255,6 +341,9 @@ class TokenDiscovery:
         dune_query_id: Optional[int] = None,
         dune_cache_file: str = "./data/dune_recent.pkl",
         timestamp_cache_file: str = "./data/last_timestamp.pkl",
+        cursor_cache_file: str = "./data/discovery_cursors.pkl",
+        seen_mints: Optional[SeenMintsCache] = None,
+        source_merge_timeout: float = 20.0,
         debug: bool = False,
     ):
         self.client = client
@@ -292,6 +381,24 @@ class TokenDiscovery:
         # --- State / Cache ---
         self.last_processed_timestamp = self._load_last_timestamp(timestamp_cache_file)
         self.timestamp_cache_file = timestamp_cache_file
+
+        # Per-source cursors (newest item timestamp already parsed). GeckoTerminal
+        # keeps using last_processed_timestamp so existing cache files stay valid.
+        self.cursor_cache_file = cursor_cache_file
+        cursors = self._load_last_timestamp(cursor_cache_file)
+        self.source_cursors: Dict[str, int] = cursors if isinstance(cursors, dict) else {}
+        if self.last_processed_timestamp:
+            self.source_cursors["geckoterminal"] = self.last_processed_timestamp
+
+        # Mints already handed to the scheduler are dropped before parsing
+        self.seen_mints = seen_mints if seen_mints is not None else SeenMintsCache(debug=debug)
+
+        # Sources are fetched independently: a slow/failing source never stalls the merge.
+        # Unfinished fetches carry over to the next poll; failures back off per source.
+        self.source_merge_timeout = source_merge_timeout
+        self._source_tasks: Dict[str, asyncio.Task] = {}
+        self._source_failures: Dict[str, int] = {}
+        self._source_retry_at: Dict[str, float] = {}
         
         # --- Dune Config ---
         self.dune_api_key = dune_api_key or os.environ.get("DUNE_API_KEY")
@@ -323,6 +430,21 @@ class TokenDiscovery:
             if self.debug:
                 print(f"Failed to save last timestamp: {e}")
 
+    def _save_source_cursors(self):
+        try:
+            joblib.dump(self.source_cursors, self.cursor_cache_file)
+        except Exception as e:
+            if self.debug:
+                print(f"Failed to save discovery cursors: {e}")
+
+    def _advance_cursor(self, source: str, ts: Optional[int]):
+        if ts and ts > self.source_cursors.get(source, 0):
+            self.source_cursors[source] = ts
+
+    def _is_new_mint(self, mint: Optional[str]) -> bool:
+        """Cheap pre-parse filter: skip mints already handed to the scheduler."""
+        return bool(mint) and mint not in self.seen_mints
+
     # ---------------- Dune helpers ----------------
     def _rows_from_dune_payload(self, payload: Any) -> List[Dict[str, Any]]:
         if payload is None:
@@ -655,11 +777,15 @@ class TokenDiscovery:
                     items = data.get("data", {}).get("items", [])
                     
                     out = []
+                    cursor = self.source_cursors.get("birdeye", 0)
                     for item in items:
                         mint = item.get("address")
-                        if not mint: continue
+                        if not self._is_new_mint(mint): continue
                         
                         block_time = self._parse_iso_timestamp(item.get("liquidityAddedAt"))
+                        # Same-second listings can be new; seen_mints already drops repeats
+                        if block_time and block_time < cursor: continue
+                        self._advance_cursor("birdeye", block_time)
                         out.append(TradingStart(
                             mint=mint,
                             block_time=block_time or int(now),
@@ -701,7 +827,7 @@ class TokenDiscovery:
                     for item in data:
                         if item.get("chainId") != "solana": continue
                         mint = item.get("tokenAddress")
-                        if not mint: continue
+                        if not self._is_new_mint(mint): continue
                         
                         out.append(TradingStart(
                             mint=mint,
@@ -750,7 +876,7 @@ class TokenDiscovery:
                     for item in data:
                         if item.get("chainId") != "solana": continue
                         mint = item.get("tokenAddress")
-                        if not mint: continue
+                        if not self._is_new_mint(mint): continue
                         
                         out.append(TradingStart(
                             mint=mint,
@@ -803,7 +929,7 @@ class TokenDiscovery:
 
         for item in data:
             mint = item.get("mint")
-            if not mint:
+            if not self._is_new_mint(mint):
                 continue
             
             # RugCheck detections are fresh; use current time for block_time
@@ -831,89 +957,121 @@ class TokenDiscovery:
         return out
 
     # ---------------- Aggregated Discovery ----------------
+    def _source_fetchers(self, limit: int) -> Dict[str, Any]:
+        """Coroutine factories per discovery source (retries stay inside each source)."""
+        return {
+            "geckoterminal": lambda: retry_with_backoff(
+                self._fetch_geckoterminal_new_pools, limit=limit, retries=3, base_delay=2.0
+            ),
+            "birdeye": self._fetch_birdeye_new_tokens,
+            "dexscreener": self._fetch_dexscreener_new_tokens,
+            "dexscreener_boost": self._fetch_dexscreener_boosted_tokens,
+            "rugcheck": lambda: retry_with_backoff(
+                self._fetch_rugcheck_new_tokens, retries=3, base_delay=2.0
+            ),
+        }
+
+    def _record_source_failure(self, name: str, error: BaseException):
+        failures = self._source_failures.get(name, 0) + 1
+        self._source_failures[name] = failures
+        backoff = min(30 * (2 ** (failures - 1)), 600)
+        self._source_retry_at[name] = time.time() + backoff
+        if self.debug:
+            print(f"[TokenDiscovery] {name} failed ({failures}x), retrying in {backoff}s: {error}")
+
+    async def _collect_source_results(self, limit: int) -> Dict[str, List[Any]]:
+        """
+        Start (or keep) one fetch task per source and wait up to `source_merge_timeout`.
+        Finished sources are merged now; unfinished ones carry over to the next poll and
+        failed ones back off on their own schedule.
+        """
+        now = time.time()
+        for name, make_coro in self._source_fetchers(limit).items():
+            if name in self._source_tasks:
+                continue  # still in flight from a previous poll
+            if now < self._source_retry_at.get(name, 0):
+                continue  # backing off after a failure
+            self._source_tasks[name] = asyncio.create_task(make_coro())
+
+        if self._source_tasks:
+            await asyncio.wait(list(self._source_tasks.values()), timeout=self.source_merge_timeout)
+
+        results: Dict[str, List[Any]] = {}
+        for name, task in list(self._source_tasks.items()):
+            if not task.done():
+                if self.debug:
+                    print(f"[TokenDiscovery] {name} still running, merging it on a later poll")
+                continue
+            del self._source_tasks[name]
+            if task.cancelled():
+                continue
+            exc = task.exception()
+            if exc is not None:
+                self._record_source_failure(name, exc)
+                continue
+            self._source_failures.pop(name, None)
+            self._source_retry_at.pop(name, None)
+            results[name] = task.result() or []
+        return results
+
     async def get_tokens_created_today(self, limit: int = 500) -> List[TradingStart]:
         """
         Fetches tokens from GeckoTerminal, BirdEye, DexScreener, and RugCheck in parallel.
+        Only items newer than each source's cursor and mints not yet seen are parsed.
         Merges results, prioritizing GeckoTerminal data if duplicates exist.
         """
-        # 1. Define tasks for parallel execution
-        gt_task = retry_with_backoff(
-            self._fetch_geckoterminal_new_pools,
-            limit=limit,
-            retries=3,
-            base_delay=2.0
-        )
-        
-        be_task = self._fetch_birdeye_new_tokens()
-        dx_task = self._fetch_dexscreener_new_tokens()
-        dx_boost_task = self._fetch_dexscreener_boosted_tokens()
-        
-        rc_task = retry_with_backoff(
-            self._fetch_rugcheck_new_tokens,
-            retries=3,
-            base_delay=2.0
-        )
+        results = await self._collect_source_results(limit)
 
-        # 2. Run concurrently
-        results = await asyncio.gather(gt_task, be_task, dx_task, dx_boost_task, rc_task, return_exceptions=True)
-        
-        # 3. Handle Results
-        gt_raw_pools = results[0] if not isinstance(results[0], Exception) else []
-        be_starts = results[1] if not isinstance(results[1], Exception) else []
-        dx_starts = results[2] if not isinstance(results[2], Exception) else []
-        dx_boosted_starts = results[3] if not isinstance(results[3], Exception) else []
-        rc_starts = results[4] if not isinstance(results[4], Exception) else []
-        
-        # Log failures if any
-        if self.debug:
-            for i, name in enumerate(["GeckoTerminal", "BirdEye", "DexScreener", "DexScreenerBoost", "RugCheck"]):
-                if isinstance(results[i], Exception):
-                    print(f"[TokenDiscovery] {name} failed: {results[i]}")
+        gt_raw_pools = results.get("geckoterminal", [])
+        be_starts = results.get("birdeye", [])
+        dx_starts = results.get("dexscreener", [])
+        dx_boosted_starts = results.get("dexscreener_boost", [])
+        rc_starts = results.get("rugcheck", [])
 
-        # 4. Process GeckoTerminal Data
+        # Process GeckoTerminal Data (cheap cursor/mint checks before the full parse)
         gt_starts = []
         now = int(datetime.now(timezone.utc).timestamp())
         cutoff = now - 24 * 3600  # last 24 hours
+        gt_cursor = self.source_cursors.get("geckoterminal", 0)
 
         for pool in gt_raw_pools:
-            block_time = self._parse_iso_timestamp(pool["attributes"]["pool_created_at"])
-            if not block_time: continue
-            if block_time < cutoff: continue
+            try:
+                block_time = self._parse_iso_timestamp(pool["attributes"]["pool_created_at"])
+                if not block_time: continue
+                if block_time < cutoff or block_time < gt_cursor: continue
 
-            ts = self._parse_geckoterminal_pool(pool)
-            gt_starts.append(ts)
+                base_id = pool["relationships"]["base_token"]["data"]["id"]
+                mint = base_id.replace("eth_", "").replace("solana_", "")
+                if not self._is_new_mint(mint): continue
+
+                gt_starts.append(self._parse_geckoterminal_pool(pool))
+            except (KeyError, TypeError, ValueError) as e:
+                if self.debug:
+                    print(f"[GeckoTerminal] Skipping malformed pool: {e}")
+                continue
 
             # Update timestamp tracker
             if self.last_processed_timestamp is None or block_time > self.last_processed_timestamp:
                 self.last_processed_timestamp = block_time
+            self._advance_cursor("geckoterminal", block_time)
 
         if gt_starts:
             self._save_last_timestamp()
+        if gt_starts or be_starts:
+            self._save_source_cursors()
 
-        # 5. Merge and Deduplicate (Priority order: RC < BE < DX < GT)
+        # Merge and Deduplicate (Priority order: RC < BE < DX < GT)
         unique_tokens = {}
-        
-        # Lower priority sources first
-        for ts in rc_starts:
-            unique_tokens[ts.mint] = ts
-        
-        for ts in be_starts:
-            unique_tokens[ts.mint] = ts
-            
-        for ts in dx_starts:
-            unique_tokens[ts.mint] = ts
-
-        for ts in dx_boosted_starts:
-            unique_tokens[ts.mint] = ts
-
-        for ts in gt_starts:
-            unique_tokens[ts.mint] = ts
+        for source_starts in (rc_starts, be_starts, dx_starts, dx_boosted_starts, gt_starts):
+            for ts in source_starts:
+                unique_tokens[ts.mint] = ts
 
         final_list = list(unique_tokens.values())
 
         if self.debug:
-            print(f"[TokenDiscovery] Combined Total: {len(final_list)} unique tokens "
-                  f"(GT: {len(gt_starts)}, BE: {len(be_starts)}, DX: {len(dx_starts)}, DX_BOOST: {len(dx_boosted_starts)}, RC: {len(rc_starts)})")
+            print(f"[TokenDiscovery] Combined Total: {len(final_list)} new unique tokens "
+                  f"(GT: {len(gt_starts)}, BE: {len(be_starts)}, DX: {len(dx_starts)}, DX_BOOST: {len(dx_boosted_starts)}, RC: {len(rc_starts)}, "
+                  f"seen cache: {len(self.seen_mints)})")
 
         return final_list
 
@@ -2076,6 +2234,251 @@ def calculate_overlap_grade(overlap_count: int, overlap_percentage: float, conce
 # -----------------------
 # Monitor (updated for async Dune)
 # -----------------------
+# -----------------------
+# Central analysis scheduler (delay queue + fixed worker pool)
+# -----------------------
+@dataclass
+class AnalysisJob:
+    mint: str
+    kind: str                     # "overlap" | "probation"
+    run_at: float
+    priority: int
+    start: TradingStart
+    check_count: int = 0
+    seq: int = 0
+    state: str = "scheduled"      # "scheduled" | "ready" | "running"
+
+
+class AnalysisScheduler:
+    """
+    Replaces one long-lived asyncio task per token with a single delay queue
+    and a fixed pool of workers.
+
+    - Jobs are keyed by (mint, kind); re-scheduling a key replaces the old entry.
+    - Due jobs are served by priority (lower first), then by deadline. With
+      `priority_fn`, priority is recomputed from the job's start on every
+      reschedule and restore, so a token's rank follows its age.
+    - First deadlines get random jitter so tokens discovered together don't wake
+      together; reschedules keep the handler's exact run time.
+    - The queue is snapshotted to disk so startup recovery resumes it exactly.
+
+    `handler(job)` runs the job and returns the next absolute run time, or None when finished.
+    """
+    def __init__(self, handler, *, workers: int = 8, queue_file: str = "./data/analysis_queue.pkl",
+                 jitter_seconds: float = 60.0, persist_interval: float = 5.0,
+                 priority_fn: Optional[Callable[[TradingStart], int]] = None, debug: bool = False):
+        self.handler = handler
+        self.priority_fn = priority_fn
+        self.num_workers = workers
+        self.queue_file = queue_file
+        self.jitter_seconds = jitter_seconds
+        self.persist_interval = persist_interval
+        self.debug = debug
+
+        self._jobs: Dict[Tuple[str, str], AnalysisJob] = {}
+        self._delay_heap: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._ready: Optional[asyncio.PriorityQueue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = 0
+        self._dirty = False
+        self._last_persist = 0.0
+
+        # Gauges
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._recent_lags: "deque[float]" = deque(maxlen=500)
+        os.makedirs(os.path.dirname(self.queue_file) or ".", exist_ok=True)
+
+    # ---------------- scheduling API ----------------
+    def schedule(self, mint: str, kind: str, start: TradingStart, run_at: float, priority: int,
+                 check_count: int = 0, jitter: bool = True) -> AnalysisJob:
+        if jitter and self.jitter_seconds > 0:
+            run_at += random.uniform(0, self.jitter_seconds)
+        self._seq += 1
+        job = AnalysisJob(mint=mint, kind=kind, run_at=run_at, priority=priority,
+                          start=start, check_count=check_count, seq=self._seq)
+        self._jobs[(mint, kind)] = job
+        heapq.heappush(self._delay_heap, (run_at, job.seq, (mint, kind)))
+        self._dirty = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _current_priority(self, job_start: TradingStart, fallback: int) -> int:
+        if self.priority_fn is None:
+            return fallback
+        try:
+            return int(self.priority_fn(job_start))
+        except Exception:
+            return fallback
+
+    def has_job(self, mint: str, kind: str) -> bool:
+        return (mint, kind) in self._jobs
+
+    def cancel(self, mint: str, kind: str):
+        # Stale heap / ready entries are skipped lazily by seq
+        if self._jobs.pop((mint, kind), None) is not None:
+            self._dirty = True
+
+    # ---------------- lifecycle ----------------
+    async def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.PriorityQueue()
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._dispatcher()))
+        for i in range(self.num_workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+        if self.debug:
+            print(f"[Scheduler] started with {self.num_workers} workers, {len(self._jobs)} queued jobs")
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self.persist(force=True)
+
+    async def _dispatcher(self):
+        while True:
+            now = time.time()
+            while self._delay_heap and self._delay_heap[0][0] <= now:
+                _, seq, key = heapq.heappop(self._delay_heap)
+                job = self._jobs.get(key)
+                if job is None or job.seq != seq:
+                    continue  # cancelled or replaced
+                job.state = "ready"
+                self._ready.put_nowait((job.priority, job.run_at, seq, key))
+
+            self.persist()
+
+            timeout = self.persist_interval
+            if self._delay_heap:
+                timeout = min(timeout, max(0.0, self._delay_heap[0][0] - now))
+            self._wakeup.clear()
+            # asyncio.wait (not wait_for) so a stop() racing a wakeup is never swallowed
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            _, _, seq, key = await self._ready.get()
+            job = self._jobs.get(key)
+            if job is None or job.seq != seq:
+                continue
+
+            job.state = "running"
+            self._in_flight += 1
+            self._recent_lags.append(max(0.0, time.time() - job.run_at))
+            next_run_at = None
+            try:
+                next_run_at = await self.handler(job)
+                self._completed += 1
+            except Exception as e:
+                self._failed += 1
+                if self.debug:
+                    print(f"[Scheduler] worker {worker_id}: {job.kind} job for {job.mint} failed: {e}")
+                    traceback.print_exc()
+                # Keep the token's lifecycle going; the handler decides when it ends
+                next_run_at = time.time() + 300
+            finally:
+                self._in_flight -= 1
+
+            # The handler may have cancelled or replaced this key while running
+            if self._jobs.get(key) is not job:
+                continue
+            if next_run_at is None:
+                del self._jobs[key]
+                self._dirty = True
+            else:
+                self.schedule(job.mint, job.kind, job.start, next_run_at,
+                              self._current_priority(job.start, job.priority),
+                              check_count=job.check_count + 1, jitter=False)
+
+    # ---------------- persistence ----------------
+    def persist(self, force: bool = False):
+        now = time.time()
+        if not self._dirty or (not force and now - self._last_persist < self.persist_interval):
+            return
+        snapshot = [
+            {
+                "mint": j.mint,
+                "kind": j.kind,
+                "run_at": j.run_at,
+                "priority": j.priority,
+                "check_count": j.check_count,
+                "start": _sanitize_maybe(j.start),
+            }
+            for j in self._jobs.values()
+        ]
+        try:
+            joblib.dump(snapshot, self.queue_file)
+            self._dirty = False
+            self._last_persist = now
+        except Exception as e:
+            if self.debug:
+                print("[Scheduler] persist failed", e)
+
+    def load_persisted(self) -> List[AnalysisJob]:
+        """Restore the queue snapshot (deadlines unchanged; overdue jobs run first by priority)."""
+        if not os.path.exists(self.queue_file):
+            return []
+        try:
+            snapshot = joblib.load(self.queue_file)
+        except Exception as e:
+            if self.debug:
+                print("[Scheduler] load failed", e)
+            return []
+
+        restored = []
+        for item in snapshot or []:
+            try:
+                start = TradingStart(**item["start"])
+                restored.append(self.schedule(
+                    item["mint"], item["kind"], start, float(item["run_at"]),
+                    self._current_priority(start, int(item["priority"])),
+                    check_count=int(item.get("check_count", 0)), jitter=False,
+                ))
+            except Exception as e:
+                if self.debug:
+                    print(f"[Scheduler] skipping unreadable queue entry: {e}")
+        if self.debug:
+            print(f"[Scheduler] restored {len(restored)} jobs from {self.queue_file}")
+        return restored
+
+    # ---------------- gauges ----------------
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        ready = [j for j in self._jobs.values() if j.state == "ready"]
+        lags = sorted(self._recent_lags)
+        return {
+            "queued": len(self._jobs),
+            "backlog": len(ready),
+            "in_flight": self._in_flight,
+            "workers": self.num_workers,
+            "oldest_ready_lag_s": round(max((now - j.run_at for j in ready), default=0.0), 1),
+            "start_lag_p50_s": round(lags[len(lags) // 2], 1) if lags else 0.0,
+            "start_lag_max_s": round(lags[-1], 1) if lags else 0.0,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+
+# -----------------------
+# Monitor
+# -----------------------
 class Monitor:
     def __init__(
         self,
@@ -2095,6 +2498,8 @@ class Monitor:
         coingecko_poll_interval_seconds: int = 30,
         initial_check_delay_seconds: int = 600, # 10 minutes
         repeat_interval_seconds: int = 1800, # 30 minutes
+        analysis_workers: int = ANALYSIS_WORKERS,
+        queue_file: str = "./data/analysis_queue.pkl",
         debug: bool = False,
     ):
         self.sol_client = sol_client
@@ -2114,11 +2519,21 @@ class Monitor:
         self.last_dune_build = 0  # Track last Dune cache build time
         # Probation / risky tokens (for GoPlus + Dexscreener gating)
         self.pending_risky_tokens: Dict[str, Dict[str, Any]] = {}  # mint -> {first_seen, last_checked, attempts, reasons, overlap_result}
-        self._probation_tasks: Dict[str, asyncio.Task] = {}  # mint -> asyncio.Task
+        # One delay queue + fixed worker pool for every token's overlap / probation checks
+        self.scheduler = AnalysisScheduler(
+            self._run_analysis_job,
+            workers=analysis_workers,
+            queue_file=queue_file,
+            jitter_seconds=ANALYSIS_JITTER_SECONDS,
+            priority_fn=self._analysis_priority,
+            debug=debug,
+        )
         # ------------------ 🚀 CHANGE 2: Use the provided session ------------------
         self.http_session = http_session
         # --- NEW: Store ML Classifier ---
         self.ml_classifier = ml_classifier
+        # Tokens reaching the ML gate together are scored as one batch off the event loop
+        self.ml_scorer = MLBatchScorer(ml_classifier)
         # concurrency guard for external API calls
         self._api_sema = asyncio.Semaphore(8)
 
@@ -2133,16 +2548,6 @@ class Monitor:
         now_ts = int(datetime.now(timezone.utc).timestamp())
         cutoff_ts = now_ts - (6 * 3600)  # 4 hours ago
 
-        # --- Cleanup _probation_tasks ---
-        finished_probation_tasks = [
-            mint for mint, task in self._probation_tasks.items() if task.done()
-        ]
-        if finished_probation_tasks:
-            for mint in finished_probation_tasks:
-                del self._probation_tasks[mint]
-            if self.debug:
-                print(f"[Cleanup] Removed {len(finished_probation_tasks)} finished probation tasks from memory.")
-
         # --- Cleanup _scheduled (as a safety net) ---
         scheduling_state = self.scheduling_store.load()
         expired_mints_in_mem = set()
@@ -2810,7 +3215,7 @@ class Monitor:
         # ML Prediction
         ml_prediction_result = None
         try:            
-            ml_prediction_result = self.ml_classifier.predict(
+            ml_prediction_result = await self.ml_scorer.score(
                 mint, 
                 threshold=ML_PREDICTION_THRESHOLD,
                 action_threshold=ML_ACTION_THRESHOLD,
@@ -3017,78 +3422,80 @@ class Monitor:
             # scheduling store might not be critical; continue
             pass
 
-        # ensure a single probation task per mint
-        if mint in self._probation_tasks and not self._probation_tasks[mint].done():
+        # ensure a single probation job per mint
+        if self.scheduler.has_job(mint, "probation"):
             if self.debug:
                 print(f"Probation: updated existing probation for {mint}; reasons={reasons}")
             return
 
-        task = asyncio.create_task(self._probation_recheck_loop(mint, start))
-        self._probation_tasks[mint] = task
+        self.scheduler.schedule(
+            mint, "probation", start,
+            run_at=time.time() + PROBATION_RECHECK_SECONDS,
+            priority=self._analysis_priority(start),
+        )
         if self.debug:
             print(f"Probation: started probation for {mint}; reasons={reasons}")
 
-    async def _probation_recheck_loop(self, mint: str, start: Any):
+    async def _run_probation_job(self, job: AnalysisJob) -> Optional[float]:
+        """One probation recheck. Returns the next run time, or None when probation is over."""
+        mint, start = job.mint, job.start
         first_seen_ts = int(self.pending_risky_tokens.get(mint, {}).get("first_seen_ts", int(datetime.now(timezone.utc).timestamp())))
         deadline = first_seen_ts + 24 * 3600
-        interval = 5 * 60  # 5 minutes
 
-        while True:
-            now_ts = int(datetime.now(timezone.utc).timestamp())
-            if now_ts >= deadline:
-                if self.debug:
-                    print(f"Probation: {mint} exceeded 6h probation -> dropping")
-                self.pending_risky_tokens.pop(mint, None)
-                try:
-                    self.scheduling_store.update_token_state(mint, {
-                        "status": "dropped",
-                        "dropped_at": datetime.now(timezone.utc).isoformat(),
-                        "probation_final": True
-                    })
-                    self._scheduled.discard(mint) # Cleanup from memory
-                except Exception:
-                    pass
-                break
-            
-            # --- 🚀 MODIFIED: Call the new analysis function ---
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        if now_ts >= deadline:
+            if self.debug:
+                print(f"Probation: {mint} exceeded 24h probation -> dropping")
+            self.pending_risky_tokens.pop(mint, None)
             try:
-                entry = self.pending_risky_tokens.get(mint)
-                if not entry:
-                    if self.debug:
-                        print(f"Probation: {mint} no longer in pending list. Exiting loop.")
-                    break # Token was promoted and removed
-                
+                self.scheduling_store.update_token_state(mint, {
+                    "status": "dropped",
+                    "dropped_at": datetime.now(timezone.utc).isoformat(),
+                    "probation_final": True
+                })
+                self._scheduled.discard(mint) # Cleanup from memory
+            except Exception:
+                pass
+            return None
+
+        try:
+            entry = self.pending_risky_tokens.get(mint)
+            if not entry:
                 if self.debug:
-                    print(f"[Probation] Re-running analysis for {mint}...")
-                    
-                check_count = entry.get("attempts", 0)
-                
-                # This function will:
-                # 1. Re-run RugCheck
-                # 2. Re-run security gate
-                # 3. If it fails again, call _start_or_update_probation (updating the entry)
-                # 4. If it passes, run Helius, save, and remove from pending_risky_tokens
-                await self.run_token_analysis_step(start, check_count)
-                
-                # Check if the token is still in probation after the analysis
-                if mint not in self.pending_risky_tokens:
-                    if self.debug:
-                        print(f"Probation: {mint} passed during probation recheck -> exiting probation loop")
-                    break # It passed and was promoted
-                    
-            except Exception as e:
+                    print(f"Probation: {mint} no longer in pending list. Ending probation.")
+                return None # Token was promoted and removed
+
+            if self.debug:
+                print(f"[Probation] Re-running analysis for {mint}...")
+
+            check_count = entry.get("attempts", 0)
+
+            # This function will:
+            # 1. Re-run RugCheck
+            # 2. Re-run security gate
+            # 3. If it fails again, call _start_or_update_probation (updating the entry)
+            # 4. If it passes, run Helius, save, and remove from pending_risky_tokens
+            await self.run_token_analysis_step(start, check_count)
+
+            # Check if the token is still in probation after the analysis
+            if mint not in self.pending_risky_tokens:
                 if self.debug:
-                    print(f"Probation: error during recheck for {mint}: {e}")
-                # Log error to scheduler
-                try:
-                    self.scheduling_store.update_token_state(mint, {
-                        "last_error": str(e),
-                        "last_error_at": datetime.now(timezone.utc).isoformat()
-                    })
-                except Exception:
-                    pass
-            
-            await asyncio.sleep(interval)
+                    print(f"Probation: {mint} passed during probation recheck -> ending probation")
+                return None # It passed and was promoted
+
+        except Exception as e:
+            if self.debug:
+                print(f"Probation: error during recheck for {mint}: {e}")
+            # Log error to scheduler
+            try:
+                self.scheduling_store.update_token_state(mint, {
+                    "last_error": str(e),
+                    "last_error_at": datetime.now(timezone.utc).isoformat()
+                })
+            except Exception:
+                pass
+
+        return time.time() + PROBATION_RECHECK_SECONDS
 
 
     async def daily_dune_scheduler(self):
@@ -3236,7 +3643,23 @@ class Monitor:
                 print(f"[Recovery] CRITICAL: Failed to load tracked tokens: {e}. Aborting recovery.")
             return
 
-        recovery_tasks = []
+        # Anything with scheduling state is already known to discovery
+        seen_mints = self.token_discovery.seen_mints
+        for token_mint, state in scheduling_state.items():
+            seen_mints.add(token_mint, state.get("launch_time"))
+        seen_mints.save()
+
+        # Resume the persisted queue as-is (deadlines and check counts preserved)
+        for job in self.scheduler.load_persisted():
+            state = scheduling_state.get(job.mint)
+            if not state or state.get("status") in ("completed", "dropped", "failed"):
+                self.scheduler.cancel(job.mint, job.kind)
+                continue
+            if job.kind == "probation":
+                self._rehydrate_probation(job.mint, state)
+            self._scheduled.add(job.mint)
+
+        recovered = 0
         for token_mint, state in scheduling_state.items():
             if token_mint in self._scheduled:
                 continue
@@ -3253,29 +3676,37 @@ class Monitor:
             if status == "pending_first" or status == "active":
                 if self.debug:
                     print(f"[Recovery] Re-launching main check loop for {token_mint} (status: {status})")
-                task = asyncio.create_task(self._schedule_overlap_checks_for_token(start_obj))
-                recovery_tasks.append(task)
+                self._enqueue_overlap_checks(start_obj)
+                recovered += 1
                 
             elif status == "probation":
                 if self.debug:
                     print(f"[Recovery] Re-launching probation loop for {token_mint}")
                 # Re-hydrate the in-memory probation state to match
-                self.pending_risky_tokens[token_mint] = {
-                    "first_seen": state.get("probation_first_seen"),
-                    "first_seen_ts": int(datetime.fromisoformat(state.get("probation_first_seen")).timestamp()),
-                    "last_checked": state.get("probation_last_checked"),
-                    "attempts": state.get("probation_attempts", 1),
-                    "reasons": state.get("probation_reasons", ["recovered_from_probation"]),
-                    "overlap_result": {"mint": token_mint, "grade": "NONE"} # Stub
-                }
-                task = asyncio.create_task(self._probation_recheck_loop(token_mint, start_obj))
-                recovery_tasks.append(task)
+                self._rehydrate_probation(token_mint, state)
+                self.scheduler.schedule(
+                    token_mint, "probation", start_obj,
+                    run_at=time.time(),
+                    priority=self._analysis_priority(start_obj),
+                )
+                recovered += 1
                 
             self._scheduled.add(token_mint)
             
-        if recovery_tasks:
-            if self.debug:
-                print(f"Monitor ASYNC: started {len(recovery_tasks)} recovery tasks")
+        if self.debug:
+            print(f"Monitor ASYNC: queue holds {len(self.scheduler)} jobs after recovery ({recovered} rebuilt from scheduling state)")
+
+    def _rehydrate_probation(self, token_mint: str, state: Dict[str, Any]):
+        if token_mint in self.pending_risky_tokens:
+            return
+        self.pending_risky_tokens[token_mint] = {
+            "first_seen": state.get("probation_first_seen"),
+            "first_seen_ts": int(datetime.fromisoformat(state.get("probation_first_seen")).timestamp()),
+            "last_checked": state.get("probation_last_checked"),
+            "attempts": state.get("probation_attempts", 1),
+            "reasons": state.get("probation_reasons", ["recovered_from_probation"]),
+            "overlap_result": {"mint": token_mint, "grade": "NONE"} # Stub
+        }
 
     async def poll_coingecko_loop(self):
         if self.debug:
@@ -3284,58 +3715,73 @@ class Monitor:
         # Start the daily Dune scheduler as a background task
         asyncio.create_task(self.daily_dune_scheduler())
         
-        # Start startup recovery
+        # Start startup recovery, then the shared analysis workers
         await self.startup_recovery()
+        await self.scheduler.start()
+        last_gauge_log = 0.0
         
         while True:
             try:
                 starts = await self.token_discovery.get_tokens_created_today(limit=500)
+                seen_mints = self.token_discovery.seen_mints
                 if self.debug:
                     print(f"Monitor ASYNC: CoinGecko returned {len(starts)} tokens")
                 new_tokens_scheduled = 0
-                for s in starts:
-                    if not s.mint:
-                        continue
-                    if s.mint in self._scheduled:
-                        continue
-                    existing_state = self.scheduling_store.get_token_state(s.mint)
-                    if existing_state:
-                        if self.debug:
-                            print(f"Monitor ASYNC: token {s.mint} already has scheduling state, skipping")
-                        continue
-                    
-                    # Launch the master task for this token
-                    asyncio.create_task(self._schedule_overlap_checks_for_token(s))
-                    self._scheduled.add(s.mint)
-                    new_tokens_scheduled += 1
-                    
-                    # Save the initial "pending" state
-                    current_time = int(datetime.now(timezone.utc).timestamp())
-                    self.scheduling_store.update_token_state(s.mint, {
-                        "launch_time": s.block_time or current_time,
-                        "first_check_at": (s.block_time or current_time) + self.initial_check_delay_seconds,
-                        "status": "pending_first",
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "total_checks_completed": 0
-                    })
+                candidates = [s for s in starts if s.mint and s.mint not in self._scheduled]
+
+                if candidates:
+                    # One store load per poll instead of one per token
+                    scheduling_state = self.scheduling_store.load()
+                    for s in candidates:
+                        seen_mints.add(s.mint)
+                        if s.mint in scheduling_state:
+                            if self.debug:
+                                print(f"Monitor ASYNC: token {s.mint} already has scheduling state, skipping")
+                            continue
+
+                        # Queue the token's check lifecycle
+                        self._enqueue_overlap_checks(s)
+                        self._scheduled.add(s.mint)
+                        new_tokens_scheduled += 1
+
+                        # Initial "pending" state
+                        current_time = int(datetime.now(timezone.utc).timestamp())
+                        scheduling_state[s.mint] = {
+                            "launch_time": s.block_time or current_time,
+                            "first_check_at": (s.block_time or current_time) + self.initial_check_delay_seconds,
+                            "status": "pending_first",
+                            "created_at": datetime.now(timezone.utc).isoformat(),
+                            "total_checks_completed": 0
+                        }
+
+                    if new_tokens_scheduled > 0:
+                        self.scheduling_store.save(scheduling_state)
+                seen_mints.save()
                     
                 if new_tokens_scheduled > 0 and self.debug:
                     print(f"Monitor ASYNC: scheduled overlap checks for {new_tokens_scheduled} new tokens")
                     
-                try:
-                    # Use the new async save method
-                    await self.updater.save_trading_starts_async(starts, skip_existing=True)
-                except Exception as e:
-                    if self.debug:
-                        print("Monitor ASYNC: updater save error", e)
+                if starts:
+                    try:
+                        # Use the new async save method
+                        await self.updater.save_trading_starts_async(starts, skip_existing=True)
+                    except Exception as e:
+                        if self.debug:
+                            print("Monitor ASYNC: updater save error", e)
                         
                 current_time = time.time()
                 if current_time - self.last_cleanup > 3600:
                     # Use the new async cleanup method
                     await self.updater.cleanup_old_tokens_async()
                     self.scheduling_store.cleanup_old_states()
+                    self.token_discovery.seen_mints.prune()
                     await self._cleanup_finished_tasks() # Memory cleanup
                     self.last_cleanup = current_time
+
+                if self.debug and current_time - last_gauge_log > 300:
+                    print(f"[Scheduler] {self.scheduler.stats()}")
+                    print(f"[ML] {self.ml_scorer.stats()}")
+                    last_gauge_log = current_time
                     
             except Exception as e:
                 if self.debug:
@@ -3344,78 +3790,89 @@ class Monitor:
                     
             await asyncio.sleep(self.coingecko_poll_interval_seconds)
 
-    async def _schedule_overlap_checks_for_token(self, start: TradingStart):
+    def _analysis_priority(self, start: TradingStart) -> int:
+        """Lower runs first: fresh launches, then high FDV."""
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        fresh = now_ts - int(start.block_time or now_ts) < PRIORITY_FRESH_SECONDS
+        high_fdv = (start.fdv_usd or 0.0) >= PRIORITY_HIGH_FDV_USD
+        return (0 if fresh else 2) + (0 if high_fdv else 1)
+
+    def _enqueue_overlap_checks(self, start: TradingStart):
         """
-        🚀 REFACTORED: This is the master task for a single token's 24-hour lifecycle.
-        It handles the initial delay and the repeating check loop, calling
-        the unified `run_token_analysis_step` function.
+        Queue a token's 6-hour check lifecycle: first run after the initial delay,
+        then every `repeat_interval_seconds` via `_run_overlap_job`.
         """
         now_ts = int(datetime.now(timezone.utc).timestamp())
         block_ts = int(start.block_time or now_ts)
         first_run_at = block_ts + self.initial_check_delay_seconds
-        to_sleep = max(0, first_run_at - now_ts)
-        
+
         if self.debug:
-            print(f"_schedule ASYNC: token={start.mint} will first run in {to_sleep}s (at {datetime.fromtimestamp(first_run_at, timezone.utc)})")
-            
-        await asyncio.sleep(to_sleep)
-        
-        self.scheduling_store.update_token_state(start.mint, {"status": "running_first_check"})
+            print(f"_schedule ASYNC: token={start.mint} will first run in {max(0, first_run_at - now_ts)}s (at {datetime.fromtimestamp(first_run_at, timezone.utc)})")
+
+        self.scheduler.schedule(start.mint, "overlap", start, run_at=first_run_at,
+                                priority=self._analysis_priority(start))
+
+    async def _run_analysis_job(self, job: AnalysisJob) -> Optional[float]:
+        if job.kind == "probation":
+            return await self._run_probation_job(job)
+        return await self._run_overlap_job(job)
+
+    async def _run_overlap_job(self, job: AnalysisJob) -> Optional[float]:
+        """
+        One step of a token's check lifecycle, calling the unified
+        `run_token_analysis_step`. Returns the next run time, or None when finished.
+        """
+        start = job.start
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        block_ts = int(start.block_time or now_ts)
         stop_after = block_ts + 6 * 3600
-        check_count = 0
-        
-        while True:
-            now_ts2 = int(datetime.now(timezone.utc).timestamp())
-            if now_ts2 > stop_after:
-                if self.debug:
-                    print(f"_schedule ASYNC: token={start.mint} past 6h -> stopping scheduled checks")
-                
-                # Final status update
-                current_state = self.scheduling_store.get_token_state(start.mint)
-                if current_state.get("status") not in ["completed", "dropped"]:
-                    self.scheduling_store.update_token_state(start.mint, {
-                        "status": "dropped", # Dropped due to timeout, not failure
-                        "completed_at": datetime.now(timezone.utc).isoformat(),
-                        "probation_final": True
-                    })
-                self._scheduled.discard(start.mint) # Cleanup from memory
-                break
-                
-            try:
-                # --- 🚀 CALL THE UNIFIED ANALYSIS FUNCTION ---
-                await self.run_token_analysis_step(start, check_count)
-                check_count += 1
-                
-                # --- Check status to see if we should stop the loop ---
-                current_state = self.scheduling_store.get_token_state(start.mint)
-                status = current_state.get("status")
-                
-                if status == "completed":
-                    if self.debug:
-                        print(f"_schedule ASYNC: token={start.mint} status is 'completed'. Stopping loop.")
-                    self._scheduled.discard(start.mint) # Cleanup from memory
-                    break # Token has passed and is finished
-                
-                if status == "dropped":
-                    if self.debug:
-                        print(f"_schedule ASYC: token={start.mint} status is 'dropped'. Stopping loop.")
-                    self._scheduled.discard(start.mint) # Cleanup from memory
-                    break # Token failed probation and is finished
-                
-                # If status is "active" or "probation", the loop continues
-                if self.debug:
-                    print(f"_schedule ASYNC: completed check #{check_count} for {start.mint}. Status: {status}. Next check in {self.repeat_interval_seconds}s")
-                
-            except Exception as e:
-                if self.debug:
-                    print(f"_schedule ASYNC: unhandled error in check loop for {start.mint}: {e}")
-                    traceback.print_exc()
+
+        if now_ts > stop_after:
+            if self.debug:
+                print(f"_schedule ASYNC: token={start.mint} past 6h -> stopping scheduled checks")
+
+            # Final status update
+            current_state = self.scheduling_store.get_token_state(start.mint)
+            if current_state.get("status") not in ["completed", "dropped"]:
                 self.scheduling_store.update_token_state(start.mint, {
-                    "last_error": str(e),
-                    "last_error_at": datetime.now(timezone.utc).isoformat()
+                    "status": "dropped", # Dropped due to timeout, not failure
+                    "completed_at": datetime.now(timezone.utc).isoformat(),
+                    "probation_final": True
                 })
-                
-            await asyncio.sleep(self.repeat_interval_seconds)
+            self._scheduled.discard(start.mint) # Cleanup from memory
+            return None
+
+        if job.check_count == 0:
+            self.scheduling_store.update_token_state(start.mint, {"status": "running_first_check"})
+
+        try:
+            # --- 🚀 CALL THE UNIFIED ANALYSIS FUNCTION ---
+            await self.run_token_analysis_step(start, job.check_count)
+
+            # --- Check status to see if we should stop ---
+            current_state = self.scheduling_store.get_token_state(start.mint)
+            status = current_state.get("status")
+
+            if status in ("completed", "dropped"):
+                if self.debug:
+                    print(f"_schedule ASYNC: token={start.mint} status is '{status}'. Stopping checks.")
+                self._scheduled.discard(start.mint) # Cleanup from memory
+                return None
+
+            # If status is "active" or "probation", checks continue
+            if self.debug:
+                print(f"_schedule ASYNC: completed check #{job.check_count + 1} for {start.mint}. Status: {status}. Next check in {self.repeat_interval_seconds}s")
+
+        except Exception as e:
+            if self.debug:
+                print(f"_schedule ASYNC: unhandled error in check for {start.mint}: {e}")
+                traceback.print_exc()
+            self.scheduling_store.update_token_state(start.mint, {
+                "last_error": str(e),
+                "last_error_at": datetime.now(timezone.utc).isoformat()
+            })
+
+        return time.time() + self.repeat_interval_seconds
 
     async def _fetch_and_calculate_overlap(self, start: TradingStart) -> Dict[str, Any]:
         """
@@ -3516,6 +3973,7 @@ async def main_loop():
     # The session is created here and passed into the Monitor,
     # which then uses it for all API calls (RugCheck, DexScreener).
     async with aiohttp.ClientSession() as http_session:
+        monitor = None
         try:
             sol_client = SolanaAlphaClient()
             ok = await sol_client.test_connection()
@@ -3531,6 +3989,8 @@ async def main_loop():
                 dune_query_id=DUNE_QUERY_ID,
                 dune_cache_file="./data/dune_recent.pkl",
                 timestamp_cache_file="./data/last_timestamp.pkl",
+                cursor_cache_file="./data/discovery_cursors.pkl",
+                seen_mints=SeenMintsCache(filepath="./data/seen_mints.pkl", horizon_seconds=24 * 3600, debug=True),
                 debug=True
             )
             holder_agg = HolderAggregator(sol_client, debug=True)
@@ -3586,6 +4046,10 @@ async def main_loop():
             print(f"\n❌ UNHANDLED EXCEPTION in main_loop: {e}")
             traceback.print_exc()
             print("--- 💀 Token Monitor Halted ---")
+        finally:
+            # Keep the analysis queue so the next start resumes it
+            if monitor is not None:
+                await monitor.scheduler.stop()
 
 if __name__ == "__main__":
     print("--- 🚀 Starting Token Monitor ---")
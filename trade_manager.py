@@ -6,30 +6,38 @@ trade_manager.py - Analytics-Driven Paper Trading
 import logging
 import json
 import asyncio
+import hashlib
 import statistics
-import aiohttp
 import os
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 from telegram.ext import Application
 from shared.file_io import safe_load, safe_save
+from shared.jupiter_prices import JUPITER_PRICES
+from alerts.trading_buttons import POSITION_KEY_INDEX
 
 from config import PORTFOLIOS_FILE, BUCKET_NAME, USE_SUPABASE, DATA_DIR, SIGNAL_FRESHNESS_WINDOW, MIN_ALPHA_SCORE
 
 # Import download_file for daily fallback checks
 try:
-    from supabase_utils import upload_file, download_file
+    from supabase_utils import upload_file, download_file, remove_local_copy
 except ImportError:
     upload_file = None
     download_file = None
+    remove_local_copy = None
 
 logger = logging.getLogger(__name__)
 
 ACTIVE_TRACKING_FILE = DATA_DIR / "active_tracking.json"
 
+# Parsed analytics daily files kept in memory (by signal type and date) and how often each is revalidated
+DAILY_FILE_CACHE_SIZE = int(os.getenv("DAILY_FILE_CACHE_SIZE", "8"))
+DAILY_FILE_REVALIDATE_SECS = int(os.getenv("DAILY_FILE_REVALIDATE_SECS", "60"))
+
 class PortfolioManager:
     """Manages virtual portfolios using analytics data."""
 
@@ -43,6 +51,9 @@ class PortfolioManager:
             "discovery": {"median_ath": 45.0, "mean_ath": 60.0, "mode_ath": 40.0, "smart_ath": 35.0},
             "alpha": {"median_ath": 50.0, "mean_ath": 70.0, "mode_ath": 45.0, "smart_ath": 40.0}
         }
+        # (signal_type, date) -> {"checked_at", "digest", "tokens": {mint: final data}}
+        self._daily_files: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._daily_file_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
         self._ensure_portfolio_structure()
         logger.info(f"📈 PortfolioManager initialized. Loaded {len(self.portfolios)} portfolios. (Initialized: {self._is_initialized})")
 
@@ -239,6 +250,7 @@ class PortfolioManager:
                 "best_trade": 0.0, "worst_trade": 0.0
             }
         }
+        POSITION_KEY_INDEX.forget(chat_id)
         self.save()
         logger.info(f"Initialized portfolio for {chat_id} with ${capital}")
 
@@ -250,39 +262,72 @@ class PortfolioManager:
 
     async def get_final_data_from_daily_file(self, mint: str, signal_type: str, tracking_end_date: str) -> Optional[Dict[str, Any]]:
         """
-        Downloads daily file and extracts final token data.
+        Extracts final token data from the analytics daily file.
         tracking_end_date format: "2025-01-15"
+
+        Parsed files are cached per (signal_type, date) and indexed by mint. The local copy is kept,
+        so revalidating (at most every DAILY_FILE_REVALIDATE_SECS) is a conditional GET.
         """
         if not download_file:
             return None
 
+        index = await self._get_daily_file_index(signal_type, tracking_end_date)
+        if index is None:
+            return None
+        return index.get(mint)
+
+    async def _get_daily_file_index(self, signal_type: str, tracking_end_date: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        key = (signal_type, tracking_end_date)
+        # Concurrent exits against the same day wait for one download instead of starting their own
+        lock = self._daily_file_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            return await self._load_daily_file_index(key)
+
+    async def _load_daily_file_index(self, key: Tuple[str, str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        signal_type, tracking_end_date = key
+        entry = self._daily_files.get(key)
+        if entry and time.time() - entry["checked_at"] < DAILY_FILE_REVALIDATE_SECS:
+            self._daily_files.move_to_end(key)
+            return entry["tokens"]
+
         remote_path = f"analytics/{signal_type}/daily/{tracking_end_date}.json"
         local_path = DATA_DIR / f"daily_{tracking_end_date}_{signal_type}.json"
-        
         try:
-            # Download if not cached or force logic can be applied here
-            if download_file(str(local_path), remote_path, bucket=BUCKET_NAME):
-                with open(local_path, 'r') as f:
-                    daily_data = json.load(f)
-                    
-                # Clean up local file to save space
-                try:
-                    os.remove(local_path)
-                except:
-                    pass
+            raw = await asyncio.to_thread(download_file, str(local_path), remote_path, bucket=BUCKET_NAME)
+            if not raw:
+                return entry["tokens"] if entry else None
 
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry and entry["digest"] == digest:
+                tokens = entry["tokens"]
+            else:
+                daily_data = json.loads(raw)
+                tokens = {}
                 if daily_data and "tokens" in daily_data:
                     for token in daily_data["tokens"]:
-                        if token.get("mint") == mint:
-                            return {
-                                "final_price": token.get("final_price"),
-                                "final_roi": token.get("final_roi"),
-                                "ath_roi": token.get("ath_roi")
-                            }
+                        # First entry per mint wins, like the old linear scan
+                        tokens.setdefault(token.get("mint"), {
+                            "final_price": token.get("final_price"),
+                            "final_roi": token.get("final_roi"),
+                            "ath_roi": token.get("ath_roi")
+                        })
         except Exception as e:
             logger.warning(f"Failed to fetch daily file {remote_path}: {e}")
-        
-        return None
+            return entry["tokens"] if entry else None
+
+        self._daily_files[key] = {"checked_at": time.time(), "digest": digest, "tokens": tokens}
+        self._daily_files.move_to_end(key)
+        while len(self._daily_files) > DAILY_FILE_CACHE_SIZE:
+            old_key, _ = self._daily_files.popitem(last=False)
+            # A held lock may still have waiters; dropping it would let a new lock run alongside them
+            old_lock = self._daily_file_locks.get(old_key)
+            if old_lock is not None and not old_lock.locked():
+                del self._daily_file_locks[old_key]
+            # Drop the evicted local copy (and its conditional-GET validators) to bound disk use
+            if remove_local_copy:
+                old_signal, old_date = old_key
+                remove_local_copy(str(DATA_DIR / f"daily_{old_date}_{old_signal}.json"))
+        return tokens
 
     # --- PNL CALCULATIONS ---
 
@@ -299,6 +344,7 @@ class PortfolioManager:
         # Download active tracking once
         active_tracking = await self.download_active_tracking()
         
+        missing = []
         for key, pos in positions.items():
             if pos.get("status") != "active":
                 continue
@@ -313,13 +359,17 @@ class PortfolioManager:
             if data and "current_price" in data:
                 live_prices[mint] = float(data["current_price"])
             else:
-                # Fallback to Jupiter API
-                price = await self.fetch_current_price_fallback(mint)
-                if price > 0:
-                    live_prices[mint] = price
-                else:
-                    # Use last known price
-                    live_prices[mint] = pos.get("current_price", pos["entry_price"])
+                missing.append(pos)
+        
+        if missing:
+            # Fallback to Jupiter API: one batched, cached lookup for every position analytics doesn't cover
+            jupiter_prices = await JUPITER_PRICES.get_prices(pos.get("mint") for pos in missing)
+            for pos in missing:
+                mint = pos.get("mint")
+                if mint in live_prices:
+                    continue
+                # Use last known price when Jupiter has none
+                live_prices[mint] = jupiter_prices.get(mint) or pos.get("current_price", pos["entry_price"])
         
         return live_prices
 
@@ -385,13 +435,8 @@ class PortfolioManager:
 
     async def fetch_current_price_fallback(self, mint: str) -> float:
         """Fallback: Fetch live price from Jupiter if analytics data missing."""
-        url = f"https://lite-api.jup.ag/price/v3?ids={mint}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=5) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        return float(data.get(mint, {}).get("usdPrice", 0))
+            return await JUPITER_PRICES.get_price(mint)
         except Exception as e:
             logger.debug(f"Jupiter fallback failed for {mint}: {e}")
         return 0.0
@@ -715,6 +760,7 @@ class PortfolioManager:
             "ml_passed": token_data.get("ml_passed", False)
         }
         
+        POSITION_KEY_INDEX.add(chat_id, position_key)
         portfolio["capital_usd"] -= size_usd
         self.save()
 
@@ -812,6 +858,7 @@ class PortfolioManager:
         
         portfolio["capital_usd"] += final_value
         del portfolio["positions"][position_key]
+        POSITION_KEY_INDEX.discard(chat_id, position_key)
         
         # Stats
         stats = portfolio["stats"]
@@ -944,10 +991,19 @@ class PortfolioManager:
                 position_dict["sl_used"] = -abs(float(sl_percent))  # Ensure negative
             
             portfolio["positions"][position_key] = position_dict
+            POSITION_KEY_INDEX.add(chat_id, position_key)
             
         self.save()
         return True
     
+    @staticmethod
+    def _manual_refresh_due(pos: Dict[str, Any]) -> bool:
+        """Manual positions refresh every 5s while the token is < 12h old, every 4 minutes after."""
+        fetch_interval = 5 if pos.get("manual_token_age_hours", 24) < 12 else 240
+        last_updated_str = pos.get("last_updated", pos.get("entry_time"))
+        last_updated = datetime.fromisoformat(last_updated_str.rstrip("Z")).replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - last_updated).total_seconds() >= fetch_interval
+
     async def check_and_exit_positions(self, chat_id: str, app: Application, user_manager, active_tracking: Optional[Dict[str, Any]] = None):
         """
         Check analytics data and exit positions if TP hit or tracking ended.
@@ -967,6 +1023,15 @@ class PortfolioManager:
         
         now = datetime.now(timezone.utc)
 
+        # Manual positions need live prices: fetch every due one in one batched, cached lookup
+        due_manual = [
+            pos.get("mint") for pos in portfolio["positions"].values()
+            if pos.get("signal_type") == "manual" and pos.get("entry_time") and self._manual_refresh_due(pos)
+        ]
+        if due_manual:
+            from alerts.price_fetcher import PriceFetcher
+            await PriceFetcher.get_token_infos(due_manual)
+
         for key, pos in list(portfolio["positions"].items()):
             mint = pos.get("mint")
             signal_type = pos.get("signal_type")
@@ -1010,21 +1075,8 @@ class PortfolioManager:
                     # In the future, this should be passed from the buy command
                     pos["manual_token_age_hours"] = 24  # Default assumption
                 
-                token_age_hours = pos.get("manual_token_age_hours", 24)
-                
-                # Determine fetch interval based on token age
-                if token_age_hours < 12:
-                    fetch_interval = 5  # 5 seconds for young tokens
-                else:
-                    fetch_interval = 240  # 4 minutes for older tokens
-                
-                # Check if enough time has passed since last update
-                last_updated_str = pos.get("last_updated", pos.get("entry_time"))
-                last_updated = datetime.fromisoformat(last_updated_str.rstrip("Z")).replace(tzinfo=timezone.utc)
-                time_since_update = (datetime.now(timezone.utc) - last_updated).total_seconds()
-                
-                # Only fetch if enough time has passed
-                if time_since_update >= fetch_interval:
+                # Only fetch if enough time has passed (served from the batch prefetch above)
+                if self._manual_refresh_due(pos):
                     token_info = await PriceFetcher.get_token_info(mint)
                     if token_info:
                         pos["current_price"] = token_info["price"]
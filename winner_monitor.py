@@ -55,6 +55,7 @@ from token_monitor import (
     evaluate_probation_from_rugcheck
 )
 from ml_predictor import SolanaTokenPredictor
+from shared.ml_batcher import MLBatchScorer
 
 load_dotenv()
 
@@ -822,6 +823,8 @@ class AlphaTokenAnalyzer:
         self.rugcheck_client = rugcheck_client
         self.dex_limiter = dex_limiter
         self.ml_classifier = ml_classifier
+        # Tokens reaching the ML gate together are scored as one batch off the event loop
+        self.ml_scorer = MLBatchScorer(ml_classifier)
         self.debug = debug
         
         if self.debug:
@@ -1635,7 +1638,7 @@ class AlphaTokenAnalyzer:
                 if self.debug:
                     print(f"[TokenAnalyzer] 🔮 Calling ML predictor for mint: {mint}")
 
-                ml_prediction_result = self.ml_classifier.predict(
+                ml_prediction_result = await self.ml_scorer.score(
                     mint, 
                     threshold=ML_PREDICTION_THRESHOLD,
                     action_threshold=ML_ACTION_THRESHOLD,
@@ -1723,6 +1726,9 @@ class AlphaTokenAnalyzer:
                 if self.debug:
                     print(f"[TokenAnalyzer] ⚠️ Analysis failed for {mints[i]}: {res.get('error')}")
                 results.append(res)
+
+        if self.debug:
+            print(f"[TokenAnalyzer] 🔮 ML scoring: {self.ml_scorer.stats()}")
                     
         return results
 